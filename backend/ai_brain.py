@@ -5,10 +5,9 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from config import Config
 import json
-import requests
 import re
-import time
 import ast # Added for safe literal eval
+from keyword_matcher import KeywordMatcher
 TRAINING_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'training_state.json')
 
 try:
@@ -17,6 +16,16 @@ except ImportError:
     print("Warning: Could not import EMOTION_CODE_MAP from emotion_codes")
     EMOTION_CODE_MAP = {}
 
+# [Phase 4] 3단계 위기 키워드 — 오토마톤(범주: level3 / level2 / level1)은 모듈 로드 시 1회 구성
+CRISIS_LEVEL_3 = ["죽고", "자살", "뛰어내", "목을", "손목", "유서", "마지막", "끝내고", "자해", "목숨"]
+CRISIS_LEVEL_2 = ["사라지고", "없어지고", "살기 싫", "의미 없", "끝내", "망했", "수면제", "칼", "약 먹", "다 끝"]
+CRISIS_LEVEL_1 = ["힘들", "지치", "우울", "불안", "두렵", "외로", "무서", "포기", "눈물"]
+CRISIS_LEVEL_MATCHER = KeywordMatcher(
+    [(kw, 'level3') for kw in CRISIS_LEVEL_3]
+    + [(kw, 'level2') for kw in CRISIS_LEVEL_2]
+    + [(kw, 'level1') for kw in CRISIS_LEVEL_1]
+)
+
 # TensorFlow/Keras Import (Optional)
 try:
     raise ImportError("Disabled to prevent mutex crash on macOS")
@@ -262,7 +271,6 @@ class EmotionAnalysis:
         """
         Generates a warm insight using Local Gemma 4 (Ollama).
         """
-        import requests
         import json
 
         print(f"🔍 [Insight] Request received. Recent diaries count: {len(recent_diaries)}, Weather: {weather}")
@@ -294,29 +302,19 @@ class EmotionAnalysis:
                 "마음온 조언(날씨와 감정 흐름이 통합된 한 문장):"
             )
 
-            # Ollama Payload
-            payload = {
-                "model": "gemma4:2b", # Use Custom Model Name
-                "prompt": prompt_text,
-                "stream": False,
-                "options": {
-                    "temperature": 0.5,
-                    "num_predict": 60 
-                }
-            }
-            
             print(f"🦙 [Insight] Requesting Ollama (Maum-On Gemma)...")
-            url = "http://localhost:11434/api/generate"
-            
+            from llm_gateway import generate
+
             # Timeout Increased to 60s (OCI CPU might be slow or busy)
-            response = requests.post(url, json=payload, timeout=60)
-            
-            if response.status_code != 200:
-                print(f"❌ Ollama Insight Error {response.status_code}: {response.text}")
-                return None
-                
-            result = response.json()
-            response_text = result.get('response', '').strip()
+            response_text = generate(
+                prompt_text,
+                model="gemma4:2b", # Use Custom Model Name
+                options={
+                    "temperature": 0.5,
+                    "num_predict": 60
+                },
+                timeout=60
+            ).strip()
             
             # Cleanup quotes if model adds them
             if response_text.startswith('"') and response_text.endswith('"'):
@@ -331,14 +329,10 @@ class EmotionAnalysis:
 
     def analyze_diary_with_local_llm(self, text, history_context=None, user_risk_level=1):
         # [Local AI Mode] Uses Local Ollama (Gemma 4) for Analysis.
-        import requests
-        import json
+        from llm_gateway import generate
         
-        # Local Ollama URL
         print(f"🦙 [Local AI] Requesting Ollama (Maum-On Gemma)...", end=" ", flush=True)
         try:
-            url = "http://localhost:11434/api/generate"
-            
             # Context Injection
             context_section = ""
             if history_context:
@@ -353,14 +347,11 @@ class EmotionAnalysis:
             if user_risk_level >= 4: risk_desc = "매우 위험(Severe Risk)"
             elif user_risk_level == 3: risk_desc = "위험(Moderate Risk)"
             
-            # [Phase 4] 3단계 위기 분류 시스템
-            CRISIS_LEVEL_3 = ["죽고", "자살", "뛰어내", "목을", "손목", "유서", "마지막", "끝내고", "자해", "목숨"]
-            CRISIS_LEVEL_2 = ["사라지고", "없어지고", "살기 싫", "의미 없", "끝내", "망했", "수면제", "칼", "약 먹", "다 끝"]
-            CRISIS_LEVEL_1 = ["힘들", "지치", "우울", "불안", "두렵", "외로", "무서", "포기", "눈물"]
-            
-            found_l3 = [k for k in CRISIS_LEVEL_3 if k in text]
-            found_l2 = [k for k in CRISIS_LEVEL_2 if k in text]
-            found_l1 = [k for k in CRISIS_LEVEL_1 if k in text]
+            # [Phase 4] 3단계 위기 분류 시스템 (CRISIS_LEVEL_MATCHER 1회 스캔, 단계별 키워드 순서 유지)
+            found = CRISIS_LEVEL_MATCHER.found(text)
+            found_l3 = [k for k, level in found if level == 'level3']
+            found_l2 = [k for k, level in found if level == 'level2']
+            found_l1 = [k for k, level in found if level == 'level1']
             
             if found_l3:
                 crisis_level = 3
@@ -407,25 +398,16 @@ class EmotionAnalysis:
                 f"반드시 위 형식만 지켜서 답변해."
             )
             
-            payload = {
-                "model": "gemma4:2b",
-                "prompt": prompt_text,
-                "stream": False,
-                "options": {
-                    "temperature": 0.3, 
-                    "num_predict": 160 # Optimized for Speed (OCI CPU)
-                }
-            }
-            
             # Timeout 60s
-            response = requests.post(url, json=payload, timeout=60)
-            
-            if response.status_code != 200:
-                print(f"❌ Ollama Error {response.status_code}: {response.text}")
-                return None, None
-                
-            result = response.json()
-            response_text = result.get('response', '').strip()
+            response_text = generate(
+                prompt_text,
+                model="gemma4:2b",
+                options={
+                    "temperature": 0.3,
+                    "num_predict": 160 # Optimized for Speed (OCI CPU)
+                },
+                timeout=60
+            ).strip()
             print(f"🔍 Raw Output: {response_text}")
             
             # Use Regex to parse Korean output
@@ -570,84 +552,40 @@ class EmotionAnalysis:
         """
         if options is None: options = {}
         
-        # RunPod Config
-        try:
-            from config import Config
-            RUNPOD_API_KEY = Config.RUNPOD_API_KEY
-            RUNPOD_LLM_URL = Config.RUNPOD_LLM_URL
-        except:
-            RUNPOD_API_KEY = os.environ.get('RUNPOD_API_KEY')
-            RUNPOD_LLM_URL = os.environ.get('RUNPOD_LLM_URL')
-
-        # 1. RunPod Serverless (Priority)
-        if RUNPOD_API_KEY and RUNPOD_LLM_URL and "YOUR_POD_ID" not in RUNPOD_LLM_URL:
+        # 1. RunPod Serverless (Priority) — 공유 비동기 클라이언트 (스레드 점유 폴링 제거)
+        from runpod_client import get_runpod_client
+        runpod = get_runpod_client()
+        if runpod.configured:
             try:
-                print("🚀 [Brain] Sending Async request to RunPod...")
-                
-                # Normalize Base URL
-                base_url = RUNPOD_LLM_URL.replace('/runsync', '').replace('/run', '').rstrip('/')
-                submit_url = f"{base_url}/run"
-                
-                headers = {
-                    "Authorization": f"Bearer {RUNPOD_API_KEY}",
-                    "Content-Type": "application/json"
-                }
+                print("🚀 [Brain] Sending request to RunPod (async client)...")
                 
-                payload = {
-                    "input": {
-                        "prompt": prompt,
-                        "max_tokens": options.get('num_predict', 2048),
-                        "temperature": options.get('temperature', 0.7),
-                        "stream": False
-                    }
+                payload_input = {
+                    "prompt": prompt,
+                    "max_tokens": options.get('num_predict', 2048),
+                    "temperature": options.get('temperature', 0.7),
+                    "stream": False
                 }
                 
-                res = requests.post(submit_url, json=payload, headers=headers, timeout=30)
-                if res.status_code != 200:
-                    print(f"❌ RunPod Submit Failed: {res.text}")
-                    raise Exception("RunPod Submit Failed")
-                    
-                job_id = res.json()['id']
-                print(f"⏳ [Brain] Job Submitted: {job_id}. Polling...")
-                
-                status_url = f"{base_url}/status/{job_id}"
-                start_time = time.time()
+                output = runpod.run(payload_input, timeout=600)  # 10 min timeout for reports
+                print("✅ [Brain] RunPod Job Completed!")
                 
-                while True:
-                    if time.time() - start_time > 600: # 10 min timeout for reports
-                         raise Exception("RunPod Timeout")
-                         
-                    status_res = requests.get(status_url, headers=headers, timeout=30)
-                    status_data = status_res.json()
-                    status = status_data.get('status')
-                    
-                    if status == 'COMPLETED':
-                        output = status_data.get('output')
-                        print("✅ [Brain] RunPod Job Completed!")
-                        
-                        # Process Output
-                        if isinstance(output, dict):
-                             # Try to get text field
-                             if 'reaction' in output:
-                                 clean_str = output['reaction'].strip()
-                                 # Clean Markdown
-                                 if clean_str.startswith('```'):
-                                     clean_str = re.sub(r'^```(?:json)?\s*|\s*```$', '', clean_str, flags=re.MULTILINE)
-                                 return clean_str.strip()
-                             elif 'text' in output:
-                                 return output['text']
-                             elif 'response' in output:
-                                 return output['response']
-                             else:
-                                 return json.dumps(output, ensure_ascii=False)
-                        else:
-                             return str(output)
-                             
-                    elif status in ['FAILED', 'CANCELLED']:
-                        print(f"❌ RunPod Job Failed: {status}")
-                        raise Exception(f"RunPod Failed: {status}")
-                        
-                    time.sleep(2)
+                # Process Output
+                if isinstance(output, dict):
+                     # Try to get text field
+                     if 'reaction' in output:
+                         clean_str = output['reaction'].strip()
+                         # Clean Markdown
+                         if clean_str.startswith('```'):
+                             clean_str = re.sub(r'^```(?:json)?\s*|\s*```$', '', clean_str, flags=re.MULTILINE)
+                         return clean_str.strip()
+                     elif 'text' in output:
+                         return output['text']
+                     elif 'response' in output:
+                         return output['response']
+                     else:
+                         return json.dumps(output, ensure_ascii=False)
+                else:
+                     return str(output)
                     
             except Exception as e:
                 print(f"❌ RunPod Async Failed: {e}")
@@ -656,17 +594,8 @@ class EmotionAnalysis:
         # 2. Local Ollama (Fallback)
         try:
             print("🦙 [Brain] Fallback to Local Ollama...")
-            url = "http://localhost:11434/api/generate"
-            payload = {
-                "model": options.get('model', 'gemma4:2b'),
-                "prompt": prompt,
-                "stream": False,
-                "options": options
-            }
-            response = requests.post(url, json=payload, timeout=600)
-            if response.status_code == 200:
-                result = response.json().get('response', '')
-                return result
+            from llm_gateway import generate
+            return generate(prompt, model=options.get('model', 'gemma4:2b'), options=options, timeout=600)
         except Exception as e:
              print(f"❌ Local AI Failed: {e}")
              
@@ -726,7 +655,7 @@ class EmotionAnalysis:
         [Meta-Analysis] Analyzes multiple past reports to find long-term patterns.
         user_name: 내담자의 실제 이름 (주변 인물과 혼동 방지)
         """
-        import requests
+        from llm_gateway import generate, LLMGatewayError
         display_name = user_name or "내담자"
         print(f"🧠 [Brain] Generating Long-Term Insight from {len(report_history)} reports for {display_name}...")
         
@@ -734,8 +663,6 @@ class EmotionAnalysis:
             return "분석할 과거 리포트 데이터가 충분하지 않습니다."
             
         try:
-            url = "http://localhost:11434/api/generate"
-            
             # Construct context from history
             history_context = ""
             for i, r in enumerate(report_history):
@@ -761,21 +688,18 @@ class EmotionAnalysis:
                 "메타 분석 결과:"
             )
             
-            payload = {
-                "model": "gemma4:2b",
-                "prompt": prompt_text,
-                "stream": False,
-                "options": {
-                    "temperature": 0.6,
-                    "num_predict": 2048
-                }
-            }
-            
-            response = requests.post(url, json=payload, timeout=300)
-            
-            if response.status_code == 200:
-                return response.json().get('response', '')
-            else:
+            try:
+                return generate(
+                    prompt_text,
+                    model="gemma4:2b",
+                    options={
+                        "temperature": 0.6,
+                        "num_predict": 2048
+                    },
+                    timeout=300
+                )
+            except LLMGatewayError as e:
+                print(f"❌ Long-Term Insight LLM Error: {e}")
                 return "메타 분석 생성에 실패했습니다."
                 
         except Exception as e:
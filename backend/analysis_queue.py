@@ -0,0 +1,326 @@
+"""
+Analysis Queue - 일기 AI 분석 영속 작업 큐
+==========================================
+일기 작성/수정마다 스레드를 새로 띄우던 방식(start_analysis_thread)을 대체한다.
+
+- 영속성: 작업은 PostgreSQL `analysis_jobs` 테이블에 저장 → 재배포/재시작 시 유실 없음
+- 처리량 상한: 고정 크기 워커 풀 (ANALYSIS_WORKER_THREADS, 기본 2)
+- 일기별 병합: diary_id UNIQUE → 연속 수정은 하나의 작업으로 합쳐지고 version만 증가
+- 재시도: 실패 시 지수 백오프 (ANALYSIS_RETRY_BASE_SECONDS × 2^n, 최대 ANALYSIS_RETRY_MAX_SECONDS)
+- 회수: 워커가 죽어 running 상태로 남은 작업은 ANALYSIS_STALE_SECONDS 후 pending으로 복귀
+
+작업 등록(enqueue_analysis)은 Flask 요청 안에서 SQLAlchemy 세션으로,
+작업 소비(워커 풀)는 psycopg2 + `FOR UPDATE SKIP LOCKED`로 수행한다.
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+from db_pool import get_conn
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# 워커 풀 / 재시도 설정
+WORKER_THREADS = int(os.environ.get('ANALYSIS_WORKER_THREADS', '2'))
+MAX_ATTEMPTS = int(os.environ.get('ANALYSIS_MAX_ATTEMPTS', '5'))
+RETRY_BASE_SECONDS = int(os.environ.get('ANALYSIS_RETRY_BASE_SECONDS', '30'))
+RETRY_MAX_SECONDS = int(os.environ.get('ANALYSIS_RETRY_MAX_SECONDS', '1800'))
+# RunPod(5분) + Ollama(5분) 폴백까지 고려한 점유 만료 시간
+STALE_SECONDS = int(os.environ.get('ANALYSIS_STALE_SECONDS', '900'))
+# 킥 분석 일기별 특징(diary_features) 계산 시 인물 추출에 LLM NER 포함 여부
+FEATURES_LLM_NER = os.environ.get('DIARY_FEATURES_LLM_NER', '1') == '1'
+POLL_INTERVAL_SECONDS = 2.0
+
+_workers = []
+_workers_lock = threading.Lock()
+_wakeup = threading.Event()
+_stop = threading.Event()
+
+
+# ─────────────────────────────────────────────
+# 작업 등록 (Flask 요청 컨텍스트)
+# ─────────────────────────────────────────────
+
+def enqueue_analysis(diary_id, user_id=None):
+    """
+    일기 AI 분석 작업을 등록한다. 이미 작업이 있으면 version을 올려 병합한다.
+    호출 전 세션에 추가된 변경(일기 INSERT/UPDATE)도 같은 트랜잭션으로 커밋된다.
+    동시 등록 경합은 INSERT ... ON CONFLICT DO UPDATE 한 문장으로 처리 → 롤백으로 호출자 변경을 잃지 않음
+    """
+    from sqlalchemy import func
+    from models import db, AnalysisJob
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    now = datetime.utcnow()
+    jobs = AnalysisJob.__table__
+    stmt = insert(AnalysisJob).values(diary_id=diary_id, user_id=user_id, status='pending', version=1,
+                                      attempts=0, next_run_at=now, created_at=now, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['diary_id'],
+        set_={
+            'version': func.coalesce(jobs.c.version, 0) + 1,
+            'status': 'pending',
+            'attempts': 0,
+            'next_run_at': now,
+            'last_error': None,
+            'updated_at': now,
+            'user_id': func.coalesce(stmt.excluded.user_id, jobs.c.user_id),
+        },
+    ).returning(jobs.c.version)
+    version = db.session.execute(stmt).scalar()
+    db.session.commit()
+
+    print(f"📥 [AnalysisQueue] 일기 {diary_id} 분석 작업 등록 (v{version})")
+    _wakeup.set()
+    return version
+
+
+def cancel_analysis(diary_id):
+    """일기 삭제 시 대기 중인 분석 작업을 제거한다. (커밋은 호출자 책임)"""
+    from models import AnalysisJob
+    AnalysisJob.query.filter_by(diary_id=diary_id).delete(synchronize_session=False)
+
+
+def get_analysis_status(diary_id):
+    """일기의 분석 작업 상태 (없으면 None)"""
+    from models import AnalysisJob
+    job = AnalysisJob.query.filter_by(diary_id=diary_id).first()
+    return job.to_dict() if job else None
+
+
+def get_queue_stats():
+    """상태별 작업 수 + 워커 풀 정보"""
+    from sqlalchemy import func
+    from models import db, AnalysisJob
+
+    counts = dict(
+        db.session.query(AnalysisJob.status, func.count(AnalysisJob.id))
+        .group_by(AnalysisJob.status).all()
+    )
+    oldest_pending = db.session.query(func.min(AnalysisJob.next_run_at)) \
+        .filter(AnalysisJob.status == 'pending').scalar()
+    return {
+        'pending': counts.get('pending', 0),
+        'running': counts.get('running', 0),
+        'done': counts.get('done', 0),
+        'failed': counts.get('failed', 0),
+        'oldest_pending_at': oldest_pending.isoformat() if oldest_pending else None,
+        'workers': {
+            'configured': WORKER_THREADS,
+            'alive': sum(1 for t in _workers if t.is_alive()),
+        },
+        'max_attempts': MAX_ATTEMPTS,
+    }
+
+
+# ─────────────────────────────────────────────
+# 워커 풀 (psycopg2, db_pool 공유 커넥션)
+# ─────────────────────────────────────────────
+# 워커는 LLM 호출(최대 수 분) 동안 연결을 잡고 있지 않도록
+# 점유/조회/종료 단계마다 풀에서 잠깐씩만 빌린다.
+
+
+def _retry_delay(attempts):
+    """n번째 실패 후 대기 시간 (지수 백오프, 상한 적용)"""
+    return min(RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), RETRY_MAX_SECONDS)
+
+
+def _claim_job(conn, worker_name):
+    """실행 가능한 작업 1건을 점유한다. 없으면 None."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE analysis_jobs
+               SET status = 'running', locked_at = now() AT TIME ZONE 'utc',
+                   locked_by = %s, attempts = attempts + 1
+             WHERE id = (
+                   SELECT id FROM analysis_jobs
+                    WHERE status = 'pending' AND next_run_at <= now() AT TIME ZONE 'utc'
+                    ORDER BY next_run_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED)
+         RETURNING id, diary_id, version, attempts
+        """, (worker_name,))
+        row = cur.fetchone()
+    conn.commit()
+    return row
+
+
+def _load_diary(conn, diary_id):
+    """분석 입력값을 DB에서 다시 읽어 복호화한다. (최신 수정본 기준)"""
+    from analysis_worker import crypto
+    from diary_envelope import open_pg_columns
+    names = ('event', 'sleep_condition', 'emotion_desc', 'emotion_meaning', 'self_talk')
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT date, user_id, sealed, event, sleep_condition, emotion_desc, emotion_meaning, self_talk "
+            "FROM diaries WHERE id = %s", (diary_id,)
+        )
+        row = cur.fetchone()
+        if row:
+            date, user_id, sealed, *fields = row
+            fields = open_pg_columns(cur, user_id, sealed, dict(zip(names, fields)))
+    conn.commit()
+    if not row:
+        return None
+    return [date] + [value or "" for value in crypto.decrypt_many(fields[name] for name in names)]
+
+
+def _finish_job(conn, job_id, version, attempts, ok, error=None):
+    """
+    작업 종료 처리. version이 그대로일 때만 상태를 바꾼다.
+    (실행 중 재수정되어 version이 올라갔다면 새 pending 작업을 건드리지 않음)
+    """
+    with conn.cursor() as cur:
+        if ok:
+            cur.execute("""
+                UPDATE analysis_jobs
+                   SET status = 'done', locked_at = NULL, locked_by = NULL,
+                       last_error = NULL, updated_at = now() AT TIME ZONE 'utc'
+                 WHERE id = %s AND version = %s
+            """, (job_id, version))
+        elif attempts >= MAX_ATTEMPTS:
+            cur.execute("""
+                UPDATE analysis_jobs
+                   SET status = 'failed', locked_at = NULL, locked_by = NULL,
+                       last_error = %s, updated_at = now() AT TIME ZONE 'utc'
+                 WHERE id = %s AND version = %s
+            """, (error, job_id, version))
+        else:
+            next_run = datetime.utcnow() + timedelta(seconds=_retry_delay(attempts))
+            cur.execute("""
+                UPDATE analysis_jobs
+                   SET status = 'pending', locked_at = NULL, locked_by = NULL,
+                       next_run_at = %s, last_error = %s, updated_at = now() AT TIME ZONE 'utc'
+                 WHERE id = %s AND version = %s
+            """, (next_run, error, job_id, version))
+    conn.commit()
+
+
+def _requeue_stale(conn):
+    """점유 후 STALE_SECONDS가 지난 running 작업을 pending으로 되돌린다. (워커 비정상 종료 대비)"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE analysis_jobs
+               SET status = 'pending', locked_at = NULL, locked_by = NULL
+             WHERE status = 'running'
+               AND locked_at < (now() AT TIME ZONE 'utc') - make_interval(secs => %s)
+        """, (STALE_SECONDS,))
+        count = cur.rowcount
+    conn.commit()
+    if count:
+        logger.warning(f"[AnalysisQueue] 점유 만료 작업 {count}건 재대기열 등록")
+    return count
+
+
+def _run_job(job):
+    from analysis_worker import run_analysis_process
+
+    job_id, diary_id, version, attempts = job
+    with get_conn() as conn:
+        diary = _load_diary(conn, diary_id)
+    if diary is None:
+        # 일기가 이미 삭제됨 → 재시도 불필요
+        with get_conn() as conn:
+            _finish_job(conn, job_id, version, attempts, ok=True)
+        return
+
+    try:
+        # 마지막 시도에서만 Fallback 코멘트를 저장 (그 전에는 이전 코멘트 유지 후 재시도)
+        ok = run_analysis_process(diary_id, *diary, task_version=version,
+                                  final_attempt=attempts >= MAX_ATTEMPTS)
+        error = None if ok else "AI 분석 실패 (Fallback 응답)"
+    except Exception as e:
+        ok, error = False, str(e)[:500]
+
+    # [DiaryFeatures] 킥 분석용 일기별 특징 계산 (AI 코멘트가 먼저 반영되도록 분석 이후에 수행)
+    _refresh_features(diary_id, diary, version)
+
+    if not ok:
+        logger.warning(f"[AnalysisQueue] 일기 {diary_id} 분석 실패 (시도 {attempts}/{MAX_ATTEMPTS}): {error}")
+    with get_conn() as conn:
+        _finish_job(conn, job_id, version, attempts, ok, error)
+
+
+def _refresh_features(diary_id, diary, version):
+    from kick_analysis.features import refresh_diary_features
+
+    _date, event, sleep, emotion_desc, emotion_meaning, self_talk = diary
+    try:
+        with get_conn() as conn:
+            refresh_diary_features(conn, diary_id, event, sleep, emotion_desc, emotion_meaning, self_talk,
+                                   source_version=version, skip_llm_ner=not FEATURES_LLM_NER)
+    except Exception as e:
+        logger.warning(f"[AnalysisQueue] 일기 {diary_id} 특징 계산 실패 (킥 분석 시 즉석 계산): {e}")
+
+
+def _worker_loop(index):
+    worker_name = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    last_reap = 0.0
+
+    while not _stop.is_set():
+        try:
+            with get_conn() as conn:
+                # 점유 만료 회수는 0번 워커가 주기적으로 담당
+                if index == 0 and time.time() - last_reap > 60:
+                    _requeue_stale(conn)
+                    last_reap = time.time()
+                job = _claim_job(conn, worker_name)
+
+            if job is None:
+                _wakeup.wait(POLL_INTERVAL_SECONDS)
+                _wakeup.clear()
+                continue
+
+            print(f"🧵 [AnalysisQueue] {worker_name} → 일기 {job[1]} (v{job[2]}, 시도 {job[3]})")
+            _run_job(job)
+        except Exception as e:
+            logger.error(f"[AnalysisQueue] 워커 {worker_name} 오류: {e}")
+            _stop.wait(POLL_INTERVAL_SECONDS)
+
+
+def start_analysis_workers(num_workers=None):
+    """
+    고정 크기 워커 풀을 시작한다. (프로세스당 1회, 중복 호출 무시)
+    PostgreSQL이 아닌 환경(테스트용 SQLite 등)에서는 시작하지 않는다.
+    """
+    db_url = os.environ.get('DATABASE_URL', '')
+    if db_url and not db_url.startswith('postgres'):
+        logger.info("[AnalysisQueue] PostgreSQL 환경이 아니므로 워커 풀을 시작하지 않습니다.")
+        return 0
+    num_workers = WORKER_THREADS if num_workers is None else num_workers
+    if num_workers <= 0:
+        # Cron 스크립트 등 app을 import만 하는 프로세스 (ANALYSIS_WORKER_THREADS=0)
+        return 0
+
+    with _workers_lock:
+        if any(t.is_alive() for t in _workers):
+            return len(_workers)
+        _stop.clear()
+        _workers.clear()
+        for i in range(num_workers):
+            t = threading.Thread(target=_worker_loop, args=(i,), name=f"analysis-worker-{i}", daemon=True)
+            t.start()
+            _workers.append(t)
+
+    print(f"🧵 [AnalysisQueue] 분석 워커 {len(_workers)}개 시작")
+    return len(_workers)
+
+
+def stop_analysis_workers(timeout=5.0):
+    """워커 풀 종료 (진행 중 작업은 점유 만료 후 다른 워커가 회수)"""
+    _stop.set()
+    _wakeup.set()
+    for t in list(_workers):
+        t.join(timeout)
@@ -1,6 +1,3 @@
-import threading
-import psycopg2
-import requests
 import json
 import os
 import re
@@ -8,51 +5,128 @@ import logging
 import ast # Added for safe literal eval
 from dotenv import load_dotenv
 from crypto_utils import EncryptionManager
+from db_pool import get_conn
+from runpod_client import get_runpod_client
 
 load_dotenv()
 
-# [Task Version Lock] 동시 수정으로 인한 과거 데이터의 덮어쓰기 현상(Race Condition) 방어 로직
-_active_tasks = {}
-_task_lock = threading.Lock()
+crypto = EncryptionManager(os.environ.get('ENCRYPTION_KEY'))
 
-# PG Config — [Fix#11] 환경변수 필수, 기본값에서 비밀번호 하드코딩 제거
-DB_NAME = os.environ.get("DB_NAME", "vibe_db")
-DB_USER = os.environ.get("DB_USER", "vibe_user")
-DB_PASS = os.environ.get("DB_PASS", "")  # [Fix#11] 비밀번호 하드코딩 제거 (환경변수 필수)
-DB_HOST = os.environ.get("DB_HOST", "127.0.0.1")
 
+def _extract_runpod_content(output):
+    """RunPod 작업 output(dict/list/str 여러 형태)에서 응답 텍스트를 추출한다."""
+    if isinstance(output, dict):
+         if 'reaction' in output:
+             # Clean Markdown tokens if present
+             clean_str = output['reaction'].strip()
+             if clean_str.startswith('```'):
+                 clean_str = re.sub(r'^```(?:json)?\s*|\s*```$', '', clean_str, flags=re.MULTILINE)
+             clean_str = clean_str.strip()
 
-crypto = EncryptionManager(os.environ.get('ENCRYPTION_KEY'))
+             try:
+                 inner = json.loads(clean_str)
+             except Exception:
+                 try:
+                     inner = ast.literal_eval(clean_str)
+                 except Exception:
+                     # Regex Fallback
+                     emo_match = re.search(r'["\']emotion["\']\s*:\s*["\']((?:[^"\\]|\\.)*)["\']', clean_str)
+                     com_match = re.search(r'["\']comment["\']\s*:\s*["\']((?:[^"\\]|\\.)*)["\']', clean_str)
+                     if emo_match and com_match:
+                         inner = {"emotion": emo_match.group(1), "comment": com_match.group(1)}
+                     else:
+                         inner = None
 
-# RunPod Config
-RUNPOD_API_KEY = os.getenv('RUNPOD_API_KEY')
-RUNPOD_LLM_URL = os.getenv('RUNPOD_LLM_URL')
+             if isinstance(inner, dict):
+                 content = json.dumps(inner, ensure_ascii=False)
+             else:
+                 content = output['reaction']
+         elif 'text' in output:
+             content = output['text']
+         elif 'response' in output:
+             content = output['response']
+         elif 'choices' in output:
+             # vLLM 형식: {"choices": [{"text": "...", "tokens": [...]}]}
+             choices = output['choices']
+             if isinstance(choices, list) and len(choices) > 0:
+                 choice = choices[0]
+                 if isinstance(choice, dict):
+                     content = choice.get('text', '')
+                     if not content and 'tokens' in choice:
+                         tokens = choice['tokens']
+                         content = ''.join(str(t) for t in tokens) if isinstance(tokens, list) else str(tokens)
+                     if not content:
+                         msg = choice.get('message', {})
+                         content = msg.get('content', '') if isinstance(msg, dict) else ''
+                 else:
+                     content = str(choice)
+             else:
+                 content = json.dumps(output, ensure_ascii=False)
+             content = content.strip()
+         else:
+             content = json.dumps(output, ensure_ascii=False)
+    elif isinstance(output, list):
+         # RunPod vLLM 실제 형태: [{'choices': [{'tokens': ['텍스트']}], 'usage': {...}}]
+         content = ''
+         if len(output) > 0:
+             first = output[0]
+             if isinstance(first, dict) and 'choices' in first:
+                 choices = first['choices']
+                 if isinstance(choices, list) and len(choices) > 0:
+                     choice = choices[0]
+                     if isinstance(choice, dict):
+                         if 'tokens' in choice:
+                             tokens = choice['tokens']
+                             content = ''.join(str(t) for t in tokens) if isinstance(tokens, list) else str(tokens)
+                         elif 'text' in choice:
+                             content = choice['text']
+             elif isinstance(first, dict) and 'text' in first:
+                 content = first['text']
+         if not content:
+             content = json.dumps(output, ensure_ascii=False)
+    elif isinstance(output, str):
+         # output이 문자열인 경우
+         content = output.strip()
+         if content.startswith('[{') or content.startswith('{'):
+             try:
+                 parsed = ast.literal_eval(content)
+                 if isinstance(parsed, list) and len(parsed) > 0:
+                     first = parsed[0]
+                     if isinstance(first, dict) and 'choices' in first:
+                         choices = first['choices']
+                         if isinstance(choices, list) and len(choices) > 0:
+                             choice = choices[0]
+                             if isinstance(choice, dict):
+                                 if 'tokens' in choice:
+                                     tokens = choice['tokens']
+                                     content = ''.join(str(t) for t in tokens) if isinstance(tokens, list) else str(tokens)
+                                 elif 'text' in choice:
+                                     content = choice['text']
+             except Exception:
+                 pass
+    else:
+         content = str(output)
+
+    # 최종 정제: 이스케이프 복원
+    content = content.replace('\\n', '\n').strip()
+
+    return content
 
 def call_llm_hybrid(prompt, model="gemma4:2b", options=None):
     """
     Hybrid LLM Caller: RunPod (Priority) -> Local Ollama (Fallback)
+    RunPod 작업은 공유 비동기 클라이언트(runpod_client)가 이벤트 루프에서 대기한다.
     """
     if options is None: options = {}
     
-    logging.info(f"🔍 Hybrid Check: KEY_LEN={len(str(RUNPOD_API_KEY)) if RUNPOD_API_KEY else 0}, URL={RUNPOD_LLM_URL}")
-    
-    import time
+    runpod = get_runpod_client()
+    logging.info(f"🔍 Hybrid Check: RunPod configured={runpod.configured}, URL={runpod.base_url}")
 
     # 1. Try RunPod Serverless (Priority)
     # The URL in .env should be base endpoint: https://api.runpod.ai/v2/mp2w6kb0npg0tp
-    if RUNPOD_API_KEY and RUNPOD_LLM_URL and "YOUR_POD_ID" not in RUNPOD_LLM_URL:
+    if runpod.configured:
         try:
-            logging.info("🚀 Sending Async request to RunPod Serverless...")
-            
-            # Normalize Base URL (Remove /runsync or /run)
-            base_url = RUNPOD_LLM_URL.replace('/runsync', '').replace('/run', '').rstrip('/')
-            
-            # 1. Submit Job
-            submit_url = f"{base_url}/run"
-            headers = {
-                "Authorization": f"Bearer {RUNPOD_API_KEY}",
-                "Content-Type": "application/json"
-            }
+            logging.info("🚀 Sending request to RunPod Serverless (async client)...")
             
             payload_input = {
                     "prompt": prompt,
@@ -71,136 +145,10 @@ def call_llm_hybrid(prompt, model="gemma4:2b", options=None):
                     },
                     "required": ["emotion", "comment", "score"]
                 }
-            payload = {"input": payload_input}
-            
-            res = requests.post(submit_url, json=payload, headers=headers, timeout=30)
-            if res.status_code != 200:
-                logging.error(f"❌ RunPod Submit Failed {res.status_code}: {res.text}")
-                raise Exception("RunPod Submit Failed")
-                
-            job_id = res.json()['id']
-            logging.info(f"⏳ Job Submitted: {job_id}. Polling status...")
-            
-            # 2. Poll Status
-            status_url = f"{base_url}/status/{job_id}"
-            start_time = time.time()
-            
-            while True:
-                if time.time() - start_time > 300: # 5 min timeout
-                    raise Exception("RunPod Job Timed Out")
-                    
-                status_res = requests.get(status_url, headers=headers, timeout=30)
-                status_data = status_res.json()
-                status = status_data.get('status')
-                
-                if status == 'COMPLETED':
-                    output = status_data.get('output')
-                    logging.info("✅ RunPod Job Completed!")
-                    
-                    # Process Output
-                    if isinstance(output, dict):
-                         if 'reaction' in output:
-                             # Clean Markdown tokens if present
-                             clean_str = output['reaction'].strip()
-                             if clean_str.startswith('```'):
-                                 clean_str = re.sub(r'^```(?:json)?\s*|\s*```$', '', clean_str, flags=re.MULTILINE)
-                             clean_str = clean_str.strip()
-                             
-                             try:
-                                 inner = json.loads(clean_str)
-                             except Exception:
-                                 try:
-                                     inner = ast.literal_eval(clean_str)
-                                 except Exception:
-                                     # Regex Fallback
-                                     emo_match = re.search(r'["\']emotion["\']\s*:\s*["\']((?:[^"\\]|\\.)*)["\']', clean_str)
-                                     com_match = re.search(r'["\']comment["\']\s*:\s*["\']((?:[^"\\]|\\.)*)["\']', clean_str)
-                                     if emo_match and com_match:
-                                         inner = {"emotion": emo_match.group(1), "comment": com_match.group(1)}
-                                     else:
-                                         inner = None
-                                     
-                             if isinstance(inner, dict):
-                                 content = json.dumps(inner, ensure_ascii=False)
-                             else:
-                                 content = output['reaction']
-                         elif 'text' in output:
-                             content = output['text']
-                         elif 'response' in output:
-                             content = output['response']
-                         elif 'choices' in output:
-                             # vLLM 형식: {"choices": [{"text": "...", "tokens": [...]}]}
-                             choices = output['choices']
-                             if isinstance(choices, list) and len(choices) > 0:
-                                 choice = choices[0]
-                                 if isinstance(choice, dict):
-                                     content = choice.get('text', '')
-                                     if not content and 'tokens' in choice:
-                                         tokens = choice['tokens']
-                                         content = ''.join(str(t) for t in tokens) if isinstance(tokens, list) else str(tokens)
-                                     if not content:
-                                         msg = choice.get('message', {})
-                                         content = msg.get('content', '') if isinstance(msg, dict) else ''
-                                 else:
-                                     content = str(choice)
-                             else:
-                                 content = json.dumps(output, ensure_ascii=False)
-                             content = content.strip()
-                         else:
-                             content = json.dumps(output, ensure_ascii=False)
-                    elif isinstance(output, list):
-                         # RunPod vLLM 실제 형태: [{'choices': [{'tokens': ['텍스트']}], 'usage': {...}}]
-                         content = ''
-                         if len(output) > 0:
-                             first = output[0]
-                             if isinstance(first, dict) and 'choices' in first:
-                                 choices = first['choices']
-                                 if isinstance(choices, list) and len(choices) > 0:
-                                     choice = choices[0]
-                                     if isinstance(choice, dict):
-                                         if 'tokens' in choice:
-                                             tokens = choice['tokens']
-                                             content = ''.join(str(t) for t in tokens) if isinstance(tokens, list) else str(tokens)
-                                         elif 'text' in choice:
-                                             content = choice['text']
-                             elif isinstance(first, dict) and 'text' in first:
-                                 content = first['text']
-                         if not content:
-                             content = json.dumps(output, ensure_ascii=False)
-                    elif isinstance(output, str):
-                         # output이 문자열인 경우
-                         content = output.strip()
-                         if content.startswith('[{') or content.startswith('{'):
-                             try:
-                                 parsed = ast.literal_eval(content)
-                                 if isinstance(parsed, list) and len(parsed) > 0:
-                                     first = parsed[0]
-                                     if isinstance(first, dict) and 'choices' in first:
-                                         choices = first['choices']
-                                         if isinstance(choices, list) and len(choices) > 0:
-                                             choice = choices[0]
-                                             if isinstance(choice, dict):
-                                                 if 'tokens' in choice:
-                                                     tokens = choice['tokens']
-                                                     content = ''.join(str(t) for t in tokens) if isinstance(tokens, list) else str(tokens)
-                                                 elif 'text' in choice:
-                                                     content = choice['text']
-                             except Exception:
-                                 pass
-                    else:
-                         content = str(output)
-                    
-                    # 최종 정제: 이스케이프 복원
-                    content = content.replace('\\n', '\n').strip()
-                    
-                    return content
-                    
-                elif status in ['FAILED', 'CANCELLED']:
-                    logging.error(f"❌ RunPod Job Failed: {status}")
-                    raise Exception(f"RunPod Job {status}")
-                
-                # Wait before polling again
-                time.sleep(2)
+
+            output = runpod.run(payload_input, timeout=300)  # 5 min timeout
+            logging.info("✅ RunPod Job Completed!")
+            return _extract_runpod_content(output)
                 
         except Exception as e:
             logging.error(f"❌ RunPod Async Failed: {e}")
@@ -208,24 +156,16 @@ def call_llm_hybrid(prompt, model="gemma4:2b", options=None):
 
     # 2. Local Ollama (Fallback)
     try:
-        logging.info("⏳ Sending request to Local Ollama...")
+        logging.info("⏳ Sending request to Local Ollama (LLM gateway)...")
+        from llm_gateway import generate
         # [Fix] options에서 format을 분리 → top-level에만 전달 (Ollama 혼선 방지)
         use_json_format = options.pop('format', None) == 'json'
-        payload = {
-            "model": model,
-            "prompt": prompt,
-            "stream": False,
-            "options": options
-        }
-        if use_json_format:
-            payload["format"] = "json"
         # Increased timeout for CPU (Long generation needs more time)
         # 180 -> 300 seconds (5 minutes)
-        res = requests.post("http://localhost:11434/api/generate", json=payload, timeout=300)
-        
-        logging.info(f"✅ Ollama Response: {res.status_code}")
-        if res.status_code == 200:
-            return res.json().get('response', '').strip()
+        result = generate(prompt, model=model, options=options,
+                          format="json" if use_json_format else None, timeout=300)
+        logging.info("✅ Ollama Response received")
+        return result.strip()
             
     except Exception as e:
          logging.error(f"❌ Local Ollama Failed: {e}")
@@ -332,7 +272,14 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-def run_analysis_process(diary_id, date, event, sleep, emotion_desc, emotion_meaning, self_talk, task_version=None):
+def run_analysis_process(diary_id, date, event, sleep, emotion_desc, emotion_meaning, self_talk, task_version=None,
+                         final_attempt=True):
+    """
+    일기 1건의 AI 분석 → DB 반영 → 보호자 푸시 → RAG 저장.
+    analysis_queue 워커가 호출하며, 재시도가 의미 있는 실패(AI Fallback/DB 오류)일 때만 False를 반환한다.
+    final_attempt=False(재시도가 남음)이면 Fallback 응답은 DB에 쓰지 않는다
+    → 백오프 동안 오류 문구가 보이거나, 수정된 일기의 기존 코멘트를 덮어쓰지 않도록.
+    """
     logging.info(f"🧵 [Thread] Starting Analysis for Diary {diary_id}...")
     print(f"🧵 [Thread] Starting Analysis for Diary {diary_id}...")
     
@@ -342,20 +289,14 @@ def run_analysis_process(diary_id, date, event, sleep, emotion_desc, emotion_mea
     # [NativeRAG] 과거 기억 검색하여 프롬프트에 주입
     user_id = None
     mood_level = 3
+    past_context = ""
     try:
         # diary_id로 user_id와 mood_level을 찾아야 함
-        db_url = os.environ.get('DATABASE_URL')
-        if db_url:
-            tmp_conn = psycopg2.connect(db_url)
-        else:
-            tmp_conn = psycopg2.connect(dbname=DB_NAME, user=DB_USER, password=DB_PASS, host=DB_HOST)
-        try:
+        with get_conn() as tmp_conn:
             tmp_cur = tmp_conn.cursor()
             tmp_cur.execute("SELECT user_id, mood_level FROM diaries WHERE id = %s", (diary_id,))
             row = tmp_cur.fetchone()
             tmp_cur.close()
-        finally:
-            tmp_conn.close()
         
         if row:
             user_id = row[0]
@@ -378,8 +319,23 @@ def run_analysis_process(diary_id, date, event, sleep, emotion_desc, emotion_mea
     emotion = "기타"
     score = 5
     
+    # [SemanticCache] 과거 기억이 주입되지 않은(개인 맥락 없는) 일기만 캐시 조회/저장
+    # 날짜는 키에서 제외 → 같은 내용의 일기는 날짜가 달라도 재사용
+    cache_token = None
     try:
-        result = generate_ai_analysis(full_text)
+        cached = None
+        if not past_context:
+            from semantic_cache import diary_comment_cache
+            cache_text = " ".join(filter(None, [sleep, event, emotion_desc, emotion_meaning, self_talk]))
+            cached, cache_token = diary_comment_cache.lookup(cache_text)
+        if cached:
+            print(f"⚡ [SemanticCache] 일기 {diary_id} 코멘트 캐시 적중")
+            result = cached
+        else:
+            result = generate_ai_analysis(full_text)
+            # Fallback 응답(대기중)은 캐시하지 않음
+            if cache_token and isinstance(result, tuple) and len(result) >= 3 and result[1] != "대기중":
+                diary_comment_cache.store(cache_token, tuple(result[:3]))
         if isinstance(result, tuple) and len(result) >= 3:
             # 안전하게 None 방어
             comment = str(result[0] or "분석 중 오류가 발생했습니다.")
@@ -396,31 +352,28 @@ def run_analysis_process(diary_id, date, event, sleep, emotion_desc, emotion_mea
     # ... (rest is same, but let's include it to be safe or use Context)
     print(f"🤖 AI Result - Score: {score}, Emotion: {emotion}, Comment: {comment[:20]}...")
 
+    is_fallback = "오류가 발생" in comment or emotion in ["기타", "대기중"]
+    if is_fallback and not final_attempt:
+        print(f"🔁 [Thread] 일기 {diary_id} Fallback 응답 → 저장하지 않고 재시도 대기")
+        return False
+
     # 2. Encrypt
     enc_comment = crypto.encrypt(comment)
     enc_emotion = crypto.encrypt(emotion)
     
-    # 3. Update DB
-    # 3. Update DB
+    # 3. Update DB (공유 커넥션 풀)
     try:
-        db_url = os.environ.get('DATABASE_URL')
-        if db_url:
-            conn = psycopg2.connect(db_url)
-        else:
-            conn = psycopg2.connect(dbname=DB_NAME, user=DB_USER, password=DB_PASS, host=DB_HOST)
-            
-        try:
+        with get_conn() as conn:
             cur = conn.cursor()
             
-            # [Race Condition Prevention] 현재 쓰레드가 가장 최신의 태스크인지 확인
+            # [Race Condition Prevention] 현재 작업이 가장 최신 버전인지 확인 (analysis_jobs.version)
             if task_version is not None:
-                with _task_lock:
-                    if _active_tasks.get(diary_id) != task_version:
-                        print(f"🚫 [Thread] 일기 {diary_id}에 대해 더 최신 수정(Task)이 감지되었습니다. 이전 AI 분석 덮어쓰기를 중단합니다.")
-                        return
-                    else:
-                        # DB 업데이트가 안전하므로 락 리스트에서 비웁니다
-                        del _active_tasks[diary_id]
+                cur.execute("SELECT version FROM analysis_jobs WHERE diary_id = %s", (diary_id,))
+                job_row = cur.fetchone()
+                if job_row and job_row[0] != task_version:
+                    print(f"🚫 [Thread] 일기 {diary_id}에 대해 더 최신 수정(Task)이 감지되었습니다. 이전 AI 분석 덮어쓰기를 중단합니다.")
+                    cur.close()
+                    return True
                         
             # Ensure score is integer and within range
             try:
@@ -466,15 +419,13 @@ def run_analysis_process(diary_id, date, event, sleep, emotion_desc, emotion_mea
             if affected_rows == 0:
                 print(f"🚫 [Thread] 일기 {diary_id}가 이미 삭제되었거나 존재하지 않습니다. RAG 저장을 취소합니다. (Zombie Resurrection 방지)")
                 cur.close()
-                return
+                return True
 
             print(f"✅ [Thread] Analysis Complete for Diary {diary_id}")
             cur.close()
-        finally:
-            conn.close()
             
         # [KILLER FEATURE] AI 분석 완료 푸시 전송 (보호자에게 리포트 전송)
-        if user_id is not None and comment and "오류가 발생" not in comment and emotion not in ["기타", "대기중"]:
+        if user_id is not None and comment and not is_fallback:
             try:
                 from push_service import notify_guardians_ai_report
                 from app import app
@@ -486,7 +437,7 @@ def run_analysis_process(diary_id, date, event, sleep, emotion_desc, emotion_mea
         
         # [NativeRAG] AI 분석 코멘트까지 포함하여 장기 기억에 저장
         if user_id is not None:
-            if "오류가 발생" in comment or emotion in ["기타", "대기중"]:
+            if is_fallback:
                 print("⚠️ [NativeRAG] Fallback(오류) 응답 발생으로 인해, RAG 저장(기억 오염 방지)을 생략합니다.")
             else:
                 try:
@@ -510,14 +461,16 @@ def run_analysis_process(diary_id, date, event, sleep, emotion_desc, emotion_mea
                 
     except Exception as e:
         print(f"❌ [Thread] Final DB Update Failed: {e}")
+        return False
 
-def start_analysis_thread(diary_id, date, event, sleep, emotion_desc, emotion_meaning, self_talk):
-    # 동일한 일기에 대한 중복/지연 업데이트 방지 체계 (Task Versioning)
-    with _task_lock:
-        task_version = _active_tasks.get(diary_id, 0) + 1
-        _active_tasks[diary_id] = task_version
+    # AI가 Fallback 응답을 돌려준 경우 → 큐에서 백오프 후 재시도
+    return not is_fallback
 
-    print(f"🧵 [Main] Spawning Analysis Thread for Diary {diary_id} (v{task_version})")
-    logging.info(f"🧵 [Main] Spawning Analysis Thread for Diary {diary_id} (v{task_version})")
-    t = threading.Thread(target=run_analysis_process, args=(diary_id, date, event, sleep, emotion_desc, emotion_meaning, self_talk, task_version))
-    t.start()
+def start_analysis_thread(diary_id, date=None, event=None, sleep=None, emotion_desc=None, emotion_meaning=None, self_talk=None):
+    """
+    [Deprecated] 하위 호환용 래퍼. 스레드를 직접 띄우지 않고 analysis_queue에 작업을 등록한다.
+    분석 입력값은 워커가 DB에서 최신 수정본을 다시 읽으므로 diary_id 외 인자는 사용하지 않는다.
+    """
+    from analysis_queue import enqueue_analysis
+    logging.info(f"📥 [Main] Enqueue Analysis for Diary {diary_id}")
+    return enqueue_analysis(diary_id)
@@ -6,7 +6,7 @@ import os
 import re
 import logging
 import ast
-from cryptography.fernet import Fernet # Direct use or utility
+from cryptography.fernet import Fernet, MultiFernet # Direct use or utility
 
 # Django Environment Check
 try:
@@ -22,7 +22,9 @@ except:
 # Simple Crypto Class to avoid dependency hell
 class SimpleCrypto:
     def __init__(self, key):
-        self.cipher = Fernet(key.encode()) if key else None
+        # [KeyRotation] 교체 중에는 이전 키(ENCRYPTION_OLD_KEYS)로 암호화된 일기도 읽을 수 있어야 함
+        old_keys = [k.strip() for k in os.environ.get('ENCRYPTION_OLD_KEYS', '').split(',') if k.strip()]
+        self.cipher = MultiFernet([Fernet(k.encode()) for k in [key] + old_keys]) if key else None
     
     def encrypt(self, plain_text):
         if not plain_text or not self.cipher: return plain_text
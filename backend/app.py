@@ -4,16 +4,26 @@ from flask_jwt_extended import JWTManager, create_access_token, jwt_required, ge
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
+from sqlalchemy import func, or_
+from sqlalchemy.orm import load_only
 from config import Config
 from models import db, User, Diary, ChatLog, Center, ShareCode, ShareRelationship
 import os
 import sys
+import json
+import base64
+import hashlib
 import logging
 import traceback
 from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
-from crypto_utils import EncryptionManager
-from analysis_worker import start_analysis_thread
+from crypto_utils import EncryptionManager, purge_plaintext
+from analysis_queue import enqueue_analysis, cancel_analysis, get_analysis_status, get_queue_stats, start_analysis_workers
+from kick_analysis.features import invalidate_diary_features
+from kick_analysis.ner_cache import invalidate_ner_cache
+from diary_events import init_diary_events, publish_diary_event, get_event_stats
+from daily_stats import refresh_daily_stats
+from diary_envelope import FIELDS as ENVELOPE_FIELDS
 
 # ── Logging 초기화 (print() 대체) ────────────────────────────────────────
 def setup_logging():
@@ -183,6 +193,28 @@ def expired_token_callback(jwt_header, jwt_payload):
 with app.app_context():
     db.create_all()
 
+# [Migrations] 기존 테이블 변경(인덱스/컬럼) 적용 — ORM이 새 컬럼을 조회하므로 실패 시 기동 중단
+from schema_migrations import should_auto_migrate, run_migrations
+if should_auto_migrate(app.config['SQLALCHEMY_DATABASE_URI']):
+    applied = run_migrations()
+    if applied:
+        print(f"✅ [Migrations] 적용: {', '.join(applied)}")
+
+# [RunPod] webhook 설정 검증 — RUNPOD_WEBHOOK_URL만 있고 시크릿이 없으면 기동 중단 (ValueError)
+from runpod_client import get_runpod_client
+get_runpod_client()
+
+# [AnalysisQueue] 고정 크기 AI 분석 워커 풀 시작 (재시작 시 미처리 작업 이어서 처리)
+start_analysis_workers()
+
+# [DiaryEvents] 일기 저장 후처리 파이프라인 (단계별 스레드 풀)
+init_diary_events(app)
+
+# [NativeRAG] 임베딩 모델 백그라운드 워밍업 (첫 요청 콜드 스타트 제거)
+if os.environ.get('ANALYSIS_WORKER_THREADS', '2') != '0':
+    from memory_manager import warm_embedder_async
+    warm_embedder_async()
+
 # CORS Setup
 # Allowed Origins: Native Apps + Web (Patient & Admin)
 CORS(app, resources={
@@ -197,7 +229,8 @@ CORS(app, resources={
             "https://217.142.253.35"
         ],
         "supports_credentials": True,
-        "allow_headers": ["Content-Type", "Authorization"],
+        "allow_headers": ["Content-Type", "Authorization", "If-None-Match"],
+        "expose_headers": ["ETag", "X-Next-Cursor"],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"]
     }
 })
@@ -371,9 +404,63 @@ except Exception:
     pass
 
 # [API Endpoint: Get Diaries]
+# [Pagination] 기본은 기존과 같이 전체 목록(배열). limit/cursor를 주면 (date, id) 키셋 페이지 단위로 반환하고
+# 다음 페이지 커서는 X-Next-Cursor 헤더로 준다. (응답 본문은 계속 배열 → 기존 앱 호환)
+DIARY_PAGE_DEFAULT_LIMIT = int(os.environ.get('DIARY_PAGE_DEFAULT_LIMIT', '50'))
+DIARY_PAGE_MAX_LIMIT = int(os.environ.get('DIARY_PAGE_MAX_LIMIT', '200'))
+# serialize_diary 출력 형식을 바꾸면 올려서 클라이언트의 기존 ETag를 무효화
+DIARY_LIST_ETAG_VERSION = '1'
+
+
+def _encode_diary_cursor(diary):
+    raw = json.dumps([diary.date, diary.id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_diary_cursor(cursor):
+    """커서 → (date, id). 형식이 잘못되면 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        date_value, diary_id = json.loads(raw)
+        if not isinstance(date_value, str) or not isinstance(diary_id, int):
+            raise ValueError
+        return date_value, diary_id
+    except Exception:
+        raise ValueError('invalid cursor')
+
+
+def _diary_list_etag(user_id, query, page_size):
+    """
+    응답에 들어갈 행들의 (개수, 최대 id, 최신 updated_at)만 집계해 ETag 생성 — 행을 읽어 복호화하지 않음.
+    수정(ORM onupdate / PG 트리거가 updated_at 갱신), 추가(최대 id), 삭제(개수)가 모두 반영된다.
+    """
+    keys = query.with_entities(
+        Diary.id.label('id'),
+        func.coalesce(Diary.updated_at, Diary.created_at).label('changed_at'),
+    )
+    if page_size is not None:
+        keys = keys.limit(page_size + 1)  # 다음 페이지 존재 여부(X-Next-Cursor)도 반영
+    keys = keys.subquery()
+    count, max_id, last_changed = db.session.query(
+        func.count(keys.c.id), func.max(keys.c.id), func.max(keys.c.changed_at)).one()
+    raw = '|'.join(str(v) for v in (DIARY_LIST_ETAG_VERSION, user_id, request.query_string.decode('utf-8'),
+                                    count, max_id, last_changed))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
 @app.route('/api/diaries', methods=['GET'])
 @jwt_required()
 def get_diaries():
+    """
+    일기 목록 (최신순).
+
+    Query:
+        year/month, start_date/end_date: 날짜 필터
+        limit: 페이지 크기 (최대 DIARY_PAGE_MAX_LIMIT). 없으면 전체
+        cursor: 이전 응답의 X-Next-Cursor (이 일기 이후부터)
+        fields: 쉼표로 구분한 응답 필드 (예: id,date,mood_level) — 지정하지 않은 암호화 필드는 복호화하지 않음
+    If-None-Match가 현재 ETag와 같으면 304
+    """
     current_user_id = int(get_jwt_identity())
     user = User.query.filter_by(id=current_user_id).first()
     
@@ -393,7 +480,8 @@ def get_diaries():
             # Pad month to 2 digits
             month_str = f"{int(month):02d}"
             prefix = f"{year}-{month_str}"
-            query = query.filter(Diary.date.startswith(prefix))
+            # [Index] LIKE 'YYYY-MM%' 대신 범위 조건 → ix_diaries_user_date 범위 스캔
+            query = query.filter(Diary.date >= f"{prefix}-01", Diary.date <= f"{prefix}-31")
         except ValueError:
             pass # Ignore invalid int conversion
 
@@ -403,12 +491,61 @@ def get_diaries():
     if end_date:
         query = query.filter(Diary.date <= end_date)
 
+    # [Projection] fields=
+    fields = None
+    if request.args.get('fields'):
+        fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in DIARY_FIELDS]
+        if unknown:
+            return jsonify({'msg': f"알 수 없는 필드입니다: {', '.join(unknown)}"}), 400
+
+    # [Pagination] (date, id) 키셋 — 같은 날짜 일기가 여러 개여도 누락/중복 없음
+    page_size = None
+    cursor = request.args.get('cursor')
+    if request.args.get('limit') or cursor:
+        try:
+            page_size = int(request.args.get('limit', DIARY_PAGE_DEFAULT_LIMIT))
+        except ValueError:
+            return jsonify({'msg': 'limit은 숫자여야 합니다.'}), 400
+        page_size = max(1, min(page_size, DIARY_PAGE_MAX_LIMIT))
+    if cursor:
+        try:
+            cursor_date, cursor_id = _decode_diary_cursor(cursor)
+        except ValueError:
+            return jsonify({'msg': '잘못된 cursor입니다.'}), 400
+        query = query.filter(
+            Diary.date <= cursor_date,  # 인덱스 범위 조건
+            or_(Diary.date < cursor_date, Diary.id < cursor_id),
+        )
+
     # [Sort] Descending (Newest first)
-    # Using specific model field for ordering
-    diaries = query.order_by(Diary.date.desc()).all()
-    
-    result = [serialize_diary(d) for d in diaries]
-    return jsonify(result), 200
+    query = query.order_by(Diary.date.desc(), Diary.id.desc())
+
+    # [ETag] 변경이 없으면 행을 읽지 않고 304
+    etag = _diary_list_etag(user.id, query, page_size)
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response
+
+    if fields is not None:
+        columns = {'id', 'date'} | {c for f in fields for c in DIARY_FIELDS[f][0]}
+        query = query.options(load_only(*[getattr(Diary, c) for c in sorted(columns)]))
+    if page_size is not None:
+        diaries = query.limit(page_size + 1).all()
+        next_cursor = _encode_diary_cursor(diaries[page_size - 1]) if len(diaries) > page_size else None
+        diaries = diaries[:page_size]
+    else:
+        diaries = query.all()
+        next_cursor = None
+
+    _prefetch_diary_plaintext(diaries, fields)
+    response = make_response(jsonify([serialize_diary(d, fields) for d in diaries]), 200)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'  # 매번 If-None-Match로 재검증
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 # [API Endpoint: Create Diary]
 @app.route('/api/diaries', methods=['POST'])
@@ -460,70 +597,26 @@ def create_diary():
 
         ai_comment=encrypted_ai_comment, # [New] Encrypted
         ai_emotion=encrypted_ai_emotion, # [New] Encrypted
-        safety_flag=data.get('safety_flag', False)
+        safety_flag=data.get('safety_flag', False),
+        # [DailyStats] 작성 시각을 명시 (DB 기본값에 맡기면 같은 트랜잭션의 일별 집계가 created_at을 못 봄)
+        created_at=datetime.utcnow()
     )
     
     db.session.add(new_diary)
-    db.session.commit()
+    db.session.flush()
 
+    # [DailyStats] 해당 날짜 기분/수면 집계 갱신 (일기와 같은 트랜잭션)
+    refresh_daily_stats(user.id, [new_diary.date])
 
-
-    start_analysis_thread(
-        new_diary.id,
-        new_diary.date, 
-        data.get('event') or data.get('question1') or "",
-        data.get('sleep_condition') or "",
-        data.get('emotion_desc') or data.get('question2') or "",
-        data.get('emotion_meaning') or data.get('question3') or "",
-        data.get('self_talk') or data.get('question4') or ""
-    )
+    # [AnalysisQueue] 일기 INSERT와 분석 작업 등록을 같은 트랜잭션으로 커밋
+    enqueue_analysis(new_diary.id, user.id)
 
     response_data = serialize_diary(new_diary)
     
-    # [Local Sync] Push to Medical Dashboard (Localhost:8000)
-    try:
-        from b2g_routes import sync_to_insight_mind
-        sync_to_insight_mind(response_data, user.id)
-    except Exception as e:
-        print(f"⚠️ Sync Trigger Failed: {e}")
-
-    # [Push Notification] 보호자 알림 트리거
-    try:
-        from push_service import notify_guardians_mood, notify_guardians_crisis, notify_guardians_kick_flag, is_push_available
-        if is_push_available():
-            mood = data.get('mood_level', 3)
-            safety = data.get('safety_flag', False)
-            # ① 기분 온도 알림 (모든 기분에 대해 발송)
-            if mood:
-                notify_guardians_mood(user, int(mood))
-            # ② 위기 감지 알림 (safety_flag=True)
-            if safety in [True, 'need_help', 'danger']:
-                notify_guardians_crisis(user)
-            # ③ 킥 분석 (Phase 1~3) → medium/high 플래그 시 알림
-            try:
-                all_kick_flags = []
-                # Phase 1: 시계열
-                from kick_analysis import analyze_timeseries
-                ts_result = analyze_timeseries(user.id, db.session, Diary)
-                if ts_result.get('flags'):
-                    all_kick_flags.extend(ts_result['flags'])
-                # Phase 2: 언어 지문
-                from kick_analysis.linguistic import analyze_linguistic
-                ling_result = analyze_linguistic(user.id, db.session, Diary, crypto_decrypt=safe_decrypt)
-                if ling_result.get('flags'):
-                    all_kick_flags.extend(ling_result['flags'])
-                # Phase 3: 관계 지형도
-                from kick_analysis.relational import analyze_relational
-                rel_result = analyze_relational(user.id, db.session, Diary, crypto_decrypt=safe_decrypt)
-                if rel_result.get('flags'):
-                    all_kick_flags.extend(rel_result['flags'])
-                # 플래그가 있으면 보호자 알림
-                if all_kick_flags:
-                    notify_guardians_kick_flag(user, all_kick_flags)
-            except Exception as ke:
-                print(f"⚠️ Kick Analysis Trigger Failed: {ke}")
-    except Exception as e:
-        print(f"⚠️ Push Notification Trigger Failed: {e}")
+    # [DiaryEvents] B2G 동기화 / 보호자 알림 / 킥 분석은 응답 후 백그라운드에서
+    publish_diary_event('created', user.id, response_data,
+                        mood_level=data.get('mood_level', 3),
+                        safety_flag=data.get('safety_flag', False))
 
     response_data['msg'] = '일기가 저장되었습니다.'
     return jsonify(response_data), 201
@@ -590,29 +683,65 @@ def safe_extract_ai_comment(raw_text):
     return text
 
 
-def serialize_diary(d):
-    return {
-        'id': str(d.id), # Cast to String for iOS
-        'date': d.date,
-        'mood_level': d.mood_level,
-        'weather': d.weather,
-        'temperature': d.temperature,
-        'event': safe_decrypt(d.event),
-        'emotion_desc': safe_decrypt(d.emotion_desc),
-        'emotion_meaning': safe_decrypt(d.emotion_meaning),
-        'self_talk': safe_decrypt(d.self_talk),
-        'sleep_condition': safe_decrypt(d.sleep_condition),
-        'gratitude_note': safe_decrypt(d.gratitude_note),
-        'ai_comment': safe_extract_ai_comment(safe_decrypt(d.ai_comment)),
-        'ai_emotion': safe_decrypt(d.ai_emotion),
-        'ai_prediction': safe_decrypt(d.ai_emotion), # Map for iOS
-        'mode': d.mode,
-        'mood_intensity': 0, # Not in DB
-        'safety_flag': d.safety_flag if hasattr(d, 'safety_flag') else False,
-        'created_at': d.created_at.isoformat() if d.created_at else None,
-        'medication': False,
-        'symptoms': []
-    }
+# [Envelope] 봉투 형식 행은 민감 필드를 sealed에서 꺼내므로 (user_id로 데이터 키 조회) 함께 로드
+_SEALED_COLUMNS = ('sealed', 'user_id')
+
+# [Projection] 응답 필드 → (필요한 컬럼, 직렬화 함수). 순서가 기본 응답 순서.
+DIARY_FIELDS = {
+    'id': (('id',), lambda d: str(d.id)), # Cast to String for iOS
+    'date': (('date',), lambda d: d.date),
+    'mood_level': (('mood_level',), lambda d: d.mood_level),
+    'weather': (('weather',), lambda d: d.weather),
+    'temperature': (('temperature',), lambda d: d.temperature),
+    'event': (('event',) + _SEALED_COLUMNS, lambda d: safe_decrypt(d.event)),
+    'emotion_desc': (('emotion_desc',) + _SEALED_COLUMNS, lambda d: safe_decrypt(d.emotion_desc)),
+    'emotion_meaning': (('emotion_meaning',) + _SEALED_COLUMNS, lambda d: safe_decrypt(d.emotion_meaning)),
+    'self_talk': (('self_talk',) + _SEALED_COLUMNS, lambda d: safe_decrypt(d.self_talk)),
+    'sleep_condition': (('sleep_condition',) + _SEALED_COLUMNS, lambda d: safe_decrypt(d.sleep_condition)),
+    'gratitude_note': (('gratitude_note',) + _SEALED_COLUMNS, lambda d: safe_decrypt(d.gratitude_note)),
+    'ai_comment': (('ai_comment',) + _SEALED_COLUMNS, lambda d: safe_extract_ai_comment(safe_decrypt(d.ai_comment))),
+    'ai_emotion': (('ai_emotion',) + _SEALED_COLUMNS, lambda d: safe_decrypt(d.ai_emotion)),
+    'ai_prediction': (('ai_emotion',) + _SEALED_COLUMNS, lambda d: safe_decrypt(d.ai_emotion)), # Map for iOS
+    'mode': (('mode',), lambda d: d.mode),
+    'mood_intensity': ((), lambda d: 0), # Not in DB
+    'safety_flag': (('safety_flag',), lambda d: d.safety_flag if hasattr(d, 'safety_flag') else False),
+    'created_at': (('created_at',), lambda d: d.created_at.isoformat() if d.created_at else None),
+    'medication': ((), lambda d: False),
+    'symptoms': ((), lambda d: []),
+}
+
+
+def _prefetch_diary_plaintext(diaries, fields=None):
+    """
+    목록의 암호문을 decrypt_many로 한 번에 복호화해 평문 캐시에 채운다. (중복 토큰 1회, 큰 목록은 스레드 풀)
+    이후 serialize_diary의 safe_decrypt는 캐시 적중. 캐시가 꺼져 있거나 목록이 캐시보다 크면 건너뜀
+    """
+    if not crypto or crypto.cache is None:
+        return
+    columns = [c for c in ENVELOPE_FIELDS if fields is None or any(c in DIARY_FIELDS[f][0] for f in fields)]
+    tokens = [getattr(d, c) for d in diaries for c in columns]
+    if tokens and len(tokens) <= crypto.cache.max_size:
+        crypto.decrypt_many(tokens)
+
+
+def _purge_diary_plaintext(diary):
+    """
+    일기 수정/삭제 시 이전 본문의 평문 캐시 제거 (커밋 전, 이전 값이 남아 있을 때 호출)
+    - 복호화 평문 LRU (crypto_utils)
+    - Kiwi 형태소 분석 결과 (킥 분석 입력 = 4개 필드 복호화 후 결합한 텍스트)
+    """
+    from kick_analysis.features import build_diary_text
+    from kick_analysis.kiwi_service import forget as forget_kiwi_analysis
+
+    tokens = [getattr(diary, c) for c in ENVELOPE_FIELDS]
+    fields = [diary.event, diary.emotion_desc, diary.emotion_meaning, diary.self_talk]
+    forget_kiwi_analysis([build_diary_text(*[safe_decrypt(f) if f else f for f in fields])])
+    purge_plaintext(tokens)
+
+
+def serialize_diary(d, fields=None):
+    """fields가 없으면 전체 필드, 있으면 해당 필드만 (지정하지 않은 필드는 복호화하지 않음)"""
+    return {name: DIARY_FIELDS[name][1](d) for name in (fields or DIARY_FIELDS)}
 
 # [API Endpoint: Get Single Diary by Date] - PostgreSQL Only
 @app.route('/api/diaries/date/<string:date_str>', methods=['GET'])
@@ -708,6 +837,9 @@ def update_diary(diary_id):
 
     data = request.get_json()
 
+    # [PlaintextCache] 이전 본문의 평문 캐시(복호화 / Kiwi 분석) 즉시 제거
+    _purge_diary_plaintext(diary)
+
     encrypted_event = safe_encrypt(data.get('event') or data.get('question1'))
     encrypted_emotion_desc = safe_encrypt(data.get('emotion_desc') or data.get('question2'))
     encrypted_emotion_meaning = safe_encrypt(data.get('emotion_meaning') or data.get('question3'))
@@ -727,60 +859,19 @@ def update_diary(diary_id):
     diary.temperature = data.get('temperature', diary.temperature)
     diary.safety_flag = data.get('safety_flag', diary.safety_flag)
     
-    db.session.commit()
-    
-    start_analysis_thread(
-        diary.id,
-        diary.date,
-        data.get('event') or data.get('question1') or "",
-        data.get('sleep_condition') or "",
-        data.get('emotion_desc') or data.get('question2') or "",
-        data.get('emotion_meaning') or data.get('question3') or "",
-        data.get('self_talk') or data.get('question4') or ""
-    )
+    # [DiaryFeatures] 이전 본문 기준 특징 무효화 → 워커가 새 버전으로 다시 계산
+    invalidate_diary_features(diary.id)
+    refresh_daily_stats(user.id, [diary.date])  # [DailyStats]
+
+    # [AnalysisQueue] 수정 내용 커밋 + 기존 분석 작업에 병합 (version 증가)
+    enqueue_analysis(diary.id, user.id)
 
     response_data = serialize_diary(diary)
     
-    # [Local Sync] Update to Medical Dashboard (Localhost:8000)
-    try:
-        from b2g_routes import sync_to_insight_mind
-        sync_to_insight_mind(response_data, user.id)
-    except Exception as e:
-        print(f"⚠️ Sync Trigger Failed: {e}")
-
-    # [Push Notification] 보호자 알림 트리거 (수정 시)
-    try:
-        from push_service import notify_guardians_mood, notify_guardians_crisis, notify_guardians_kick_flag, is_push_available
-        if is_push_available():
-            mood = data.get('mood_level', diary.mood_level)
-            safety = data.get('safety_flag', diary.safety_flag)
-            # ① 기분 온도 알림
-            if mood:
-                notify_guardians_mood(user, int(mood))
-            # ② 위기 감지 알림
-            if safety in [True, 'need_help', 'danger']:
-                notify_guardians_crisis(user)
-            # ③ 킥 분석 (Phase 1~3)
-            try:
-                all_kick_flags = []
-                from kick_analysis import analyze_timeseries
-                ts_result = analyze_timeseries(user.id, db.session, Diary)
-                if ts_result.get('flags'): all_kick_flags.extend(ts_result['flags'])
-                
-                from kick_analysis.linguistic import analyze_linguistic
-                ling_result = analyze_linguistic(user.id, db.session, Diary, crypto_decrypt=safe_decrypt)
-                if ling_result.get('flags'): all_kick_flags.extend(ling_result['flags'])
-                
-                from kick_analysis.relational import analyze_relational
-                rel_result = analyze_relational(user.id, db.session, Diary, crypto_decrypt=safe_decrypt)
-                if rel_result.get('flags'): all_kick_flags.extend(rel_result['flags'])
-                
-                if all_kick_flags:
-                    notify_guardians_kick_flag(user, all_kick_flags)
-            except Exception as ke:
-                print(f"⚠️ Kick Analysis Trigger Failed (Update): {ke}")
-    except Exception as e:
-        print(f"⚠️ Push Notification Trigger Failed (Update): {e}")
+    # [DiaryEvents] B2G 동기화 / 보호자 알림 / 킥 분석은 응답 후 백그라운드에서
+    publish_diary_event('updated', user.id, response_data,
+                        mood_level=data.get('mood_level', diary.mood_level),
+                        safety_flag=data.get('safety_flag', diary.safety_flag))
 
     response_data['msg'] = '일기가 수정되었습니다.'
     return jsonify(response_data)
@@ -809,11 +900,103 @@ def delete_diary(diary_id):
     except Exception as e:
         print(f"⚠️ [NativeRAG] RAG 메모리 완전 파기 실패: {e}")
         
+    cancel_analysis(diary_id)
+    invalidate_diary_features(diary_id)
+    invalidate_ner_cache(diary_id)
+    _purge_diary_plaintext(diary)  # [PlaintextCache] 삭제된 일기 평문 캐시(복호화 / Kiwi 분석) 즉시 제거
     db.session.delete(diary)
+    refresh_daily_stats(user.id, [target_date])  # [DailyStats] 삭제 반영 (그날 일기가 없으면 행 제거)
     db.session.commit()
     
     return jsonify({'msg': '일기가 삭제되었습니다.'})
 
+# [API Endpoint: Diary Analysis Status]
+@app.route('/api/diaries/<int:diary_id>/analysis', methods=['GET'])
+@jwt_required()
+def get_diary_analysis_status(diary_id):
+    """일기 AI 분석 작업 상태 조회 (pending/running/done/failed)"""
+    current_user_id = int(get_jwt_identity())
+    diary = Diary.query.filter_by(id=diary_id, user_id=current_user_id).first()
+    if not diary:
+        return jsonify({'msg': '일기를 찾을 수 없습니다.'}), 404
+
+    status = get_analysis_status(diary_id)
+    if not status:
+        return jsonify({'diary_id': diary_id, 'status': 'none'}), 200
+    return jsonify(status), 200
+
+def _require_staff(current_user_id):
+    """의료진/관리자 권한 확인 (kick_routes._require_staff와 동일 기준)"""
+    user = User.query.filter_by(id=current_user_id).first()
+    if not user or user.role not in ('staff', 'admin', 'doctor'):
+        return None
+    return user
+
+# [API Endpoint: Analysis Queue Stats]
+@app.route('/api/analysis/queue', methods=['GET'])
+@jwt_required()
+def get_analysis_queue_stats():
+    """AI 분석 작업 큐 현황 (의료진/관리자 전용)"""
+    if not _require_staff(int(get_jwt_identity())):
+        return jsonify({'error': '의료진 권한이 필요합니다'}), 403
+    return jsonify(get_queue_stats()), 200
+
+# [API Endpoint: DB Pool Stats]
+@app.route('/api/system/db-pool', methods=['GET'])
+@jwt_required()
+def get_db_pool_stats():
+    """공유 psycopg2 커넥션 풀 지표 (분석 워커/RAG 메모리 사용분, 의료진/관리자 전용)"""
+    from db_pool import get_pool_stats
+    if not _require_staff(int(get_jwt_identity())):
+        return jsonify({'error': '의료진 권한이 필요합니다'}), 403
+    return jsonify(get_pool_stats()), 200
+
+# [API Endpoint: Diary Event Pipeline Stats]
+@app.route('/api/system/diary-events', methods=['GET'])
+@jwt_required()
+def get_diary_event_stats():
+    """일기 저장 후처리 단계별 지표 (처리 수/실패/대기·소요 시간, 의료진/관리자 전용)"""
+    if not _require_staff(int(get_jwt_identity())):
+        return jsonify({'error': '의료진 권한이 필요합니다'}), 403
+    return jsonify(get_event_stats()), 200
+
+@app.route('/api/runpod/webhook', methods=['POST'])
+def runpod_webhook():
+    """RunPod 작업 완료 통지 (RUNPOD_WEBHOOK_URL 사용 시). 대기 중인 작업을 즉시 깨운다. 시크릿 미설정 시 항상 403"""
+    from runpod_client import get_runpod_client
+    client = get_runpod_client()
+    if not client.verify_webhook_token(request.args.get('token')):
+        return jsonify({'error': 'invalid token'}), 403
+    resolved = client.resolve_webhook(request.get_json(silent=True))
+    return jsonify({'ok': True, 'resolved': resolved}), 200
+
+@app.route('/api/system/runpod', methods=['GET'])
+@jwt_required()
+def get_runpod_stats():
+    """RunPod 비동기 클라이언트 지표 (의료진/관리자 전용)"""
+    from runpod_client import get_runpod_client
+    if not _require_staff(int(get_jwt_identity())):
+        return jsonify({'error': '의료진 권한이 필요합니다'}), 403
+    return jsonify(get_runpod_client().stats()), 200
+
+@app.route('/api/system/llm-gateway', methods=['GET'])
+@jwt_required()
+def get_llm_gateway_stats():
+    """로컬 LLM 게이트웨이 지표 — 큐 길이, 배치 크기, 토큰 처리량 (의료진/관리자 전용)"""
+    from llm_gateway import get_gateway_stats
+    if not _require_staff(int(get_jwt_identity())):
+        return jsonify({'error': '의료진 권한이 필요합니다'}), 403
+    return jsonify(get_gateway_stats()), 200
+
+@app.route('/api/system/semantic-cache', methods=['GET'])
+@jwt_required()
+def get_semantic_cache_stats():
+    """채팅 반응 / 일기 코멘트 시맨틱 캐시 적중률 (의료진/관리자 전용)"""
+    from semantic_cache import get_cache_stats
+    if not _require_staff(int(get_jwt_identity())):
+        return jsonify({'error': '의료진 권한이 필요합니다'}), 403
+    return jsonify(get_cache_stats()), 200
+
 # [API Endpoint: Verify Center Code]
 @app.route('/api/centers/verify-code/', methods=['POST'])
 def verify_center_code():
@@ -119,6 +119,73 @@ def check_status():
     return jsonify({"linked": False}), 200
 
 # [Stubbed Sync Helpers]
+def push_to_insight_mind(diary_data, user_id):
+    """
+    Web(217) -> Admin(Local 8000) Sync (호출한 스레드에서 바로 전송, app_context 필요)
+    diary_events 파이프라인의 b2g 단계가 동시 실행 수를 제한해 호출한다.
+    """
+    # 1. Get User Info (Postgres)
+    # user_id passed might be int or str. PG ID is int.
+    if isinstance(user_id, str) and not user_id.isdigit():
+         # Maybe username?
+         user = User.query.filter_by(username=user_id).first()
+    else:
+         user = User.query.get(int(user_id))
+         
+    if not user: return
+    
+    center_code = user.center_code
+    if not center_code: 
+        print(f"⏩ [B2G Local] Skipping sync. No center linked for {user.username}")
+        return
+        
+    nickname = user.nickname or user.username
+    
+    # 2. Format Payload
+    # diary_data should be DECRYPTED dictionary (from serialize_diary)
+    
+    metrics = [{
+        "created_at": diary_data.get('created_at', ''),
+        "date": diary_data.get('date', ''),
+        "mood_level": diary_data.get('mood_level', 3),
+        
+        # Content
+        "event": diary_data.get('event', ''),
+        "emotion": diary_data.get('emotion_desc', ''),
+        "meaning": diary_data.get('emotion_meaning', ''),
+        "selftalk": diary_data.get('self_talk', ''),
+        "sleep": diary_data.get('sleep_condition', ''),
+        "gratitude": diary_data.get('gratitude_note', ''),
+        
+        # AI Data
+        "ai_comment": diary_data.get('ai_comment', ''),
+        "ai_prediction": diary_data.get('ai_emotion', ''),
+        
+        # Rich Data
+        "weather": diary_data.get('weather', ''),
+        "mode": diary_data.get('mode', 'green'),
+        "mood_intensity": diary_data.get('mood_intensity', 0)
+    }]
+    
+    payload = {
+        "center_code": center_code,
+        "user_nickname": nickname,
+        "risk_level": 0,
+        "mood_metrics": metrics
+    }
+    
+    # 3. Send to Local Dashboard (Django on Port 8000)
+    url = "http://127.0.0.1:8000/api/v1/centers/sync-data/"
+    print(f"🚀 [B2G Local] Pushing to Dashboard(8000)... User: {nickname}, Code: {center_code}")
+    
+    res = requests.post(url, json=payload, timeout=5) # No SSL verify needed for localhost
+    
+    if res.status_code == 200:
+        print(f"✅ [B2G Local] Sync Success: {res.json()}")
+    else:
+        print(f"⚠️ [B2G Local] Sync Failed ({res.status_code}): {res.text}")
+
+
 def sync_to_insight_mind(diary_data, user_id):
     """
     Web(217) -> Admin(Local 8000) Sync
@@ -132,67 +199,7 @@ def sync_to_insight_mind(diary_data, user_id):
             from app import app
             with app.app_context():
                 try:
-                    # 1. Get User Info (Postgres)
-                    # user_id passed might be int or str. PG ID is int.
-                    if isinstance(user_id, str) and not user_id.isdigit():
-                         # Maybe username?
-                         user = User.query.filter_by(username=user_id).first()
-                    else:
-                         user = User.query.get(int(user_id))
-                         
-                    if not user: return
-                    
-                    center_code = user.center_code
-                    if not center_code: 
-                        print(f"⏩ [B2G Local] Skipping sync. No center linked for {user.username}")
-                        return
-                        
-                    nickname = user.nickname or user.username
-                    
-                    # 2. Format Payload
-                    # diary_data should be DECRYPTED dictionary (from serialize_diary)
-                    
-                    metrics = [{
-                        "created_at": diary_data.get('created_at', ''),
-                        "date": diary_data.get('date', ''),
-                        "mood_level": diary_data.get('mood_level', 3),
-                        
-                        # Content
-                        "event": diary_data.get('event', ''),
-                        "emotion": diary_data.get('emotion_desc', ''),
-                        "meaning": diary_data.get('emotion_meaning', ''),
-                        "selftalk": diary_data.get('self_talk', ''),
-                        "sleep": diary_data.get('sleep_condition', ''),
-                        "gratitude": diary_data.get('gratitude_note', ''),
-                        
-                        # AI Data
-                        "ai_comment": diary_data.get('ai_comment', ''),
-                        "ai_prediction": diary_data.get('ai_emotion', ''),
-                        
-                        # Rich Data
-                        "weather": diary_data.get('weather', ''),
-                        "mode": diary_data.get('mode', 'green'),
-                        "mood_intensity": diary_data.get('mood_intensity', 0)
-                    }]
-                    
-                    payload = {
-                        "center_code": center_code,
-                        "user_nickname": nickname,
-                        "risk_level": 0,
-                        "mood_metrics": metrics
-                    }
-                    
-                    # 3. Send to Local Dashboard (Django on Port 8000)
-                    url = "http://127.0.0.1:8000/api/v1/centers/sync-data/"
-                    print(f"🚀 [B2G Local] Pushing to Dashboard(8000)... User: {nickname}, Code: {center_code}")
-                    
-                    res = requests.post(url, json=payload, timeout=5) # No SSL verify needed for localhost
-                    
-                    if res.status_code == 200:
-                        print(f"✅ [B2G Local] Sync Success: {res.json()}")
-                    else:
-                        print(f"⚠️ [B2G Local] Sync Failed ({res.status_code}): {res.text}")
-                        
+                    push_to_insight_mind(diary_data, user_id)
                 except Exception as ex:
                     print(f"❌ [B2G Local] Sync Error inside thread: {ex}")
 
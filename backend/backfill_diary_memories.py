@@ -0,0 +1,124 @@
+"""
+마음온 RAG 기억(diary_memories) 배치 재색인 스크립트
+==================================================
+과거 일기를 id 순으로 청크 단위로 읽어 복호화 → 배치 임베딩 → 일괄 UPSERT 합니다.
+임베딩 모델 교체 후 전체 재색인하거나, 누락된 일기 기억을 채울 때 사용합니다.
+
+청크가 커밋될 때마다 체크포인트 파일에 마지막 일기 id를 기록하므로,
+중단되더라도 같은 명령을 다시 실행하면 이어서 진행합니다.
+
+수동 실행:
+  cd /home/ubuntu/project/backend && source venv/bin/activate
+  python backfill_diary_memories.py                  # 전체 재색인 (체크포인트부터 이어서)
+  python backfill_diary_memories.py --only-missing   # 기억이 없는 일기만
+  python backfill_diary_memories.py --reset          # 체크포인트 무시하고 처음부터
+  python backfill_diary_memories.py --user-id 42 --batch-size 256
+  python backfill_diary_memories.py --ensure-indexes --reindex   # 모델 교체 후: 인덱스 확인 → 재색인 → HNSW 재구성
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+
+# 백엔드 루트 디렉토리를 path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# [DBPool] 백필은 연결 1개면 충분
+os.environ.setdefault('DB_POOL_MAX', '2')
+
+from memory_manager import (backfill_diary_memories, ensure_memory_indexes, reindex_memory_hnsw,
+                            EMBED_BATCH_SIZE, BACKFILL_CHUNK_SIZE)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [MemoryBackfill] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.memory_backfill_checkpoint.json')
+
+
+def _load_checkpoint(path, user_id, only_missing):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return 0
+    # 다른 조건으로 실행한 체크포인트는 재사용하지 않음
+    if data.get('user_id') != user_id or data.get('only_missing') != only_missing:
+        logger.info("ℹ️ 실행 조건이 달라 기존 체크포인트를 무시합니다.")
+        return 0
+    return int(data.get('last_id', 0))
+
+
+def _save_checkpoint(path, last_id, user_id, only_missing, stats):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({
+            'last_id': last_id,
+            'user_id': user_id,
+            'only_missing': only_missing,
+            'stats': stats,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+        }, f)
+    os.replace(tmp, path)  # 중간에 죽어도 체크포인트가 깨지지 않도록 원자적 교체
+
+
+def main():
+    parser = argparse.ArgumentParser(description="diary_memories 배치 재색인")
+    parser.add_argument('--user-id', type=int, default=None, help="특정 사용자만 처리")
+    parser.add_argument('--only-missing', action='store_true', help="기억이 없는 일기만 처리")
+    parser.add_argument('--chunk-size', type=int, default=BACKFILL_CHUNK_SIZE, help="DB에서 한 번에 읽을 일기 수")
+    parser.add_argument('--batch-size', type=int, default=EMBED_BATCH_SIZE, help="임베딩 배치 크기 (64~256 권장)")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help="체크포인트 파일 경로")
+    parser.add_argument('--reset', action='store_true', help="체크포인트 무시하고 처음부터")
+    parser.add_argument('--ensure-indexes', action='store_true', help="시작 전 테이블/인덱스(HNSW 포함) 생성 확인")
+    parser.add_argument('--reindex', action='store_true', help="완료 후 HNSW 인덱스 재구성 (REINDEX CONCURRENTLY)")
+    args = parser.parse_args()
+
+    if args.ensure_indexes:
+        ensure_memory_indexes()
+
+    start_after = 0 if args.reset else _load_checkpoint(args.checkpoint, args.user_id, args.only_missing)
+
+    logger.info("=" * 60)
+    logger.info("🧠 diary_memories 배치 재색인 시작")
+    logger.info(f"   시작 위치: id > {start_after} | chunk={args.chunk_size} | batch={args.batch_size}"
+                f" | user={args.user_id or '전체'} | only_missing={args.only_missing}")
+    logger.info("=" * 60)
+
+    started = time.time()
+    stats = backfill_diary_memories(
+        start_after_id=start_after,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        user_id=args.user_id,
+        only_missing=args.only_missing,
+        on_chunk=lambda last_id, s: _save_checkpoint(args.checkpoint, last_id, args.user_id, args.only_missing, s),
+    )
+    elapsed = time.time() - started
+
+    rate = stats['stored'] / elapsed if elapsed > 0 else 0.0
+    logger.info(f"📊 완료: 조회={stats['scanned']}, 저장={stats['stored']}, 제외={stats['skipped']}, "
+                f"오류={stats['errors']}, 마지막 id={stats['last_id']} ({elapsed:.1f}s, {rate:.1f}건/s)")
+
+    # 끝까지 처리했으면 체크포인트 정리 → 다음 실행은 처음부터
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    if args.reindex:
+        logger.info("🔧 HNSW 인덱스 재구성 중...")
+        reindex_memory_hnsw()
+        logger.info("✅ HNSW 인덱스 재구성 완료")
+
+
+if __name__ == "__main__":
+    from db_pool import close_pool
+    try:
+        main()
+    finally:
+        close_pool()
@@ -0,0 +1,128 @@
+"""
+일기 봉투 암호화 벤치마크 — 필드별 Fernet vs 행 단위 봉투(diaries.sealed)
+=========================================================================
+같은 합성 일기를 두 형식으로 저장하고,
+GET /api/diaries가 하는 일(사용자 일기 전체 ORM 로드 + 민감 필드 8개 복호화)과 저장 크기를 비교한다.
+두 형식의 복호화 결과가 완전히 같은지도 확인한다.
+
+데이터: 임시 SQLite 파일, 사용자 --users명 × 일기 --diaries건 (본문 길이는 실제 일기와 비슷하게)
+
+실행:
+  cd /home/ubuntu/project/backend && source venv/bin/activate
+  python benchmarks/bench_envelope.py --users 20 --diaries 200
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func
+from models import db, User, Diary
+from crypto_utils import crypto_manager
+import diary_envelope
+from diary_envelope import FIELDS
+
+_WORDS = ("오늘 회사에서 팀장님과 회의를 했는데 생각보다 길어져서 점심을 늦게 먹었다 퇴근길에 친구와 통화하며 "
+          "주말 계획을 세웠고 집에 와서는 산책을 조금 했다 기분이 나쁘지 않았다 잠이 잘 올 것 같다").split()
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _seed(num_users, num_diaries, seed):
+    """두 형식에 같은 내용을 넣는다 (봉투 형식 사용자 id = 기존 형식 사용자 id + num_users)"""
+    rng = random.Random(seed)
+    contents = []
+    for _ in range(num_users):
+        contents.append([{
+            'event': _text(rng, 60), 'sleep_condition': _text(rng, 5), 'emotion_desc': _text(rng, 8),
+            'emotion_meaning': _text(rng, 25), 'self_talk': _text(rng, 15), 'gratitude_note': _text(rng, 10),
+            'ai_comment': _text(rng, 40), 'ai_emotion': rng.choice(["기쁨", "평온", "불안", "슬픔"]),
+        } for _ in range(num_diaries)])
+
+    start = date(2025, 1, 1)
+    for envelope in (False, True):
+        diary_envelope.WRITE_ENABLED = envelope
+        for index, diaries in enumerate(contents):
+            user_id = index + 1 + (num_users if envelope else 0)
+            db.session.add(User(id=user_id, username=f"bench{user_id}", password="x", role="user"))
+            for day, fields in enumerate(diaries):
+                db.session.add(Diary(user_id=user_id, date=(start + timedelta(days=day)).isoformat(), mood_level=3,
+                                     **{f: crypto_manager.encrypt(v) for f, v in fields.items()}))
+            db.session.commit()
+    diary_envelope.WRITE_ENABLED = False
+
+
+def _list_users(user_ids):
+    """GET /api/diaries와 같은 경로: 사용자별 전체 로드 + serialize_diary의 safe_decrypt"""
+    result = []
+    for user_id in user_ids:
+        db.session.expunge_all()
+        for d in Diary.query.filter_by(user_id=user_id).order_by(Diary.date.desc(), Diary.id.desc()).all():
+            result.append([crypto_manager.decrypt(getattr(d, f)) for f in FIELDS])
+    return result
+
+
+def _storage_bytes(user_ids):
+    columns = [func.coalesce(func.length(getattr(Diary, f)), 0) for f in FIELDS]
+    total = db.session.query(func.sum(sum(columns[1:], columns[0]) +
+                                      func.coalesce(func.length(Diary.sealed), 0)))
+    return total.filter(Diary.user_id.in_(user_ids)).scalar() or 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="일기 봉투 암호화 벤치마크")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--diaries', type=int, default=200, help="사용자당 일기 수")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp_dir.name, 'bench.db')}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        _seed(args.users, args.diaries, args.seed)
+        print(f"📄 사용자 {args.users}명 × 일기 {args.diaries}건 × 2형식 생성 ({time.perf_counter() - started:.1f}s)")
+
+        legacy_users = list(range(1, args.users + 1))
+        envelope_users = [u + args.users for u in legacy_users]
+
+        timings, sizes, results = {}, {}, {}
+        for name, user_ids in (('필드별 Fernet', legacy_users), ('봉투(sealed)', envelope_users)):
+            best = None
+            for _ in range(args.repeat):
+                diary_envelope._keys.clear()  # 데이터 키 풀기까지 포함 (요청마다 캐시가 비어 있는 최악의 경우)
+                started = time.perf_counter()
+                results[name] = _list_users(user_ids)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best
+            sizes[name] = size = _storage_bytes(user_ids)
+            rows = args.users * args.diaries
+            print(f"   {name}: 목록 로드+복호화 {best * 1000:.0f}ms ({best / rows * 1e6:.0f}µs/행) | "
+                  f"저장 {size / 1024:.0f}KB ({size / rows:.0f}B/행)")
+
+        legacy, envelope = '필드별 Fernet', '봉투(sealed)'
+        print(f"   → 속도 x{timings[legacy] / timings[envelope]:.1f}, "
+              f"저장 크기 -{(1 - sizes[envelope] / sizes[legacy]) * 100:.0f}%")
+        print(f"   결과 일치: {'✅' if results[legacy] == results[envelope] else '❌'}")
+        db.drop_all()
+
+    tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
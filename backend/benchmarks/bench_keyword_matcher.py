@@ -0,0 +1,152 @@
+"""
+사전 키워드 스캔 벤치마크 — 키워드별 `in` 루프 vs Aho–Corasick(KeywordMatcher)
+==========================================================================
+킥 분석에서 일기 1건마다 돌던 사전 스캔(감정어 어근, 호칭, 자기 서사 패턴, 수면 키워드, CBT 키워드)을
+기존 방식(키워드마다 `kw in text`)과 KeywordMatcher(순수 Python / pyahocorasick)로 각각 측정한다.
+relational의 문장별 감정 스캔(문장 수 × 어근 수)도 따로 측정한다.
+
+텍스트: 기본은 예시 문장을 이어 붙여 실제 일기 분량(약 150 / 400 / 1000자)으로 만든 합성 일기.
+--from-db N 을 주면 운영 DB의 최근 일기 N건을 복호화해 그대로 사용한다.
+
+실행:
+  cd /home/ubuntu/project/backend && source venv/bin/activate
+  python benchmarks/bench_keyword_matcher.py
+  python benchmarks/bench_keyword_matcher.py --from-db 500 --repeat 20
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DB_POOL_MAX', '2')
+
+import keyword_matcher
+from keyword_matcher import KeywordMatcher
+from kick_analysis.emotion_lexicon import ALL_STEMS
+from kick_analysis.relational import KINSHIP_DICT
+from kick_analysis.cbt_patterns import CBT_PATTERNS
+from kick_analysis.sleep_mind import SLEEP_POSITIVE_KEYWORDS, SLEEP_NEGATIVE_KEYWORDS
+from kick_analysis import self_narrative as sn
+
+SAMPLE_SENTENCES = [
+    "오늘은 회사에서 발표를 했는데 너무 떨리고 불안했다.",
+    "팀장님이 칭찬해주셔서 뿌듯했지만 집에 와서는 지치고 피곤했다.",
+    "엄마랑 여동생이랑 저녁을 먹었는데 오랜만에 편안하고 따뜻했다.",
+    "나는 항상 실수만 하는 것 같아. 다 내 잘못이야. 앞으로 더 잘해야 하는데.",
+    "잠을 못 자서 뒤척였고 새벽에 깼다. 머리가 아프다.",
+    "친구 덕분에 감사한 하루였다. 내일은 일찍 자야겠다.",
+    "아무도 나를 이해하지 못하는 것 같아서 외롭고 허전했다.",
+    "점심에는 동료들이랑 산책을 했는데 날씨가 좋아서 기분이 조금 나아졌다.",
+    "요즘 계속 무기력하고 아무것도 하기 싫다. 그래도 일기는 쓰고 있다.",
+]
+
+# 일기 1건에 대해 돌던 사전 전체 (범주 = 사전 이름)
+LEXICONS = {
+    'emotion': list(ALL_STEMS),
+    'kinship': list(KINSHIP_DICT),
+    'cbt': [kw for info in CBT_PATTERNS.values() for kw in info['keywords']],
+    'sleep': SLEEP_POSITIVE_KEYWORDS + SLEEP_NEGATIVE_KEYWORDS,
+    'narrative': (sn.INTERNAL_ATTRIBUTION + sn.EXTERNAL_ATTRIBUTION + sn.PAST_MARKERS + sn.PRESENT_MARKERS
+                  + sn.FUTURE_MARKERS + sn.OBLIGATION_PATTERNS + sn.EFFICACY_POSITIVE + sn.EFFICACY_NEGATIVE
+                  + sn.GRATITUDE_PATTERNS),
+}
+
+
+def _synthetic_diaries(count, seed):
+    rng = random.Random(seed)
+    diaries = []
+    for target in (150, 400, 1000):
+        for _ in range(count):
+            text = ""
+            while len(text) < target:
+                text += rng.choice(SAMPLE_SENTENCES) + " "
+            diaries.append(text.strip())
+    return diaries
+
+
+def _db_diaries(limit):
+    from db_pool import get_conn
+    from crypto_utils import crypto_manager
+    from kick_analysis.features import build_diary_text
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT event, emotion_desc, emotion_meaning, self_talk FROM diaries "
+                        "ORDER BY id DESC LIMIT %s", (limit,))
+            rows = cur.fetchall()
+        conn.commit()
+    texts = [build_diary_text(*[crypto_manager.decrypt(f) if f else "" for f in row]) for row in rows]
+    return [t for t in texts if t]
+
+
+def _time(fn, texts, repeat):
+    """텍스트 1건당 평균 처리 시간(µs) 목록의 중앙값"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            fn(text)
+        samples.append((time.perf_counter() - started) / len(texts) * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="사전 키워드 스캔 벤치마크")
+    parser.add_argument('--count', type=int, default=100, help="분량별 합성 일기 수")
+    parser.add_argument('--from-db', type=int, default=0, help="운영 DB 최근 일기 N건 사용")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    texts = _db_diaries(args.from_db) if args.from_db else _synthetic_diaries(args.count, args.seed)
+    lengths = sorted(len(t) for t in texts)
+    print(f"📄 일기 {len(texts)}건 | 길이 중앙값 {lengths[len(lengths) // 2]}자 (최대 {lengths[-1]}자)")
+    print(f"   pyahocorasick: {'설치됨' if keyword_matcher.AHOCORASICK_AVAILABLE else '없음 (순수 Python만 측정)'}")
+
+    backends = [('python', False)] + ([('c', True)] if keyword_matcher.AHOCORASICK_AVAILABLE else [])
+    cases = dict(LEXICONS, all=[kw for kws in LEXICONS.values() for kw in kws])
+
+    print(f"\n{'사전':<10}{'키워드':>7}{'in 루프(µs)':>14}" + "".join(f"{'AC-' + name + '(µs)':>16}" for name, _ in backends))
+    for name, keywords in cases.items():
+        row = f"{name:<10}{len(keywords):>7}"
+        legacy = _time(lambda text: [kw for kw in keywords if kw in text], texts, args.repeat)
+        row += f"{legacy:>14.1f}"
+        for _, use_c in backends:
+            matcher = KeywordMatcher(keywords, use_c=use_c)
+            elapsed = _time(matcher.found, texts, args.repeat)
+            row += f"{elapsed:>10.1f} (x{legacy / elapsed:.1f})"
+        print(row)
+
+    # relational: 문장마다 어근 전체 스캔
+    sentences = [[s for s in text.split('. ') if s] for text in texts]
+    print("\n문장별 감정 스캔 (relational._analyze_sentence_emotions)")
+    legacy = _time_sentences(lambda s: {c for stem, c in ALL_STEMS.items() if stem in s}, sentences, args.repeat)
+    print(f"   in 루프: {legacy:.1f}µs/일기")
+    for name, use_c in backends:
+        matcher = KeywordMatcher(ALL_STEMS, use_c=use_c)
+        elapsed = _time_sentences(matcher.categories, sentences, args.repeat)
+        print(f"   AC-{name}: {elapsed:.1f}µs/일기 (x{legacy / elapsed:.1f})")
+
+
+def _time_sentences(fn, sentences, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for sents in sentences:
+            for s in sents:
+                fn(s)
+        samples.append((time.perf_counter() - started) / len(sentences) * 1e6)
+    return statistics.median(samples)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        if '--from-db' in sys.argv:
+            from db_pool import close_pool
+            close_pool()
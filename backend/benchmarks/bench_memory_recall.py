@@ -0,0 +1,122 @@
+"""
+RAG 기억 검색(recall_memories) 재현율 / 지연 벤치마크
+=====================================================
+운영 DB의 diary_memories를 그대로 사용하여, 사용자별 정확 검색(exact) 대비
+HNSW 검색의 recall@k와 지연(p50/p95)을 ef_search 값별로 측정합니다.
+
+질의 벡터는 각 사용자의 실제 기억 임베딩에 작은 잡음을 더해 만듭니다. (자기 자신과의 완전 일치 방지)
+
+실행:
+  cd /home/ubuntu/project/backend && source venv/bin/activate
+  python benchmarks/bench_memory_recall.py --users 50 --queries 5 --k 5 --ef 16,32,64,128,256
+  python benchmarks/bench_memory_recall.py --ensure-indexes   # 인덱스부터 만들고 측정
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DB_POOL_MAX', '2')
+
+from memory_manager import (get_db_connection, search_memory_rows, ensure_memory_indexes,
+                            EXACT_SEARCH_MAX_ROWS)
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[idx]
+
+
+def _sample_queries(conn, num_users, per_user, seed):
+    """기억이 k개 이상인 사용자를 골라 (user_id, 질의 벡터) 목록을 만든다."""
+    rng = np.random.default_rng(seed)
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT user_id, count(*) FROM diary_memories
+             GROUP BY user_id HAVING count(*) >= 10
+             ORDER BY random() LIMIT %s
+        """, (num_users,))
+        users = cur.fetchall()
+        queries = []
+        for user_id, count in users:
+            cur.execute("SELECT embedding FROM diary_memories WHERE user_id = %s ORDER BY random() LIMIT %s",
+                        (user_id, per_user))
+            for (embedding,) in cur.fetchall():
+                vec = np.asarray(embedding, dtype=np.float32)
+                vec = vec + rng.normal(0, 0.02, size=vec.shape).astype(np.float32)
+                queries.append((user_id, count, vec.tolist()))
+    conn.commit()
+    return queries
+
+
+def _run(conn, queries, k, strategy, ef_search=None, truth=None):
+    latencies, recalls, results = [], [], []
+    for i, (user_id, _, vec) in enumerate(queries):
+        started = time.perf_counter()
+        rows = search_memory_rows(conn, user_id, vec, limit=k, strategy=strategy, ef_search=ef_search)
+        latencies.append((time.perf_counter() - started) * 1000)
+        ids = [r[0] for r in rows]
+        results.append(ids)
+        if truth is not None and truth[i]:
+            recalls.append(len(set(ids) & set(truth[i])) / len(truth[i]))
+    return results, latencies, recalls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="diary_memories 검색 재현율/지연 벤치마크")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=5, help="사용자당 질의 수")
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--ef', default="16,32,64,128,256", help="측정할 hnsw.ef_search 값 (쉼표 구분)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--ensure-indexes', action='store_true', help="측정 전 인덱스 생성/검증")
+    args = parser.parse_args()
+
+    if args.ensure_indexes:
+        ensure_memory_indexes()
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*), count(DISTINCT user_id) FROM diary_memories")
+            total_rows, total_users = cur.fetchone()
+        conn.commit()
+
+        queries = _sample_queries(conn, args.users, args.queries, args.seed)
+        if not queries:
+            print("⚠️ 측정할 기억 데이터가 없습니다. (기억 10건 이상인 사용자 필요)")
+            return
+
+        print(f"📦 diary_memories: {total_rows:,}행 / 사용자 {total_users:,}명 | 질의 {len(queries)}건 | k={args.k}")
+        print(f"   auto 전략: 사용자 기억 ≤ {EXACT_SEARCH_MAX_ROWS}건이면 exact, 초과 시 hnsw\n")
+
+        # 워밍업 (캐시/플랜)
+        _run(conn, queries[:5], args.k, 'exact')
+
+        truth, lat, _ = _run(conn, queries, args.k, 'exact')
+        print(f"{'strategy':<18}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+        print(f"{'exact':<18}{1.0:>10.3f}{_percentile(lat, 50):>10.2f}{_percentile(lat, 95):>10.2f}{max(lat):>10.2f}")
+
+        _, lat, rec = _run(conn, queries, args.k, 'auto', truth=truth)
+        print(f"{'auto':<18}{statistics.mean(rec):>10.3f}{_percentile(lat, 50):>10.2f}"
+              f"{_percentile(lat, 95):>10.2f}{max(lat):>10.2f}")
+
+        for ef in [int(x) for x in args.ef.split(',') if x.strip()]:
+            _, lat, rec = _run(conn, queries, args.k, 'hnsw', ef_search=ef, truth=truth)
+            print(f"{'hnsw ef=' + str(ef):<18}{statistics.mean(rec):>10.3f}{_percentile(lat, 50):>10.2f}"
+                  f"{_percentile(lat, 95):>10.2f}{max(lat):>10.2f}")
+
+
+if __name__ == "__main__":
+    from db_pool import close_pool
+    try:
+        main()
+    finally:
+        close_pool()
@@ -0,0 +1,111 @@
+"""
+Phase 1 시계열 전체 분석 벤치마크 — 사용자별 N+1 쿼리 vs 집계 쿼리(analyze_timeseries_bulk)
+==========================================================================================
+의료진 대시보드(_build_dashboard_overview)가 호출하는 analyze_all_users_timeseries를
+기존 방식(사용자마다 analyze_timeseries → 쿼리 5개)과 집계 쿼리 2개 방식으로 각각 측정하고,
+두 방식의 사용자별 결과가 완전히 같은지 확인한다.
+
+데이터: 기본은 임시 SQLite 파일에 합성 사용자/일기를 만든다. (사용자당 0~40일 범위의 일기 0~30건)
+--database-url 로 빈 Postgres 스키마를 주면 같은 데이터를 그곳에 만들어 측정한다.
+
+실행:
+  cd /home/ubuntu/project/backend && source venv/bin/activate
+  python benchmarks/bench_timeseries.py --users 10000
+  python benchmarks/bench_timeseries.py --users 10000 --database-url postgresql://.../bench_db
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models import db, User, Diary
+from kick_analysis import analyze_timeseries, analyze_timeseries_bulk, analyze_all_users_timeseries
+
+
+def _seed(num_users, today, seed):
+    rng = random.Random(seed)
+    users, diaries = [], []
+    for user_id in range(1, num_users + 1):
+        users.append({'id': user_id, 'username': f"bench{user_id}", 'password': "x", 'role': "user"})
+        for _ in range(rng.randint(0, 30)):
+            day = today - timedelta(days=rng.randint(0, 40))
+            created_at = None if rng.random() < 0.1 else (
+                datetime.combine(day, datetime.min.time()) + timedelta(hours=rng.randint(0, 23)))
+            diaries.append({
+                'user_id': user_id, 'date': day.strftime('%Y-%m-%d'), 'created_at': created_at,
+                'mood_level': None if rng.random() < 0.1 else rng.randint(1, 5),
+            })
+    db.session.bulk_insert_mappings(User, users)
+    db.session.bulk_insert_mappings(Diary, diaries)
+    db.session.commit()
+    return len(diaries)
+
+
+def _legacy_all_users(today):
+    """변경 전 analyze_all_users_timeseries와 같은 사용자별 루프"""
+    return {user.id: analyze_timeseries(user.id, db.session, Diary, today)
+            for user in db.session.query(User).all()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="시계열 전체 분석 벤치마크")
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--database-url', default=None, help="기본: 임시 SQLite 파일")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-legacy', action='store_true', help="사용자별 루프 측정 생략")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    url = args.database_url
+    if not url:
+        tmp_dir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmp_dir.name, 'bench.db')}"
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    db.init_app(app)
+    today = date(2026, 3, 31)
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        num_diaries = _seed(args.users, today, args.seed)
+        print(f"📄 사용자 {args.users}명 / 일기 {num_diaries}건 생성 ({time.perf_counter() - started:.1f}s) | {url.split(':')[0]}")
+
+        started = time.perf_counter()
+        bulk = analyze_timeseries_bulk(db.session, Diary, today)
+        bulk_elapsed = time.perf_counter() - started
+        print(f"   집계 쿼리 (analyze_timeseries_bulk): {bulk_elapsed * 1000:.0f}ms")
+
+        started = time.perf_counter()
+        overview = analyze_all_users_timeseries(db.session, User, Diary, today)
+        print(f"   analyze_all_users_timeseries: {(time.perf_counter() - started) * 1000:.0f}ms "
+              f"(플래그 사용자 {overview['flagged_count']}명)")
+
+        if not args.skip_legacy:
+            started = time.perf_counter()
+            legacy = _legacy_all_users(today)
+            legacy_elapsed = time.perf_counter() - started
+            print(f"   사용자별 루프 (쿼리 {args.users * 5}개): {legacy_elapsed * 1000:.0f}ms "
+                  f"→ x{legacy_elapsed / bulk_elapsed:.1f}")
+
+            # 일기가 없는 사용자는 bulk 결과에 없음 (플래그도 없음)
+            mismatched = [uid for uid, result in legacy.items()
+                          if (bulk[uid] != result if uid in bulk else result['flag_count'] > 0)]
+            print(f"   결과 일치: {'✅' if not mismatched else f'❌ {len(mismatched)}명 불일치 (예: {mismatched[:5]})'}")
+
+        db.drop_all()
+
+    if tmp_dir:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import User
 import re
@@ -38,30 +38,9 @@ def chat_reaction():
             reaction_text = "지금은 제가 잘 이해하지 못했어요. 조금 더 이야기해주실 수 있을까요? 🤔"
         
         # [Optional] 채팅 로그 저장
-        try:
-            from models import db, ChatLog
-            import uuid
-            session_id = request.headers.get('X-Session-Id', str(uuid.uuid4())[:8])
-            
-            # 사용자 메시지 저장
-            user_log = ChatLog(
-                user_id=current_user_id,
-                session_id=session_id,
-                message=user_text[:500],
-                sender='user'
-            )
-            # AI 응답 저장
-            ai_log = ChatLog(
-                user_id=current_user_id,
-                session_id=session_id,
-                message=reaction_text[:500],
-                sender='ai'
-            )
-            db.session.add(user_log)
-            db.session.add(ai_log)
-            db.session.commit()
-        except Exception as log_err:
-            print(f"⚠️ [Chat] Log save failed (non-critical): {log_err}")
+        import uuid
+        session_id = request.headers.get('X-Session-Id', str(uuid.uuid4())[:8])
+        _save_chat_log(current_user_id, session_id, user_text, reaction_text)
         
         return jsonify({"reaction": reaction_text}), 200
         
@@ -72,6 +51,92 @@ def chat_reaction():
         }), 200  # 200으로 반환 (iOS가 에러 처리할 수 있도록 graceful)
 
 
+def _save_chat_log(user_id, session_id, user_text, reaction_text):
+    """사용자 메시지 + AI 응답을 ChatLog에 저장 (실패해도 응답에는 영향 없음)"""
+    try:
+        from models import db, ChatLog
+        
+        # 사용자 메시지 저장
+        user_log = ChatLog(
+            user_id=user_id,
+            session_id=session_id,
+            message=user_text[:500],
+            sender='user'
+        )
+        # AI 응답 저장
+        ai_log = ChatLog(
+            user_id=user_id,
+            session_id=session_id,
+            message=reaction_text[:500],
+            sender='ai'
+        )
+        db.session.add(user_log)
+        db.session.add(ai_log)
+        db.session.commit()
+    except Exception as log_err:
+        print(f"⚠️ [Chat] Log save failed (non-critical): {log_err}")
+
+
+def _sse(data, event=None):
+    import json
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@chat_bp.route('/api/chat/reaction/stream', methods=['POST'])
+@jwt_required()
+def chat_reaction_stream():
+    """
+    AI 공감 반응 스트리밍 API (Server-Sent Events)
+    토큰이 생성되는 대로 전달하여 CPU 서버에서도 첫 글자가 1초 안에 보이도록 한다.
+    
+    Request: /api/chat/reaction과 동일 {"text", "mode", "history"}
+    Response (text/event-stream):
+        data: {"delta": "응답 조각"}            ← 0회 이상
+        event: done
+        data: {"reaction": "최종 전체 응답"}
+    금지어 필터 / 위기 응답 대체는 조각 단위로 적용된 상태로 전달된다.
+    """
+    data = request.get_json()
+    if not data or not data.get('text'):
+        return jsonify({"error": "text 필드가 필요합니다."}), 400
+    
+    user_text = data['text']
+    mode = data.get('mode', 'reaction')
+    history = data.get('history', '')
+    
+    current_user_id = int(get_jwt_identity())
+    import uuid
+    session_id = request.headers.get('X-Session-Id', str(uuid.uuid4())[:8])
+    
+    def _events():
+        from standalone_ai import stream_analysis_reaction_standalone
+        parts = []
+        try:
+            for delta in stream_analysis_reaction_standalone(user_text, mode=mode, history=history):
+                parts.append(delta)
+                yield _sse({"delta": delta})
+        except Exception as e:
+            print(f"❌ [Chat] AI Stream Error: {e}")
+            if not parts:
+                fallback = "잠시 시스템에 문제가 있어요. 곧 돌아올게요. 🙏"
+                parts.append(fallback)
+                yield _sse({"delta": fallback})
+        
+        reaction_text = "".join(parts) or "지금은 제가 잘 이해하지 못했어요. 조금 더 이야기해주실 수 있을까요? 🤔"
+        yield _sse({"reaction": reaction_text}, event="done")
+        _save_chat_log(current_user_id, session_id, user_text, reaction_text)
+    
+    return Response(
+        stream_with_context(_events()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # Nginx 버퍼링 해제 (토큰 즉시 전달)
+        }
+    )
+
+
 @chat_bp.route('/api/chat/analysis-report', methods=['POST'])
 @jwt_required()
 def analysis_report():
@@ -404,7 +469,7 @@ def guided_start():
 
     if diary_context.strip():
         try:
-            import requests as req
+            from llm_gateway import generate
             import json
 
             # 요일/시간대 컨텍스트
@@ -432,16 +497,10 @@ def guided_start():
                 "답변:"
             )
 
-            payload = {
-                "model": "gemma4:2b",
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": 0.8, "num_predict": 100}
-            }
-            res = req.post("http://localhost:11434/api/generate", json=payload, timeout=15)
+            raw = generate(prompt, model="gemma4:2b",
+                           options={"temperature": 0.8, "num_predict": 100}, timeout=15).strip()
 
-            if res.status_code == 200:
-                raw = res.json().get('response', '').strip()
+            if raw:
                 # JSON 배열 추출 시도
                 import re as re_mod
                 match = re_mod.search(r'\[.*?\]', raw, re_mod.DOTALL)
@@ -37,5 +37,7 @@ class Config:
     
     # [Data Privacy] Encryption Key for Diaries (Fernet)
     ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY')
+    # [KeyRotation] 교체 전 키 (쉼표 구분, 복호화 전용) — key_rotation.py 재암호화 완료 후 제거
+    ENCRYPTION_OLD_KEYS = os.environ.get('ENCRYPTION_OLD_KEYS')
     
 
@@ -0,0 +1,65 @@
+"""
+마음온 마음 컨디션 스냅샷 갱신 Cron
+===================================
+user_condition_snapshots에서 일기가 바뀐 사용자(또는 날짜가 바뀐 스냅샷)만 다시 계산합니다.
+대시보드 요청도 백그라운드 갱신을 트리거하지만, 자정 이후 첫 조회 전에 미리 채워두기 위해 cron으로도 돌립니다.
+다른 워커가 갱신 중이면(Postgres advisory lock) 건너뜁니다.
+
+crontab 예시 (KST 00:10 = UTC 15:10, 이후 30분마다):
+  10 15 * * * cd /home/ubuntu/project/backend && /home/ubuntu/project/backend/venv/bin/python cron_condition_snapshots.py >> /home/ubuntu/cron_condition_snapshots.log 2>&1
+  */30 * * * * cd /home/ubuntu/project/backend && /home/ubuntu/project/backend/venv/bin/python cron_condition_snapshots.py >> /home/ubuntu/cron_condition_snapshots.log 2>&1
+
+수동 실행:
+  cd /home/ubuntu/project/backend && source venv/bin/activate
+  python cron_condition_snapshots.py           # 증분 갱신
+  python cron_condition_snapshots.py --force   # 전체 재계산
+"""
+
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime
+
+# 백엔드 루트 디렉토리를 path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# [DBPool] Cron은 app을 import만 하므로 AI 분석 워커를 띄우지 않고, 공유 풀도 작게 유지
+os.environ.setdefault('ANALYSIS_WORKER_THREADS', '0')
+os.environ.setdefault('DB_POOL_MAX', '2')
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [ConditionSnapshot] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def run_refresh(force=False):
+    from app import app, safe_decrypt
+    from models import db, User, Diary
+    from kick_analysis.condition_snapshots import run_locked_refresh
+
+    with app.app_context():
+        stats = run_locked_refresh(db, User, Diary, crypto_decrypt=safe_decrypt, force=force)
+        if stats is None:
+            logger.info("ℹ️ 다른 프로세스가 갱신 중 → 종료")
+        else:
+            logger.info("📊 사용자 %d명 | 재계산 %d | 변경 없음 %d | 오류 %d",
+                        stats['users'], stats['refreshed'], stats['skipped'], stats['errors'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="마음 컨디션 스냅샷 갱신")
+    parser.add_argument('--force', action='store_true', help="변경 여부와 관계없이 전체 재계산")
+    args = parser.parse_args()
+
+    logger.info("=" * 60)
+    logger.info("🌤️ 마음 컨디션 스냅샷 갱신 시작 (%s)", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    logger.info("=" * 60)
+
+    from db_pool import close_pool
+    try:
+        run_refresh(force=args.force)
+    finally:
+        close_pool()
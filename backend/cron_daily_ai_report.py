@@ -8,6 +8,10 @@ import pytz
 # 백엔드 루트 디렉토리를 path에 추가하여 모듈 임포트가 가능하게 함
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# [DBPool] Cron은 app을 import만 하므로 AI 분석 워커를 띄우지 않고, 공유 풀도 작게 유지
+os.environ.setdefault('ANALYSIS_WORKER_THREADS', '0')
+os.environ.setdefault('DB_POOL_MAX', '2')
+
 from app import app
 from models import db, User, ShareRelationship, Diary
 from push_service import _firebase_initialized, send_push
@@ -109,4 +113,8 @@ def send_daily_6pm_reports():
     logger.info("🎉 [Cron] 일일 마음 리포트 발송 작업 종료")
 
 if __name__ == "__main__":
-    send_daily_6pm_reports()
+    from db_pool import close_pool
+    try:
+        send_daily_6pm_reports()
+    finally:
+        close_pool()
@@ -26,6 +26,10 @@ from datetime import datetime, timedelta
 # 백엔드 루트 디렉토리를 path에 추가
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# [DBPool] Cron은 app을 import만 하므로 AI 분석 워커를 띄우지 않고, 공유 풀도 작게 유지
+os.environ.setdefault('ANALYSIS_WORKER_THREADS', '0')
+os.environ.setdefault('DB_POOL_MAX', '2')
+
 # 로깅 설정
 logging.basicConfig(
     level=logging.INFO,
@@ -204,7 +208,11 @@ if __name__ == "__main__":
     logger.info("   실행 시각: %s", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
     logger.info("=" * 60)
 
-    run_safety_check()
+    from db_pool import close_pool
+    try:
+        run_safety_check()
+    finally:
+        close_pool()
 
     logger.info("=" * 60)
     logger.info("🛡️ 안전 확인 배치 종료")
@@ -19,6 +19,10 @@ from datetime import datetime
 # 백엔드 루트 디렉토리를 path에 추가
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# [DBPool] Cron은 app을 import만 하므로 AI 분석 워커를 띄우지 않고, 공유 풀도 작게 유지
+os.environ.setdefault('ANALYSIS_WORKER_THREADS', '0')
+os.environ.setdefault('DB_POOL_MAX', '2')
+
 from kick_analysis.weekly_letter import process_all_users_weekly_letter
 
 # 로깅 설정
@@ -65,4 +69,8 @@ def run_weekly_letter_batch():
 
 
 if __name__ == "__main__":
-    run_weekly_letter_batch()
+    from db_pool import close_pool
+    try:
+        run_weekly_letter_batch()
+    finally:
+        close_pool()
@@ -1,17 +1,126 @@
 import os
-from cryptography.fernet import Fernet
+import time
+import hashlib
+import weakref
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
 from config import Config
 
-class EncryptionManager:
-    def __init__(self, key=None):
-        if key:
-            self.fernet = Fernet(key)
+# [PlaintextCache] 같은 암호문을 짧은 시간 안에 반복 복호화하는 경우(인사이트 Phase 1~6, 대시보드, 보호자 화면)용 LRU
+# 키는 암호문 해시, 값은 평문. 크기 상한 + 짧은 TTL, 일기 삭제/수정 시 forget()으로 즉시 제거. 0이면 사용 안 함
+DECRYPT_CACHE_SIZE = int(os.environ.get('DECRYPT_CACHE_SIZE', '20000'))
+DECRYPT_CACHE_TTL = float(os.environ.get('DECRYPT_CACHE_TTL', '60'))
+# [Batch] decrypt_many/encrypt_many에서 캐시에 없는 토큰이 이만큼 이상이면 스레드 풀로 나눠 처리
+# Fernet 토큰 1개 복호화는 십수 µs라 GIL 때문에 스레드 이득이 거의 없음 → 기본 1(사용 안 함), 측정 후 켤 것
+CRYPTO_PARALLEL_MIN = int(os.environ.get('CRYPTO_PARALLEL_MIN', '512'))
+CRYPTO_POOL_WORKERS = int(os.environ.get('CRYPTO_POOL_WORKERS', '1'))
+
+_pool = None
+_pool_lock = threading.Lock()
+_managers = weakref.WeakSet()  # 프로세스 안의 모든 EncryptionManager (purge_plaintext가 전부 비움)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=CRYPTO_POOL_WORKERS, thread_name_prefix='crypto')
+        return _pool
+
+
+def _map_chunked(fn, items):
+    """큰 배치는 워커 수만큼 나눠 스레드 풀에서 (작은 배치는 호출 스레드에서)"""
+    if len(items) < CRYPTO_PARALLEL_MIN or CRYPTO_POOL_WORKERS <= 1:
+        return [fn(item) for item in items]
+    size = -(-len(items) // CRYPTO_POOL_WORKERS)
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+    return [result for chunk in _get_pool().map(lambda c: [fn(item) for item in c], chunks) for result in chunk]
+
+
+class PlaintextCache:
+    """암호문 해시 → (만료 시각, 평문) LRU. 스레드 안전"""
+
+    def __init__(self, max_size=DECRYPT_CACHE_SIZE, ttl=DECRYPT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token):
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token, plaintext):
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, plaintext)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def forget(self, tokens):
+        keys = [self._key(t) for t in tokens if t and isinstance(t, str)]
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'max_size': self.max_size, 'ttl': self.ttl,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+def purge_plaintext(tokens=None):
+    """모든 EncryptionManager 캐시에서 해당 암호문의 평문 제거 (tokens가 None이면 전부)"""
+    for manager in list(_managers):
+        if manager.cache is None:
+            continue
+        if tokens is None:
+            manager.cache.clear()
         else:
+            manager.cache.forget(tokens)
+
+
+def old_keys_from_env():
+    """[KeyRotation] 교체 전 키 목록 (ENCRYPTION_OLD_KEYS, 쉼표 구분) — 읽기 전용, 재암호화가 끝나면 제거"""
+    value = os.environ.get('ENCRYPTION_OLD_KEYS') or Config.ENCRYPTION_OLD_KEYS or ''
+    return [k.strip() for k in value.split(',') if k.strip()]
+
+
+class EncryptionManager:
+    def __init__(self, key=None, cache_size=DECRYPT_CACHE_SIZE, old_keys=None):
+        if not key:
             # Load from Config or Env
-            env_key = os.environ.get('ENCRYPTION_KEY') or Config.ENCRYPTION_KEY
-            if not env_key:
+            key = os.environ.get('ENCRYPTION_KEY') or Config.ENCRYPTION_KEY
+            if not key:
                 raise ValueError("ENCRYPTION_KEY is missing!")
-            self.fernet = Fernet(env_key)
+        # [KeyRotation] 암호화는 항상 ENCRYPTION_KEY(primary), 복호화는 primary → 이전 키 순서로 시도
+        self.primary = Fernet(key)
+        old = [Fernet(k) for k in (old_keys if old_keys is not None else old_keys_from_env())]
+        self.fernet = MultiFernet([self.primary] + old)
+        self.cache = PlaintextCache(cache_size) if cache_size > 0 else None
+        _managers.add(self)
 
     def encrypt(self, text):
         if not text:
@@ -32,11 +141,65 @@ class EncryptionManager:
             return ""
         if not isinstance(token, str):
             return token
+        # Fernet 토큰은 항상 'gAAAA'로 시작 → 아니면 평문 (봉투 암호화로 이미 복호화된 값 / 암호화 전 데이터)
+        if not token.startswith('gAAAA'):
+            return token
+        if self.cache is not None:
+            cached = self.cache.get(token)
+            if cached is not None:
+                return cached
+        return self._decrypt_uncached(token)
+
+    def decrypt_many(self, tokens):
+        """
+        decrypt()의 배치 버전 (입력 순서대로 반환). 중복 토큰은 한 번만 복호화하고,
+        캐시에 없는 토큰이 CRYPTO_PARALLEL_MIN개 이상이면 스레드 풀로 나눠 처리한다.
+        """
+        tokens = list(tokens)
+        results = {}
+        pending = []
+        for token in tokens:
+            if not token or not isinstance(token, str) or not token.startswith('gAAAA'):
+                continue
+            if token in results:
+                continue
+            cached = self.cache.get(token) if self.cache is not None else None
+            results[token] = cached
+            if cached is None:
+                pending.append(token)
+        for token, plaintext in zip(pending, _map_chunked(self._decrypt_uncached, pending)):
+            results[token] = plaintext
+        return [results[token] if isinstance(token, str) and token in results else self.decrypt(token)
+                for token in tokens]
+
+    def _decrypt_uncached(self, token):
         try:
-            return self.fernet.decrypt(token.encode()).decode()
+            plaintext = self.fernet.decrypt(token.encode()).decode()
         except Exception:
             # If decryption fails, it might be plain text (during transition)
             return token
+        if self.cache is not None:
+            self.cache.put(token, plaintext)
+        return plaintext
+
+    def rotate(self, token):
+        """
+        [KeyRotation] 이전 키로 암호화된 토큰을 primary 키로 재암호화 (원래 타임스탬프 유지).
+        Returns: 새 토큰, 이미 primary 키이거나 Fernet 토큰이 아니면 None
+        """
+        if not token or not isinstance(token, str) or not token.startswith('gAAAA'):
+            return None
+        data = token.encode()
+        try:
+            self.primary.decrypt(data)
+            return None
+        except InvalidToken:
+            pass
+        return self.fernet.rotate(data).decode()  # 어떤 키로도 열리지 않으면 InvalidToken
+
+    def encrypt_many(self, texts):
+        """encrypt()의 배치 버전 (입력 순서대로 반환, 큰 배치는 스레드 풀)"""
+        return _map_chunked(self.encrypt, list(texts))
 
 # Global Instance
 # [Security] ENCRYPTION_KEY 누락 시 서버 기동 자체를 차단 (Fail Fast)
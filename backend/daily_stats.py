@@ -0,0 +1,231 @@
+"""
+Daily Stats - 사용자별 일별 기분 집계 (user_daily_stats)
+========================================================
+/api/statistics는 사용자의 일기 전체를, /api/mood-calendar는 한 달치 일기를 ORM으로 읽고
+(봉투 형식이면 행마다 봉인을 열고) 수면 메모를 복호화했다. 마음 온도도 호출마다 최근 수면 메모를 다시 복호화했다.
+
+- 일기 작성/수정/삭제 시 그 날짜 행만 다시 계산 (refresh_daily_stats, 커밋은 호출자 책임)
+- 조회는 (user_id, date) 인덱스 범위 조회 한 번 (load_daily_stats)
+- 마음 온도는 기존처럼 최근 7일 안에 "작성한" 일기 기준 (날짜를 과거로 적은 일기 포함)
+  → (user_id, last_created_at)으로 행을 고르고 항목의 created_at으로 거름 (load_written_since)
+- 행의 일기 수 합계가 diaries와 다르거나(도입 전 일기, ORM 밖 삭제 스크립트 등) stats_version이 이전이면
+  조회 전에 그 사용자 전체를 다시 계산 (ensure_daily_stats)
+
+수동 백필:
+  python daily_stats.py --backfill [--user-id 42]
+"""
+
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 집계 로직(수면 키워드, 온도 공식 등)이 바뀌면 올린다 → 이전 버전 행은 조회 시 사용자 단위로 재계산
+# 2: 항목에 created_at / safety 추가, last_created_at
+STATS_VERSION = 2
+
+SLEEP_POSITIVE = ["잘", "충분", "숙면", "편안", "좋"]
+SLEEP_NEGATIVE = ["못", "불면", "뒤척", "힘들", "나쁘", "잠을 못"]
+
+
+def _get_safe_decrypt():
+    """app.py의 safe_decrypt 함수를 가져온다."""
+    from app import safe_decrypt
+    return safe_decrypt
+
+
+def sleep_text_score(sleep_text):
+    """수면 메모 키워드 → 80(긍정) / 30(부정) / 50(기본, 메모 없음)"""
+    if not sleep_text:
+        return 50
+    pos = sum(1 for kw in SLEEP_POSITIVE if kw in sleep_text)
+    neg = sum(1 for kw in SLEEP_NEGATIVE if kw in sleep_text)
+    if pos > neg:
+        return 80
+    if neg > pos:
+        return 30
+    return 50
+
+
+def daily_temperature(mood_levels, sleep_scores):
+    """
+    하루치 일기의 마음 온도 (calculate_mood_temperature의 일별 축소 버전)
+    기분 60% + 수면 40% → 20°~45°. mood_level이 없는 일기는 3으로 본다.
+    """
+    if not mood_levels:
+        return None
+    mood_levels = [m or 3 for m in mood_levels]
+    mood_score = ((sum(mood_levels) / len(mood_levels) - 1) / 4) * 100
+    sleep_score = sum(sleep_scores) / len(sleep_scores) if sleep_scores else 50
+    raw_score = mood_score * 0.60 + sleep_score * 0.40
+    return round(20 + (raw_score / 100) * 25, 1)
+
+
+def _day_values(diaries, safe_decrypt):
+    """같은 날짜 일기들(id 순) → user_daily_stats 컬럼 값"""
+    entries = []
+    for d in diaries:
+        sleep_text = safe_decrypt(d.sleep_condition) if d.sleep_condition else ""
+        weather = (d.weather or "").strip() or None
+        created_at = d.created_at.isoformat() if d.created_at else None
+        safety = d.safety_flag in [True, 'need_help', 'danger']
+        entries.append([d.mood_level, weather, sleep_text_score(sleep_text), created_at, safety])
+
+    mood_levels = [entry[0] for entry in entries if entry[0]]
+    sleep_scores = [entry[2] for entry in entries]
+    created = [d.created_at for d in diaries if d.created_at]
+    return {
+        'stats_version': STATS_VERSION,
+        'diary_count': len(entries),
+        'mood_avg': round(sum(mood_levels) / len(mood_levels), 1) if mood_levels else None,
+        'sleep_score': sum(sleep_scores) / len(sleep_scores),
+        'temperature': daily_temperature([entry[0] for entry in entries], sleep_scores),
+        'safety_flag': any(entry[4] for entry in entries),
+        'entries': json.dumps(entries, ensure_ascii=False),
+        'last_created_at': max(created) if created else None,
+    }
+
+
+def entries_of(row):
+    """[[mood_level, weather, sleep_score, created_at(ISO), safety], ...] (일기 id 순)"""
+    return json.loads(row.entries) if row.entries else []
+
+
+# ─────────────────────────────────────────────
+# 갱신
+# ─────────────────────────────────────────────
+
+def refresh_daily_stats(user_id, dates):
+    """
+    일기 작성/수정/삭제 후 해당 날짜 행을 다시 계산한다. (커밋은 호출자 책임)
+    일기 변경은 아직 flush 전이어도 된다 — 조회 시 autoflush로 반영된 상태를 집계한다.
+    """
+    from models import db, Diary, UserDailyStats
+
+    safe_decrypt = _get_safe_decrypt()
+    for day in {d for d in dates if d}:
+        diaries = Diary.query.filter(Diary.user_id == user_id, Diary.date == day).order_by(Diary.id).all()
+        row = UserDailyStats.query.filter_by(user_id=user_id, date=day).first()
+        if not diaries:
+            if row is not None:
+                db.session.delete(row)
+            continue
+        if row is None:
+            row = UserDailyStats(user_id=user_id, date=day)
+            db.session.add(row)
+        for name, value in _day_values(diaries, safe_decrypt).items():
+            setattr(row, name, value)
+
+
+def rebuild_user_daily_stats(user_id):
+    """사용자의 일별 집계를 일기 전체로 다시 만든다. (커밋은 호출자 책임) Returns: 행 수"""
+    from models import db, Diary, UserDailyStats
+
+    safe_decrypt = _get_safe_decrypt()
+    UserDailyStats.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+
+    by_date = defaultdict(list)
+    for d in Diary.query.filter(Diary.user_id == user_id).order_by(Diary.date, Diary.id).all():
+        by_date[d.date].append(d)
+    db.session.add_all([UserDailyStats(user_id=user_id, date=day, **_day_values(diaries, safe_decrypt))
+                        for day, diaries in by_date.items()])
+    return len(by_date)
+
+
+def ensure_daily_stats(user_id, force=False):
+    """
+    조회 전 확인: 일기 수 합계/집계 버전이 맞지 않으면 사용자 전체 재계산 후 커밋.
+    Returns: 재계산 여부 (실패해도 예외 없이 False — 기존 행으로 응답)
+    """
+    from sqlalchemy import func
+    from models import db, Diary, UserDailyStats
+
+    try:
+        if not force:
+            diary_total = db.session.query(func.count(Diary.id)).filter(Diary.user_id == user_id).scalar()
+            counted, oldest = db.session.query(
+                func.coalesce(func.sum(UserDailyStats.diary_count), 0), func.min(UserDailyStats.stats_version)
+            ).filter(UserDailyStats.user_id == user_id).one()
+            if diary_total == counted and oldest in (None, STATS_VERSION):
+                return False
+        days = rebuild_user_daily_stats(user_id)
+        db.session.commit()
+        logger.info(f"[DailyStats] 사용자 {user_id} 일별 집계 재계산 ({days}일)")
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"[DailyStats] 사용자 {user_id} 재계산 실패: {e}")
+        return False
+
+
+# ─────────────────────────────────────────────
+# 조회
+# ─────────────────────────────────────────────
+
+def load_daily_stats(user_id, start=None, end=None):
+    """start <= date < end ('YYYY-MM-DD', 생략 시 제한 없음) 행을 날짜순으로"""
+    from models import UserDailyStats
+
+    query = UserDailyStats.query.filter(UserDailyStats.user_id == user_id)
+    if start:
+        query = query.filter(UserDailyStats.date >= start)
+    if end:
+        query = query.filter(UserDailyStats.date < end)
+    return query.order_by(UserDailyStats.date.asc()).all()
+
+
+def load_written_since(user_id, since):
+    """
+    created_at >= since인 일기 항목만 [(행, [항목, ...]), ...] (날짜순)
+    일기 날짜와 무관하게 그 기간에 작성한 일기 — Diary.created_at 범위 조회와 같은 대상
+    """
+    from models import UserDailyStats
+
+    rows = (UserDailyStats.query
+            .filter(UserDailyStats.user_id == user_id, UserDailyStats.last_created_at >= since)
+            .order_by(UserDailyStats.date.asc()).all())
+    result = []
+    for row in rows:
+        written = [entry for entry in entries_of(row)
+                   if entry[3] and datetime.fromisoformat(entry[3]) >= since]
+        if written:
+            result.append((row, written))
+    return result
+
+
+def backfill_daily_stats(user_id=None, force=False):
+    """일기가 있는 사용자의 집계를 확인/재계산한다. Returns: {'users': n, 'rebuilt': n}"""
+    from models import db, Diary
+
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = [uid for (uid,) in db.session.query(Diary.user_id).distinct().order_by(Diary.user_id)]
+
+    stats = {'users': 0, 'rebuilt': 0}
+    for uid in user_ids:
+        stats['users'] += 1
+        if ensure_daily_stats(uid, force=force):
+            stats['rebuilt'] += 1
+        db.session.expunge_all()  # 사용자마다 로드한 일기 해제
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [DailyStats] %(message)s')
+    parser = argparse.ArgumentParser(description="user_daily_stats 백필")
+    parser.add_argument('--backfill', action='store_true')
+    parser.add_argument('--user-id', type=int, default=None)
+    parser.add_argument('--all', action='store_true', help="맞는 사용자도 다시 계산")
+    args = parser.parse_args()
+
+    if args.backfill:
+        from app import app
+        with app.app_context():
+            print(f"✅ {backfill_daily_stats(args.user_id, force=args.all)}")
+    else:
+        parser.print_help()
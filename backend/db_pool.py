@@ -0,0 +1,191 @@
+"""
+DB Pool - 공유 PostgreSQL 커넥션 풀
+===================================
+analysis_worker / analysis_queue / memory_manager가 psycopg2 연결을 매번 새로 맺던 방식을 대체한다.
+
+- 프로세스당 1개의 ThreadedConnectionPool (DB_POOL_MIN ~ DB_POOL_MAX)
+- 풀이 가득 차면 PoolError 대신 DB_POOL_TIMEOUT 초까지 대기
+- pgvector 타입 등록(register_vector)은 풀 연결마다 최초 1회만 수행
+- 끊어진 연결은 반납 시 폐기하고 다음 대여 때 새로 맺음
+- get_pool_stats()로 대여/대기/폐기 지표 노출
+
+사용 예:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.commit()
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# PG Config — [Fix#11] 비밀번호 하드코딩 금지 (환경변수 필수)
+DB_NAME = os.environ.get("DB_NAME", "vibe_db")
+DB_USER = os.environ.get("DB_USER", "vibe_user")
+DB_PASS = os.environ.get("DB_PASS", "")
+DB_HOST = os.environ.get("DB_HOST", "127.0.0.1")
+
+POOL_MIN = int(os.environ.get('DB_POOL_MIN', '1'))
+POOL_MAX = int(os.environ.get('DB_POOL_MAX', '10'))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '30'))
+
+
+class PoolTimeout(PoolError):
+    """DB_POOL_TIMEOUT 안에 빈 연결을 얻지 못함"""
+
+
+class _PooledConnection(psycopg2.extensions.connection):
+    """풀 전용 연결 — pgvector 등록 여부를 연결 객체에 기록"""
+    vector_registered = False
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = None
+
+_stats_lock = threading.Lock()
+_stats = {
+    'checkouts': 0,
+    'waits': 0,              # 빈 연결이 없어 대기한 횟수
+    'wait_seconds_total': 0.0,
+    'timeouts': 0,
+    'discarded': 0,          # 끊어진 연결 폐기 수
+    'vector_registrations': 0,
+}
+
+
+def _connect_kwargs():
+    db_url = os.environ.get('DATABASE_URL')
+    if db_url:
+        return {'dsn': db_url}
+    return {'dbname': DB_NAME, 'user': DB_USER, 'password': DB_PASS, 'host': DB_HOST}
+
+
+def _get_pool():
+    """프로세스별 풀 (fork 이후에는 자식 프로세스에서 새로 생성)"""
+    global _pool, _pool_pid, _slots
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = ThreadedConnectionPool(
+                POOL_MIN, POOL_MAX,
+                connection_factory=_PooledConnection,
+                **_connect_kwargs()
+            )
+            _slots = threading.BoundedSemaphore(POOL_MAX)
+            _pool_pid = pid
+            logger.info(f"[DBPool] 커넥션 풀 생성 (min={POOL_MIN}, max={POOL_MAX}, pid={pid})")
+    return _pool
+
+
+def _acquire_slot(slots, timeout):
+    if slots.acquire(blocking=False):
+        return
+    started = time.monotonic()
+    acquired = slots.acquire(timeout=timeout)
+    waited = time.monotonic() - started
+    with _stats_lock:
+        _stats['waits'] += 1
+        _stats['wait_seconds_total'] += waited
+        if not acquired:
+            _stats['timeouts'] += 1
+    if not acquired:
+        raise PoolTimeout(f"DB 커넥션 풀 대기 시간 초과 ({timeout}s, max={POOL_MAX})")
+
+
+@contextmanager
+def get_conn(vector=False, timeout=None):
+    """
+    풀에서 연결을 빌려 with 블록 동안 사용한다.
+    - vector=True: pgvector 타입 등록 보장 (연결당 1회)
+    - 커밋은 호출자 책임. 블록 종료 시 미커밋 트랜잭션은 롤백 후 반납된다.
+    """
+    pool = _get_pool()
+    slots = _slots
+    _acquire_slot(slots, POOL_TIMEOUT if timeout is None else timeout)
+
+    conn = None
+    broken = False
+    try:
+        conn = pool.getconn()
+        if conn.closed:
+            pool.putconn(conn, close=True)
+            with _stats_lock:
+                _stats['discarded'] += 1
+            conn = pool.getconn()
+
+        if vector and not conn.vector_registered:
+            from pgvector.psycopg2 import register_vector
+            register_vector(conn)
+            conn.commit()
+            conn.vector_registered = True
+            with _stats_lock:
+                _stats['vector_registrations'] += 1
+
+        with _stats_lock:
+            _stats['checkouts'] += 1
+
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        if conn is not None:
+            if not broken and not conn.closed:
+                try:
+                    if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                except Exception:
+                    broken = True
+            discard = broken or conn.closed
+            if discard:
+                with _stats_lock:
+                    _stats['discarded'] += 1
+            try:
+                pool.putconn(conn, close=discard)
+            except Exception as e:
+                logger.error(f"[DBPool] 연결 반납 실패: {e}")
+        slots.release()
+
+
+def get_pool_stats():
+    """풀 사용 현황 및 누적 지표"""
+    with _stats_lock:
+        stats = dict(_stats)
+    pool = _pool if _pool_pid == os.getpid() else None
+    stats.update({
+        'initialized': pool is not None,
+        'min': POOL_MIN,
+        'max': POOL_MAX,
+        'in_use': len(pool._used) if pool else 0,
+        'idle': len(pool._pool) if pool else 0,
+        'avg_wait_ms': round(stats['wait_seconds_total'] / stats['waits'] * 1000, 2) if stats['waits'] else 0.0,
+    })
+    stats['wait_seconds_total'] = round(stats['wait_seconds_total'], 3)
+    return stats
+
+
+def close_pool():
+    """풀의 모든 연결을 닫는다. (Cron 스크립트 종료 시)"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+            logger.info("[DBPool] 커넥션 풀 종료")
+        _pool = None
+        _pool_pid = None
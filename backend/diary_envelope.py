@@ -0,0 +1,354 @@
+"""
+Diary Envelope - 일기 행 단위 봉투 암호화 (diaries.sealed)
+=========================================================
+기존 형식은 민감 필드 8개(event, sleep_condition, emotion_desc, emotion_meaning, self_talk,
+gratitude_note, ai_comment, ai_emotion)를 각각 Fernet 토큰으로 저장한다.
+행 하나를 읽을 때 base64 디코드 + HMAC + AES-CBC가 최대 8번이고, 필드마다 토큰 오버헤드(약 100바이트)가 붙는다.
+
+봉투 형식:
+- 사용자별 데이터 키(AES-256) 1개를 마스터 키(ENCRYPTION_KEY, Fernet)로 감싸 user_data_keys에 저장
+- 행의 민감 필드를 JSON 하나로 묶어 AES-GCM으로 암호화 → diaries.sealed (bytea)
+  [버전 1바이트][nonce 12바이트][암호문 + 태그 16바이트], AAD = "diaries:<user_id>"
+- 봉인된 행의 기존 필드 컬럼은 NULL
+
+읽기 (두 형식 모두 투명하게):
+- ORM: Diary 로드 시(models의 load/refresh 이벤트) 봉인을 열어 필드 속성에 평문을 채운다.
+  기존 코드의 safe_decrypt()/crypto_manager.decrypt()는 Fernet 토큰이 아닌 값을 그대로 돌려주므로 수정 불필요
+- psycopg2: open_pg_columns()로 sealed + 기존 컬럼을 합친다
+- 봉인 후 ORM 밖(analysis_worker의 ai_comment UPDATE 등)에서 기존 컬럼에 쓴 값은 NULL이 아니므로 봉인 값보다 우선
+
+쓰기 / 지연 마이그레이션:
+- DIARY_ENVELOPE_WRITE=1 이면 새 일기와, 수정되는 기존 형식 일기를 봉투 형식으로 저장 (기본 0: 기존 형식 유지)
+- 이미 봉인된 행은 설정과 관계없이 봉인 형식을 유지
+- 남은 기존 형식 행 일괄 변환: python diary_envelope.py --migrate [--user-id N]
+"""
+
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('event', 'sleep_condition', 'emotion_desc', 'emotion_meaning', 'self_talk',
+          'gratitude_note', 'ai_comment', 'ai_emotion')
+FORMAT_VERSION = 1
+_NONCE_BYTES = 12
+
+WRITE_ENABLED = os.environ.get('DIARY_ENVELOPE_WRITE', '0') == '1'
+KEY_CACHE_SIZE = int(os.environ.get('DIARY_ENVELOPE_KEY_CACHE', '4096'))  # 메모리에 두는 풀린 데이터 키 수
+MIGRATE_BATCH = 500
+
+_SESSION_NEW_KEYS = 'diary_envelope_new_keys'  # session.info: 이번 트랜잭션에서 만든 데이터 키의 user_id
+
+_keys = OrderedDict()  # user_id -> AESGCM (LRU)
+_keys_lock = threading.Lock()
+
+
+# ─────────────────────────────────────────────
+# 데이터 키
+# ─────────────────────────────────────────────
+
+def wrap_data_key(raw_key):
+    from crypto_utils import crypto_manager
+    return crypto_manager.fernet.encrypt(raw_key).decode()
+
+
+def unwrap_data_key(wrapped_key):
+    from crypto_utils import crypto_manager
+    return crypto_manager.fernet.decrypt(wrapped_key.encode())
+
+
+def _cache_get(user_id):
+    with _keys_lock:
+        cipher = _keys.get(user_id)
+        if cipher is not None:
+            _keys.move_to_end(user_id)
+        return cipher
+
+
+def _cache_put(user_id, cipher):
+    with _keys_lock:
+        _keys[user_id] = cipher
+        _keys.move_to_end(user_id)
+        while len(_keys) > KEY_CACHE_SIZE:
+            _keys.popitem(last=False)
+
+
+def forget_user_key(user_id):
+    with _keys_lock:
+        _keys.pop(user_id, None)
+
+
+def get_cipher(user_id, fetch_wrapped):
+    """
+    사용자 데이터 키(AESGCM). 캐시에 없으면 fetch_wrapped(user_id)로 감싼 키를 읽어 푼다.
+    Returns: AESGCM 또는 None (키 없음)
+    """
+    cipher = _cache_get(user_id)
+    if cipher is not None:
+        return cipher
+    wrapped = fetch_wrapped(user_id)
+    if not wrapped:
+        return None
+    cipher = AESGCM(unwrap_data_key(wrapped))
+    _cache_put(user_id, cipher)
+    return cipher
+
+
+def cipher_from_wrapped(user_id, wrapped):
+    """감싼 키를 미리 받아 둔 곳(대시보드 계산 워커 프로세스)에서 사용"""
+    return get_cipher(user_id, lambda _: wrapped)
+
+
+def _connection_fetcher(connection):
+    from sqlalchemy import select
+    from models import UserDataKey
+
+    def fetch(user_id):
+        return connection.execute(
+            select(UserDataKey.wrapped_key).where(UserDataKey.user_id == user_id)).scalar()
+    return fetch
+
+
+def _pg_fetcher(cur):
+    def fetch(user_id):
+        cur.execute("SELECT wrapped_key FROM user_data_keys WHERE user_id = %s", (user_id,))
+        row = cur.fetchone()
+        return row[0] if row else None
+    return fetch
+
+
+def query_wrapped_keys(db_session, user_ids):
+    """{user_id: 감싼 데이터 키} (대시보드 청크처럼 여러 사용자를 한 번에 넘길 때)"""
+    if not user_ids:
+        return {}
+    from models import UserDataKey
+    return dict(
+        db_session.query(UserDataKey.user_id, UserDataKey.wrapped_key)
+        .filter(UserDataKey.user_id.in_(list(user_ids)))
+        .all()
+    )
+
+
+def pg_wrapped_keys(cur, user_ids):
+    """psycopg2 커서로 {user_id: 감싼 데이터 키}"""
+    if not user_ids:
+        return {}
+    cur.execute("SELECT user_id, wrapped_key FROM user_data_keys WHERE user_id = ANY(%s)", (list(user_ids),))
+    return dict(cur.fetchall())
+
+
+def _ensure_cipher(connection, session, user_id):
+    """쓰기용: 데이터 키가 없으면 만들어 flush 중인 트랜잭션에 INSERT"""
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    from models import UserDataKey
+
+    fetch = _connection_fetcher(connection)
+    cipher = get_cipher(user_id, fetch)
+    if cipher is not None:
+        return cipher
+
+    raw_key = AESGCM.generate_key(bit_length=256)
+    result = connection.execute(
+        insert(UserDataKey)
+        .values(user_id=user_id, wrapped_key=wrap_data_key(raw_key), created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=['user_id'])
+    )
+    if result.rowcount == 0:
+        # 같은 사용자의 다른 요청이 먼저 만들고 커밋함 → 그 키 사용
+        cipher = get_cipher(user_id, fetch)
+        if cipher is None:
+            raise RuntimeError(f"사용자 {user_id}의 데이터 키를 만들지 못했습니다")
+        return cipher
+
+    cipher = AESGCM(raw_key)
+    _cache_put(user_id, cipher)
+    # 트랜잭션이 롤백되면 키 행도 사라지므로 캐시에서도 빼야 한다 (forget_session_keys)
+    if session is not None:
+        session.info.setdefault(_SESSION_NEW_KEYS, set()).add(user_id)
+    return cipher
+
+
+def forget_session_keys(session, rollback):
+    """세션 커밋/롤백 후 호출 (models의 Session 이벤트). 롤백이면 이번에 만든 키를 캐시에서 제거"""
+    user_ids = session.info.pop(_SESSION_NEW_KEYS, None)
+    if rollback and user_ids:
+        for user_id in user_ids:
+            forget_user_key(user_id)
+
+
+# ─────────────────────────────────────────────
+# 봉인 / 열기
+# ─────────────────────────────────────────────
+
+def _aad(user_id):
+    return f"diaries:{user_id}".encode()
+
+
+def seal_fields(cipher, user_id, values):
+    """{필드: 평문} → sealed bytes (빈 값은 넣지 않음)"""
+    payload = {field: value for field, value in values.items() if value}
+    plaintext = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    nonce = os.urandom(_NONCE_BYTES)
+    return bytes([FORMAT_VERSION]) + nonce + cipher.encrypt(nonce, plaintext, _aad(user_id))
+
+
+def open_sealed(cipher, user_id, sealed):
+    """sealed bytes → {필드: 평문}"""
+    sealed = bytes(sealed)  # psycopg2는 memoryview
+    if not sealed or sealed[0] != FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 봉투 형식: {sealed[:1].hex()}")
+    nonce = sealed[1:1 + _NONCE_BYTES]
+    return json.loads(cipher.decrypt(nonce, sealed[1 + _NONCE_BYTES:], _aad(user_id)))
+
+
+def merge_columns(opened, columns):
+    """기존 컬럼 값(NULL이 아니면 우선) + 봉인 값. columns: {필드: 컬럼 값}"""
+    return {field: value if value is not None else opened.get(field) for field, value in columns.items()}
+
+
+def open_columns(user_id, sealed, columns, wrapped_key):
+    """open_pg_columns와 같지만 감싼 키를 미리 조회해 둔 경우 (query_wrapped_keys / pg_wrapped_keys)"""
+    if sealed is None:
+        return columns
+    if not wrapped_key:
+        raise ValueError(f"사용자 {user_id}의 데이터 키가 없습니다")
+    return merge_columns(open_sealed(cipher_from_wrapped(user_id, wrapped_key), user_id, sealed), columns)
+
+
+def open_pg_columns(cur, user_id, sealed, columns):
+    """
+    psycopg2로 읽은 행의 필드 값. sealed가 없으면 columns 그대로.
+    반환 값은 평문 또는 Fernet 토큰이 섞여 있으므로 기존처럼 crypto.decrypt()를 거쳐 사용한다.
+    """
+    if sealed is None:
+        return columns
+    cipher = get_cipher(user_id, _pg_fetcher(cur))
+    if cipher is None:
+        raise ValueError(f"사용자 {user_id}의 데이터 키가 없습니다")
+    return merge_columns(open_sealed(cipher, user_id, sealed), columns)
+
+
+# ─────────────────────────────────────────────
+# ORM 훅 (models.py의 Diary 이벤트에서 호출)
+# ─────────────────────────────────────────────
+
+def open_diary(target, connection, attrs=None):
+    """로드/리프레시된 Diary의 NULL 필드 속성에 봉인 평문을 채운다 (변경으로 잡히지 않도록 committed value로)"""
+    from sqlalchemy.orm.attributes import set_committed_value
+
+    try:
+        cipher = get_cipher(target.user_id, _connection_fetcher(connection))
+        if cipher is None:
+            raise ValueError("데이터 키 없음")
+        opened = open_sealed(cipher, target.user_id, target.sealed)
+    except Exception as e:
+        logger.error(f"[Envelope] 일기 {target.id} 봉인 열기 실패: {e}")
+        # 필드 속성이 NULL인 채로 남음 → seal_diary가 이 값으로 다시 봉인하지 않도록 표시
+        target.__dict__['_envelope_unopened'] = True
+        return
+    state = target.__dict__
+    state.pop('_envelope_unopened', None)
+    for field in FIELDS:
+        if (attrs is None or field in attrs) and field in state and state[field] is None:
+            set_committed_value(target, field, opened.get(field))
+
+
+def seal_diary(connection, session, target, inserting):
+    """
+    flush 직전: 봉투 형식으로 저장할 행이면 필드를 봉인하고 컬럼은 NULL로.
+    평문은 restore_diary()가 flush 직후 속성에 되돌린다. (같은 요청에서 serialize_diary 등이 계속 읽음)
+    """
+    from sqlalchemy.orm.attributes import get_history
+    from crypto_utils import crypto_manager
+
+    already_sealed = target.__dict__.get('sealed') is not None
+    if not (WRITE_ENABLED or already_sealed):
+        return
+    if already_sealed and not inserting and not any(get_history(target, f).has_changes() for f in FIELDS):
+        return
+    if already_sealed and target.__dict__.get('_envelope_unopened'):
+        # 열지 못한 봉인을 빈 필드로 다시 봉인하면 보내지 않은 필드(ai_comment 등)가 영구 유실됨
+        raise ValueError(f"일기 {target.id}의 봉인을 열지 못해 수정할 수 없습니다")
+
+    values = {field: crypto_manager.decrypt(getattr(target, field)) or None for field in FIELDS}
+    target.sealed = seal_fields(_ensure_cipher(connection, session, target.user_id), target.user_id, values)
+    for field in FIELDS:
+        setattr(target, field, None)
+    target.__dict__['_envelope_plaintext'] = values
+
+
+def restore_diary(target):
+    from sqlalchemy.orm.attributes import set_committed_value
+
+    values = target.__dict__.pop('_envelope_plaintext', None)
+    if values:
+        for field, value in values.items():
+            set_committed_value(target, field, value)
+
+
+# ─────────────────────────────────────────────
+# 일괄 변환 (지연 마이그레이션의 나머지)
+# ─────────────────────────────────────────────
+
+def migrate_legacy_rows(user_id=None, batch_size=MIGRATE_BATCH):
+    """
+    sealed가 없는 기존 형식 일기를 id 순으로 batch_size씩 봉인 (배치마다 커밋, 중단 후 재실행 가능).
+    Flask app_context 안에서 호출.
+    Returns: {'scanned', 'sealed'}
+    """
+    global WRITE_ENABLED
+    from sqlalchemy.orm.attributes import flag_modified
+    from models import db, Diary
+
+    stats = {'scanned': 0, 'sealed': 0}
+    previous, WRITE_ENABLED = WRITE_ENABLED, True
+    try:
+        last_id = 0
+        while True:
+            query = Diary.query.filter(Diary.id > last_id, Diary.sealed.is_(None))
+            if user_id is not None:
+                query = query.filter(Diary.user_id == user_id)
+            batch = query.order_by(Diary.id).limit(batch_size).all()
+            if not batch:
+                break
+            for diary in batch:
+                last_id = diary.id
+                stats['scanned'] += 1
+                # 값 변경 없이도 before_update(seal_diary)가 돌도록 dirty 표시
+                flag_modified(diary, 'sealed')
+            db.session.commit()
+            stats['sealed'] += len(batch)
+            logger.info(f"[Envelope] 변환 진행: {stats} (last_id={last_id})")
+    finally:
+        WRITE_ENABLED = previous
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [Envelope] %(message)s')
+    parser = argparse.ArgumentParser(description="일기 봉투 암호화 변환")
+    parser.add_argument('--migrate', action='store_true', help="기존 형식 일기를 봉투 형식으로 변환")
+    parser.add_argument('--user-id', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=MIGRATE_BATCH)
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        if args.migrate:
+            print(f"✅ 변환 완료: {migrate_legacy_rows(args.user_id, args.batch_size)}")
+        else:
+            from models import Diary
+            total = Diary.query.count()
+            sealed = Diary.query.filter(Diary.sealed.isnot(None)).count()
+            print(f"ℹ️ 봉투 형식 {sealed} / 전체 {total}")
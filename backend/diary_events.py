@@ -0,0 +1,254 @@
+"""
+Diary Events - 일기 저장 후처리 파이프라인 (post-commit)
+========================================================
+create_diary / update_diary는 커밋 후 응답 전에 B2G 동기화, 보호자 알림, 킥 분석(Phase 1~3, LLM NER 포함)을
+요청 스레드에서 차례로 실행했다. 저장 한 번에 수십 초가 걸릴 수 있었다.
+
+- 요청은 일기 커밋 직후 publish_diary_event()만 호출하고 바로 응답
+- 후처리 단계(stage)마다 별도 스레드 풀 → 단계별 동시 실행 수 제한 (DIARY_EVENT_<STAGE>_WORKERS)
+  · b2g: 의료진 대시보드(8000) 동기화
+  · guardian_push: 기분 온도 / 위기 감지 보호자 알림
+  · kick_flags: 킥 분석 Phase 1~3 → medium/high 플래그 보호자 알림 (사용자별 병합: 대기 중이면 다시 넣지 않음)
+- 단계별 처리 수 / 실패 / 대기 지연 / 소요 시간 지표 (get_event_stats, /api/system/diary-events)
+
+RAG 장기 기억 저장은 AI 코멘트가 필요하므로 기존대로 analysis_queue 워커가 분석 완료 후 수행한다.
+이벤트는 프로세스 메모리에만 있으므로 재시작 시 처리 전 이벤트는 유실된다. (알림/동기화는 다음 저장에서 다시 발생)
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 테스트/디버그용: 요청 스레드에서 바로 실행
+INLINE = os.environ.get('DIARY_EVENTS_INLINE', '0') == '1'
+
+_app = None
+_executors = {}
+_executors_lock = threading.Lock()
+
+_kick_pending = set()  # 킥 분석이 대기 중인 user_id
+_kick_pending_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+# ─────────────────────────────────────────────
+# 단계 (app_context 안에서 실행)
+# ─────────────────────────────────────────────
+
+def _stage_b2g(event):
+    from b2g_routes import push_to_insight_mind
+    push_to_insight_mind(event['diary'], event['user_id'])
+
+
+def _stage_guardian_push(event):
+    from push_service import notify_guardians_mood, notify_guardians_crisis, is_push_available
+    from models import User
+
+    if not is_push_available():
+        return
+    user = User.query.get(event['user_id'])
+    if not user:
+        return
+    # ① 기분 온도 알림 (모든 기분에 대해 발송)
+    if event['mood_level']:
+        notify_guardians_mood(user, int(event['mood_level']))
+    # ② 위기 감지 알림 (safety_flag=True)
+    if event['safety_flag'] in [True, 'need_help', 'danger']:
+        notify_guardians_crisis(user)
+
+
+def _stage_kick_flags(event):
+    from push_service import notify_guardians_kick_flag, is_push_available
+    from models import db, User, Diary
+    from app import safe_decrypt
+    from kick_analysis import analyze_timeseries
+    from kick_analysis.corpus import UserDiaryWindow
+    from kick_analysis.linguistic import analyze_linguistic
+    from kick_analysis.relational import analyze_relational
+
+    user_id = event['user_id']
+    _release_kick_flags(event)  # 실행 시작 이후의 저장은 다시 분석하도록
+    if not is_push_available():
+        return
+    user = User.query.get(user_id)
+    if not user:
+        return
+
+    # ③ 킥 분석 (Phase 1~3) → medium/high 플래그 시 알림
+    window = UserDiaryWindow(user_id, db.session, Diary, crypto_decrypt=safe_decrypt)
+    all_kick_flags = []
+    for result in (
+        analyze_timeseries(user_id, db.session, Diary, window=window),
+        analyze_linguistic(user_id, db.session, Diary, crypto_decrypt=safe_decrypt, window=window),
+        analyze_relational(user_id, db.session, Diary, crypto_decrypt=safe_decrypt, window=window),
+    ):
+        all_kick_flags.extend(result.get('flags') or [])
+    if all_kick_flags:
+        notify_guardians_kick_flag(user, all_kick_flags)
+
+
+def _accept_kick_flags(event):
+    """같은 사용자의 킥 분석이 아직 시작 전이면 새로 넣지 않음 (연속 수정 병합)"""
+    with _kick_pending_lock:
+        if event['user_id'] in _kick_pending:
+            return False
+        _kick_pending.add(event['user_id'])
+        return True
+
+
+def _release_kick_flags(event):
+    """대기 표시 해제 (단계 실행 시작 또는 등록 실패 시)"""
+    with _kick_pending_lock:
+        _kick_pending.discard(event['user_id'])
+
+
+# (이름, 처리 함수, 기본 동시 실행 수, 수락 함수)
+STAGES = [
+    ('b2g', _stage_b2g, 2, None),
+    ('guardian_push', _stage_guardian_push, 2, None),
+    ('kick_flags', _stage_kick_flags, 1, _accept_kick_flags),
+]
+
+
+def _stage_workers(name, default):
+    return max(1, int(os.environ.get(f'DIARY_EVENT_{name.upper()}_WORKERS', str(default))))
+
+
+# ─────────────────────────────────────────────
+# 실행 / 지표
+# ─────────────────────────────────────────────
+
+def _stage_stats(name):
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats[name] = {
+            'submitted': 0, 'coalesced': 0, 'completed': 0, 'failed': 0,
+            'queued': 0, 'running': 0,
+            'wait_ms_total': 0.0, 'run_ms_total': 0.0, 'run_ms_max': 0.0, 'run_ms_last': 0.0,
+        }
+    return stats
+
+
+def _get_executor(name, default_workers):
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = _executors[name] = ThreadPoolExecutor(
+                max_workers=_stage_workers(name, default_workers),
+                thread_name_prefix=f'diary-event-{name}')
+        return executor
+
+
+def _run_stage(name, handler, event, submitted_at):
+    from models import db
+
+    started = time.time()
+    with _stats_lock:
+        stats = _stage_stats(name)
+        stats['queued'] -= 1
+        stats['running'] += 1
+        stats['wait_ms_total'] += (started - submitted_at) * 1000
+
+    ok = True
+    try:
+        with _app.app_context():
+            try:
+                handler(event)
+            finally:
+                db.session.remove()
+    except Exception as e:
+        ok = False
+        logger.warning(f"[DiaryEvents] {name} 실패 (user={event['user_id']}, diary={event['diary_id']}): {e}")
+
+    elapsed_ms = (time.time() - started) * 1000
+    with _stats_lock:
+        stats = _stage_stats(name)
+        stats['running'] -= 1
+        stats['completed' if ok else 'failed'] += 1
+        stats['run_ms_total'] += elapsed_ms
+        stats['run_ms_max'] = max(stats['run_ms_max'], elapsed_ms)
+        stats['run_ms_last'] = elapsed_ms
+    if elapsed_ms > 5000:
+        logger.info(f"[DiaryEvents] {name} {elapsed_ms / 1000:.1f}s (user={event['user_id']})")
+
+
+def init_diary_events(app):
+    """단계 실행 시 사용할 Flask 앱 등록 (app.py에서 1회)"""
+    global _app
+    _app = app
+
+
+def publish_diary_event(kind, user_id, diary_data, mood_level=None, safety_flag=False):
+    """
+    일기 커밋 후 호출. 단계별 스레드 풀에 후처리를 넣고 바로 반환한다.
+
+    Args:
+        kind: 'created' / 'updated'
+        diary_data: serialize_diary 결과 (복호화된 응답 데이터 — B2G 동기화에 그대로 사용)
+    """
+    event = {
+        'kind': kind,
+        'user_id': user_id,
+        'diary_id': diary_data.get('id'),
+        'diary': dict(diary_data),
+        'mood_level': mood_level,
+        'safety_flag': safety_flag,
+    }
+    for name, handler, default_workers, accept in STAGES:
+        if accept is not None and not accept(event):
+            with _stats_lock:
+                _stage_stats(name)['coalesced'] += 1
+            continue
+        submitted_at = time.time()
+        with _stats_lock:
+            stats = _stage_stats(name)
+            stats['submitted'] += 1
+            stats['queued'] += 1
+        if INLINE:
+            _run_stage(name, handler, event, submitted_at)
+            continue
+        try:
+            _get_executor(name, default_workers).submit(_run_stage, name, handler, event, submitted_at)
+        except RuntimeError as e:
+            # 인터프리터 종료 중 (executor shutdown)
+            logger.warning(f"[DiaryEvents] {name} 등록 실패: {e}")
+            if accept is _accept_kick_flags:
+                _release_kick_flags(event)  # 남겨두면 이후 이 사용자의 킥 분석이 모두 병합되어 버려짐
+            with _stats_lock:
+                stats['queued'] -= 1
+                stats['failed'] += 1
+
+
+def get_event_stats():
+    """단계별 처리 지표 (평균 대기/소요 시간 포함)"""
+    with _stats_lock:
+        result = {}
+        for name, _, default_workers, _ in STAGES:
+            stats = dict(_stage_stats(name))
+            finished = stats['completed'] + stats['failed']
+            started = finished + stats['running']
+            stats['workers'] = _stage_workers(name, default_workers)
+            stats['wait_ms_avg'] = round(stats.pop('wait_ms_total') / started, 1) if started else None
+            stats['run_ms_avg'] = round(stats.pop('run_ms_total') / finished, 1) if finished else None
+            stats['run_ms_max'] = round(stats['run_ms_max'], 1)
+            stats['run_ms_last'] = round(stats['run_ms_last'], 1)
+            result[name] = stats
+        return result
+
+
+def wait_idle(timeout=10.0):
+    """모든 단계의 대기/실행 중 이벤트가 끝날 때까지 대기 (테스트/종료용). Returns: 완료 여부"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with _stats_lock:
+            busy = any(s['queued'] or s['running'] for s in _stats.values())
+        if not busy:
+            return True
+        time.sleep(0.02)
+    return False
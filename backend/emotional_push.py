@@ -63,7 +63,7 @@ def _generate_nudge_message(user_id, db_session, Diary, safe_decrypt=None):
     # 3. LLM 호출 시도
     if diary_snippet.strip():
         try:
-            import requests as req
+            from llm_gateway import generate
             import re
 
             prompt = (
@@ -81,21 +81,14 @@ def _generate_nudge_message(user_id, db_session, Diary, safe_decrypt=None):
                 "메시지:"
             )
 
-            payload = {
-                "model": "gemma4:2b",
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": 0.8, "num_predict": 80}
-            }
-            res = req.post("http://localhost:11434/api/generate", json=payload, timeout=15)
-
-            if res.status_code == 200:
-                result = res.json().get('response', '').strip()
-                if result and len(result) >= 5:
-                    # 따옴표 제거
-                    if result.startswith('"') and result.endswith('"'):
-                        result = result[1:-1]
-                    return result, 'llm'
+            result = generate(prompt, model="gemma4:2b",
+                              options={"temperature": 0.8, "num_predict": 80}, timeout=15).strip()
+
+            if result and len(result) >= 5:
+                # 따옴표 제거
+                if result.startswith('"') and result.endswith('"'):
+                    result = result[1:-1]
+                return result, 'llm'
 
         except Exception as e:
             logger.warning(f"⚠️ [Nudge] LLM failed: {e}")
@@ -60,13 +60,31 @@ def fill_missing_comments():
     cur = conn.cursor()
     
     # 1. Select diaries with NULL ai_comment
-    cur.execute("SELECT id, date, event, emotion_desc, emotion_meaning, self_talk FROM diaries WHERE ai_comment IS NULL OR ai_comment = '';")
+    # [Envelope] 봉투 형식 행은 필드 컬럼이 NULL → sealed를 열어서 본문/기존 코멘트 확인
+    cur.execute("""
+        SELECT id, user_id, date, sealed, event, emotion_desc, emotion_meaning, self_talk, ai_comment
+          FROM diaries WHERE ai_comment IS NULL OR ai_comment = '';
+    """)
     rows = cur.fetchall()
-    total = len(rows)
+    
+    from diary_envelope import open_pg_columns
+    opened_rows = []
+    for d_id, user_id, date, sealed, *columns in rows:
+        try:
+            fields = open_pg_columns(cur, user_id, sealed, dict(zip(
+                ('event', 'emotion_desc', 'emotion_meaning', 'self_talk', 'ai_comment'), columns)))
+        except Exception as e:
+            print(f"   ⚠️ Skip Diary {d_id}: 봉인 열기 실패 ({e})")
+            continue
+        if fields['ai_comment']:
+            continue  # 봉인 안에 코멘트가 이미 있음
+        opened_rows.append((d_id, date, fields['event'], fields['emotion_desc'],
+                            fields['emotion_meaning'], fields['self_talk']))
+    total = len(opened_rows)
     print(f"📄 Found {total} diaries missing comments.")
     
     count = 0
-    for r in rows:
+    for r in opened_rows:
         d_id, date, event, emo_desc, emo_mean, self_talk = r
         # Decrypt if needed?
         # Assuming DB stores them encrypted if using app.py path, but migrated data might be plain or encrypted.
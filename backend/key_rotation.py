@@ -0,0 +1,386 @@
+"""
+Key Rotation - 마스터 키(ENCRYPTION_KEY) 교체 후 온라인 재암호화
+================================================================
+절차:
+  1. 새 키를 ENCRYPTION_KEY, 기존 키를 ENCRYPTION_OLD_KEYS에 넣고 앱/워커 재시작
+     → 새로 쓰는 값은 새 키로 암호화, 기존 값은 이전 키로 계속 읽힘 (crypto_utils의 MultiFernet)
+  2. python key_rotation.py            # 아래 TARGETS를 서비스 중에 재암호화 (중단 후 다시 실행하면 이어서)
+  3. python key_rotation.py --dry-run  # 이전 키 값이 남았는지 확인 (쓰기 없음)
+  4. ENCRYPTION_OLD_KEYS 제거 후 재시작
+
+동작:
+- 테이블마다 PK keyset 청크(ROTATION_CHUNK_ROWS)를 서버 사이드(named) 커서로 ROTATION_BATCH_SIZE씩 스트리밍.
+  청크가 끝나면 읽기 트랜잭션을 닫아 긴 스냅샷을 잡고 있지 않는다
+- 재암호화는 프로세스 풀(ROTATION_WORKERS)에서 (Fernet은 GIL을 잡으므로 스레드로는 병렬이 안 됨)
+- 쓰기는 배치마다 UPDATE ... FROM (VALUES ...) 한 문장. 읽은 시점의 값 그대로일 때만 교체하므로
+  그 사이 앱이 새 키로 쓴 값은 건드리지 않는다. lock_timeout을 넘기면 잠시 후 재시도
+- --max-rows-per-sec / --pause 로 앱 부하 제한
+- 진행 상황(last_pk, 처리 수)은 key_rotation_progress에 배치마다 커밋 → 진행률/ETA 로그, 재실행 시 이어서
+- diaries.sealed(봉투 형식)는 사용자 데이터 키로 암호화되어 있으므로 user_data_keys.wrapped_key만 다시 감싸면 된다
+"""
+
+import os
+import time
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from cryptography.fernet import InvalidToken
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.environ.get('ROTATION_BATCH_SIZE', '500'))
+CHUNK_ROWS = int(os.environ.get('ROTATION_CHUNK_ROWS', '20000'))
+WORKERS = int(os.environ.get('ROTATION_WORKERS', str(max(1, (os.cpu_count() or 2) - 1))))
+LOCK_TIMEOUT = os.environ.get('ROTATION_LOCK_TIMEOUT', '2s')
+LOCK_RETRIES = 5
+PROGRESS_LOG_INTERVAL = 5.0
+
+# (테이블, PK, 암호화 컬럼) — 작은 테이블(키)부터
+TARGETS = [
+    ('user_data_keys', 'user_id', ('wrapped_key',)),
+    ('diaries', 'id', ('event', 'sleep_condition', 'emotion_desc', 'emotion_meaning', 'self_talk',
+                       'gratitude_note', 'ai_comment', 'ai_emotion')),
+    ('diary_memories', 'id', ('memory_text',)),
+    ('bridge_shares', 'id', ('encrypted_data',)),
+    ('chat_logs', 'id', ('message',)),
+    ('diary_features', 'id', ('payload',)),
+    ('diary_ner_cache', 'id', ('names',)),
+]
+
+
+# ─────────────────────────────────────────────
+# 재암호화 (워커 프로세스)
+# ─────────────────────────────────────────────
+
+_worker_crypto = None
+
+
+def _init_worker():
+    global _worker_crypto
+    from crypto_utils import EncryptionManager
+    _worker_crypto = EncryptionManager(cache_size=0)
+
+
+def rewrap_rows(rows, crypto=None):
+    """
+    [(pk, 값1, 값2, ...)] → (변경된 행 [(pk, 이전1, 새1, 이전2, 새2, ...)], 통계)
+    primary 키 값 / 평문 / NULL은 그대로 (새 값 = 이전 값), 어떤 키로도 열리지 않는 값은 failed
+    """
+    crypto = crypto or _worker_crypto
+    changed = []
+    stats = {'rows': len(rows), 'rotated': 0, 'failed': 0}
+    for pk, *values in rows:
+        pairs = []
+        row_changed = False
+        for value in values:
+            try:
+                new_value = crypto.rotate(value)
+            except InvalidToken:
+                stats['failed'] += 1
+                new_value = None
+            if new_value is None:
+                new_value = value
+            else:
+                stats['rotated'] += 1
+                row_changed = True
+            pairs += [value, new_value]
+        if row_changed:
+            changed.append((pk, *pairs))
+    return changed, stats
+
+
+# ─────────────────────────────────────────────
+# 진행 상황
+# ─────────────────────────────────────────────
+
+def _ensure_progress_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS key_rotation_progress (
+            job_id VARCHAR(32) NOT NULL,
+            table_name VARCHAR(64) NOT NULL,
+            last_pk BIGINT NOT NULL DEFAULT 0,
+            scanned BIGINT NOT NULL DEFAULT 0,
+            rotated BIGINT NOT NULL DEFAULT 0,
+            failed BIGINT NOT NULL DEFAULT 0,
+            done BOOLEAN NOT NULL DEFAULT FALSE,
+            started_at TIMESTAMP DEFAULT now(),
+            updated_at TIMESTAMP DEFAULT now(),
+            PRIMARY KEY (job_id, table_name)
+        )
+    """)
+
+
+def job_id_for_current_key():
+    """같은 primary 키로의 교체는 같은 job (재실행 시 이어서). 키 자체는 기록하지 않음"""
+    from config import Config
+    key = os.environ.get('ENCRYPTION_KEY') or Config.ENCRYPTION_KEY
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def _load_progress(job_id, table):
+    from db_pool import get_conn
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            _ensure_progress_table(cur)
+            cur.execute("""
+                INSERT INTO key_rotation_progress (job_id, table_name) VALUES (%s, %s)
+                ON CONFLICT (job_id, table_name) DO NOTHING
+            """, (job_id, table))
+            cur.execute("""
+                SELECT last_pk, scanned, rotated, failed, done FROM key_rotation_progress
+                 WHERE job_id = %s AND table_name = %s
+            """, (job_id, table))
+            last_pk, scanned, rotated, failed, done = cur.fetchone()
+        conn.commit()
+    return {'last_pk': last_pk, 'scanned': scanned, 'rotated': rotated, 'failed': failed, 'done': done}
+
+
+def _save_progress(cur, job_id, table, progress):
+    cur.execute("""
+        UPDATE key_rotation_progress
+           SET last_pk = %s, scanned = %s, rotated = %s, failed = %s, done = %s, updated_at = now()
+         WHERE job_id = %s AND table_name = %s
+    """, (progress['last_pk'], progress['scanned'], progress['rotated'], progress['failed'],
+          progress['done'], job_id, table))
+
+
+def rotation_status(job_id=None):
+    """[(table, last_pk, scanned, rotated, failed, done, updated_at), ...]"""
+    from db_pool import get_conn
+    job_id = job_id or job_id_for_current_key()
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            _ensure_progress_table(cur)
+            cur.execute("""
+                SELECT table_name, last_pk, scanned, rotated, failed, done, updated_at
+                  FROM key_rotation_progress WHERE job_id = %s ORDER BY started_at
+            """, (job_id,))
+            rows = cur.fetchall()
+        conn.commit()
+    return rows
+
+
+# ─────────────────────────────────────────────
+# 스트리밍 읽기 / 배치 쓰기
+# ─────────────────────────────────────────────
+
+def _table_exists(table):
+    from db_pool import get_conn
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s)", (table,))
+            exists = cur.fetchone()[0] is not None
+        conn.commit()
+    return exists
+
+
+def _estimate_remaining(table, pk, last_pk):
+    """남은 행 수 추정 (pg_class 통계 × PK 범위 비율, 큰 테이블도 count(*) 없이)"""
+    from db_pool import get_conn
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = %s::regclass", (table,))
+            total = cur.fetchone()[0]
+            cur.execute(f"SELECT MIN({pk}), MAX({pk}) FROM {table}")
+            min_pk, max_pk = cur.fetchone()
+        conn.commit()
+    if not total or max_pk is None or max_pk <= min_pk:
+        return total
+    return int(total * max(0.0, (max_pk - max(last_pk, min_pk - 1)) / (max_pk - min_pk + 1)))
+
+
+def _stream_chunk(table, pk, columns, last_pk, batch_size, chunk_rows):
+    """PK > last_pk 인 행을 chunk_rows개까지 서버 사이드 커서로 batch_size씩 읽는다 (청크 후 트랜잭션 종료)"""
+    from db_pool import get_conn
+    with get_conn() as conn:
+        try:
+            with conn.cursor(name=f'key_rotation_{table}') as cur:
+                cur.itersize = batch_size
+                cur.execute(f"""
+                    SELECT {pk}, {', '.join(columns)} FROM {table}
+                     WHERE {pk} > %s ORDER BY {pk} LIMIT %s
+                """, (last_pk, chunk_rows))
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+        finally:
+            conn.rollback()  # 읽기 전용 트랜잭션 종료
+
+
+def _write_batch(table, pk, columns, changed, job_id, progress):
+    """읽은 값이 그대로인 컬럼만 새 값으로 교체 + 진행 상황을 같은 트랜잭션으로 커밋"""
+    import psycopg2
+    from psycopg2.extras import execute_values
+    from db_pool import get_conn
+
+    names = ['pk'] + [f"{prefix}{i}" for i in range(len(columns)) for prefix in ('o', 'n')]
+    assignments = ', '.join(
+        f"{column} = CASE WHEN t.{column} IS NOT DISTINCT FROM v.o{i} THEN v.n{i} ELSE t.{column} END"
+        for i, column in enumerate(columns))
+    sql = (f"UPDATE {table} AS t SET {assignments} "
+           f"FROM (VALUES %s) AS v({', '.join(names)}) WHERE t.{pk} = v.pk")
+
+    for attempt in range(1, LOCK_RETRIES + 1):
+        with get_conn() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SET LOCAL lock_timeout = %s", (LOCK_TIMEOUT,))
+                    if changed:
+                        execute_values(cur, sql, changed, page_size=len(changed))
+                    _save_progress(cur, job_id, table, progress)
+                conn.commit()
+                return
+            except psycopg2.errors.LockNotAvailable:
+                conn.rollback()
+                logger.warning(f"[KeyRotation] {table} 잠금 대기 초과 → 재시도 {attempt}/{LOCK_RETRIES}")
+                time.sleep(attempt)
+    raise RuntimeError(f"{table}: 행 잠금을 {LOCK_RETRIES}번 얻지 못함 (다시 실행하면 last_pk부터 이어서)")
+
+
+# ─────────────────────────────────────────────
+# 실행
+# ─────────────────────────────────────────────
+
+class _Throttle:
+    """초당 처리 행 수 상한 + 배치 사이 휴식"""
+
+    def __init__(self, max_rows_per_sec=None, pause=0.0):
+        self.max_rows_per_sec = max_rows_per_sec
+        self.pause = pause
+        self.started = time.monotonic()
+        self.rows = 0
+
+    def wait(self, rows):
+        self.rows += rows
+        delay = self.pause
+        if self.max_rows_per_sec:
+            delay = max(delay, self.rows / self.max_rows_per_sec - (time.monotonic() - self.started))
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _format_eta(seconds):
+    if seconds is None:
+        return "?"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def rotate_table(table, pk, columns, job_id, pool=None, throttle=None, dry_run=False,
+                 batch_size=BATCH_SIZE, chunk_rows=CHUNK_ROWS):
+    """테이블 하나를 재암호화. Returns: 진행 상황 dict (scanned/rotated/failed/last_pk/done)"""
+    if dry_run:
+        progress = {'last_pk': 0, 'scanned': 0, 'rotated': 0, 'failed': 0, 'done': False}
+    else:
+        progress = _load_progress(job_id, table)
+        if progress['done']:
+            logger.info(f"[KeyRotation] {table}: 이미 완료 (rotated={progress['rotated']})")
+            return progress
+
+    local_crypto = None
+    if pool is None:
+        from crypto_utils import EncryptionManager
+        local_crypto = EncryptionManager(cache_size=0)
+
+    remaining = _estimate_remaining(table, pk, progress['last_pk'])
+    run_started, run_rows, last_log = time.monotonic(), 0, 0.0
+    while True:
+        batches = []
+        for rows in _stream_chunk(table, pk, columns, progress['last_pk'], batch_size, chunk_rows):
+            last = rows[-1][0]
+            result = (pool.submit(rewrap_rows, rows) if pool is not None
+                      else rewrap_rows(rows, local_crypto))
+            batches.append((last, result))
+        if not batches:
+            break
+
+        for last, result in batches:
+            changed, stats = result.result() if pool is not None else result
+            progress['last_pk'] = last
+            progress['scanned'] += stats['rows']
+            progress['rotated'] += stats['rotated']
+            progress['failed'] += stats['failed']
+            if not dry_run:
+                _write_batch(table, pk, columns, changed, job_id, progress)
+            run_rows += stats['rows']
+            if throttle is not None:
+                throttle.wait(stats['rows'])
+
+            now = time.monotonic()
+            if now - last_log >= PROGRESS_LOG_INTERVAL:
+                last_log = now
+                rate = run_rows / max(now - run_started, 1e-6)
+                left = max(remaining - run_rows, 0) if remaining else None
+                pct = f"{min(run_rows / remaining, 1) * 100:.0f}%" if remaining else "?"
+                logger.info(f"[KeyRotation] {table}: {run_rows}/{remaining or '?'} ({pct}) "
+                            f"{rate:.0f}행/s, ETA {_format_eta(left / rate if left is not None and rate else None)} "
+                            f"| 재암호화 {progress['rotated']}, 실패 {progress['failed']}")
+
+    progress['done'] = True
+    if not dry_run:
+        _write_batch(table, pk, columns, [], job_id, progress)
+    logger.info(f"[KeyRotation] {table} 완료: {progress}")
+    return progress
+
+
+def run_rotation(tables=None, workers=WORKERS, max_rows_per_sec=None, pause=0.0, dry_run=False,
+                 batch_size=BATCH_SIZE, chunk_rows=CHUNK_ROWS):
+    """
+    TARGETS(또는 tables로 지정한 테이블)를 순서대로 재암호화.
+    Returns: {table: 진행 상황}
+    """
+    from crypto_utils import old_keys_from_env
+    if not old_keys_from_env():
+        logger.warning("[KeyRotation] ENCRYPTION_OLD_KEYS가 비어 있음 → 이전 키 값은 실패로 집계됨")
+
+    job_id = job_id_for_current_key()
+    throttle = _Throttle(max_rows_per_sec, pause)
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers > 1 else None
+    results = {}
+    try:
+        for table, pk, columns in TARGETS:
+            if tables and table not in tables:
+                continue
+            if not _table_exists(table):
+                logger.info(f"[KeyRotation] {table}: 테이블 없음 → 건너뜀")
+                continue
+            results[table] = rotate_table(table, pk, columns, job_id, pool=pool, throttle=throttle,
+                                          dry_run=dry_run, batch_size=batch_size, chunk_rows=chunk_rows)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [KeyRotation] %(message)s')
+    parser = argparse.ArgumentParser(description="마스터 키 교체 후 온라인 재암호화")
+    parser.add_argument('--table', action='append', help="특정 테이블만 (여러 번 지정 가능)")
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--max-rows-per-sec', type=float, default=None)
+    parser.add_argument('--pause', type=float, default=0.0, help="배치 사이 휴식(초)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help="쓰기 없이 이전 키 값 개수만 집계")
+    parser.add_argument('--status', action='store_true', help="진행 상황만 출력")
+    args = parser.parse_args()
+
+    from db_pool import close_pool
+    try:
+        if args.status:
+            for table, last_pk, scanned, rotated, failed, done, updated_at in rotation_status():
+                mark = "✅" if done else "⏳"
+                print(f"{mark} {table}: last_pk={last_pk} scanned={scanned} rotated={rotated} "
+                      f"failed={failed} ({updated_at:%Y-%m-%d %H:%M:%S})")
+        else:
+            results = run_rotation(args.table, workers=args.workers, max_rows_per_sec=args.max_rows_per_sec,
+                                   pause=args.pause, dry_run=args.dry_run, batch_size=args.batch_size)
+            for table, progress in results.items():
+                print(f"{'🔎' if args.dry_run else '✅'} {table}: {progress}")
+    finally:
+        close_pool()
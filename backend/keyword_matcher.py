@@ -0,0 +1,169 @@
+"""
+Keyword Matcher - Aho–Corasick 다중 키워드 매처
+===============================================
+감정어 사전(emotion_lexicon), 호칭 사전(relational), 자기 서사 패턴(self_narrative),
+수면 키워드(sleep_mind), CBT 패턴(cbt_patterns), 위기 키워드(standalone_ai, ai_brain)는
+키워드마다 `kw in text`를 한 번씩 돌려 텍스트를 사전 크기만큼 반복 스캔했다.
+
+KeywordMatcher는 사전당 한 번 오토마톤을 만들고, 텍스트를 한 번만 훑어
+모든 일치(키워드, 범주, 시작 위치)를 돌려준다.
+
+- pyahocorasick(C 확장)이 설치돼 있으면 사용, 없으면 순수 Python 오토마톤
+  (순수 Python은 글자당 비용이 커서, 텍스트가 키워드 수보다 길면 C 구현인 `in` 루프로 스캔
+   — benchmarks/bench_keyword_matcher.py 측정 기준)
+- found(text)는 `[(kw, cat) for kw, cat in entries if kw in text]`와 같은 결과·순서를 보장
+  (기존 함수들의 출력 순서를 그대로 유지하기 위함)
+
+사용 예:
+    from keyword_matcher import KeywordMatcher
+    matcher = KeywordMatcher({"슬프": "sadness", "기쁘": "joy"})
+    matcher.found("기쁘고 슬프다")        # [("슬프", "sadness"), ("기쁘", "joy")]
+    matcher.iter_matches("기쁘고 슬프다")  # [(0, "기쁘", "joy"), (3, "슬프", "sadness")]
+"""
+
+from collections import deque
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# 순수 Python 오토마톤이 `in` 루프보다 빠른 텍스트 길이 상한 (키워드 1개당 글자 수)
+PY_AUTOMATON_CHARS_PER_KEYWORD = 1.0
+
+
+class KeywordMatcher:
+    def __init__(self, entries, use_c=None):
+        """
+        entries: {키워드: 범주} dict 또는 (키워드, 범주) / 키워드 문자열의 iterable.
+                 같은 키워드가 여러 번(다른 범주로) 등록될 수 있으며, 등록 순서가 found()의 순서가 된다.
+        use_c: None이면 pyahocorasick 설치 여부에 따름
+        """
+        if isinstance(entries, dict):
+            entries = entries.items()
+        self.entries = []
+        for entry in entries:
+            keyword, category = (entry, None) if isinstance(entry, str) else entry
+            if keyword:
+                self.entries.append((keyword, category))
+
+        # 키워드 → 등록 순번 목록 (중복 등록 지원)
+        self._ids_by_keyword = {}
+        for idx, (keyword, _) in enumerate(self.entries):
+            self._ids_by_keyword.setdefault(keyword, []).append(idx)
+
+        self.backend = 'c' if (AHOCORASICK_AVAILABLE if use_c is None else use_c) else 'python'
+        if self.backend == 'c':
+            self._build_c()
+        else:
+            self._build_python()
+
+    # ── 오토마톤 구성 ──
+
+    def _build_c(self):
+        automaton = ahocorasick.Automaton(ahocorasick.STORE_ANY)
+        for keyword in self._ids_by_keyword:
+            automaton.add_word(keyword, keyword)
+        if self._ids_by_keyword:
+            automaton.make_automaton()
+        self._automaton = automaton
+
+    def _build_python(self):
+        goto = [{}]
+        output = [()]
+        for keyword in self._ids_by_keyword:
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    output.append(())
+                    goto[state][ch] = nxt
+                state = nxt
+            output[state] = (keyword,)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                # 접미사 상태의 출력까지 합쳐 두면 스캔 시 fail 체인을 따라갈 필요가 없음
+                output[nxt] = output[nxt] + output[fail[nxt]]
+
+        self._goto, self._fail, self._output = goto, fail, output
+
+    # ── 스캔 ──
+
+    def _use_naive(self, text):
+        return (self.backend == 'python'
+                and len(text) > len(self._ids_by_keyword) * PY_AUTOMATON_CHARS_PER_KEYWORD)
+
+    def _scan(self, text):
+        """(끝 위치, 키워드) 일치를 yield (오토마톤: 텍스트 순서 / `in` 루프: 키워드 순서)"""
+        if not text or not self._ids_by_keyword:
+            return
+        if self.backend == 'c':
+            for end, keyword in self._automaton.iter(text):
+                yield end, keyword
+            return
+        if self._use_naive(text):
+            for keyword in self._ids_by_keyword:
+                start = text.find(keyword)
+                while start != -1:
+                    yield start + len(keyword) - 1, keyword
+                    start = text.find(keyword, start + 1)
+            return
+
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                for keyword in output[state]:
+                    yield i, keyword
+
+    def iter_matches(self, text):
+        """모든 일치 [(시작 위치, 키워드, 범주), ...] — 시작 위치 순, 같은 키워드의 중복 등록은 각각 포함"""
+        matches = []
+        for end, keyword in self._scan(text):
+            start = end - len(keyword) + 1
+            for idx in self._ids_by_keyword[keyword]:
+                matches.append((start, idx))
+        matches.sort()
+        return [(start, self.entries[idx][0], self.entries[idx][1]) for start, idx in matches]
+
+    def found(self, text):
+        """텍스트에 등장하는 (키워드, 범주) 목록 — 등록 순서, 키워드당 1회"""
+        if text and self._use_naive(text):
+            return [(kw, cat) for kw, cat in self.entries if kw in text]
+        ids = set()
+        for _, keyword in self._scan(text):
+            ids.update(self._ids_by_keyword[keyword])
+        return [self.entries[idx] for idx in sorted(ids)]
+
+    def found_keywords(self, text, category=None):
+        """found()의 키워드만 (category 지정 시 해당 범주만)"""
+        return [kw for kw, cat in self.found(text) if category is None or cat == category]
+
+    def categories(self, text):
+        """텍스트에 등장하는 범주 집합"""
+        return {cat for _, cat in self.found(text)}
+
+    def contains_any(self, text):
+        if text and self._use_naive(text):
+            return any(kw in text for kw in self._ids_by_keyword)
+        for _ in self._scan(text):
+            return True
+        return False
+
+    def __len__(self):
+        return len(self.entries)
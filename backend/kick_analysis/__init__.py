@@ -11,10 +11,20 @@ Phase 1: 외부 라이브러리 불필요. SQLAlchemy + 기본 Python만 사용.
 """
 
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, case, and_
 
 
-def analyze_timeseries(user_id, db_session, Diary, today=None):
+def _period_bounds(today):
+    """(최근 7일 시작, 오늘, 이전 7일 시작, 이전 7일 끝) — 'YYYY-MM-DD' 문자열"""
+    return (
+        (today - timedelta(days=6)).strftime('%Y-%m-%d'),
+        today.strftime('%Y-%m-%d'),
+        (today - timedelta(days=13)).strftime('%Y-%m-%d'),
+        (today - timedelta(days=7)).strftime('%Y-%m-%d'),
+    )
+
+
+def analyze_timeseries(user_id, db_session, Diary, today=None, window=None):
     """
     특정 사용자의 시계열 패턴을 분석하여 위기 플래그를 산출한다.
     
@@ -23,6 +33,7 @@ def analyze_timeseries(user_id, db_session, Diary, today=None):
         db_session: SQLAlchemy db.session
         Diary: Diary 모델 클래스
         today: 기준일 (테스트용, 기본값=오늘)
+        window: UserDiaryWindow (있으면 최근 14일 빈도/시간대 집계를 로드된 일기로 계산)
     
     Returns:
         dict: 시계열 분석 결과 + 플래그
@@ -32,6 +43,9 @@ def analyze_timeseries(user_id, db_session, Diary, today=None):
     elif isinstance(today, datetime):
         today = today.date()
 
+    # 같은 요청에서 이미 로드한 30일 윈도우가 있으면 최근 14일 집계는 추가 쿼리 없이 계산
+    use_window = window is not None and window.user_id == user_id and window.today == today
+
     # ─── 1. 미기록 감지 ───
     last_diary = (
         db_session.query(Diary)
@@ -40,49 +54,32 @@ def analyze_timeseries(user_id, db_session, Diary, today=None):
         .first()
     )
 
-    if last_diary and last_diary.date:
-        try:
-            last_date = datetime.strptime(last_diary.date, '%Y-%m-%d').date()
-            days_since = (today - last_date).days
-        except (ValueError, TypeError):
-            days_since = -1  # 파싱 실패
-    else:
-        days_since = -1  # 기록 없음
-
-    inactivity_flag = days_since >= 7
-
     # ─── 2. 기록 빈도 변화 ───
-    recent_start = (today - timedelta(days=6)).strftime('%Y-%m-%d')
-    recent_end = today.strftime('%Y-%m-%d')
-    prev_start = (today - timedelta(days=13)).strftime('%Y-%m-%d')
-    prev_end = (today - timedelta(days=7)).strftime('%Y-%m-%d')
+    recent_start, recent_end, prev_start, prev_end = _period_bounds(today)
 
-    recent_count = (
-        db_session.query(func.count(Diary.id))
-        .filter(
-            Diary.user_id == user_id,
-            Diary.date >= recent_start,
-            Diary.date <= recent_end
+    if use_window:
+        recent_count = sum(1 for d in window.diaries if recent_start <= d.date <= recent_end)
+        prev_count = sum(1 for d in window.diaries if prev_start <= d.date <= prev_end)
+    else:
+        recent_count = (
+            db_session.query(func.count(Diary.id))
+            .filter(
+                Diary.user_id == user_id,
+                Diary.date >= recent_start,
+                Diary.date <= recent_end
+            )
+            .scalar() or 0
         )
-        .scalar() or 0
-    )
 
-    prev_count = (
-        db_session.query(func.count(Diary.id))
-        .filter(
-            Diary.user_id == user_id,
-            Diary.date >= prev_start,
-            Diary.date <= prev_end
+        prev_count = (
+            db_session.query(func.count(Diary.id))
+            .filter(
+                Diary.user_id == user_id,
+                Diary.date >= prev_start,
+                Diary.date <= prev_end
+            )
+            .scalar() or 0
         )
-        .scalar() or 0
-    )
-
-    if prev_count > 0:
-        frequency_change = round(((recent_count - prev_count) / prev_count) * 100, 1)
-    else:
-        frequency_change = 0.0  # 이전 기록 없으면 비교 불가
-
-    frequency_drop_flag = prev_count > 0 and frequency_change <= -50.0
 
     # ─── 3. 마음 온도 추세 ───
     recent_diaries = (
@@ -91,13 +88,131 @@ def analyze_timeseries(user_id, db_session, Diary, today=None):
             Diary.user_id == user_id,
             Diary.mood_level.isnot(None)
         )
-        .order_by(Diary.date.desc())
+        .order_by(Diary.date.desc(), Diary.id.desc())
         .limit(7)
         .all()
     )
 
     mood_values = [d.mood_level for d in reversed(recent_diaries) if d.mood_level is not None]
 
+    # ─── 4. 기록 시간대 분석 ───
+    # 빈도와 같은 최근 7일(recent_start~today) — 윈도우/bulk 경로와 같은 범위 (기준일 이후 날짜 제외)
+    if use_window:
+        recent_with_time = [d for d in window.diaries
+                            if d.created_at is not None and recent_start <= d.date <= recent_end]
+    else:
+        recent_with_time = (
+            db_session.query(Diary.created_at)
+            .filter(
+                Diary.user_id == user_id,
+                Diary.created_at.isnot(None),
+                Diary.date >= recent_start,
+                Diary.date <= recent_end
+            )
+            .all()
+        )
+
+    total_entries = len(recent_with_time)
+    night_entries = 0
+
+    for entry in recent_with_time:
+        if entry.created_at and hasattr(entry.created_at, 'hour'):
+            if 0 <= entry.created_at.hour <= 5:
+                night_entries += 1
+
+    return _timeseries_result(
+        user_id, today, last_diary.date if last_diary else None,
+        recent_count, prev_count, mood_values, total_entries, night_entries
+    )
+
+
+def analyze_timeseries_bulk(db_session, Diary, today=None):
+    """
+    전체 사용자의 시계열 집계를 집계 쿼리 2개로 계산한다. (사용자별 analyze_timeseries와 동일한 결과)
+    사용자마다 쿼리 5개를 돌리던 N+1 대신 diaries를 user_id로 GROUP BY / 윈도우 함수로 한 번씩만 훑는다.
+
+    Returns:
+        dict: {user_id: analyze_timeseries 결과} — 일기가 1건 이상 있는 사용자만
+    """
+    if today is None:
+        today = datetime.utcnow().date()
+    elif isinstance(today, datetime):
+        today = today.date()
+
+    recent_start, recent_end, prev_start, prev_end = _period_bounds(today)
+
+    def _count_if(*conditions):
+        return func.coalesce(func.sum(case((and_(*conditions), 1), else_=0)), 0)
+
+    has_recent_time = and_(Diary.created_at.isnot(None), Diary.date >= recent_start, Diary.date <= recent_end)
+
+    # ─── 1/2/4. 마지막 기록일, 7일 vs 이전 7일 빈도, 새벽 기록 비율 ───
+    stats = (
+        db_session.query(
+            Diary.user_id,
+            func.max(Diary.date),
+            _count_if(Diary.date >= recent_start, Diary.date <= recent_end),
+            _count_if(Diary.date >= prev_start, Diary.date <= prev_end),
+            _count_if(has_recent_time),
+            _count_if(has_recent_time, func.extract('hour', Diary.created_at).between(0, 5)),
+        )
+        .group_by(Diary.user_id)
+        .all()
+    )
+
+    # ─── 3. 사용자별 최근 7개 mood_level (date 내림차순 순위) ───
+    rank = func.row_number().over(
+        partition_by=Diary.user_id,
+        order_by=(Diary.date.desc(), Diary.id.desc())
+    ).label('rank')
+    ranked = (
+        db_session.query(Diary.user_id, Diary.mood_level, rank)
+        .filter(Diary.mood_level.isnot(None))
+        .subquery()
+    )
+    mood_rows = (
+        db_session.query(ranked.c.user_id, ranked.c.mood_level)
+        .filter(ranked.c.rank <= 7)
+        .order_by(ranked.c.user_id, ranked.c.rank.desc())
+        .all()
+    )
+    mood_by_user = {}
+    for user_id, mood_level in mood_rows:
+        mood_by_user.setdefault(user_id, []).append(mood_level)
+
+    return {
+        user_id: _timeseries_result(
+            user_id, today, last_date, int(recent_count), int(prev_count),
+            mood_by_user.get(user_id, []), int(total_entries), int(night_entries)
+        )
+        for user_id, last_date, recent_count, prev_count, total_entries, night_entries in stats
+    }
+
+
+def _timeseries_result(user_id, today, last_date_str, recent_count, prev_count, mood_values,
+                       total_entries, night_entries):
+    """집계값으로 플래그/결과 dict를 만든다. (analyze_timeseries / analyze_timeseries_bulk 공용)"""
+    # ─── 1. 미기록 감지 ───
+    if last_date_str:
+        try:
+            last_date = datetime.strptime(last_date_str, '%Y-%m-%d').date()
+            days_since = (today - last_date).days
+        except (ValueError, TypeError):
+            days_since = -1  # 파싱 실패
+    else:
+        days_since = -1  # 기록 없음
+
+    inactivity_flag = days_since >= 7
+
+    # ─── 2. 기록 빈도 변화 ───
+    if prev_count > 0:
+        frequency_change = round(((recent_count - prev_count) / prev_count) * 100, 1)
+    else:
+        frequency_change = 0.0  # 이전 기록 없으면 비교 불가
+
+    frequency_drop_flag = prev_count > 0 and frequency_change <= -50.0
+
+    # ─── 3. 마음 온도 추세 ───
     # 연속 하락 일수 계산
     consecutive_decline = 0
     if len(mood_values) >= 2:
@@ -116,24 +231,6 @@ def analyze_timeseries(user_id, db_session, Diary, today=None):
     decline_flag = consecutive_decline >= 3 and mood_100 is not None and mood_100 <= 40
 
     # ─── 4. 기록 시간대 분석 ───
-    recent_with_time = (
-        db_session.query(Diary.created_at)
-        .filter(
-            Diary.user_id == user_id,
-            Diary.created_at.isnot(None),
-            Diary.date >= recent_start
-        )
-        .all()
-    )
-
-    total_entries = len(recent_with_time)
-    night_entries = 0
-
-    for entry in recent_with_time:
-        if entry.created_at and hasattr(entry.created_at, 'hour'):
-            if 0 <= entry.created_at.hour <= 5:
-                night_entries += 1
-
     night_ratio = round(night_entries / max(total_entries, 1), 2)
     night_flag = total_entries >= 3 and night_ratio >= 0.5  # 최소 3건 이상일 때만
 
@@ -144,7 +241,7 @@ def analyze_timeseries(user_id, db_session, Diary, today=None):
             'type': 'inactivity',
             'severity': 'high',
             'message': f'{days_since}일간 기록 없음',
-            'detail': f'마지막 기록일: {last_diary.date if last_diary else "없음"}'
+            'detail': f'마지막 기록일: {last_date_str or "없음"}'
         })
     if decline_flag:
         flags.append({
@@ -201,14 +298,15 @@ def analyze_timeseries(user_id, db_session, Diary, today=None):
 def analyze_all_users_timeseries(db_session, User, Diary, today=None):
     """
     전체 사용자의 시계열 분석을 수행하고 플래그가 있는 사용자만 반환.
-    의료진 대시보드용.
+    의료진 대시보드용. (사용자별 쿼리 대신 analyze_timeseries_bulk의 집계 쿼리 2개 + 사용자 목록 1개)
     """
-    users = db_session.query(User).all()
+    users = db_session.query(User.id, User.username, User.real_name).order_by(User.id).all()
+    results = analyze_timeseries_bulk(db_session, Diary, today)
     flagged_users = []
 
     for user in users:
-        result = analyze_timeseries(user.id, db_session, Diary, today)
-        if result['flag_count'] > 0:
+        result = results.get(user.id)
+        if result and result['flag_count'] > 0:
             result['username'] = user.username
             result['real_name'] = user.real_name
             flagged_users.append(result)
@@ -13,6 +13,8 @@ import re
 from collections import Counter
 from datetime import datetime, timedelta
 
+from keyword_matcher import KeywordMatcher
+
 
 # ═══ 12가지 CBT 인지 왜곡 패턴 정의 ═══
 
@@ -164,6 +166,12 @@ CBT_PATTERNS = {
 }
 
 
+# 전체 CBT 키워드 오토마톤 (범주 = 패턴 키)
+CBT_MATCHER = KeywordMatcher(
+    [(kw, key) for key, info in CBT_PATTERNS.items() for kw in info['keywords']]
+)
+
+
 def _detect_patterns_in_text(text):
     """
     텍스트에서 CBT 패턴 키워드를 탐지한다.
@@ -175,15 +183,8 @@ def _detect_patterns_in_text(text):
         return {}
 
     detected = {}
-    text_lower = text.lower()
-
-    for pattern_key, pattern_info in CBT_PATTERNS.items():
-        count = 0
-        for keyword in pattern_info['keywords']:
-            if keyword in text_lower:
-                count += 1
-        if count > 0:
-            detected[pattern_key] = count
+    for _, pattern_key in CBT_MATCHER.found(text.lower()):
+        detected[pattern_key] = detected.get(pattern_key, 0) + 1
 
     return detected
 
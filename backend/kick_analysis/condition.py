@@ -278,21 +278,30 @@ def generate_condition(user_id, db_session, Diary, crypto_decrypt=None, today=No
     from kick_analysis import analyze_timeseries
     from kick_analysis.linguistic import analyze_linguistic
     from kick_analysis.relational import analyze_relational
+    from kick_analysis.corpus import UserDiaryWindow, prefetch_kiwi
 
     # ─── Phase별 분석 실행 ───
     ts_result = None
     lg_result = None
     rl_result = None
 
+    # 30일 일기를 한 번만 로드/복호화해서 Phase 1~3이 공유
+    window = None
     try:
-        ts_result = analyze_timeseries(user_id, db_session, Diary, today=today)
+        window = UserDiaryWindow(user_id, db_session, Diary, crypto_decrypt=crypto_decrypt, today=today)
+        prefetch_kiwi([window], accept=None if skip_phase3 else (lambda f: f.get('relational_llm')))
+    except Exception as e:
+        print(f"⚠️ Condition: 일기 윈도우 로드 실패: {e}")
+
+    try:
+        ts_result = analyze_timeseries(user_id, db_session, Diary, today=today, window=window)
     except Exception as e:
         print(f"⚠️ Condition: Phase 1 실패: {e}")
 
     try:
         lg_result = analyze_linguistic(
             user_id, db_session, Diary,
-            crypto_decrypt=crypto_decrypt, today=today
+            crypto_decrypt=crypto_decrypt, today=today, window=window
         )
     except Exception as e:
         print(f"⚠️ Condition: Phase 2 실패: {e}")
@@ -301,7 +310,7 @@ def generate_condition(user_id, db_session, Diary, crypto_decrypt=None, today=No
         try:
             rl_result = analyze_relational(
                 user_id, db_session, Diary,
-                crypto_decrypt=crypto_decrypt, today=today
+                crypto_decrypt=crypto_decrypt, today=today, window=window
             )
         except Exception as e:
             print(f"⚠️ Condition: Phase 3 실패: {e}")
@@ -376,14 +385,7 @@ def generate_condition(user_id, db_session, Diary, crypto_decrypt=None, today=No
     }
 
 
-# ═══ 캐싱 ═══
-
-_condition_cache = {
-    'data': None,
-    'timestamp': None,
-}
-_CACHE_TTL_SECONDS = 300  # 5분
-
+# ═══ 전체 사용자 (스냅샷) ═══
 
 def generate_all_users_condition(db_session, User, Diary,
                                   crypto_decrypt=None, today=None):
@@ -391,68 +393,12 @@ def generate_all_users_condition(db_session, User, Diary,
     전체 사용자의 마음 컨디션 조회. 의료진 대시보드용.
     관심 필요(cloudy/rainy) 등급 사용자를 우선 표시.
     
-    [성능] 5분간 캐시된 결과를 반환하여 Ollama 과부하 방지.
+    [성능] user_condition_snapshots에서 일기가 바뀐 사용자만 다시 계산한 뒤 스냅샷을 읽는다.
+    (대시보드 엔드포인트는 갱신을 기다리지 않고 스냅샷만 읽음 — condition_snapshots 참고)
     """
-    import time
-    now = time.time()
-    
-    # 캐시가 유효하면 즉시 반환
-    if (_condition_cache['data'] is not None
-            and _condition_cache['timestamp'] is not None
-            and (now - _condition_cache['timestamp']) < _CACHE_TTL_SECONDS):
-        print(f"✅ [Condition] 캐시 사용 (남은 {int(_CACHE_TTL_SECONDS - (now - _condition_cache['timestamp']))}초)")
-        return _condition_cache['data']
-    
-    print("🔄 [Condition] 전체 사용자 컨디션 계산 시작...")
-    
-    users = db_session.query(User).all()
-    results = []
-
-    for user in users:
-        try:
-            cond = generate_condition(
-                user.id, db_session, Diary,
-                crypto_decrypt=crypto_decrypt, today=today,
-                skip_phase3=True  # 대시보드용: LLM NER 건너뛰어 속도 확보
-            )
-            cond['username'] = user.username
-            cond['real_name'] = getattr(user, 'real_name', None)
-            results.append(cond)
-        except Exception as e:
-            print(f"⚠️ Condition: user={user.id} 실패: {e}")
+    from .condition_snapshots import refresh_condition_snapshots, load_condition_overview
 
-    # 점수 낮은 순(관심 필요 우선)으로 정렬
-    results.sort(key=lambda x: x['condition']['score'])
-
-    # 등급별 분포 집계
-    grade_distribution = {}
-    for grade_key in CONDITION_GRADES:
-        grade_distribution[grade_key] = sum(
-            1 for r in results if r['condition']['grade'] == grade_key
-        )
-
-    analysis_date = today or datetime.utcnow().date()
-    if isinstance(analysis_date, datetime):
-        analysis_date = analysis_date.date()
-
-    # 관심 필요 사용자 (cloudy + rainy)
-    attention_needed = [
-        r for r in results
-        if r['condition']['grade'] in ('cloudy', 'rainy')
-    ]
-
-    result = {
-        'analysis_date': analysis_date.strftime('%Y-%m-%d'),
-        'total_users': len(users),
-        'grade_distribution': grade_distribution,
-        'attention_count': len(attention_needed),
-        'attention_users': attention_needed,
-        'all_users': results,
-    }
-    
-    # 캐시 저장
-    _condition_cache['data'] = result
-    _condition_cache['timestamp'] = now
-    print(f"✅ [Condition] 계산 완료. {len(users)}명. 5분간 캐시 유지.")
-    
-    return result
+    print("🔄 [Condition] 전체 사용자 컨디션 스냅샷 갱신...")
+    stats = refresh_condition_snapshots(db_session, User, Diary, crypto_decrypt=crypto_decrypt, today=today)
+    print(f"✅ [Condition] 갱신 완료. {stats['users']}명 중 {stats['refreshed']}명 재계산.")
+    return load_condition_overview(db_session, User)
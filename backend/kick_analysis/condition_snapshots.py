@@ -0,0 +1,236 @@
+"""
+마음온 킥(Kick) 분석 — 마음 컨디션 스냅샷 (user_condition_snapshots)
+====================================================================
+generate_all_users_condition은 결과를 모듈 전역 dict에 5분간 캐시했다.
+gunicorn 워커마다 따로 재계산했고, 재시작하면 항상 처음부터 계산했다.
+
+- 결과는 user_condition_snapshots 테이블에 사용자별 1행으로 저장 → 모든 워커가 공유
+- 갱신은 증분: 일기 지문(일기 수 / 최대 id / analysis_jobs.version 합)이 바뀌었거나
+  analysis_date가 오늘이 아닌 사용자만 다시 계산
+  (일기 수정은 enqueue_analysis가 version을 올리고, 삭제는 일기 수가 줄어 지문이 바뀜)
+- 대시보드는 스냅샷을 바로 읽고(as_of 포함), 갱신은 백그라운드 스레드 또는 cron이 수행
+- Postgres에서는 advisory lock으로 여러 워커 중 한 곳만 갱신
+
+수동/cron 갱신:
+  python cron_condition_snapshots.py
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+from sqlalchemy import func
+
+# 요청 경로에서 백그라운드 갱신을 시도하는 최소 간격 (프로세스별)
+REFRESH_INTERVAL_SECONDS = int(os.environ.get('KICK_CONDITION_REFRESH_INTERVAL', '60'))
+COMMIT_EVERY = 50
+
+# pg_try_advisory_lock 키 (임의의 고정 정수)
+_ADVISORY_LOCK_KEY = 720016
+
+_refresh_lock = threading.Lock()
+_last_refresh_started = {'at': 0.0}
+
+
+def _normalize_today(today):
+    if today is None:
+        return datetime.utcnow().date()
+    if isinstance(today, datetime):
+        return today.date()
+    return today
+
+
+def diary_fingerprints(db_session, Diary):
+    """{user_id: '일기 수:최대 id:분석 version 합'} — GROUP BY 쿼리 1개"""
+    from models import AnalysisJob
+
+    rows = (
+        db_session.query(
+            Diary.user_id,
+            func.count(Diary.id),
+            func.max(Diary.id),
+            func.coalesce(func.sum(AnalysisJob.version), 0),
+        )
+        .outerjoin(AnalysisJob, AnalysisJob.diary_id == Diary.id)
+        .group_by(Diary.user_id)
+        .all()
+    )
+    return {user_id: f"{count}:{max_id}:{int(versions)}" for user_id, count, max_id, versions in rows}
+
+
+def refresh_condition_snapshots(db_session, User, Diary, crypto_decrypt=None, today=None, force=False):
+    """
+    지문이 바뀐 사용자만 generate_condition을 다시 계산해 스냅샷을 UPSERT한다.
+
+    Returns:
+        dict: {'users', 'refreshed', 'skipped', 'errors'}
+    """
+    from models import UserConditionSnapshot
+    from .condition import generate_condition
+
+    today = _normalize_today(today)
+    today_str = today.strftime('%Y-%m-%d')
+
+    user_ids = [uid for (uid,) in db_session.query(User.id).order_by(User.id).all()]
+    fingerprints = diary_fingerprints(db_session, Diary)
+    snapshots = {s.user_id: s for s in db_session.query(UserConditionSnapshot).all()}
+
+    stats = {'users': len(user_ids), 'refreshed': 0, 'skipped': 0, 'errors': 0}
+    pending = 0
+    for user_id in user_ids:
+        fingerprint = fingerprints.get(user_id, '0:0:0')
+        snapshot = snapshots.get(user_id)
+        if (not force and snapshot is not None and snapshot.analysis_date == today_str
+                and snapshot.diary_fingerprint == fingerprint):
+            stats['skipped'] += 1
+            continue
+
+        try:
+            cond = generate_condition(
+                user_id, db_session, Diary,
+                crypto_decrypt=crypto_decrypt, today=today,
+                skip_phase3=True  # 대시보드용: LLM NER 건너뛰어 속도 확보
+            )
+        except Exception as e:
+            print(f"⚠️ Condition: user={user_id} 실패: {e}")
+            db_session.rollback()
+            stats['errors'] += 1
+            continue
+
+        if snapshot is None:
+            snapshot = UserConditionSnapshot(user_id=user_id)
+            db_session.add(snapshot)
+            snapshots[user_id] = snapshot
+        # 계산 전에 읽은 지문을 저장 → 계산 도중 바뀐 일기는 다음 갱신에서 다시 계산됨
+        snapshot.analysis_date = today_str
+        snapshot.diary_fingerprint = fingerprint
+        snapshot.score = cond['condition']['score']
+        snapshot.grade = cond['condition']['grade']
+        snapshot.payload = json.dumps(cond, ensure_ascii=False)
+        snapshot.computed_at = datetime.utcnow()
+        stats['refreshed'] += 1
+
+        pending += 1
+        if pending >= COMMIT_EVERY:
+            db_session.commit()  # 다른 워커의 대시보드에도 진행 중인 결과가 바로 보이도록
+            pending = 0
+
+    # 탈퇴 등으로 사라진 사용자의 스냅샷 정리
+    removed = set(snapshots) - set(user_ids)
+    if removed:
+        (db_session.query(UserConditionSnapshot)
+         .filter(UserConditionSnapshot.user_id.in_(removed))
+         .delete(synchronize_session=False))
+    db_session.commit()
+    return stats
+
+
+def load_condition_overview(db_session, User):
+    """스냅샷에서 전체 사용자 컨디션 요약을 만든다. (generate_all_users_condition과 같은 형태 + as_of)"""
+    from models import UserConditionSnapshot
+    from .condition import CONDITION_GRADES
+
+    rows = (
+        db_session.query(UserConditionSnapshot.payload, UserConditionSnapshot.computed_at,
+                         UserConditionSnapshot.analysis_date, User.username, User.real_name)
+        .join(User, User.id == UserConditionSnapshot.user_id)
+        .order_by(UserConditionSnapshot.score.asc(), UserConditionSnapshot.user_id.asc())
+        .all()
+    )
+    total_users = db_session.query(func.count(User.id)).scalar() or 0
+
+    results = []
+    for payload, _, _, username, real_name in rows:
+        cond = json.loads(payload)
+        cond['username'] = username
+        cond['real_name'] = real_name
+        results.append(cond)
+
+    grade_distribution = {
+        grade_key: sum(1 for r in results if r['condition']['grade'] == grade_key)
+        for grade_key in CONDITION_GRADES
+    }
+    # 관심 필요 사용자 (cloudy + rainy)
+    attention_needed = [r for r in results if r['condition']['grade'] in ('cloudy', 'rainy')]
+
+    computed = [computed_at for _, computed_at, _, _, _ in rows if computed_at]
+    dates = [analysis_date for _, _, analysis_date, _, _ in rows]
+    return {
+        'analysis_date': max(dates) if dates else None,
+        'as_of': min(computed).isoformat() + 'Z' if computed else None,  # 가장 오래된 스냅샷 시각
+        'updated_at': max(computed).isoformat() + 'Z' if computed else None,
+        'snapshot_count': len(results),
+        'total_users': total_users,
+        'grade_distribution': grade_distribution,
+        'attention_count': len(attention_needed),
+        'attention_users': attention_needed,
+        'all_users': results,
+    }
+
+
+# ─────────────────────────────────────────────
+# 백그라운드 갱신 (요청 경로에서 트리거)
+# ─────────────────────────────────────────────
+
+def _try_advisory_lock(connection):
+    """Postgres면 세션 advisory lock 시도 (다른 워커가 갱신 중이면 False), 그 외 DB는 항상 True"""
+    if connection.dialect.name != 'postgresql':
+        return True
+    from sqlalchemy import text
+    return bool(connection.execute(text("SELECT pg_try_advisory_lock(:key)"),
+                                   {'key': _ADVISORY_LOCK_KEY}).scalar())
+
+
+def _release_advisory_lock(connection):
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy import text
+        connection.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': _ADVISORY_LOCK_KEY})
+
+
+def run_locked_refresh(db, User, Diary, crypto_decrypt=None, today=None, force=False):
+    """다른 프로세스가 갱신 중이 아니면 갱신. (app_context 안에서 호출) Returns: stats 또는 None(건너뜀)"""
+    if not _refresh_lock.acquire(blocking=False):
+        return None
+    try:
+        with db.engine.connect() as lock_conn:
+            if not _try_advisory_lock(lock_conn):
+                print("ℹ️ [ConditionSnapshot] 다른 워커가 갱신 중 → 건너뜀")
+                return None
+            try:
+                started = time.time()
+                stats = refresh_condition_snapshots(db.session, User, Diary, crypto_decrypt=crypto_decrypt,
+                                                    today=today, force=force)
+                print(f"✅ [ConditionSnapshot] 갱신 완료: {stats} ({time.time() - started:.1f}s)")
+                return stats
+            finally:
+                _release_advisory_lock(lock_conn)
+    finally:
+        _refresh_lock.release()
+
+
+def trigger_background_refresh(app, User, Diary, crypto_decrypt=None):
+    """마지막 시도 후 REFRESH_INTERVAL_SECONDS가 지났으면 백그라운드 스레드로 증분 갱신. Returns: 시작 여부"""
+    now = time.time()
+    if now - _last_refresh_started['at'] < REFRESH_INTERVAL_SECONDS or _refresh_lock.locked():
+        return False
+    _last_refresh_started['at'] = now
+
+    def _run():
+        from models import db
+        with app.app_context():
+            try:
+                run_locked_refresh(db, User, Diary, crypto_decrypt=crypto_decrypt)
+            except Exception as e:
+                print(f"⚠️ [ConditionSnapshot] 갱신 실패: {e}")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=_run, name='condition-snapshots', daemon=True).start()
+    return True
+
+
+def is_refreshing():
+    return _refresh_lock.locked()
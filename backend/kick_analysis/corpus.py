@@ -0,0 +1,189 @@
+"""
+마음온 킥(Kick) 분석 — 사용자 일기 윈도우 (공유 코퍼스)
+====================================================
+Phase 2~6(linguistic / relational / emotion_flow / sleep_mind / self_narrative)은
+모두 같은 "최근 30일 일기"를 각자 조회하고 같은 4개 필드를 각자 복호화했다.
+한 요청에서 여러 Phase를 돌리면 조회·복호화가 Phase 수만큼 반복되므로,
+UserDiaryWindow가 한 번만 로드하고 복호화 결과를 일기별로 캐시해 모든 Phase가 공유한다.
+
+사용 예:
+    window = UserDiaryWindow(user_id, db.session, Diary, crypto_decrypt=safe_decrypt)
+    lg = analyze_linguistic(user_id, db.session, Diary, window=window)
+    ef = analyze_emotion_flow(user_id, db.session, Diary, window=window)
+
+window 없이 호출하면 각 analyze_* 함수가 기존과 같이 직접 윈도우를 만든다.
+
+일기별 단일 분석 결과는 diary_features(작성/수정 시 워커가 계산)에서 윈도우 단위로 한 번에 읽고,
+저장된 특징이 없는 일기만 즉석에서 계산한다. (feature())
+즉석 계산할 일기는 prefetch_kiwi()로 Kiwi 배치 분석(멀티스레드)을 먼저 돌려 캐시에 올려둘 수 있다.
+relational의 LLM 인물 추출 결과는 diary_ner_cache에서 읽고(ner_entries) 새로 추출한 결과를 저장한다(save_ner_entries).
+"""
+
+from datetime import datetime, timedelta
+
+from .features import build_diary_text, load_diary_features
+from .kiwi_service import analyze_many
+from .ner_cache import load_ner_cache, store_ner_cache
+
+
+def _normalize_today(today):
+    if today is None:
+        return datetime.utcnow().date()
+    if isinstance(today, datetime):
+        return today.date()
+    return today
+
+
+class UserDiaryWindow:
+    """한 사용자의 최근 N일 일기 + 복호화 텍스트 캐시 (요청 단위로 생성해 Phase 간 공유)"""
+
+    DEFAULT_DAYS = 30
+
+    def __init__(self, user_id, db_session, Diary, crypto_decrypt=None, today=None, days=DEFAULT_DAYS,
+                 diaries=None, features=None, ner_cache=None):
+        """
+        diaries/features: 이미 조회한 일기 행(날짜 오름차순)과 load_diary_features 결과를 넘기면
+                          DB를 조회하지 않는다. (대시보드 병렬 계산 워커처럼 DB 세션이 없는 곳에서 사용)
+        ner_cache: load_ner_cache 결과 (위와 같은 용도). DB 세션이 없으면 새 NER 결과는 ner_updates에만 모인다.
+        """
+        self.user_id = user_id
+        self.db_session = db_session
+        self.crypto_decrypt = crypto_decrypt
+        self.today = _normalize_today(today)
+        self.today_str = self.today.strftime('%Y-%m-%d')
+        self.cutoff_30d = (self.today - timedelta(days=days)).strftime('%Y-%m-%d')
+        self.cutoff_7d = (self.today - timedelta(days=6)).strftime('%Y-%m-%d')
+
+        if diaries is None:
+            diaries = (
+                db_session.query(Diary)
+                .filter(
+                    Diary.user_id == user_id,
+                    Diary.date >= self.cutoff_30d,
+                    Diary.date <= self.today_str
+                )
+                .order_by(Diary.date.asc())
+                .all()
+            )
+        self.diaries = diaries
+        self._texts = {}
+        self._sleep_texts = {}
+        self._features = features
+        self._ner_cache = ner_cache
+        self.ner_updates = {}
+
+    @classmethod
+    def resolve(cls, window, user_id, db_session, Diary, crypto_decrypt=None, today=None):
+        """전달받은 윈도우가 같은 사용자·기준일이면 재사용, 아니면 새로 로드"""
+        if window is not None and window.user_id == user_id and (
+                today is None or window.today == _normalize_today(today)):
+            return window
+        return cls(user_id, db_session, Diary, crypto_decrypt=crypto_decrypt, today=today)
+
+    @property
+    def recent_diaries(self):
+        """최근 7일"""
+        return [d for d in self.diaries if d.date >= self.cutoff_7d]
+
+    @property
+    def baseline_diaries(self):
+        """Baseline 기간 (8~30일 전)"""
+        return [d for d in self.diaries if d.date < self.cutoff_7d]
+
+    def text(self, diary):
+        """event/emotion_desc/emotion_meaning/self_talk 복호화 후 공백으로 결합 (일기별 1회만 복호화)"""
+        cached = self._texts.get(diary.id)
+        if cached is None:
+            fields = [diary.event, diary.emotion_desc, diary.emotion_meaning, diary.self_talk]
+            if self.crypto_decrypt:
+                fields = [self.crypto_decrypt(f) if f else f for f in fields]
+            cached = self._texts[diary.id] = build_diary_text(*fields)
+        return cached
+
+    def sleep_text(self, diary):
+        """sleep_condition 복호화 (실패 시 원문)"""
+        if diary.id not in self._sleep_texts:
+            sleep_text = diary.sleep_condition
+            if self.crypto_decrypt and sleep_text:
+                try:
+                    sleep_text = self.crypto_decrypt(sleep_text)
+                except Exception:
+                    pass
+            self._sleep_texts[diary.id] = sleep_text
+        return self._sleep_texts[diary.id]
+
+    def _stored_features(self):
+        if self._features is None:
+            try:
+                self._features = load_diary_features(self.db_session, [d.id for d in self.diaries])
+            except Exception as e:
+                print(f"⚠️ [DiaryFeatures] 특징 조회 실패 → 즉석 계산: {e}")
+                self.db_session.rollback()
+                self._features = {}
+        return self._features
+
+    def uncached_diaries(self, accept=None):
+        """저장된 특징으로 대신할 수 없어 즉석 분석이 필요한 일기 (accept는 feature()와 동일)"""
+        stored = self._stored_features()
+        return [d for d in self.diaries
+                if d.id not in stored or (accept is not None and not accept(stored[d.id]))]
+
+    def uncached_texts(self, accept=None):
+        return [self.text(d) for d in self.uncached_diaries(accept)]
+
+    def ner_entries(self):
+        """윈도우 일기의 LLM NER 캐시 {diary_id: (content_hash, names)}"""
+        if self._ner_cache is None:
+            try:
+                self._ner_cache = load_ner_cache(self.db_session, [d.id for d in self.diaries])
+            except Exception as e:
+                print(f"⚠️ [NerCache] 캐시 조회 실패 → LLM 재추출: {e}")
+                self.db_session.rollback()
+                self._ner_cache = {}
+        return self._ner_cache
+
+    def save_ner_entries(self, entries):
+        """새로 추출한 NER 결과 저장 (DB 세션이 없으면 ner_updates로 호출자에게 넘김)"""
+        if not entries:
+            return
+        self.ner_entries().update(entries)
+        self.ner_updates.update(entries)
+        if self.db_session is None:
+            return
+        try:
+            store_ner_cache(self.db_session, entries)
+        except Exception as e:
+            print(f"⚠️ [NerCache] 캐시 저장 실패: {e}")
+            self.db_session.rollback()
+
+    def feature(self, diary, kind, compute, accept=None):
+        """
+        일기 1건의 Phase별 단일 분석 결과(kind: linguistic/relational/emotion/narrative/sleep).
+        diary_features에 현재 버전으로 저장돼 있으면 그대로 쓰고, 없으면 compute()로 계산한다.
+        accept(features)가 False를 돌려주면 저장값을 쓰지 않는다. (예: LLM NER 포함 여부)
+        """
+        stored = self._stored_features().get(diary.id)
+        if stored is not None and kind in stored and (accept is None or accept(stored)):
+            value = stored[kind]
+            # 호출자가 date 등을 덧붙이므로 복사본 반환
+            return dict(value) if isinstance(value, dict) else value
+        return compute()
+
+    def no_data_result(self):
+        return {
+            'user_id': self.user_id,
+            'analysis_date': self.today_str,
+            'status': 'no_data',
+            'message': '분석할 일기 데이터가 없습니다.',
+            'flags': [],
+            'flag_count': 0,
+            'has_critical': False,
+        }
+
+
+def prefetch_kiwi(windows, accept=None):
+    """여러 윈도우에서 즉석 분석할 일기 텍스트를 모아 Kiwi 배치 분석 → 이후 Phase의 단건 호출은 캐시 적중"""
+    texts = [text for window in windows for text in window.uncached_texts(accept)
+             if text and len(text.strip()) >= 10]
+    if texts:
+        analyze_many(texts)
@@ -21,6 +21,7 @@ LLM 사용: 없음. Kiwi + 감정어 사전 기반 순수 Python 연산.
 
 from datetime import datetime, timedelta
 from collections import defaultdict, Counter
+from .corpus import UserDiaryWindow
 from .emotion_lexicon import match_emotions_in_text, EMOTION_CATEGORIES
 
 # ─── 감정 valence 분류 ───
@@ -60,7 +61,7 @@ def _analyze_single_diary_emotion(text):
         "category_count": len(categories),
         "valence": valence,
         "intensity": intensity,
-        "found_words": [(w, c) for w, c in result["found_words"]],
+        "found_words": [[w, c] for w, c in result["found_words"]],
         "diversity_score": result["diversity_score"],
     }
 
@@ -247,7 +248,7 @@ def _compute_weekday_distribution(daily_results):
 
 # ═══ 메인 분석 함수 ═══
 
-def analyze_emotion_flow(user_id, db_session, Diary, crypto_decrypt=None, today=None):
+def analyze_emotion_flow(user_id, db_session, Diary, crypto_decrypt=None, today=None, window=None):
     """
     특정 사용자의 감정 흐름을 분석한다.
 
@@ -257,56 +258,23 @@ def analyze_emotion_flow(user_id, db_session, Diary, crypto_decrypt=None, today=
         Diary: Diary 모델 클래스
         crypto_decrypt: 복호화 함수
         today: 기준일 (테스트용)
+        window: UserDiaryWindow (여러 Phase가 같은 일기 로드/복호화 결과를 공유, 없으면 직접 로드)
 
     Returns:
         dict: 감정 흐름 분석 결과 + 플래그
     """
-    if today is None:
-        today = datetime.utcnow().date()
-    elif isinstance(today, datetime):
-        today = today.date()
-
-    cutoff_30d = (today - timedelta(days=30)).strftime('%Y-%m-%d')
-    today_str = today.strftime('%Y-%m-%d')
-
-    all_diaries = (
-        db_session.query(Diary)
-        .filter(
-            Diary.user_id == user_id,
-            Diary.date >= cutoff_30d,
-            Diary.date <= today_str
-        )
-        .order_by(Diary.date.asc())
-        .all()
-    )
+    window = UserDiaryWindow.resolve(window, user_id, db_session, Diary,
+                                     crypto_decrypt=crypto_decrypt, today=today)
+    today, today_str = window.today, window.today_str
+    all_diaries = window.diaries
 
     if not all_diaries:
-        return {
-            'user_id': user_id,
-            'analysis_date': today_str,
-            'status': 'no_data',
-            'message': '분석할 일기 데이터가 없습니다.',
-            'flags': [],
-            'flag_count': 0,
-            'has_critical': False,
-        }
-
-    # 텍스트 추출 + 복호화
-    def extract_text(diary):
-        parts = []
-        for field in [diary.event, diary.emotion_desc,
-                      diary.emotion_meaning, diary.self_talk]:
-            if field:
-                text = crypto_decrypt(field) if crypto_decrypt else field
-                if text and len(text.strip()) > 2:
-                    parts.append(text)
-        return ' '.join(parts)
+        return window.no_data_result()
 
     # ─── 일별 감정 분석 ───
     daily_results = []
     for diary in all_diaries:
-        text = extract_text(diary)
-        result = _analyze_single_diary_emotion(text)
+        result = window.feature(diary, 'emotion', lambda: _analyze_single_diary_emotion(window.text(diary)))
         if result:
             result["date"] = str(diary.date)
             result["mood_level"] = diary.mood_level
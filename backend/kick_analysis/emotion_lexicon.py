@@ -16,6 +16,8 @@
   - arousal ≤ 1.5 → 저각성 (우울, 무기력)
 """
 
+from keyword_matcher import KeywordMatcher
+
 # ─── 8개 감정 범주별 어근 사전 ───
 # 학술 감정어 868개에서 어근을 추출하고 범주별로 분류
 EMOTION_CATEGORIES = {
@@ -104,6 +106,9 @@ for category, info in EMOTION_CATEGORIES.items():
     for stem in info["stems"]:
         ALL_STEMS[stem] = category
 
+# 어근 사전 Aho–Corasick 오토마톤 (텍스트 1회 스캔으로 모든 어근 매칭)
+EMOTION_MATCHER = KeywordMatcher(ALL_STEMS)
+
 
 def match_emotions_in_text(text):
     """
@@ -117,13 +122,8 @@ def match_emotions_in_text(text):
             "diversity_ratio": float (매칭 범주 / 전체 8범주)
         }
     """
-    found = []
-    found_categories = set()
-    
-    for stem, category in ALL_STEMS.items():
-        if stem in text:
-            found.append((stem, category))
-            found_categories.add(category)
+    found = EMOTION_MATCHER.found(text)
+    found_categories = {category for _, category in found}
     
     return {
         "found_categories": found_categories,
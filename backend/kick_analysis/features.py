@@ -0,0 +1,248 @@
+"""
+마음온 킥(Kick) 분석 — 일기별 특징 저장소 (diary_features)
+=========================================================
+Phase 2~6의 일기 단위 분석 결과를 작성/수정 시점에 한 번만 계산해 저장한다.
+
+- linguistic._analyze_single_text            → 토큰/문장 수, TTR, 자기 집중도, 부정어 비율, 감정 범주
+- relational._analyze_single_diary_relational → 등장 인물 + 인물별 감정
+- emotion_flow._analyze_single_diary_emotion  → 감정 범주 / 극성
+- self_narrative._analyze_single_diary_narrative → 귀인·시제·당위·효능감·감사 표현
+- sleep_mind._score_sleep_text               → 수면 점수
+
+계산: analysis_queue 워커가 일기 분석 작업을 처리할 때 (refresh_diary_features)
+무효화: 일기 수정(enqueue 직전) / 삭제 시 invalidate_diary_features
+조회: UserDiaryWindow.feature()가 윈도우 내 일기의 특징을 한 번에 읽고, 없는 일기만 즉석 계산
+
+수동 백필 (기존 일기):
+  python -m kick_analysis.features --backfill [--user-id 42]
+"""
+
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 특징 추출 로직(사전, 토크나이저 규칙 등)이 바뀌면 올린다 → 이전 버전 행은 자동으로 무시/재계산
+FEATURES_VERSION = 1
+
+FEATURE_KINDS = ('linguistic', 'relational', 'emotion', 'narrative', 'sleep')
+
+
+def build_diary_text(event, emotion_desc, emotion_meaning, self_talk):
+    """킥 분석 공통 입력 텍스트: 복호화된 4개 필드 중 의미 있는 것만 공백으로 결합"""
+    parts = []
+    for text in (event, emotion_desc, emotion_meaning, self_talk):
+        if text and len(text.strip()) > 2:
+            parts.append(text)
+    return ' '.join(parts)
+
+
+def compute_diary_features(text, sleep_text, skip_llm_ner=False):
+    """일기 1건의 Phase별 단일 분석 결과 (JSON 직렬화 가능한 dict)"""
+    from .linguistic import _analyze_single_text
+    from .relational import _analyze_single_diary_relational
+    from .emotion_flow import _analyze_single_diary_emotion
+    from .self_narrative import _analyze_single_diary_narrative
+    from .sleep_mind import _score_sleep_text
+
+    sleep_score, pos_hits, neg_hits = _score_sleep_text(sleep_text)
+    features = {
+        'linguistic': _analyze_single_text(text),
+        'relational': _analyze_single_diary_relational(text, skip_llm=skip_llm_ner),
+        'emotion': _analyze_single_diary_emotion(text),
+        'narrative': _analyze_single_diary_narrative(text),
+        'sleep': [sleep_score, pos_hits, neg_hits],
+    }
+    # 튜플/집합 → 리스트 (저장 후 읽은 값과 같은 형태로 맞춤)
+    return json.loads(json.dumps(features, ensure_ascii=False, default=list))
+
+
+def _encrypt_payload(features):
+    from crypto_utils import crypto_manager
+    return crypto_manager.encrypt(json.dumps(features, ensure_ascii=False))
+
+
+def _decrypt_payload(payload):
+    from crypto_utils import crypto_manager
+    return json.loads(crypto_manager.decrypt(payload))
+
+
+def _scalar_columns(features):
+    lg = features.get('linguistic') or {}
+    rl = features.get('relational') or {}
+    return {
+        'word_count': lg.get('word_count'),
+        'sentence_count': lg.get('sentence_count'),
+        'char_count': lg.get('char_count'),
+        'ttr': lg.get('ttr'),
+        'self_focus': lg.get('self_focus'),
+        'negation_ratio': lg.get('negation_ratio'),
+        'people_count': rl.get('people_count'),
+        'sleep_score': features['sleep'][0],
+    }
+
+
+# ─────────────────────────────────────────────
+# 워커 (psycopg2, db_pool 공유 커넥션)
+# ─────────────────────────────────────────────
+
+def store_diary_features(conn, diary_id, features, source_version, relational_llm):
+    """
+    특징을 UPSERT한다. 계산 도중 일기가 다시 수정되어 analysis_jobs.version이 올라갔다면 저장하지 않는다.
+    (수정 요청이 이미 행을 무효화했으므로 이전 본문 기준 특징이 되살아나지 않도록)
+    Returns: 저장 여부
+    """
+    columns = _scalar_columns(features)
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO diary_features (
+                diary_id, user_id, date, features_version, source_version, relational_llm,
+                word_count, sentence_count, char_count, ttr, self_focus, negation_ratio,
+                people_count, sleep_score, payload, created_at, updated_at)
+            SELECT d.id, d.user_id, d.date, %(features_version)s, %(source_version)s, %(relational_llm)s,
+                   %(word_count)s, %(sentence_count)s, %(char_count)s, %(ttr)s, %(self_focus)s, %(negation_ratio)s,
+                   %(people_count)s, %(sleep_score)s, %(payload)s,
+                   now() AT TIME ZONE 'utc', now() AT TIME ZONE 'utc'
+              FROM diaries d
+             WHERE d.id = %(diary_id)s
+               AND (%(source_version)s IS NULL OR EXISTS (
+                    SELECT 1 FROM analysis_jobs j
+                     WHERE j.diary_id = d.id AND j.version = %(source_version)s))
+            ON CONFLICT (diary_id) DO UPDATE SET
+                date = EXCLUDED.date,
+                features_version = EXCLUDED.features_version,
+                source_version = EXCLUDED.source_version,
+                relational_llm = EXCLUDED.relational_llm,
+                word_count = EXCLUDED.word_count,
+                sentence_count = EXCLUDED.sentence_count,
+                char_count = EXCLUDED.char_count,
+                ttr = EXCLUDED.ttr,
+                self_focus = EXCLUDED.self_focus,
+                negation_ratio = EXCLUDED.negation_ratio,
+                people_count = EXCLUDED.people_count,
+                sleep_score = EXCLUDED.sleep_score,
+                payload = EXCLUDED.payload,
+                updated_at = EXCLUDED.updated_at
+        """, dict(columns, diary_id=diary_id, features_version=FEATURES_VERSION,
+                  source_version=source_version, relational_llm=relational_llm,
+                  payload=_encrypt_payload(features)))
+        stored = cur.rowcount > 0
+    conn.commit()
+    return stored
+
+
+def refresh_diary_features(conn, diary_id, event, sleep, emotion_desc, emotion_meaning, self_talk,
+                           source_version=None, skip_llm_ner=False):
+    """복호화된 일기 필드로 특징을 계산해 저장한다. (analysis_queue 워커에서 호출)"""
+    text = build_diary_text(event, emotion_desc, emotion_meaning, self_talk)
+    features = compute_diary_features(text, sleep, skip_llm_ner=skip_llm_ner)
+    return store_diary_features(conn, diary_id, features, source_version, relational_llm=not skip_llm_ner)
+
+
+# ─────────────────────────────────────────────
+# Flask 요청 컨텍스트 (SQLAlchemy 세션)
+# ─────────────────────────────────────────────
+
+def invalidate_diary_features(diary_id):
+    """일기 수정/삭제 시 저장된 특징을 제거한다. (커밋은 호출자 책임)"""
+    from models import DiaryFeature
+    DiaryFeature.query.filter_by(diary_id=diary_id).delete(synchronize_session=False)
+
+
+def load_diary_features(db_session, diary_ids):
+    """{diary_id: {kind: 결과, ..., 'relational_llm': bool}} — 현재 버전으로 계산된 행만"""
+    if not diary_ids:
+        return {}
+    from models import DiaryFeature
+
+    rows = (
+        db_session.query(DiaryFeature.diary_id, DiaryFeature.payload, DiaryFeature.relational_llm)
+        .filter(
+            DiaryFeature.diary_id.in_(list(diary_ids)),
+            DiaryFeature.features_version == FEATURES_VERSION
+        )
+        .all()
+    )
+    return decode_feature_rows(rows)
+
+
+def decode_feature_rows(rows):
+    """(diary_id, payload, relational_llm) 행 → load_diary_features 형식 (복호화는 호출한 프로세스에서)"""
+    result = {}
+    for diary_id, payload, relational_llm in rows:
+        try:
+            features = _decrypt_payload(payload)
+        except Exception as e:
+            logger.warning(f"[DiaryFeatures] 일기 {diary_id} 특징 복호화 실패 → 재계산: {e}")
+            continue
+        features['relational_llm'] = bool(relational_llm)
+        result[diary_id] = features
+    return result
+
+
+# ─────────────────────────────────────────────
+# 백필
+# ─────────────────────────────────────────────
+
+_TEXT_FIELDS = ('event', 'sleep_condition', 'emotion_desc', 'emotion_meaning', 'self_talk')
+
+
+def backfill_diary_features(user_id=None, only_missing=True, skip_llm_ner=True, chunk_size=200):
+    """특징이 없는(또는 이전 버전인) 일기를 id 순으로 계산해 채운다."""
+    from db_pool import get_conn
+    from crypto_utils import crypto_manager
+    from diary_envelope import open_pg_columns
+
+    stats = {'scanned': 0, 'stored': 0, 'errors': 0}
+    last_id = 0
+    while True:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT d.id, d.user_id, d.sealed,
+                           d.event, d.sleep_condition, d.emotion_desc, d.emotion_meaning, d.self_talk
+                      FROM diaries d
+                      LEFT JOIN diary_features f ON f.diary_id = d.id
+                     WHERE d.id > %s
+                       AND (%s IS NULL OR d.user_id = %s)
+                       AND (NOT %s OR f.id IS NULL OR f.features_version <> %s)
+                     ORDER BY d.id
+                     LIMIT %s
+                """, (last_id, user_id, user_id, only_missing, FEATURES_VERSION, chunk_size))
+                rows = cur.fetchall()
+            conn.commit()
+            if not rows:
+                break
+
+            for diary_id, owner_id, sealed, *fields in rows:
+                last_id = diary_id
+                stats['scanned'] += 1
+                try:
+                    with conn.cursor() as cur:
+                        fields = open_pg_columns(cur, owner_id, sealed, dict(zip(_TEXT_FIELDS, fields)))
+                    event, sleep, emotion_desc, emotion_meaning, self_talk = [
+                        crypto_manager.decrypt(fields[name]) or "" if fields[name] else "" for name in _TEXT_FIELDS]
+                    if refresh_diary_features(conn, diary_id, event, sleep, emotion_desc, emotion_meaning,
+                                              self_talk, skip_llm_ner=skip_llm_ner):
+                        stats['stored'] += 1
+                except Exception as e:
+                    conn.rollback()
+                    stats['errors'] += 1
+                    logger.warning(f"[DiaryFeatures] 일기 {diary_id} 백필 실패: {e}")
+        logger.info(f"[DiaryFeatures] 백필 진행: {stats} (last_id={last_id})")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="diary_features 백필")
+    parser.add_argument('--backfill', action='store_true')
+    parser.add_argument('--user-id', type=int, default=None)
+    parser.add_argument('--all', action='store_true', help="이미 있는 행도 다시 계산")
+    parser.add_argument('--llm-ner', action='store_true', help="인물 추출에 LLM NER 포함 (느림)")
+    args = parser.parse_args()
+    if args.backfill:
+        print(f"✅ {backfill_diary_features(args.user_id, only_missing=not args.all, skip_llm_ner=not args.llm_ner)}")
+    else:
+        parser.print_help()
@@ -0,0 +1,145 @@
+"""
+마음온 킥(Kick) 분석 — 공유 Kiwi 형태소 분석 서비스
+==================================================
+linguistic / relational / self_narrative가 각자 Kiwi() 싱글톤을 들고 있어 프로세스당 모델을 3번 로드했고,
+일기마다 tokenize()와 split_into_sents()를 따로 돌렸다. (relational은 _map_people_emotions에서 한 번 더)
+
+- Kiwi는 프로세스당 1개 (KIWI_NUM_WORKERS: Kiwi 내부 스레드 수, -1 = 전체 코어)
+- split_into_sents(return_tokens=True) 한 번으로 토큰과 문장을 같이 얻는다
+  (문장별 토큰을 이어 붙이면 tokenize() 결과와 동일)
+- analyze_many(texts): Kiwi의 iterable 입력으로 여러 일기를 멀티스레드 배치 분석
+- 결과는 텍스트 해시 키 LRU(KIWI_CACHE_SIZE)에 보관 → 같은 요청의 여러 Phase, 대시보드 재계산에서 재사용
+  토큰/문장은 일기 평문이므로 TTL(KIWI_CACHE_TTL) 후 만료, 일기 수정/삭제 시 forget()으로 즉시 제거
+
+사용 예:
+    from .kiwi_service import analyze_text, analyze_many
+    analyze_many([window.text(d) for d in window.diaries])   # 배치로 미리 분석 (캐시 적재)
+    tokens, sentences = analyze_text(text)                   # 캐시 적중
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+KIWI_NUM_WORKERS = int(os.environ.get('KIWI_NUM_WORKERS', '-1'))
+KIWI_CACHE_SIZE = int(os.environ.get('KIWI_CACHE_SIZE', '4096'))
+KIWI_CACHE_TTL = float(os.environ.get('KIWI_CACHE_TTL', '600'))
+
+# tokens: Token 목록 (tokenize()와 동일), sentences: Sentence 목록 (split_into_sents()와 동일)
+KiwiAnalysis = namedtuple('KiwiAnalysis', ['tokens', 'sentences'])
+
+_kiwi = None
+_kiwi_lock = threading.Lock()
+
+_cache = OrderedDict()  # 텍스트 해시 → (만료 시각, KiwiAnalysis)
+_cache_lock = threading.Lock()
+
+
+def get_kiwi():
+    """Kiwi 싱글톤 (서버 기동 시 1회만 로드)"""
+    global _kiwi
+    if _kiwi is None:
+        with _kiwi_lock:
+            if _kiwi is None:
+                from kiwipiepy import Kiwi
+                _kiwi = Kiwi(num_workers=KIWI_NUM_WORKERS)
+    return _kiwi
+
+
+def _key(text):
+    return hashlib.sha1(text.encode('utf-8')).digest()
+
+
+def _cache_get(key):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return entry[1]
+
+
+def _cache_put(key, value):
+    if KIWI_CACHE_SIZE <= 0:
+        return
+    with _cache_lock:
+        _cache[key] = (time.monotonic() + KIWI_CACHE_TTL, value)
+        _cache.move_to_end(key)
+        while len(_cache) > KIWI_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _to_analysis(sentences):
+    tokens = [token for sent in sentences for token in (sent.tokens or [])]
+    return KiwiAnalysis(tokens, sentences)
+
+
+def analyze_text(text):
+    """단일 텍스트의 (토큰, 문장). 캐시에 있으면 재사용. 분석 실패 시 예외를 그대로 올린다."""
+    key = _key(text)
+    cached = _cache_get(key)
+    if cached is None:
+        cached = _to_analysis(get_kiwi().split_into_sents(text, return_tokens=True))
+        _cache_put(key, cached)
+    return cached
+
+
+def analyze_many(texts):
+    """
+    여러 텍스트를 배치로 분석한다. 캐시에 없는 텍스트만 Kiwi에 iterable로 넘겨 멀티스레드로 처리.
+    빈 텍스트는 None, 개별 분석 실패도 None.
+
+    Returns:
+        list: texts와 같은 순서의 KiwiAnalysis (또는 None)
+    """
+    results = [None] * len(texts)
+    missing = {}  # key → (text, [index, ...]) — 같은 텍스트는 한 번만 분석
+    for idx, text in enumerate(texts):
+        if not text:
+            continue
+        key = _key(text)
+        cached = _cache_get(key)
+        if cached is not None:
+            results[idx] = cached
+        else:
+            missing.setdefault(key, (text, []))[1].append(idx)
+
+    if missing:
+        keys = list(missing)
+        try:
+            analyzed = get_kiwi().split_into_sents([missing[k][0] for k in keys], return_tokens=True)
+            for key, sentences in zip(keys, analyzed):
+                value = _to_analysis(sentences)
+                _cache_put(key, value)
+                for idx in missing[key][1]:
+                    results[idx] = value
+        except Exception as e:
+            # 배치 중 하나가 실패하면 남은 텍스트는 개별 분석으로 (실패한 텍스트만 None)
+            print(f"⚠️ [KiwiService] 배치 분석 실패 → 개별 분석: {e}")
+            for key in keys:
+                text, indices = missing[key]
+                try:
+                    value = analyze_text(text)
+                except Exception:
+                    value = None
+                for idx in indices:
+                    results[idx] = value
+    return results
+
+
+def forget(texts):
+    """일기 수정/삭제 시 해당 텍스트의 분석 결과(평문 토큰/문장)를 즉시 제거"""
+    keys = [_key(text) for text in texts if text]
+    with _cache_lock:
+        for key in keys:
+            _cache.pop(key, None)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -14,19 +14,11 @@ LLM 사용 없음. CPU 연산만으로 처리.
 5. 감정어 다양성 — 8개 범주 중 몇 개를 사용하는가
 """
 
-from kiwipiepy import Kiwi
-from datetime import datetime, timedelta
+from datetime import datetime
 from sqlalchemy import func
+from .corpus import UserDiaryWindow, prefetch_kiwi
 from .emotion_lexicon import match_emotions_in_text
-
-# Kiwi 싱글톤 (서버 기동 시 1회만 로드)
-_kiwi = None
-
-def _get_kiwi():
-    global _kiwi
-    if _kiwi is None:
-        _kiwi = Kiwi()
-    return _kiwi
+from .kiwi_service import analyze_text
 
 
 def _analyze_single_text(text):
@@ -37,11 +29,8 @@ def _analyze_single_text(text):
     if not text or len(text.strip()) < 10:
         return None
     
-    kiwi = _get_kiwi()
-    
     try:
-        tokens = kiwi.tokenize(text)
-        sentences = kiwi.split_into_sents(text)
+        tokens, sentences = analyze_text(text)
     except Exception:
         return None
     
@@ -141,7 +130,7 @@ def _compute_deviation(current, baseline):
     return deviations
 
 
-def analyze_linguistic(user_id, db_session, Diary, crypto_decrypt=None, today=None):
+def analyze_linguistic(user_id, db_session, Diary, crypto_decrypt=None, today=None, window=None):
     """
     특정 사용자의 언어 지문을 분석한다.
     
@@ -151,62 +140,27 @@ def analyze_linguistic(user_id, db_session, Diary, crypto_decrypt=None, today=No
         Diary: Diary 모델 클래스
         crypto_decrypt: 복호화 함수 (text -> plain text)
         today: 기준일 (테스트용)
+        window: UserDiaryWindow (여러 Phase가 같은 일기 로드/복호화 결과를 공유, 없으면 직접 로드)
     
     Returns:
         dict: 언어 지문 분석 결과 + Baseline 비교 + 플래그
     """
-    if today is None:
-        today = datetime.utcnow().date()
-    elif isinstance(today, datetime):
-        today = today.date()
-    
-    # ─── 전체 일기 로드 (최근 30일) ───
-    cutoff_30d = (today - timedelta(days=30)).strftime('%Y-%m-%d')
-    cutoff_7d = (today - timedelta(days=6)).strftime('%Y-%m-%d')
-    today_str = today.strftime('%Y-%m-%d')
-    
-    all_diaries = (
-        db_session.query(Diary)
-        .filter(
-            Diary.user_id == user_id,
-            Diary.date >= cutoff_30d,
-            Diary.date <= today_str
-        )
-        .order_by(Diary.date.asc())
-        .all()
-    )
-    
+    window = UserDiaryWindow.resolve(window, user_id, db_session, Diary,
+                                     crypto_decrypt=crypto_decrypt, today=today)
+    today, today_str = window.today, window.today_str
+    all_diaries = window.diaries
+
     if not all_diaries:
-        return {
-            'user_id': user_id,
-            'analysis_date': today_str,
-            'status': 'no_data',
-            'message': '분석할 일기 데이터가 없습니다.',
-            'flags': [],
-            'flag_count': 0,
-            'has_critical': False,
-        }
-    
-    # ─── 텍스트 추출 + 복호화 ───
-    def extract_text(diary):
-        parts = []
-        for field in [diary.event, diary.emotion_desc,
-                      diary.emotion_meaning, diary.self_talk]:
-            if field:
-                text = crypto_decrypt(field) if crypto_decrypt else field
-                if text and len(text.strip()) > 2:
-                    parts.append(text)
-        return ' '.join(parts)
-    
+        return window.no_data_result()
+
     # ─── Baseline: 이전 기간 (8~30일 전) ───
-    baseline_diaries = [d for d in all_diaries if d.date < cutoff_7d]
-    recent_diaries = [d for d in all_diaries if d.date >= cutoff_7d]
+    baseline_diaries = window.baseline_diaries
+    recent_diaries = window.recent_diaries
     
     # Baseline 분석
     baseline_analyses = []
     for d in baseline_diaries:
-        text = extract_text(d)
-        result = _analyze_single_text(text)
+        result = window.feature(d, 'linguistic', lambda: _analyze_single_text(window.text(d)))
         if result:
             result['date'] = d.date
             baseline_analyses.append(result)
@@ -216,8 +170,7 @@ def analyze_linguistic(user_id, db_session, Diary, crypto_decrypt=None, today=No
     # 최근 7일 분석
     recent_analyses = []
     for d in recent_diaries:
-        text = extract_text(d)
-        result = _analyze_single_text(text)
+        result = window.feature(d, 'linguistic', lambda: _analyze_single_text(window.text(d)))
         if result:
             result['date'] = d.date
             recent_analyses.append(result)
@@ -326,9 +279,12 @@ def analyze_all_users_linguistic(db_session, User, Diary, crypto_decrypt=None,
     flagged_users = []
     
     for user in users:
+        # 30일 일기 중 즉석 분석할 텍스트를 Kiwi 배치(멀티스레드)로 먼저 분석
+        window = UserDiaryWindow(user.id, db_session, Diary, crypto_decrypt=crypto_decrypt, today=today)
+        prefetch_kiwi([window])
         result = analyze_linguistic(
             user.id, db_session, Diary,
-            crypto_decrypt=crypto_decrypt, today=today
+            crypto_decrypt=crypto_decrypt, today=today, window=window
         )
         if result.get('flag_count', 0) > 0:
             result['username'] = user.username
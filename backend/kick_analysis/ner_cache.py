@@ -0,0 +1,89 @@
+"""
+마음온 킥(Kick) 분석 — 관계 분석 LLM NER 캐시 (diary_ner_cache)
+==============================================================
+relational의 LLM 인물 추출(_extract_people_llm)은 Ollama 요청(최대 10초)이라
+30일 윈도우의 일기마다 호출하면 /api/kick/my-insights 한 번에 수십 번의 순차 LLM 호출이 생겼다.
+
+- 추출 결과를 (diary_id, content_hash)로 저장 → 같은 본문이면 재사용, 수정되면 해시가 달라져 재추출
+- 캐시에 없는 일기만 relational._extract_people_llm_batch로 묶어서 요청
+- 인물 이름은 암호화해서 저장
+
+Flask 요청에서는 UserDiaryWindow.db_session으로 읽고 쓰며,
+DB 세션이 없는 대시보드 워커는 메인 프로세스가 미리 읽어 넘긴 캐시를 쓰고 새 결과를 돌려보낸다.
+"""
+
+import os
+import json
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+NER_MODEL = "gemma4:2b"
+NER_INPUT_CHARS = 500  # LLM 프롬프트에 넣는 텍스트 길이 (해시도 이 범위로 계산)
+NER_BATCH_SIZE = int(os.environ.get('KICK_NER_BATCH_SIZE', '8'))  # LLM 요청 1번에 묶는 일기 수
+
+
+def content_hash(text):
+    """LLM 입력 텍스트 기준 해시 (프롬프트에 들어가지 않는 뒷부분 수정은 재추출하지 않음)"""
+    return hashlib.sha256(text[:NER_INPUT_CHARS].encode('utf-8')).hexdigest()
+
+
+def query_ner_rows(db_session, diary_ids):
+    """현재 모델로 추출한 캐시 행 [(diary_id, content_hash, 암호화 names), ...]"""
+    if not diary_ids:
+        return []
+    from models import DiaryNerCache
+
+    return [
+        tuple(r) for r in
+        db_session.query(DiaryNerCache.diary_id, DiaryNerCache.content_hash, DiaryNerCache.names)
+        .filter(DiaryNerCache.diary_id.in_(list(diary_ids)), DiaryNerCache.model == NER_MODEL)
+        .all()
+    ]
+
+
+def decode_ner_rows(rows):
+    """query_ner_rows 행 → {diary_id: (content_hash, names)} (복호화는 호출한 프로세스에서)"""
+    from crypto_utils import crypto_manager
+
+    result = {}
+    for diary_id, hash_value, names in rows:
+        try:
+            result[diary_id] = (hash_value, json.loads(crypto_manager.decrypt(names)))
+        except Exception as e:
+            logger.warning(f"[NerCache] 일기 {diary_id} 캐시 복호화 실패 → 재추출: {e}")
+    return result
+
+
+def load_ner_cache(db_session, diary_ids):
+    """{diary_id: (content_hash, names)}"""
+    return decode_ner_rows(query_ner_rows(db_session, diary_ids))
+
+
+def store_ner_cache(db_session, entries):
+    """entries: {diary_id: (content_hash, names)} UPSERT 후 커밋"""
+    if not entries:
+        return
+    from models import DiaryNerCache
+    from crypto_utils import crypto_manager
+
+    existing = {
+        row.diary_id: row for row in
+        db_session.query(DiaryNerCache).filter(DiaryNerCache.diary_id.in_(list(entries))).all()
+    }
+    for diary_id, (hash_value, names) in entries.items():
+        row = existing.get(diary_id)
+        if row is None:
+            row = DiaryNerCache(diary_id=diary_id)
+            db_session.add(row)
+        row.content_hash = hash_value
+        row.model = NER_MODEL
+        row.names = crypto_manager.encrypt(json.dumps(names, ensure_ascii=False))
+    db_session.commit()
+
+
+def invalidate_ner_cache(diary_id):
+    """일기 삭제 시 캐시 행 제거 (커밋은 호출자 책임)"""
+    from models import DiaryNerCache
+    DiaryNerCache.query.filter_by(diary_id=diary_id).delete(synchronize_session=False)
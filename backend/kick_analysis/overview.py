@@ -0,0 +1,461 @@
+"""
+마음온 킥(Kick) 분석 — 의료진 대시보드 전체 요약 (병렬 계산)
+=============================================================
+_build_dashboard_overview는 analyze_all_users_* 6개를 요청 스레드에서 차례로 돌렸다.
+Phase 2~6은 사용자마다 Fernet 복호화 + Kiwi 형태소 분석이라 CPU 1코어로 수 분이 걸렸다.
+
+- Phase 1(시계열): analyze_timeseries_bulk 집계 쿼리 (메인 프로세스)
+- Phase 2~6: 사용자를 청크로 나눠 ProcessPoolExecutor 워커에 분배
+    · 메인 프로세스는 청크 사용자들의 30일 일기(암호문)와 diary_features 행만 한 번에 조회
+    · 워커는 시작 시 Kiwi를 한 번 로드하고, 청크를 받아 복호화 → Kiwi 배치 분석 → Phase 2~6 실행
+      (Kiwi 내부 스레드는 코어 수 / 워커 수 — 워커마다 전체 코어 스레드를 띄우면 과다 구독)
+    · 청크 조회/전송은 워커당 OVERVIEW_INFLIGHT_PER_WORKER개까지만 앞서 가고, 결과가 오는 대로 다음 청크를 보낸다
+    · 플래그가 있는 사용자 결과만 돌려받아 Phase별로 합친다
+- 계산은 백그라운드 스레드에서 진행 → 엔드포인트는 진행률과 지금까지 합친 부분 결과를 바로 반환
+- 완료 결과는 KICK_OVERVIEW_CACHE_TTL초 동안 캐시
+
+KICK_OVERVIEW_WORKERS=1이면 프로세스 풀 없이 같은 청크 처리를 백그라운드 스레드에서 순차 실행한다.
+"""
+
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+OVERVIEW_WORKERS = int(os.environ.get('KICK_OVERVIEW_WORKERS', str(os.cpu_count() or 1)))
+OVERVIEW_CHUNK_USERS = int(os.environ.get('KICK_OVERVIEW_CHUNK_USERS', '20'))
+OVERVIEW_CACHE_TTL = int(os.environ.get('KICK_OVERVIEW_CACHE_TTL', '300'))
+OVERVIEW_INFLIGHT_PER_WORKER = int(os.environ.get('KICK_OVERVIEW_INFLIGHT_PER_WORKER', '2'))
+
+# (phase 키, 라벨) — 통합 플래그 정렬 전 순서
+PHASES = [
+    ('timeseries', '시계열'),
+    ('linguistic', '언어 지문'),
+    ('relational', '관계 지형도'),
+    ('emotion_flow', '감정 흐름'),
+    ('sleep_mind', '수면-마음'),
+    ('self_narrative', '자기 서사'),
+]
+WORKER_PHASES = [key for key, _ in PHASES if key != 'timeseries']
+
+# 워커로 보내는 일기 컬럼 (Phase 2~6이 읽는 필드만)
+_DIARY_COLUMNS = ('id', 'user_id', 'date', 'mood_level',
+                  'event', 'emotion_desc', 'emotion_meaning', 'self_talk', 'sleep_condition', 'sealed')
+_TEXT_COLUMNS = ('event', 'emotion_desc', 'emotion_meaning', 'self_talk', 'sleep_condition')
+
+
+# ─────────────────────────────────────────────
+# 워커 프로세스
+# ─────────────────────────────────────────────
+
+_worker_decrypt = None
+
+
+def _init_worker(kiwi_threads=1):
+    """워커 시작 시 1회: Kiwi 로드 (내부 스레드 kiwi_threads개) + 복호화 함수 준비"""
+    global _worker_decrypt
+    try:
+        from crypto_utils import crypto_manager
+        _worker_decrypt = crypto_manager.decrypt  # 실패 시 원문 반환 (app.safe_decrypt와 동일)
+    except Exception as e:
+        print(f"⚠️ [KickOverview] 워커 {os.getpid()} 복호화 초기화 실패 → 원문 사용: {e}")
+        _worker_decrypt = None
+
+    from . import kiwi_service
+    kiwi_service.KIWI_NUM_WORKERS = kiwi_threads
+    kiwi_service.get_kiwi()
+
+
+def _phase_functions():
+    from .linguistic import analyze_linguistic
+    from .relational import analyze_relational
+    from .emotion_flow import analyze_emotion_flow
+    from .sleep_mind import analyze_sleep_mind
+    from .self_narrative import analyze_self_narrative
+    return {
+        'linguistic': analyze_linguistic,
+        'relational': analyze_relational,
+        'emotion_flow': analyze_emotion_flow,
+        'sleep_mind': analyze_sleep_mind,
+        'self_narrative': analyze_self_narrative,
+    }
+
+
+def _diary_namespace(row, wrapped_keys):
+    """_DIARY_COLUMNS 행 튜플 → 일기 객체 (봉투 형식이면 필드를 연 값으로)"""
+    diary = SimpleNamespace(**dict(zip(_DIARY_COLUMNS, row)))
+    if diary.sealed is not None:
+        from diary_envelope import open_columns
+        columns = {name: getattr(diary, name) for name in _TEXT_COLUMNS}
+        try:
+            opened = open_columns(diary.user_id, diary.sealed, columns, (wrapped_keys or {}).get(diary.user_id))
+        except Exception as e:
+            print(f"⚠️ [KickOverview] 일기 {diary.id} 봉인 열기 실패: {e}")
+            opened = columns
+        for name, value in opened.items():
+            setattr(diary, name, value)
+    return diary
+
+
+def analyze_user_chunk(today, user_diaries, feature_rows, crypto_decrypt=None, ner_rows=(), wrapped_keys=None):
+    """
+    사용자 청크의 Phase 2~6 분석. (워커 프로세스 또는 순차 실행에서 호출)
+
+    Args:
+        today: 기준일 (date)
+        user_diaries: [(user_id, [일기 행 튜플(_DIARY_COLUMNS 순서), ...]), ...]
+        feature_rows: [(diary_id, payload, relational_llm), ...] — 암호화된 diary_features 행
+        ner_rows: [(diary_id, content_hash, names), ...] — 암호화된 diary_ner_cache 행
+        wrapped_keys: {user_id: 감싼 데이터 키} — 봉투 형식(sealed) 일기가 있는 사용자
+        crypto_decrypt: 없으면 워커 초기화 때 준비한 복호화 함수
+
+    Returns:
+        dict: {phase: [(user_id, 결과), ...]} — 플래그가 있는 사용자만, 실패한 (사용자, phase) 수는 'errors',
+              새로 추출한 LLM NER 결과 {diary_id: (content_hash, names)}는 'ner_updates' (메인 프로세스가 저장)
+    """
+    from .corpus import UserDiaryWindow, prefetch_kiwi
+    from .features import decode_feature_rows
+    from .ner_cache import decode_ner_rows
+
+    decrypt = crypto_decrypt or _worker_decrypt
+    features = decode_feature_rows(feature_rows)
+    ner_cache = decode_ner_rows(ner_rows)
+    phase_functions = _phase_functions()
+    flagged = {phase: [] for phase in WORKER_PHASES}
+    errors = 0
+
+    windows = []
+    for user_id, rows in user_diaries:
+        diaries = [_diary_namespace(row, wrapped_keys) for row in rows]
+        windows.append(UserDiaryWindow(
+            user_id, None, None, crypto_decrypt=decrypt, today=today, diaries=diaries,
+            features={d.id: features[d.id] for d in diaries if d.id in features},
+            ner_cache={d.id: ner_cache[d.id] for d in diaries if d.id in ner_cache}
+        ))
+    # 청크 전체에서 즉석 분석할 텍스트를 Kiwi 배치로 한 번에 (relational은 LLM NER 포함 특징만 재사용)
+    prefetch_kiwi(windows, accept=lambda f: f.get('relational_llm'))
+
+    for window in windows:
+        user_id = window.user_id
+        for phase in WORKER_PHASES:
+            try:
+                result = phase_functions[phase](user_id, None, None, window=window)
+            except Exception as e:
+                errors += 1
+                print(f"⚠️ [KickOverview] user={user_id} {phase} 실패: {e}")
+                continue
+            if result.get('flag_count', 0) > 0:
+                flagged[phase].append((user_id, result))
+
+    flagged['errors'] = errors
+    flagged['ner_updates'] = {k: v for window in windows for k, v in window.ner_updates.items()}
+    return flagged
+
+
+# ─────────────────────────────────────────────
+# 메인 프로세스: 청크 조회 / 프로세스 풀
+# ─────────────────────────────────────────────
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """프로세스 풀 싱글톤 (워커의 Kiwi를 다음 계산에서도 재사용)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # fork는 Flask/DB 커넥션/스레드 상태를 복제하므로 spawn 사용 (batch_update_ai와 동일)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(max(1, (os.cpu_count() or 1) // workers),),
+            )
+            print(f"✅ [KickOverview] 프로세스 풀 시작 (워커 {workers}개)")
+        return _pool
+
+
+def _reset_pool(pool=None):
+    """풀 종료 후 초기화 (pool을 주면 그 풀이 아직 현재 풀일 때만 — 이미 새로 만든 풀은 유지)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and (pool is None or _pool is pool):
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _load_chunk(db_session, Diary, user_ids, today):
+    """
+    청크 사용자들의 30일 일기(암호문 그대로) + diary_features / diary_ner_cache 행을 쿼리 3개로 조회
+    (봉투 형식 일기가 있으면 그 사용자들의 감싼 데이터 키도 조회 → 복호화는 워커에서)
+    """
+    from .corpus import UserDiaryWindow
+    from .features import FEATURES_VERSION
+    from .ner_cache import query_ner_rows
+    from diary_envelope import query_wrapped_keys
+    from models import DiaryFeature
+
+    cutoff = (today - timedelta(days=UserDiaryWindow.DEFAULT_DAYS)).strftime('%Y-%m-%d')
+    rows = (
+        db_session.query(*[getattr(Diary, c) for c in _DIARY_COLUMNS])
+        .filter(
+            Diary.user_id.in_(user_ids),
+            Diary.date >= cutoff,
+            Diary.date <= today.strftime('%Y-%m-%d')
+        )
+        .order_by(Diary.user_id, Diary.date.asc(), Diary.id.asc())
+        .all()
+    )
+    by_user = {user_id: [] for user_id in user_ids}
+    for row in rows:
+        by_user[row.user_id].append(tuple(row))
+
+    diary_ids = [row.id for row in rows]
+    feature_rows = []
+    if diary_ids:
+        feature_rows = [
+            tuple(r) for r in db_session.query(
+                DiaryFeature.diary_id, DiaryFeature.payload, DiaryFeature.relational_llm)
+            .filter(
+                DiaryFeature.diary_id.in_(diary_ids),
+                DiaryFeature.features_version == FEATURES_VERSION
+            )
+            .all()
+        ]
+    wrapped_keys = query_wrapped_keys(db_session, {row.user_id for row in rows if row.sealed is not None})
+    return list(by_user.items()), feature_rows, query_ner_rows(db_session, diary_ids), wrapped_keys
+
+
+# ─────────────────────────────────────────────
+# 계산 작업 (백그라운드 스레드) + 부분 결과
+# ─────────────────────────────────────────────
+
+def merge_overview(phase_results, total_users):
+    """
+    Phase별 flagged_users → 대시보드 통합 요약.
+    phase_results: {phase: analyze_all_users_* 결과의 flagged_users 목록}
+    """
+    all_flags = []
+    for phase_key, phase_label in PHASES:
+        for user_data in phase_results.get(phase_key, []):
+            for flag in user_data.get('flags', []):
+                all_flags.append({
+                    'phase': phase_key,
+                    'phase_label': phase_label,
+                    'username': user_data.get('username', ''),
+                    'real_name': user_data.get('real_name', ''),
+                    'user_id': user_data.get('user_id'),
+                    **flag
+                })
+
+    # 심각도순 정렬
+    severity_order = {'high': 0, 'medium': 1, 'low': 2}
+    all_flags.sort(key=lambda x: severity_order.get(x.get('severity', 'low'), 3))
+
+    # 요약 통계
+    severity_counts = {'high': 0, 'medium': 0, 'low': 0}
+    phase_counts = {phase_key: 0 for phase_key, _ in PHASES}
+    for f in all_flags:
+        severity_counts[f.get('severity', 'low')] = severity_counts.get(f.get('severity', 'low'), 0) + 1
+        phase_counts[f.get('phase', '')] = phase_counts.get(f.get('phase', ''), 0) + 1
+
+    flagged_user_ids = set(f.get('user_id') for f in all_flags if f.get('user_id'))
+
+    return {
+        'total_users': total_users,
+        'flagged_user_count': len(flagged_user_ids),
+        'total_flags': len(all_flags),
+        'by_severity': severity_counts,
+        'by_phase': phase_counts,
+        'flags': all_flags,
+    }
+
+
+class _OverviewJob:
+    """전체 요약 계산 1회분의 진행 상태 (백그라운드 스레드가 갱신, 요청 스레드가 snapshot)"""
+
+    def __init__(self, today):
+        self.today = today
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.users = []            # [(user_id, username, real_name)] — 정렬 기준 순서
+        self.results = {phase: {} for phase, _ in PHASES}   # {phase: {user_id: 결과}}
+        self.processed_users = 0
+        self.errors = 0
+        self.done = False
+        self.finished_at = None
+        self.error = None
+        self.thread = None
+
+    def add(self, phase, user_id, result):
+        with self.lock:
+            self.results[phase][user_id] = result
+
+    def snapshot(self):
+        """지금까지 합친 결과 (analyze_all_users_*와 같은 사용자 순서/정렬)"""
+        with self.lock:
+            phase_results = {}
+            for phase, _ in PHASES:
+                flagged = []
+                for user_id, username, real_name in self.users:
+                    result = self.results[phase].get(user_id)
+                    if result is not None:
+                        result['username'] = username
+                        result['real_name'] = real_name
+                        flagged.append(result)
+                flagged.sort(key=lambda x: (-int(x.get('has_critical', False)), -x['flag_count']))
+                phase_results[phase] = flagged
+            total_users = len(self.users)
+            progress = {
+                'processed_users': self.processed_users,
+                'total_users': total_users,
+                'percent': round(self.processed_users / max(total_users, 1) * 100, 1),
+                'errors': self.errors,
+                'elapsed_sec': round(time.time() - self.started_at, 1),
+            }
+            status = 'error' if self.error else ('done' if self.done else 'computing')
+
+        overview = merge_overview(phase_results, total_users)
+        overview['status'] = status
+        overview['progress'] = progress
+        overview['analysis_date'] = self.today.strftime('%Y-%m-%d')
+        if self.error:
+            overview['error'] = self.error
+        return overview
+
+
+def _run_job(job, app, User, Diary, crypto_decrypt, workers, chunk_size):
+    from models import db
+    from . import analyze_timeseries_bulk
+    from .ner_cache import store_ner_cache
+
+    with app.app_context():
+        try:
+            users = db.session.query(User.id, User.username, User.real_name).order_by(User.id).all()
+            timeseries = analyze_timeseries_bulk(db.session, Diary, job.today)
+            with job.lock:
+                job.users = [tuple(u) for u in users]
+            for user_id, result in timeseries.items():
+                if result['flag_count'] > 0:
+                    job.add('timeseries', user_id, result)
+
+            user_ids = [u.id for u in users]
+            chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+
+            def _collect(chunk_user_count, flagged):
+                if flagged.get('ner_updates'):
+                    try:
+                        store_ner_cache(db.session, flagged['ner_updates'])
+                    except Exception as e:
+                        print(f"⚠️ [KickOverview] NER 캐시 저장 실패: {e}")
+                        db.session.rollback()
+                for phase in WORKER_PHASES:
+                    for user_id, result in flagged[phase]:
+                        job.add(phase, user_id, result)
+                with job.lock:
+                    job.processed_users += chunk_user_count
+                    job.errors += flagged['errors']
+
+            if workers <= 1:
+                for chunk in chunks:
+                    user_diaries, feature_rows, ner_rows, wrapped_keys = _load_chunk(
+                        db.session, Diary, chunk, job.today)
+                    _collect(len(chunk), analyze_user_chunk(job.today, user_diaries, feature_rows,
+                                                            crypto_decrypt=crypto_decrypt, ner_rows=ner_rows,
+                                                            wrapped_keys=wrapped_keys))
+            else:
+                pool = _get_pool(workers)
+                inflight = max(1, workers * OVERVIEW_INFLIGHT_PER_WORKER)
+                pending = {}
+                next_chunk = 0
+                while pending or next_chunk < len(chunks):
+                    # 워커가 놀지 않을 만큼만 미리 조회/전송 → 첫 결과가 전체 조회를 기다리지 않음
+                    while next_chunk < len(chunks) and len(pending) < inflight:
+                        chunk = chunks[next_chunk]
+                        next_chunk += 1
+                        user_diaries, feature_rows, ner_rows, wrapped_keys = _load_chunk(
+                            db.session, Diary, chunk, job.today)
+                        db.session.rollback()  # 조회 트랜잭션을 계산 동안 열어두지 않음
+                        try:
+                            future = pool.submit(analyze_user_chunk, job.today, user_diaries, feature_rows,
+                                                 ner_rows=ner_rows, wrapped_keys=wrapped_keys)
+                        except Exception as e:
+                            print(f"⚠️ [KickOverview] 청크 전송 실패: {e}")
+                            _reset_pool(pool)
+                            pool = _get_pool(workers)
+                            with job.lock:
+                                job.processed_users += len(chunk)
+                                job.errors += len(chunk)
+                            continue
+                        pending[future] = len(chunk)
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        chunk_user_count = pending.pop(future)
+                        try:
+                            _collect(chunk_user_count, future.result())
+                        except Exception as e:
+                            # 워커가 죽으면(BrokenProcessPool) 풀을 새로 만들어 남은 청크를 보낸다
+                            print(f"⚠️ [KickOverview] 청크 실패: {e}")
+                            _reset_pool(pool)
+                            pool = _get_pool(workers)
+                            with job.lock:
+                                job.processed_users += chunk_user_count
+                                job.errors += chunk_user_count
+            with job.lock:
+                job.done = True
+                job.finished_at = time.time()
+            print(f"✅ [KickOverview] 전체 요약 완료: {len(user_ids)}명, "
+                  f"{time.time() - job.started_at:.1f}s (워커 {workers}개)")
+        except Exception as e:
+            logger.exception("[KickOverview] 전체 요약 계산 실패")
+            with job.lock:
+                job.error = str(e)
+        finally:
+            db.session.remove()
+
+
+_state = {'job': None}
+_state_lock = threading.Lock()
+
+
+def get_dashboard_overview(app, User, Diary, crypto_decrypt=None, today=None, wait=False,
+                           workers=None, chunk_size=None):
+    """
+    의료진 대시보드 전체 요약. 캐시가 유효하면 캐시, 계산 중이면 진행률 + 부분 결과를 바로 반환한다.
+
+    Args:
+        app: Flask 앱 (백그라운드 스레드의 app_context용)
+        wait: True면 계산이 끝날 때까지 기다린 뒤 반환 (CLI/테스트용)
+
+    Returns:
+        dict: merge_overview 결과 + status('computing'/'done'/'error') + progress
+    """
+    if today is None:
+        today = datetime.utcnow().date()
+    elif isinstance(today, datetime):
+        today = today.date()
+    workers = OVERVIEW_WORKERS if workers is None else workers
+    chunk_size = chunk_size or OVERVIEW_CHUNK_USERS
+
+    with _state_lock:
+        job = _state['job']
+        reusable = job is not None and job.today == today and not job.error and (
+            not job.done or time.time() - job.finished_at < OVERVIEW_CACHE_TTL)
+        if not reusable:
+            job = _state['job'] = _OverviewJob(today)
+            job.thread = threading.Thread(
+                target=_run_job, args=(job, app, User, Diary, crypto_decrypt, workers, chunk_size),
+                name='kick-overview', daemon=True)
+            job.thread.start()
+
+    if wait:
+        job.thread.join()
+    return job.snapshot()
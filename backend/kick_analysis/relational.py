@@ -18,19 +18,13 @@
 LLM 사용: 없음. Kiwi + 사전 매칭.
 """
 
-from kiwipiepy import Kiwi
-from datetime import datetime, timedelta
+from datetime import datetime
 from collections import defaultdict
-from .emotion_lexicon import match_emotions_in_text, EMOTION_CATEGORIES, ALL_STEMS
-
-# Kiwi 싱글톤 (linguistic.py와 공유)
-_kiwi = None
-
-def _get_kiwi():
-    global _kiwi
-    if _kiwi is None:
-        _kiwi = Kiwi()
-    return _kiwi
+from .corpus import UserDiaryWindow, prefetch_kiwi
+from keyword_matcher import KeywordMatcher
+from .emotion_lexicon import match_emotions_in_text, EMOTION_CATEGORIES, EMOTION_MATCHER
+from .kiwi_service import analyze_text
+from .ner_cache import NER_MODEL, NER_INPUT_CHARS, NER_BATCH_SIZE, content_hash
 
 
 # ─── 호칭 사전 ───
@@ -69,6 +63,10 @@ KINSHIP_DICT = {
     "목사님": "사회", "신부님": "사회", "스님": "사회",
 }
 
+# 호칭 사전 오토마톤 + 긴 호칭 우선 순서 (모듈 로드 시 1회)
+KINSHIP_MATCHER = KeywordMatcher(KINSHIP_DICT)
+_SORTED_KINSHIPS = sorted(KINSHIP_DICT.keys(), key=len, reverse=True)
+
 # ─── 한국어 접미 패턴 (사람 이름 + 접미사) ───
 # 확실도 높은 접미사만 사용 (씨, 한테, 에게, 야/아 호격 등)
 # "야/아"는 문장 끝에서 호칭으로 쓰일 때만 유효 → 별도 패턴
@@ -128,12 +126,11 @@ def _extract_people_kiwi_nnp(text):
     Returns:
         list of str: 추출된 고유명사 후보 목록
     """
-    kiwi = _get_kiwi()
     results = []
     seen = set()
     
     try:
-        tokens = kiwi.tokenize(text)
+        tokens = analyze_text(text).tokens
         for i, token in enumerate(tokens):
             # NNP = 고유명사, 2~3글자 (한국 이름 길이)
             if token.tag == 'NNP' and 2 <= len(token.form) <= 3:
@@ -179,15 +176,8 @@ def _extract_people_suffix_pattern(text):
     return results
 
 
-def _extract_people_llm(text):
-    """
-    서버 LLM(Ollama)을 사용하여 텍스트에서 사람 이름만 추출한다.
-    LLM은 문맥을 이해하므로 '강남에서 쇼핑'(지역)과 '강남이랑 노래'(사람)를 구분.
-    
-    Returns:
-        list of str: 추출된 사람 이름 목록
-    """
-    import requests
+def _request_people_llm(text):
+    """단일 텍스트 LLM NER. 실패(응답 없음/파싱 불가) 시 None — 캐시하지 않고 다음에 재시도"""
     import json
     
     prompt = (
@@ -196,35 +186,118 @@ def _extract_people_llm(text):
         "사람이 없으면 빈 리스트를 반환해.\n"
         "반드시 JSON 배열 형식으로만 답해. 설명 없이 배열만.\n"
         "예시: [\"성희\", \"엄마\", \"팀장\"]\n\n"
-        f"텍스트: {text[:500]}\n\n"
+        f"텍스트: {text[:NER_INPUT_CHARS]}\n\n"
         "추출된 사람:"
     )
     
     try:
-        res = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "gemma4:2b",
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": 0.1, "num_predict": 100}
-            },
+        from llm_gateway import generate
+        response_text = generate(
+            prompt,
+            model=NER_MODEL,
+            options={"temperature": 0.1, "num_predict": 100},
             timeout=10
-        )
-        if res.status_code == 200:
-            response_text = res.json().get('response', '').strip()
+        ).strip()
+        if response_text:
             # JSON 배열 추출
             match = re.search(r'\[.*?\]', response_text, re.DOTALL)
             if match:
-                names = json.loads(match.group())
-                return [n for n in names if isinstance(n, str) and 1 <= len(n) <= 4]
+                return _filter_llm_names(json.loads(match.group()))
     except Exception as e:
         print(f"⚠️ LLM NER 실패 (호칭 사전으로 fallback): {e}")
     
-    return []
+    return None
+
+
+def _filter_llm_names(names):
+    if not isinstance(names, list):
+        return None
+    return [n for n in names if isinstance(n, str) and 1 <= len(n) <= 4]
+
+
+def _extract_people_llm(text):
+    """
+    서버 LLM(Ollama)을 사용하여 텍스트에서 사람 이름만 추출한다.
+    LLM은 문맥을 이해하므로 '강남에서 쇼핑'(지역)과 '강남이랑 노래'(사람)를 구분.
+    
+    Returns:
+        list of str: 추출된 사람 이름 목록
+    """
+    return _request_people_llm(text) or []
+
+
+def _extract_people_llm_batch(texts):
+    """
+    여러 일기의 LLM NER을 요청 1번으로. 번호 붙인 텍스트를 넣고 {"번호": [이름, ...]} JSON으로 받는다.
+    
+    Returns:
+        list: texts와 같은 순서의 이름 목록 (해당 항목을 파싱하지 못하면 None)
+    """
+    import json
+    
+    if len(texts) == 1:
+        return [_request_people_llm(texts[0])]
+    
+    numbered = "\n\n".join(f"[{i}] {text[:NER_INPUT_CHARS]}" for i, text in enumerate(texts, 1))
+    prompt = (
+        "아래 번호가 붙은 텍스트들에서 각각 **사람 이름과 호칭**만 추출해줘. "
+        "지역명, 앱이름, 학교명, 프로젝트명은 제외해. "
+        "사람이 없으면 빈 리스트로 답해.\n"
+        "반드시 번호를 키로 하는 JSON 객체 형식으로만 답해. 설명 없이 객체만.\n"
+        "예시: {\"1\": [\"성희\", \"엄마\"], \"2\": [], \"3\": [\"팀장\"]}\n\n"
+        f"{numbered}\n\n"
+        "추출된 사람:"
+    )
+    
+    try:
+        from llm_gateway import generate
+        response_text = generate(
+            prompt,
+            model=NER_MODEL,
+            options={"temperature": 0.1, "num_predict": 60 * len(texts)},
+            timeout=min(10 + 3 * len(texts), 40)
+        ).strip()
+        match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if match:
+            parsed = json.loads(match.group())
+            return [_filter_llm_names(parsed.get(str(i))) for i in range(1, len(texts) + 1)]
+    except Exception as e:
+        print(f"⚠️ LLM NER 배치 실패 ({len(texts)}건, 호칭 사전으로 fallback): {e}")
+    
+    return [None] * len(texts)
 
 
-def _extract_people_from_text(text, skip_llm=False):
+def _resolve_llm_names(window, diaries):
+    """
+    일기별 LLM 추출 인물 {diary_id: [이름, ...]}.
+    diary_ner_cache에 같은 본문 해시로 저장된 결과는 재사용하고, 없는 일기만 NER_BATCH_SIZE씩 묶어 요청한다.
+    """
+    cached = window.ner_entries()
+    names_by_diary = {}
+    misses = []
+    for diary in diaries:
+        text = window.text(diary)
+        if not text or len(text.strip()) < 10:
+            continue
+        hash_value = content_hash(text)
+        entry = cached.get(diary.id)
+        if entry is not None and entry[0] == hash_value:
+            names_by_diary[diary.id] = entry[1]
+        else:
+            misses.append((diary.id, hash_value, text))
+    
+    new_entries = {}
+    for start in range(0, len(misses), max(NER_BATCH_SIZE, 1)):
+        batch = misses[start:start + max(NER_BATCH_SIZE, 1)]
+        for (diary_id, hash_value, _), names in zip(batch, _extract_people_llm_batch([t for _, _, t in batch])):
+            names_by_diary[diary_id] = names or []
+            if names is not None:
+                new_entries[diary_id] = (hash_value, names)
+    window.save_ner_entries(new_entries)
+    return names_by_diary
+
+
+def _extract_people_from_text(text, skip_llm=False, llm_names=None):
     """
     텍스트에서 인물을 추출한다. 3단계 + 보조 패턴 매칭.
     
@@ -235,15 +308,16 @@ def _extract_people_from_text(text, skip_llm=False):
     
     Args:
         skip_llm: True이면 LLM NER 호출을 건너뜀 (배치 작업용)
+        llm_names: 미리 추출한(캐시된) LLM 결과가 있으면 LLM을 호출하지 않고 사용
     """
     people = []
     seen = set()
     
     # 1차: 호칭 사전 매칭 (항상 안전, 기본 동작)
     # 긴 호칭 우선 매칭 ("보조강사님" → "보조강사", "강사님", "강사" 중복 방지)
-    sorted_kinships = sorted(KINSHIP_DICT.keys(), key=len, reverse=True)
-    for kinship in sorted_kinships:
-        if kinship in text and kinship not in seen:
+    present = set(KINSHIP_MATCHER.found_keywords(text))
+    for kinship in _SORTED_KINSHIPS:
+        if kinship in present and kinship not in seen:
             # 이미 매칭된 더 긴 호칭의 부분이면 스킵
             is_substring = False
             for already in seen:
@@ -283,7 +357,8 @@ def _extract_people_from_text(text, skip_llm=False):
     
     # 2차: LLM NER 보완 (실제 이름 추가 추출) — skip_llm=True이면 건너뜀
     if not skip_llm:
-        llm_names = _extract_people_llm(text)
+        if llm_names is None:
+            llm_names = _extract_people_llm(text)
         for name in llm_names:
             if name not in seen:
                 # 호칭 사전에 있으면 이미 1차에서 잡았으므로 스킵
@@ -301,25 +376,22 @@ def _extract_people_from_text(text, skip_llm=False):
 
 def _analyze_sentence_emotions(sentence_text):
     """문장 하나에서 감정 범주를 추출."""
-    found_categories = set()
-    for stem, category in ALL_STEMS.items():
-        if stem in sentence_text:
-            found_categories.add(category)
-    return found_categories
+    return EMOTION_MATCHER.categories(sentence_text)
 
 
-def _map_people_emotions(text, skip_llm=False):
+def _map_people_emotions(text, skip_llm=False, people=None):
     """
     인물-감정 매핑: 각 문장에서 인물과 감정어를 동시에 추출하여 연결.
+    people: 이미 추출한 인물 목록 (없으면 여기서 추출)
     
     Returns:
         dict: {"민수": {"joy", "sadness"}, "팀장": {"anger"}, ...}
     """
-    kiwi = _get_kiwi()
-    sentences = kiwi.split_into_sents(text)
+    sentences = analyze_text(text).sentences  # 인물 추출(NNP)과 같은 분석 결과 공유 (캐시)
     
-    all_people = _extract_people_from_text(text, skip_llm=skip_llm)
-    people_names = {p["name"] for p in all_people}
+    if people is None:
+        people = _extract_people_from_text(text, skip_llm=skip_llm)
+    people_names = {p["name"] for p in people}
     
     # 인물별 감정 집합
     person_emotions = defaultdict(set)
@@ -343,16 +415,17 @@ def _map_people_emotions(text, skip_llm=False):
     return dict(person_emotions)
 
 
-def _analyze_single_diary_relational(text, skip_llm=False):
+def _analyze_single_diary_relational(text, skip_llm=False, llm_names=None):
     """
     단일 일기의 관계 분석.
+    llm_names: _resolve_llm_names로 미리 얻은 LLM 추출 결과 (없고 skip_llm=False면 여기서 LLM 호출)
     Returns dict or None.
     """
     if not text or len(text.strip()) < 10:
         return None
     
-    people = _extract_people_from_text(text, skip_llm=skip_llm)
-    person_emotions = _map_people_emotions(text, skip_llm=skip_llm)
+    people = _extract_people_from_text(text, skip_llm=skip_llm, llm_names=llm_names)
+    person_emotions = _map_people_emotions(text, people=people)
     
     # 인물별 감정 정보 통합
     people_detail = []
@@ -385,55 +458,22 @@ def _analyze_single_diary_relational(text, skip_llm=False):
     }
 
 
-def analyze_relational(user_id, db_session, Diary, crypto_decrypt=None, today=None, skip_llm_ner=False):
+def analyze_relational(user_id, db_session, Diary, crypto_decrypt=None, today=None, skip_llm_ner=False, window=None):
     """
     특정 사용자의 관계 지형도를 분석한다.
+    window(UserDiaryWindow)를 넘기면 다른 Phase와 일기 로드/복호화 결과를 공유한다.
     
     Returns:
         dict: 관계 분석 결과 + 사회적 밀도 추이 + 플래그
     """
-    if today is None:
-        today = datetime.utcnow().date()
-    elif isinstance(today, datetime):
-        today = today.date()
-    
-    # 최근 30일 일기 로드
-    cutoff_30d = (today - timedelta(days=30)).strftime('%Y-%m-%d')
-    today_str = today.strftime('%Y-%m-%d')
-    
-    all_diaries = (
-        db_session.query(Diary)
-        .filter(
-            Diary.user_id == user_id,
-            Diary.date >= cutoff_30d,
-            Diary.date <= today_str
-        )
-        .order_by(Diary.date.asc())
-        .all()
-    )
-    
+    window = UserDiaryWindow.resolve(window, user_id, db_session, Diary,
+                                     crypto_decrypt=crypto_decrypt, today=today)
+    today, today_str = window.today, window.today_str
+    all_diaries = window.diaries
+
     if not all_diaries:
-        return {
-            'user_id': user_id,
-            'analysis_date': today_str,
-            'status': 'no_data',
-            'message': '분석할 일기 데이터가 없습니다.',
-            'flags': [],
-            'flag_count': 0,
-            'has_critical': False,
-        }
-    
-    # 텍스트 추출 + 복호화
-    def extract_text(diary):
-        parts = []
-        for field in [diary.event, diary.emotion_desc,
-                      diary.emotion_meaning, diary.self_talk]:
-            if field:
-                text = crypto_decrypt(field) if crypto_decrypt else field
-                if text and len(text.strip()) > 2:
-                    parts.append(text)
-        return ' '.join(parts)
-    
+        return window.no_data_result()
+
     # ─── 주차별 분석 ───
     weekly_data = defaultdict(lambda: {
         "people": set(),
@@ -445,9 +485,17 @@ def analyze_relational(user_id, db_session, Diary, crypto_decrypt=None, today=No
     all_people_ever = set()
     daily_analyses = []
     
+    # 저장된 특징은 LLM NER 포함으로 계산된 경우에만 LLM 요청에 재사용
+    accept = lambda f: skip_llm_ner or f.get('relational_llm')
+    # 즉석 계산할 일기의 LLM NER은 캐시 조회 + 미스만 배치 요청으로 미리 해결
+    llm_names = {} if skip_llm_ner else _resolve_llm_names(window, window.uncached_diaries(accept))
+    
     for diary in all_diaries:
-        text = extract_text(diary)
-        result = _analyze_single_diary_relational(text, skip_llm=skip_llm_ner)
+        result = window.feature(
+            diary, 'relational',
+            lambda: _analyze_single_diary_relational(window.text(diary), skip_llm=skip_llm_ner,
+                                                     llm_names=llm_names.get(diary.id, [])),
+            accept=accept)
         
         if not result:
             continue
@@ -584,9 +632,12 @@ def analyze_all_users_relational(db_session, User, Diary, crypto_decrypt=None,
     flagged_users = []
     
     for user in users:
+        # 30일 일기 중 즉석 분석할 텍스트를 Kiwi 배치(멀티스레드)로 먼저 분석
+        window = UserDiaryWindow(user.id, db_session, Diary, crypto_decrypt=crypto_decrypt, today=today)
+        prefetch_kiwi([window], accept=lambda f: f.get('relational_llm'))
         result = analyze_relational(
             user.id, db_session, Diary,
-            crypto_decrypt=crypto_decrypt, today=today
+            crypto_decrypt=crypto_decrypt, today=today, window=window
         )
         if result.get('flag_count', 0) > 0:
             result['username'] = user.username
@@ -20,18 +20,12 @@
 LLM 사용: 없음. Kiwi 형태소 분석 + 패턴 사전 기반.
 """
 
-from kiwipiepy import Kiwi
-from datetime import datetime, timedelta
+from datetime import datetime
 from collections import defaultdict
 
-# Kiwi 싱글톤
-_kiwi = None
-
-def _get_kiwi():
-    global _kiwi
-    if _kiwi is None:
-        _kiwi = Kiwi()
-    return _kiwi
+from keyword_matcher import KeywordMatcher
+from .corpus import UserDiaryWindow, prefetch_kiwi
+from .kiwi_service import analyze_text
 
 
 # ─── 1. 자기 귀인 사전 ───
@@ -109,12 +103,21 @@ GRATITUDE_PATTERNS = [
 ]
 
 
-def _count_pattern_hits(text, patterns):
-    """텍스트에서 패턴 히트 수와 매칭 단어 반환."""
-    hits = []
-    for p in patterns:
-        if p in text:
-            hits.append(p)
+# 서사 패턴 사전 전체를 하나의 오토마톤으로 (범주 = 사전 이름) → 일기 1건당 1회 스캔
+NARRATIVE_MATCHER = KeywordMatcher(
+    [(p, name) for name, patterns in [
+        ('internal', INTERNAL_ATTRIBUTION), ('external', EXTERNAL_ATTRIBUTION),
+        ('past', PAST_MARKERS), ('present', PRESENT_MARKERS), ('future', FUTURE_MARKERS),
+        ('obligation', OBLIGATION_PATTERNS),
+        ('efficacy_positive', EFFICACY_POSITIVE), ('efficacy_negative', EFFICACY_NEGATIVE),
+        ('gratitude', GRATITUDE_PATTERNS),
+    ] for p in patterns]
+)
+
+
+def _hits_by_category(found, category):
+    """NARRATIVE_MATCHER.found() 결과에서 한 사전의 (히트 수, 매칭 단어)"""
+    hits = [kw for kw, cat in found if cat == category]
     return len(hits), hits
 
 
@@ -126,10 +129,8 @@ def _analyze_single_diary_narrative(text):
     if not text or len(text.strip()) < 10:
         return None
 
-    kiwi = _get_kiwi()
-
     try:
-        tokens = kiwi.tokenize(text)
+        tokens = analyze_text(text).tokens
     except Exception:
         return None
 
@@ -137,9 +138,11 @@ def _analyze_single_diary_narrative(text):
     if total_tokens < 3:
         return None
 
+    found = NARRATIVE_MATCHER.found(text)
+
     # 1. 귀인 양식 분석
-    internal_count, internal_hits = _count_pattern_hits(text, INTERNAL_ATTRIBUTION)
-    external_count, external_hits = _count_pattern_hits(text, EXTERNAL_ATTRIBUTION)
+    internal_count, internal_hits = _hits_by_category(found, 'internal')
+    external_count, external_hits = _hits_by_category(found, 'external')
     total_attribution = internal_count + external_count
 
     if total_attribution > 0:
@@ -148,9 +151,9 @@ def _analyze_single_diary_narrative(text):
         internal_ratio = 0.5  # 귀인 표현 없으면 중립
 
     # 2. 시제 분포 분석
-    past_count, _ = _count_pattern_hits(text, PAST_MARKERS)
-    present_count, _ = _count_pattern_hits(text, PRESENT_MARKERS)
-    future_count, _ = _count_pattern_hits(text, FUTURE_MARKERS)
+    past_count, _ = _hits_by_category(found, 'past')
+    present_count, _ = _hits_by_category(found, 'present')
+    future_count, _ = _hits_by_category(found, 'future')
     total_tense = past_count + present_count + future_count
 
     if total_tense > 0:
@@ -163,12 +166,12 @@ def _analyze_single_diary_narrative(text):
         tense_distribution = {"past": 0.33, "present": 0.33, "future": 0.33}
 
     # 3. 당위 표현 분석
-    obligation_count, obligation_hits = _count_pattern_hits(text, OBLIGATION_PATTERNS)
+    obligation_count, obligation_hits = _hits_by_category(found, 'obligation')
     obligation_ratio = round(obligation_count / max(total_tokens, 1) * 100, 3)
 
     # 4. 자기 효능감 분석
-    pos_efficacy_count, pos_efficacy_hits = _count_pattern_hits(text, EFFICACY_POSITIVE)
-    neg_efficacy_count, neg_efficacy_hits = _count_pattern_hits(text, EFFICACY_NEGATIVE)
+    pos_efficacy_count, pos_efficacy_hits = _hits_by_category(found, 'efficacy_positive')
+    neg_efficacy_count, neg_efficacy_hits = _hits_by_category(found, 'efficacy_negative')
     total_efficacy = pos_efficacy_count + neg_efficacy_count
 
     if total_efficacy > 0:
@@ -177,7 +180,7 @@ def _analyze_single_diary_narrative(text):
         efficacy_score = 0.5  # 효능감 표현 없으면 중립
 
     # 5. 감사 표현 분석
-    gratitude_count, gratitude_hits = _count_pattern_hits(text, GRATITUDE_PATTERNS)
+    gratitude_count, gratitude_hits = _hits_by_category(found, 'gratitude')
 
     char_count = len(text.replace(' ', '').replace('\n', ''))
 
@@ -243,7 +246,7 @@ def _compute_narrative_baseline(analyses):
 
 # ═══ 메인 분석 함수 ═══
 
-def analyze_self_narrative(user_id, db_session, Diary, crypto_decrypt=None, today=None):
+def analyze_self_narrative(user_id, db_session, Diary, crypto_decrypt=None, today=None, window=None):
     """
     특정 사용자의 자기 서사 패턴을 분석한다.
 
@@ -253,61 +256,27 @@ def analyze_self_narrative(user_id, db_session, Diary, crypto_decrypt=None, toda
         Diary: Diary 모델 클래스
         crypto_decrypt: 복호화 함수
         today: 기준일 (테스트용)
+        window: UserDiaryWindow (여러 Phase가 같은 일기 로드/복호화 결과를 공유, 없으면 직접 로드)
 
     Returns:
         dict: 자기 서사 분석 결과 + Baseline 비교 + 플래그
     """
-    if today is None:
-        today = datetime.utcnow().date()
-    elif isinstance(today, datetime):
-        today = today.date()
-
-    cutoff_30d = (today - timedelta(days=30)).strftime('%Y-%m-%d')
-    cutoff_7d = (today - timedelta(days=6)).strftime('%Y-%m-%d')
-    today_str = today.strftime('%Y-%m-%d')
-
-    all_diaries = (
-        db_session.query(Diary)
-        .filter(
-            Diary.user_id == user_id,
-            Diary.date >= cutoff_30d,
-            Diary.date <= today_str
-        )
-        .order_by(Diary.date.asc())
-        .all()
-    )
+    window = UserDiaryWindow.resolve(window, user_id, db_session, Diary,
+                                     crypto_decrypt=crypto_decrypt, today=today)
+    today, today_str = window.today, window.today_str
+    all_diaries = window.diaries
 
     if not all_diaries:
-        return {
-            'user_id': user_id,
-            'analysis_date': today_str,
-            'status': 'no_data',
-            'message': '분석할 일기 데이터가 없습니다.',
-            'flags': [],
-            'flag_count': 0,
-            'has_critical': False,
-        }
-
-    # 텍스트 추출 + 복호화
-    def extract_text(diary):
-        parts = []
-        for field in [diary.event, diary.emotion_desc,
-                      diary.emotion_meaning, diary.self_talk]:
-            if field:
-                text = crypto_decrypt(field) if crypto_decrypt else field
-                if text and len(text.strip()) > 2:
-                    parts.append(text)
-        return ' '.join(parts)
+        return window.no_data_result()
 
     # ─── Baseline (8~30일 전) vs 최근 7일 ───
-    baseline_diaries = [d for d in all_diaries if d.date < cutoff_7d]
-    recent_diaries = [d for d in all_diaries if d.date >= cutoff_7d]
+    baseline_diaries = window.baseline_diaries
+    recent_diaries = window.recent_diaries
 
     # Baseline 분석
     baseline_analyses = []
     for d in baseline_diaries:
-        text = extract_text(d)
-        result = _analyze_single_diary_narrative(text)
+        result = window.feature(d, 'narrative', lambda: _analyze_single_diary_narrative(window.text(d)))
         if result:
             result["date"] = str(d.date)
             baseline_analyses.append(result)
@@ -317,8 +286,7 @@ def analyze_self_narrative(user_id, db_session, Diary, crypto_decrypt=None, toda
     # 최근 7일 분석
     recent_analyses = []
     for d in recent_diaries:
-        text = extract_text(d)
-        result = _analyze_single_diary_narrative(text)
+        result = window.feature(d, 'narrative', lambda: _analyze_single_diary_narrative(window.text(d)))
         if result:
             result["date"] = str(d.date)
             recent_analyses.append(result)
@@ -440,9 +408,12 @@ def analyze_all_users_self_narrative(db_session, User, Diary, crypto_decrypt=Non
     flagged_users = []
 
     for user in users:
+        # 30일 일기 중 즉석 분석할 텍스트를 Kiwi 배치(멀티스레드)로 먼저 분석
+        window = UserDiaryWindow(user.id, db_session, Diary, crypto_decrypt=crypto_decrypt, today=today)
+        prefetch_kiwi([window])
         result = analyze_self_narrative(
             user.id, db_session, Diary,
-            crypto_decrypt=crypto_decrypt, today=today
+            crypto_decrypt=crypto_decrypt, today=today, window=window
         )
         if result.get('flag_count', 0) > 0:
             result['username'] = user.username
@@ -19,9 +19,12 @@
 LLM 사용: 없음. 키워드 사전 기반 순수 Python 연산.
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime
 from collections import defaultdict
 
+from keyword_matcher import KeywordMatcher
+from .corpus import UserDiaryWindow
+
 # ─── 수면 키워드 사전 ───
 # 한국어 수면 관련 표현을 긍정/부정으로 분류
 SLEEP_POSITIVE_KEYWORDS = [
@@ -43,6 +46,11 @@ SLEEP_NEGATIVE_KEYWORDS = [
     "자다 깨", "새벽에 일어", "잠귀가 밝",
 ]
 
+SLEEP_MATCHER = KeywordMatcher(
+    [(kw, 'positive') for kw in SLEEP_POSITIVE_KEYWORDS] +
+    [(kw, 'negative') for kw in SLEEP_NEGATIVE_KEYWORDS]
+)
+
 # 수면 상태 단순 분류 (sleep_condition이 단순 라벨인 경우 대비)
 SLEEP_LABEL_SCORES = {
     "좋음": 85, "보통": 55, "나쁨": 25,
@@ -70,8 +78,9 @@ def _score_sleep_text(text):
         return SLEEP_LABEL_SCORES[text_lower], [], []
 
     # 2. 키워드 매칭
-    pos_hits = [kw for kw in SLEEP_POSITIVE_KEYWORDS if kw in text_lower]
-    neg_hits = [kw for kw in SLEEP_NEGATIVE_KEYWORDS if kw in text_lower]
+    found = SLEEP_MATCHER.found(text_lower)
+    pos_hits = [kw for kw, cat in found if cat == 'positive']
+    neg_hits = [kw for kw, cat in found if cat == 'negative']
 
     if not pos_hits and not neg_hits:
         return 50, [], []  # 판별 불가 → 중립
@@ -120,7 +129,7 @@ def _moving_average(values, window=7):
 
 # ═══ 메인 분석 함수 ═══
 
-def analyze_sleep_mind(user_id, db_session, Diary, crypto_decrypt=None, today=None):
+def analyze_sleep_mind(user_id, db_session, Diary, crypto_decrypt=None, today=None, window=None):
     """
     특정 사용자의 수면-마음 상관관계를 분석한다.
 
@@ -130,52 +139,25 @@ def analyze_sleep_mind(user_id, db_session, Diary, crypto_decrypt=None, today=No
         Diary: Diary 모델 클래스
         crypto_decrypt: 복호화 함수
         today: 기준일 (테스트용)
+        window: UserDiaryWindow (여러 Phase가 같은 일기 로드/복호화 결과를 공유, 없으면 직접 로드)
 
     Returns:
         dict: 수면-마음 상관 분석 결과 + 플래그
     """
-    if today is None:
-        today = datetime.utcnow().date()
-    elif isinstance(today, datetime):
-        today = today.date()
-
-    cutoff_30d = (today - timedelta(days=30)).strftime('%Y-%m-%d')
-    cutoff_7d = (today - timedelta(days=6)).strftime('%Y-%m-%d')
-    today_str = today.strftime('%Y-%m-%d')
-
-    all_diaries = (
-        db_session.query(Diary)
-        .filter(
-            Diary.user_id == user_id,
-            Diary.date >= cutoff_30d,
-            Diary.date <= today_str
-        )
-        .order_by(Diary.date.asc())
-        .all()
-    )
+    window = UserDiaryWindow.resolve(window, user_id, db_session, Diary,
+                                     crypto_decrypt=crypto_decrypt, today=today)
+    today, today_str = window.today, window.today_str
+    cutoff_7d = window.cutoff_7d
+    all_diaries = window.diaries
 
     if not all_diaries:
-        return {
-            'user_id': user_id,
-            'analysis_date': today_str,
-            'status': 'no_data',
-            'message': '분석할 일기 데이터가 없습니다.',
-            'flags': [],
-            'flag_count': 0,
-            'has_critical': False,
-        }
+        return window.no_data_result()
 
     # ─── 일별 수면 분석 ───
     daily_records = []
     for diary in all_diaries:
-        sleep_text = diary.sleep_condition
-        if crypto_decrypt and sleep_text:
-            try:
-                sleep_text = crypto_decrypt(sleep_text)
-            except Exception:
-                pass
-
-        sleep_score, pos_hits, neg_hits = _score_sleep_text(sleep_text)
+        sleep_score, pos_hits, neg_hits = window.feature(
+            diary, 'sleep', lambda: _score_sleep_text(window.sleep_text(diary)))
 
         daily_records.append({
             "date": str(diary.date),
@@ -1,5 +1,4 @@
 import json
-import requests
 from datetime import datetime, timedelta
 from sqlalchemy import desc
 
@@ -7,6 +6,7 @@ from kick_analysis import analyze_timeseries
 from kick_analysis.linguistic import analyze_linguistic
 from kick_analysis.relational import analyze_relational
 from models import WeeklyLetter
+from llm_gateway import generate
 
 def generate_weekly_letter_for_user(user_id, db_session, User, Diary, crypto_decrypt=None, target_date=None):
     """
@@ -95,18 +95,13 @@ def generate_weekly_letter_for_user(user_id, db_session, User, Diary, crypto_dec
     
     # LLM 호출 (Ollama)
     try:
-        res = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "gemma4:2b",
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": 0.5, "num_predict": 500}
-            },
+        letter_content = generate(
+            prompt,
+            model="gemma4:2b",
+            options={"temperature": 0.5, "num_predict": 500},
             timeout=60
-        )
-        if res.status_code == 200:
-            letter_content = res.json().get('response', '').strip()
+        ).strip()
+        if letter_content:
             
             # DB 저장
             new_letter = WeeklyLetter(
@@ -141,7 +136,7 @@ def generate_weekly_letter_for_user(user_id, db_session, User, Diary, crypto_dec
             
             return {"status": "success", "letter_id": new_letter.id}
         else:
-            return {"status": "error", "message": f"LLM error: {res.status_code}"}
+            return {"status": "error", "message": "LLM error: empty response"}
     except Exception as e:
         print(f"⚠️ Weekly Letter Generation LLM Failed: {e}")
         return {"status": "error", "message": str(e)}
@@ -20,7 +20,8 @@ from kick_analysis.relational import analyze_relational, analyze_all_users_relat
 from kick_analysis.emotion_flow import analyze_emotion_flow, analyze_all_users_emotion_flow
 from kick_analysis.sleep_mind import analyze_sleep_mind, analyze_all_users_sleep_mind
 from kick_analysis.self_narrative import analyze_self_narrative, analyze_all_users_self_narrative
-from kick_analysis.condition import generate_condition, generate_all_users_condition
+from kick_analysis.condition import generate_condition
+from kick_analysis.corpus import UserDiaryWindow
 
 kick_bp = Blueprint('kick', __name__)
 
@@ -50,14 +51,16 @@ def get_my_kick_insights():
     insights = []
 
     try:
+        # 30일 일기를 한 번만 조회/복호화해서 Phase 1~6이 공유
+        window = UserDiaryWindow(user_id, db.session, Diary, crypto_decrypt=_decrypt_func)
+
         # Phase 1: 시계열
-        from kick_analysis import analyze_timeseries
-        ts = analyze_timeseries(user_id, db.session, Diary)
+        ts = analyze_timeseries(user_id, db.session, Diary, window=window)
         for f in ts.get('flags', []):
             insights.append(f"[시계열] {f['message']}")
 
         # Phase 2: 언어 지문
-        lg = analyze_linguistic(user_id, db.session, Diary, crypto_decrypt=_decrypt_func)
+        lg = analyze_linguistic(user_id, db.session, Diary, crypto_decrypt=_decrypt_func, window=window)
         if lg.get('status') == 'completed':
             dev = lg.get('linguistic', {}).get('deviation', {})
             labels = {'ttr': '어휘 다양성', 'self_focus': '자기 집중도',
@@ -70,7 +73,7 @@ def get_my_kick_insights():
             insights.append(f"[언어] ⚠️ {f['message']}")
 
         # Phase 3: 관계 지형도
-        rl = analyze_relational(user_id, db.session, Diary, crypto_decrypt=_decrypt_func)
+        rl = analyze_relational(user_id, db.session, Diary, crypto_decrypt=_decrypt_func, window=window)
         if rl.get('status') == 'completed':
             rel = rl.get('relational', {})
             timeline = rel.get('social_density_timeline', [])
@@ -85,7 +88,7 @@ def get_my_kick_insights():
             insights.append(f"[관계] ⚠️ {f['message']}")
 
         # Phase 4: 감정 흐름 지도
-        ef = analyze_emotion_flow(user_id, db.session, Diary, crypto_decrypt=_decrypt_func)
+        ef = analyze_emotion_flow(user_id, db.session, Diary, crypto_decrypt=_decrypt_func, window=window)
         if ef.get('status') == 'completed':
             flow = ef.get('emotion_flow', {})
             dom = flow.get('dominant_emotion_label')
@@ -98,7 +101,7 @@ def get_my_kick_insights():
             insights.append(f"[감정흐름] ⚠️ {f['message']}")
 
         # Phase 5: 수면-마음 상관
-        sm = analyze_sleep_mind(user_id, db.session, Diary, crypto_decrypt=_decrypt_func)
+        sm = analyze_sleep_mind(user_id, db.session, Diary, crypto_decrypt=_decrypt_func, window=window)
         if sm.get('status') in ('completed', 'limited_data'):
             sleep_data = sm.get('sleep_mind', {})
             recent_7d = sleep_data.get('recent_7d', {})
@@ -112,7 +115,7 @@ def get_my_kick_insights():
             insights.append(f"[수면] ⚠️ {f['message']}")
 
         # Phase 6: 자기 서사 분석
-        sn = analyze_self_narrative(user_id, db.session, Diary, crypto_decrypt=_decrypt_func)
+        sn = analyze_self_narrative(user_id, db.session, Diary, crypto_decrypt=_decrypt_func, window=window)
         if sn.get('status') == 'completed':
             narr = sn.get('narrative', {}).get('recent_7d', {})
             if narr:
@@ -203,133 +206,53 @@ def get_dashboard_overview_internal():
     return _build_dashboard_overview()
 
 
-import threading
-
-_condition_lock = threading.Lock()
-_condition_computing = False
-
 @kick_bp.route('/api/kick/dashboard/condition-overview', methods=['GET'])
 def get_condition_overview_internal():
     """
     전체 사용자의 마음 컨디션 분포 + 관심 필요 사용자 목록.
     의료진 대시보드 프론트엔드 전용.
     
-    [성능] 동시 호출 방지 — 이미 계산 중이면 캐시 또는 202 반환.
+    [성능] user_condition_snapshots를 바로 읽어 반환 (as_of = 가장 오래된 스냅샷 계산 시각).
+    일기가 바뀐 사용자만 백그라운드에서 증분 갱신 — 스냅샷이 아직 없으면(최초 계산) 202 반환.
     """
-    global _condition_computing
-    
-    from kick_analysis.condition import _condition_cache, _CACHE_TTL_SECONDS
-    import time
-    
-    # 1) 캐시가 유효하면 즉시 반환
-    now = time.time()
-    if (_condition_cache['data'] is not None
-            and _condition_cache['timestamp'] is not None
-            and (now - _condition_cache['timestamp']) < _CACHE_TTL_SECONDS):
-        return jsonify(_condition_cache['data'])
-    
-    # 2) 이미 다른 요청이 계산 중이면 즉시 202 반환
-    if _condition_computing:
-        return jsonify({
-            'status': 'computing',
-            'message': '컨디션 분석 중입니다. 잠시 후 다시 시도해주세요.'
-        }), 202
-    
-    # 3) 계산 시작
-    acquired = _condition_lock.acquire(blocking=False)
-    if not acquired:
-        return jsonify({
-            'status': 'computing',
-            'message': '컨디션 분석 중입니다.'
-        }), 202
-    
+    from flask import current_app
+    from kick_analysis.condition_snapshots import (load_condition_overview, trigger_background_refresh,
+                                                   is_refreshing)
+
     try:
-        _condition_computing = True
-        result = generate_all_users_condition(
-            db.session, User, Diary,
-            crypto_decrypt=_decrypt_func
-        )
-        return jsonify(result)
+        result = load_condition_overview(db.session, User)
     except Exception as e:
         print(f"⚠️ Condition Overview Error: {e}")
         return jsonify({
             'error': '컨디션 분석 중 오류 발생',
             'detail': str(e)
         }), 500
-    finally:
-        _condition_computing = False
-        _condition_lock.release()
+
+    trigger_background_refresh(current_app._get_current_object(), User, Diary, crypto_decrypt=_decrypt_func)
+
+    if result['snapshot_count'] == 0:
+        return jsonify({
+            'status': 'computing',
+            'message': '컨디션 분석 중입니다. 잠시 후 다시 시도해주세요.'
+        }), 202
+
+    result['refreshing'] = is_refreshing()
+    return jsonify(result)
 
 
 def _build_dashboard_overview():
     """
     의료진 대시보드용 킥 전체 Phase 통합 요약.
-    Phase 1(시계열) + Phase 2(언어) + Phase 3(관계)의 플래그를 한 번에 조회.
+    Phase 1~6 플래그를 프로세스 풀에서 병렬 계산 (kick_analysis.overview).
+    계산 중이면 진행률과 지금까지 합친 부분 결과를 202로 반환.
     """
+    from flask import current_app
+    from kick_analysis.overview import get_dashboard_overview
 
-    from kick_analysis import analyze_all_users_timeseries
-
-    # Phase 1
-    ts_result = analyze_all_users_timeseries(db.session, User, Diary)
-    # Phase 2
-    lg_result = analyze_all_users_linguistic(db.session, User, Diary, crypto_decrypt=_decrypt_func)
-    # Phase 3
-    rl_result = analyze_all_users_relational(db.session, User, Diary, crypto_decrypt=_decrypt_func)
-    # Phase 4
-    ef_result = analyze_all_users_emotion_flow(db.session, User, Diary, crypto_decrypt=_decrypt_func)
-    # Phase 5
-    sm_result = analyze_all_users_sleep_mind(db.session, User, Diary, crypto_decrypt=_decrypt_func)
-    # Phase 6
-    sn_result = analyze_all_users_self_narrative(db.session, User, Diary, crypto_decrypt=_decrypt_func)
-
-    # 통합 플래그
-    all_flags = []
-
-    phase_sources = [
-        (ts_result, 'timeseries', '시계열'),
-        (lg_result, 'linguistic', '언어 지문'),
-        (rl_result, 'relational', '관계 지형도'),
-        (ef_result, 'emotion_flow', '감정 흐름'),
-        (sm_result, 'sleep_mind', '수면-마음'),
-        (sn_result, 'self_narrative', '자기 서사'),
-    ]
-
-    for phase_result, phase_key, phase_label in phase_sources:
-        for user_data in phase_result.get('flagged_users', []):
-            for flag in user_data.get('flags', []):
-                all_flags.append({
-                    'phase': phase_key,
-                    'phase_label': phase_label,
-                    'username': user_data.get('username', ''),
-                    'real_name': user_data.get('real_name', ''),
-                    'user_id': user_data.get('user_id'),
-                    **flag
-                })
-
-    # 심각도순 정렬
-    severity_order = {'high': 0, 'medium': 1, 'low': 2}
-    all_flags.sort(key=lambda x: severity_order.get(x.get('severity', 'low'), 3))
-
-    # 요약 통계
-    severity_counts = {'high': 0, 'medium': 0, 'low': 0}
-    phase_counts = {
-        'timeseries': 0, 'linguistic': 0, 'relational': 0,
-        'emotion_flow': 0, 'sleep_mind': 0, 'self_narrative': 0,
-    }
-    for f in all_flags:
-        severity_counts[f.get('severity', 'low')] = severity_counts.get(f.get('severity', 'low'), 0) + 1
-        phase_counts[f.get('phase', '')] = phase_counts.get(f.get('phase', ''), 0) + 1
-
-    flagged_user_ids = set(f.get('user_id') for f in all_flags if f.get('user_id'))
-
-    return jsonify({
-        'total_users': ts_result.get('total_users', 0),
-        'flagged_user_count': len(flagged_user_ids),
-        'total_flags': len(all_flags),
-        'by_severity': severity_counts,
-        'by_phase': phase_counts,
-        'flags': all_flags,
-    })
+    result = get_dashboard_overview(
+        current_app._get_current_object(), User, Diary, crypto_decrypt=_decrypt_func
+    )
+    return jsonify(result), {'computing': 202, 'error': 500}.get(result['status'], 200)
 
 def _require_staff(current_user_id):
     """의료진/관리자 권한 확인"""
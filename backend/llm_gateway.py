@@ -0,0 +1,460 @@
+"""
+LLM Gateway - 프로세스 공유 로컬 LLM 호출 게이트웨이
+====================================================
+ai_brain / standalone_ai / kick_analysis / analysis_worker 등이 각자
+`requests.post("http://localhost:11434/api/generate")`를 직접 호출하던 방식을 대체한다.
+
+- 백엔드별 전역 동시 실행 상한 (LLM_OLLAMA_CONCURRENCY, LLM_VLLM_CONCURRENCY)
+  → 요청이 몰려도 OCI CPU 서버에 동시에 던지지 않고 큐에서 대기
+- 마이크로 배칭: LLM_BATCH_WINDOW_MS 동안 같은 모델/옵션의 프롬프트를 모아 한 번에 실행
+  (vLLM OpenAI 호환 `/v1/completions`는 prompt 리스트를 받음.
+   Ollama `/api/generate`는 단건 API라 LLM_OLLAMA_MAX_BATCH 기본 1 = 순차 디스패치)
+- 호출자가 타임아웃으로 포기한 요청은 실행 전에 큐에서 폐기
+- generate_stream(): 토큰 스트리밍 (배칭 없이 같은 동시 실행 슬롯을 점유)
+- get_gateway_stats()로 큐 길이 / 배치 크기 / 지연 / 토큰 처리량 노출
+
+사용 예:
+    from llm_gateway import generate
+    text = generate(prompt, options={"temperature": 0.5, "num_predict": 60}, timeout=60)
+"""
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = os.environ.get('LLM_BACKEND', 'ollama')
+DEFAULT_MODEL = os.environ.get('LLM_DEFAULT_MODEL', 'gemma4:2b')
+
+OLLAMA_URL = os.environ.get('OLLAMA_URL', 'http://localhost:11434').rstrip('/')
+OLLAMA_CONCURRENCY = int(os.environ.get('LLM_OLLAMA_CONCURRENCY', '2'))
+OLLAMA_MAX_BATCH = int(os.environ.get('LLM_OLLAMA_MAX_BATCH', '1'))
+
+VLLM_URL = os.environ.get('VLLM_URL', 'http://localhost:8000').rstrip('/')
+VLLM_MODEL = os.environ.get('VLLM_MODEL')  # 미설정 시 호출자의 model 그대로 사용
+VLLM_CONCURRENCY = int(os.environ.get('LLM_VLLM_CONCURRENCY', '4'))
+VLLM_MAX_BATCH = int(os.environ.get('LLM_VLLM_MAX_BATCH', '16'))
+
+BATCH_WINDOW_MS = int(os.environ.get('LLM_BATCH_WINDOW_MS', '20'))
+THROUGHPUT_WINDOW_SECONDS = 60
+
+# Ollama options → vLLM sampling 파라미터
+_VLLM_OPTION_MAP = {
+    'num_predict': 'max_tokens',
+    'temperature': 'temperature',
+    'top_p': 'top_p',
+    'top_k': 'top_k',
+    'repeat_penalty': 'repetition_penalty',
+    'stop': 'stop',
+    'seed': 'seed',
+}
+
+
+class LLMGatewayError(Exception):
+    """LLM 호출 실패 (HTTP 오류, 타임아웃, 백엔드 미설정 등)"""
+
+
+class _Request:
+    __slots__ = ('prompt', 'model', 'options', 'format', 'deadline', 'enqueued_at', 'future')
+
+    def __init__(self, prompt, model, options, format, timeout):
+        self.prompt = prompt
+        self.model = model
+        self.options = options
+        self.format = format
+        self.enqueued_at = time.monotonic()
+        self.deadline = self.enqueued_at + timeout
+        self.future = Future()
+
+    @property
+    def batch_key(self):
+        return (self.model, self.format, json.dumps(self.options, sort_keys=True, default=str))
+
+
+class _Backend(ABC):
+    """백엔드 1개 = 요청 큐 + 디스패처 스레드 + 동시 실행 상한이 걸린 실행 풀"""
+
+    name = None
+
+    def __init__(self, concurrency, max_batch):
+        self.concurrency = max(1, concurrency)
+        self.max_batch = max(1, max_batch)
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._executor = None
+        self._dispatcher = None
+        self._start_lock = threading.Lock()
+        self._http = requests.Session()  # keep-alive 재사용
+
+        self._stats_lock = threading.Lock()
+        self._recent = deque()  # (완료 시각, completion 토큰 수)
+        self._stats = {
+            'requests': 0, 'completed': 0, 'failed': 0, 'expired': 0,
+            'batches': 0, 'streams': 0, 'inflight': 0,
+            'prompt_tokens': 0, 'completion_tokens': 0,
+            'busy_seconds': 0.0, 'queue_wait_seconds': 0.0,
+        }
+
+    # ── 요청 등록 ──
+
+    def submit(self, req):
+        self._ensure_started()
+        with self._stats_lock:
+            self._stats['requests'] += 1
+        self._queue.put(req)
+        return req.future
+
+    def _ensure_started(self):
+        if self._dispatcher is not None and self._dispatcher.is_alive():
+            return
+        with self._start_lock:
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                    thread_name_prefix=f"llm-{self.name}")
+                self._dispatcher = threading.Thread(target=self._dispatch_loop,
+                                                    name=f"llm-{self.name}-dispatcher", daemon=True)
+                self._dispatcher.start()
+                logger.info(f"[LLMGateway] {self.name} 디스패처 시작 "
+                            f"(concurrency={self.concurrency}, max_batch={self.max_batch})")
+
+    # ── 디스패치 ──
+
+    def _collect_batch(self, first):
+        """첫 요청과 같은 배치 키를 가진 요청을 BATCH_WINDOW_MS 동안 모은다. 다른 키는 되돌려 보낸다."""
+        batch, others = [first], []
+        if self.max_batch > 1:
+            window_end = time.monotonic() + BATCH_WINDOW_MS / 1000.0
+            while len(batch) < self.max_batch:
+                remaining = window_end - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    req = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                (batch if req.batch_key == first.batch_key else others).append(req)
+        for req in others:
+            self._queue.put(req)
+        return batch
+
+    def _dispatch_loop(self):
+        while True:
+            first = self._queue.get()
+            batch = self._collect_batch(first)
+
+            # 전역 동시 실행 상한: 빈 슬롯이 날 때까지 나머지는 큐에서 대기
+            self._slots.acquire()
+
+            now = time.monotonic()
+            live = []
+            for req in batch:
+                if now >= req.deadline or not req.future.set_running_or_notify_cancel():
+                    # 호출자가 이미 포기한 요청 → 실행하지 않음
+                    if not req.future.done():
+                        req.future.set_exception(LLMGatewayError("LLM 요청 대기 시간 초과"))
+                    with self._stats_lock:
+                        self._stats['expired'] += 1
+                    continue
+                live.append(req)
+
+            if not live:
+                self._slots.release()
+                continue
+            self._executor.submit(self._run_batch, live)
+
+    def _run_batch(self, batch):
+        started = time.monotonic()
+        with self._stats_lock:
+            self._stats['batches'] += 1
+            self._stats['inflight'] += len(batch)
+            self._stats['queue_wait_seconds'] += sum(started - r.enqueued_at for r in batch)
+        try:
+            results = self._execute(batch)
+            elapsed = time.monotonic() - started
+            prompt_tokens = sum(r[1] for r in results)
+            completion_tokens = sum(r[2] for r in results)
+            with self._stats_lock:
+                self._stats['completed'] += len(batch)
+                self._stats['prompt_tokens'] += prompt_tokens
+                self._stats['completion_tokens'] += completion_tokens
+                self._stats['busy_seconds'] += elapsed
+                self._recent.append((time.time(), completion_tokens))
+            for req, (text, _, _) in zip(batch, results):
+                req.future.set_result(text)
+        except Exception as e:
+            with self._stats_lock:
+                self._stats['failed'] += len(batch)
+            err = e if isinstance(e, LLMGatewayError) else LLMGatewayError(f"{self.name} 호출 실패: {e}")
+            for req in batch:
+                if not req.future.done():
+                    req.future.set_exception(err)
+        finally:
+            with self._stats_lock:
+                self._stats['inflight'] -= len(batch)
+            self._slots.release()
+
+    @abstractmethod
+    def _execute(self, batch):
+        """배치를 실행하고 [(text, prompt_tokens, completion_tokens), ...]를 요청 순서대로 반환"""
+
+    # ── 스트리밍 ──
+
+    def stream(self, req):
+        """
+        토큰 조각을 생성되는 대로 yield한다. 배칭 없이 동시 실행 슬롯 1개를 직접 점유하며,
+        슬롯 대기도 요청 timeout 안에서만 한다.
+        """
+        with self._stats_lock:
+            self._stats['requests'] += 1
+        if not self._slots.acquire(timeout=max(0.0, req.deadline - time.monotonic())):
+            with self._stats_lock:
+                self._stats['expired'] += 1
+            raise LLMGatewayError("LLM 요청 대기 시간 초과")
+
+        started = time.monotonic()
+        usage = {}
+        ok = False
+        with self._stats_lock:
+            self._stats['streams'] += 1
+            self._stats['inflight'] += 1
+            self._stats['queue_wait_seconds'] += started - req.enqueued_at
+        try:
+            for text in self._stream_chunks(req, usage):
+                if text:
+                    yield text
+            ok = True
+        except LLMGatewayError:
+            raise
+        except Exception as e:
+            raise LLMGatewayError(f"{self.name} 스트리밍 실패: {e}")
+        finally:
+            elapsed = time.monotonic() - started
+            with self._stats_lock:
+                self._stats['inflight'] -= 1
+                self._stats['completed' if ok else 'failed'] += 1
+                self._stats['prompt_tokens'] += usage.get('prompt_tokens', 0)
+                self._stats['completion_tokens'] += usage.get('completion_tokens', 0)
+                self._stats['busy_seconds'] += elapsed
+                self._recent.append((time.time(), usage.get('completion_tokens', 0)))
+            self._slots.release()
+
+    @abstractmethod
+    def _stream_chunks(self, req, usage):
+        """HTTP 스트리밍 응답을 읽어 텍스트 조각을 yield하고, 끝나면 usage에 토큰 수를 기록"""
+
+    # ── 지표 ──
+
+    def stats(self):
+        now = time.time()
+        with self._stats_lock:
+            while self._recent and now - self._recent[0][0] > THROUGHPUT_WINDOW_SECONDS:
+                self._recent.popleft()
+            stats = dict(self._stats)
+            recent_tokens = sum(t for _, t in self._recent)
+        finished = stats['completed'] + stats['failed']
+        batched = finished - stats['streams']
+        stats.update({
+            'queue_depth': self._queue.qsize(),
+            'concurrency': self.concurrency,
+            'max_batch': self.max_batch,
+            'avg_batch_size': round(batched / stats['batches'], 2) if stats['batches'] else 0.0,
+            'avg_queue_wait_ms': round(stats['queue_wait_seconds'] / finished * 1000, 1) if finished else 0.0,
+            'tokens_per_second': round(stats['completion_tokens'] / stats['busy_seconds'], 2)
+                                 if stats['busy_seconds'] else 0.0,
+            'tokens_per_second_recent': round(recent_tokens / THROUGHPUT_WINDOW_SECONDS, 2),
+        })
+        stats['busy_seconds'] = round(stats['busy_seconds'], 3)
+        stats['queue_wait_seconds'] = round(stats['queue_wait_seconds'], 3)
+        return stats
+
+
+class _OllamaBackend(_Backend):
+    name = 'ollama'
+
+    @staticmethod
+    def _payload(req, stream):
+        payload = {
+            "model": req.model,
+            "prompt": req.prompt,
+            "stream": stream,
+            "options": req.options,
+        }
+        if req.format:
+            payload["format"] = req.format
+        return payload
+
+    def _execute(self, batch):
+        # /api/generate는 단건 API → 배치 내 요청을 같은 슬롯에서 차례로 실행
+        results = []
+        for req in batch:
+            payload = self._payload(req, stream=False)
+            timeout = max(1.0, req.deadline - time.monotonic())
+            res = self._http.post(f"{OLLAMA_URL}/api/generate", json=payload, timeout=timeout)
+            if res.status_code != 200:
+                raise LLMGatewayError(f"Ollama Error {res.status_code}: {res.text[:200]}")
+            data = res.json()
+            results.append((data.get('response', ''),
+                            data.get('prompt_eval_count', 0) or 0,
+                            data.get('eval_count', 0) or 0))
+        return results
+
+    def _stream_chunks(self, req, usage):
+        timeout = max(1.0, req.deadline - time.monotonic())
+        with self._http.post(f"{OLLAMA_URL}/api/generate", json=self._payload(req, stream=True),
+                             timeout=timeout, stream=True) as res:
+            if res.status_code != 200:
+                raise LLMGatewayError(f"Ollama Error {res.status_code}: {res.text[:200]}")
+            # NDJSON: 줄마다 {"response": "...", "done": false}
+            for line in res.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get('error'):
+                    raise LLMGatewayError(f"Ollama Error: {data['error']}")
+                yield data.get('response', '')
+                if data.get('done'):
+                    usage['prompt_tokens'] = data.get('prompt_eval_count', 0) or 0
+                    usage['completion_tokens'] = data.get('eval_count', 0) or 0
+                    break
+
+
+class _VLLMBackend(_Backend):
+    name = 'vllm'
+
+    @staticmethod
+    def _payload(first, prompt):
+        payload = {
+            "model": VLLM_MODEL or first.model,
+            "prompt": prompt,
+        }
+        for key, value in first.options.items():
+            if key in _VLLM_OPTION_MAP:
+                payload[_VLLM_OPTION_MAP[key]] = value
+        if first.format == 'json':
+            payload["response_format"] = {"type": "json_object"}
+        return payload
+
+    def _execute(self, batch):
+        payload = self._payload(batch[0], [req.prompt for req in batch])
+
+        timeout = max(1.0, max(req.deadline for req in batch) - time.monotonic())
+        res = self._http.post(f"{VLLM_URL}/v1/completions", json=payload, timeout=timeout)
+        if res.status_code != 200:
+            raise LLMGatewayError(f"vLLM Error {res.status_code}: {res.text[:200]}")
+        data = res.json()
+
+        texts = [''] * len(batch)
+        for choice in data.get('choices', []):
+            index = choice.get('index', 0)
+            if 0 <= index < len(batch):
+                texts[index] = choice.get('text', '')
+        usage = data.get('usage') or {}
+        # usage는 배치 합계만 주므로 요청별로 균등 배분 (지표 용도)
+        n = len(batch)
+        prompt_tokens = (usage.get('prompt_tokens') or 0) / n
+        completion_tokens = (usage.get('completion_tokens') or 0) / n
+        return [(text, prompt_tokens, completion_tokens) for text in texts]
+
+    def _stream_chunks(self, req, usage):
+        payload = self._payload(req, req.prompt)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        timeout = max(1.0, req.deadline - time.monotonic())
+        with self._http.post(f"{VLLM_URL}/v1/completions", json=payload,
+                             timeout=timeout, stream=True) as res:
+            if res.status_code != 200:
+                raise LLMGatewayError(f"vLLM Error {res.status_code}: {res.text[:200]}")
+            # SSE: "data: {...}" ... "data: [DONE]"
+            for line in res.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                body = line[5:].strip()
+                if body == '[DONE]':
+                    break
+                data = json.loads(body)
+                if data.get('usage'):
+                    usage['prompt_tokens'] = data['usage'].get('prompt_tokens') or 0
+                    usage['completion_tokens'] = data['usage'].get('completion_tokens') or 0
+                for choice in data.get('choices', []):
+                    yield choice.get('text', '')
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+_BACKEND_TYPES = {
+    'ollama': (_OllamaBackend, OLLAMA_CONCURRENCY, OLLAMA_MAX_BATCH),
+    'vllm': (_VLLMBackend, VLLM_CONCURRENCY, VLLM_MAX_BATCH),
+}
+
+
+def _get_backend(name):
+    if name not in _BACKEND_TYPES:
+        raise LLMGatewayError(f"알 수 없는 LLM 백엔드: {name}")
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                cls, concurrency, max_batch = _BACKEND_TYPES[name]
+                backend = _backends[name] = cls(concurrency, max_batch)
+    return backend
+
+
+def generate(prompt, model=None, options=None, format=None, timeout=120, backend=None):
+    """
+    프롬프트 1건을 게이트웨이 큐에 넣고 생성 결과 텍스트를 반환한다. (앞뒤 공백 제거 전 원문)
+    - options: Ollama options 형식 (temperature, num_predict, ...). 'model' / 'format' 키가 있으면 분리해 사용
+    - timeout: 큐 대기 + 생성 전체에 대한 상한(초)
+    실패/타임아웃 시 LLMGatewayError.
+    """
+    options = dict(options or {})
+    model = model or options.pop('model', None) or DEFAULT_MODEL
+    options.pop('model', None)
+    format = format or options.pop('format', None)
+    options.pop('format', None)
+
+    req = _Request(prompt, model, options, format, timeout)
+    future = _get_backend(backend or DEFAULT_BACKEND).submit(req)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        # 아직 대기 중이면 실행되지 않도록 취소 (실행 중이면 결과만 버려짐)
+        future.cancel()
+        raise LLMGatewayError(f"LLM 응답 시간 초과 ({timeout}s)")
+
+
+def generate_stream(prompt, model=None, options=None, format=None, timeout=120, backend=None):
+    """
+    generate()의 스트리밍 버전. 생성되는 텍스트 조각을 차례로 yield한다.
+    - timeout: 슬롯 대기 + 생성 전체에 대한 상한(초)
+    실패 시 LLMGatewayError (이미 일부 조각을 yield한 뒤일 수 있음).
+    """
+    options = dict(options or {})
+    model = model or options.pop('model', None) or DEFAULT_MODEL
+    options.pop('model', None)
+    format = format or options.pop('format', None)
+    options.pop('format', None)
+
+    req = _Request(prompt, model, options, format, timeout)
+    yield from _get_backend(backend or DEFAULT_BACKEND).stream(req)
+
+
+def get_gateway_stats():
+    """백엔드별 큐 길이 / 배치 / 지연 / 토큰 처리량 지표"""
+    return {
+        'default_backend': DEFAULT_BACKEND,
+        'batch_window_ms': BATCH_WINDOW_MS,
+        'backends': {name: backend.stats() for name, backend in list(_backends.items())},
+    }
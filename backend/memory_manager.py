@@ -8,10 +8,9 @@ HuggingFace (sentence-transformers)와 PostgreSQL (pgvector)를
 import os
 import json
 import logging
-import psycopg2
-from pgvector.psycopg2 import register_vector
 from dotenv import load_dotenv
 from crypto_utils import EncryptionManager
+from db_pool import get_conn
 import threading
 
 load_dotenv()
@@ -19,39 +18,90 @@ crypto = EncryptionManager(os.environ.get('ENCRYPTION_KEY'))
 
 logger = logging.getLogger(__name__)
 
-# DB 접속 설정 (기본값)
-DB_USER = os.environ.get("DB_USER", "vibe_user")
-DB_PASS = os.environ.get("DB_PASS", "")  # [Fix] Gemini 버그 헌팅: 비밀번호 하드코딩 완전 제거
-DB_HOST = os.environ.get("DB_HOST", "localhost")
-DB_NAME = os.environ.get("DB_NAME", "vibe_db")
-
 # 임베딩 모델 싱글톤 초기화
+# EMBEDDER_BACKEND: 'torch' (SentenceTransformer, 기본) | 'onnx' (int8 양자화 ONNX, onnx_embedder.py)
+EMBEDDER_BACKEND = os.environ.get('EMBEDDER_BACKEND', 'torch')
 _embedder = None
 _embedder_lock = threading.Lock()
 
+def _load_embedder():
+    if EMBEDDER_BACKEND == 'onnx':
+        try:
+            from onnx_embedder import OnnxEmbedder
+            embedder = OnnxEmbedder()
+            logger.info(f"[MemoryManager] ONNX(int8) Embedder 초기화 완료: {embedder.model_path}")
+            return embedder
+        except Exception as e:
+            # 모델 파일/onnxruntime이 없으면 기존 PyTorch 모델로 대체
+            logger.error(f"[MemoryManager] ONNX Embedder 초기화 실패 → PyTorch로 대체: {e}")
+    from sentence_transformers import SentenceTransformer
+    embedder = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+    logger.info("[MemoryManager] Native Embedder 초기화 완료")
+    return embedder
+
 def get_embedder():
     global _embedder
     if _embedder is None:
         with _embedder_lock:
             if _embedder is None:
                 try:
-                    from sentence_transformers import SentenceTransformer
-                    _embedder = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
-                    logger.info("[MemoryManager] Native Embedder 초기화 완료")
+                    _embedder = _load_embedder()
                 except Exception as e:
                     logger.error(f"[MemoryManager] Embedder 초기화 실패: {e}")
     return _embedder
 
+def warm_embedder_async():
+    """
+    서버 시작 시 임베딩 모델을 백그라운드에서 미리 올린다. (첫 일기 분석의 콜드 스타트 제거)
+    RAG(pgvector)를 쓰지 않는 환경(테스트용 SQLite 등)이나 EMBEDDER_WARMUP=0이면 생략.
+    """
+    db_url = os.environ.get('DATABASE_URL', '')
+    if os.environ.get('EMBEDDER_WARMUP', '1') != '1' or (db_url and not db_url.startswith('postgres')):
+        return None
+
+    def _warm():
+        embedder = get_embedder()
+        if embedder is not None:
+            embedder.encode("마음온 임베딩 워밍업")
+
+    t = threading.Thread(target=_warm, name="embedder-warmup", daemon=True)
+    t.start()
+    return t
+
 def get_db_connection():
-    db_url = os.environ.get('DATABASE_URL')
-    if db_url:
-        conn = psycopg2.connect(db_url)
-    else:
-        conn = psycopg2.connect(dbname=DB_NAME, user=DB_USER, password=DB_PASS, host=DB_HOST)
-    
-    # pgvector 타입 등록 (벡터 삽입/검색용)
-    register_vector(conn)
-    return conn
+    """
+    공유 커넥션 풀에서 pgvector 타입이 등록된 연결을 빌린다. (with 문으로 사용)
+    register_vector는 풀 연결마다 최초 1회만 수행된다.
+    """
+    return get_conn(vector=True)
+
+def build_memory_text(diary_text: str, mood_level: int, emotion_desc: str = "",
+                      ai_comment: str = "", diary_date: str = "") -> str:
+    """기억에 저장할 텍스트 구성 (store_diary_memory / 배치 백필 공용)"""
+    memory_parts = []
+    if diary_date:
+        memory_parts.append(f"[{diary_date}]")
+    memory_parts.append(f"기분점수: {mood_level}/5")
+    if emotion_desc:
+        memory_parts.append(f"감정: {emotion_desc}")
+    if diary_text:
+        truncated = diary_text[:200] if len(diary_text) > 200 else diary_text
+        memory_parts.append(f"일기내용: {truncated}")
+        
+    if ai_comment:
+        comment_text = ai_comment
+        try:
+            json_start = ai_comment.find('{')
+            if json_start >= 0:
+                parsed = json.loads(ai_comment[json_start:])
+                if isinstance(parsed, dict):
+                    comment_text = parsed.get('comment', '') or ai_comment
+        except Exception:
+            pass
+        if comment_text:
+            memory_parts.append(f"AI의견: {comment_text[:150]}")
+            
+    return " | ".join(memory_parts)
 
 def store_diary_memory(diary_id: int, user_id: int, diary_text: str, mood_level: int,
                        emotion_desc: str = "", ai_comment: str = "",
@@ -60,31 +110,7 @@ def store_diary_memory(diary_id: int, user_id: int, diary_text: str, mood_level:
     일기 작성 시 핵심 내용을 PostgreSQL(pgvector)에 바로 저장합니다. (UPSERT 수행)
     """
     try:
-        # 기억에 저장할 텍스트 구성
-        memory_parts = []
-        if diary_date:
-            memory_parts.append(f"[{diary_date}]")
-        memory_parts.append(f"기분점수: {mood_level}/5")
-        if emotion_desc:
-            memory_parts.append(f"감정: {emotion_desc}")
-        if diary_text:
-            truncated = diary_text[:200] if len(diary_text) > 200 else diary_text
-            memory_parts.append(f"일기내용: {truncated}")
-            
-        if ai_comment:
-            comment_text = ai_comment
-            try:
-                json_start = ai_comment.find('{')
-                if json_start >= 0:
-                    parsed = json.loads(ai_comment[json_start:])
-                    if isinstance(parsed, dict):
-                        comment_text = parsed.get('comment', '') or ai_comment
-            except Exception:
-                pass
-            if comment_text:
-                memory_parts.append(f"AI의견: {comment_text[:150]}")
-                
-        memory_text = " | ".join(memory_parts)
+        memory_text = build_memory_text(diary_text, mood_level, emotion_desc, ai_comment, diary_date)
         
         embedder = get_embedder()
         if not embedder:
@@ -98,8 +124,7 @@ def store_diary_memory(diary_id: int, user_id: int, diary_text: str, mood_level:
         encrypted_text = crypto.encrypt(memory_text)
         
         # DB에 바로 삽입
-        conn = get_db_connection()
-        try:
+        with get_db_connection() as conn:
             cur = conn.cursor()
             query = """
                 INSERT INTO diary_memories (diary_id, user_id, memory_text, embedding)
@@ -112,13 +137,159 @@ def store_diary_memory(diary_id: int, user_id: int, diary_text: str, mood_level:
             conn.commit()
             cur.close()
             logger.info(f"[MemoryManager] 유저 {user_id} 기억 직접 저장 완료 (Native RAG)")
-        finally:
-            conn.close()
         
     except Exception as e:
         logger.error(f"[MemoryManager] 메모리 직접 저장 실패 (유저 {user_id}): {e}")
 
 
+# ─────────────────────────────────────────────
+# [NativeRAG] 벡터 검색 전략 / ANN 인덱스
+# ─────────────────────────────────────────────
+# - 사용자별 기억이 EXACT_SEARCH_MAX_ROWS 이하: (user_id, diary_id) 복합 인덱스로 해당 사용자 행만 뽑아
+#   정확(exact) 거리 정렬 → 수천 건 이하에서는 1ms 안팎, 재현율 100%
+# - 그보다 많으면: HNSW 인덱스 + hnsw.ef_search (pgvector 0.8+는 iterative_scan으로 필터 후 부족분 보충)
+# HNSW만 쓰면 user_id 필터가 인덱스 탐색 뒤에 적용되어 소수 사용자 검색 결과가 k개보다 모자랄 수 있다.
+
+EXACT_SEARCH_MAX_ROWS = int(os.environ.get('MEMORY_EXACT_SEARCH_MAX_ROWS', '5000'))
+HNSW_EF_SEARCH = int(os.environ.get('MEMORY_HNSW_EF_SEARCH', '64'))
+HNSW_M = int(os.environ.get('MEMORY_HNSW_M', '16'))
+HNSW_EF_CONSTRUCTION = int(os.environ.get('MEMORY_HNSW_EF_CONSTRUCTION', '64'))
+EMBEDDING_DIM = 384  # paraphrase-multilingual-MiniLM-L12-v2
+USER_COUNT_TTL_SECONDS = 600
+
+HNSW_INDEX_NAME = 'idx_diary_memories_embedding_hnsw'
+USER_INDEX_NAME = 'idx_diary_memories_user_diary'
+
+_user_counts = {}          # user_id → (기억 수, 조회 시각)
+_user_counts_lock = threading.Lock()
+_pgvector_version = None
+
+
+def _get_pgvector_version(cur):
+    global _pgvector_version
+    if _pgvector_version is None:
+        cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cur.fetchone()
+        _pgvector_version = tuple(int(p) for p in row[0].split('.')[:2]) if row else (0, 0)
+    return _pgvector_version
+
+
+def _user_memory_count_cached(cur, user_id):
+    import time
+    now = time.time()
+    with _user_counts_lock:
+        cached = _user_counts.get(user_id)
+    if cached and now - cached[1] < USER_COUNT_TTL_SECONDS:
+        return cached[0]
+    cur.execute("SELECT count(*) FROM diary_memories WHERE user_id = %s", (user_id,))
+    count = cur.fetchone()[0]
+    with _user_counts_lock:
+        if len(_user_counts) > 10000:
+            _user_counts.clear()
+        _user_counts[user_id] = (count, now)
+    return count
+
+
+def search_memory_rows(conn, user_id, search_vector, limit=5, exclude_diary_id=None,
+                       strategy='auto', ef_search=None):
+    """
+    사용자 기억 벡터 검색. [(diary_id, memory_text(암호문), cosine distance), ...]
+    strategy: 'auto' | 'exact' | 'hnsw'
+    """
+    exclude = exclude_diary_id if exclude_diary_id is not None else -1
+    with conn.cursor() as cur:
+        if strategy == 'auto':
+            strategy = 'exact' if _user_memory_count_cached(cur, user_id) <= EXACT_SEARCH_MAX_ROWS else 'hnsw'
+
+        if strategy == 'exact':
+            # MATERIALIZED CTE → 플래너가 HNSW 순서 스캔을 고르지 못하게 하고 user_id 인덱스로만 읽는다
+            cur.execute("""
+                WITH mine AS MATERIALIZED (
+                    SELECT diary_id, memory_text, embedding
+                      FROM diary_memories
+                     WHERE user_id = %s AND diary_id <> %s
+                )
+                SELECT diary_id, memory_text, embedding <=> %s::vector AS distance
+                  FROM mine
+                 ORDER BY distance
+                 LIMIT %s
+            """, (user_id, exclude, search_vector, limit))
+        else:
+            # SET LOCAL은 트랜잭션 범위 → 풀 연결 반납 시 롤백/커밋과 함께 원복
+            cur.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(ef_search or HNSW_EF_SEARCH),))
+            if _get_pgvector_version(cur) >= (0, 8):
+                cur.execute("SELECT set_config('hnsw.iterative_scan', 'relaxed_order', true)")
+            cur.execute("""
+                SELECT diary_id, memory_text, embedding <=> %s::vector AS distance
+                  FROM diary_memories
+                 WHERE user_id = %s AND diary_id <> %s
+                 ORDER BY distance
+                 LIMIT %s
+            """, (search_vector, user_id, exclude, limit))
+        rows = cur.fetchall()
+    conn.commit()
+    return rows
+
+
+def ensure_memory_indexes(build_hnsw=True):
+    """
+    diary_memories 테이블과 검색 인덱스를 만든다. (이미 있으면 건너뜀)
+    HNSW는 CREATE INDEX CONCURRENTLY로 만들어 쓰기를 막지 않는다. (대용량이면 수 분 소요 → 배포 후 CLI로 실행)
+    """
+    with get_conn() as conn:
+        conn.autocommit = True  # CONCURRENTLY는 트랜잭션 밖에서만 가능
+        try:
+            with conn.cursor() as cur:
+                cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+                cur.execute(f"""
+                    CREATE TABLE IF NOT EXISTS diary_memories (
+                        id SERIAL PRIMARY KEY,
+                        diary_id INTEGER NOT NULL UNIQUE,
+                        user_id INTEGER NOT NULL,
+                        memory_text TEXT NOT NULL,
+                        embedding vector({EMBEDDING_DIM}) NOT NULL,
+                        created_at TIMESTAMP DEFAULT now()
+                    )
+                """)
+                cur.execute(f"CREATE INDEX IF NOT EXISTS {USER_INDEX_NAME} ON diary_memories (user_id, diary_id)")
+
+                if build_hnsw:
+                    # 이전 CONCURRENTLY 빌드가 중단되어 INVALID로 남은 인덱스는 다시 만든다
+                    cur.execute("""
+                        SELECT i.indisvalid FROM pg_index i
+                          JOIN pg_class c ON c.oid = i.indexrelid
+                         WHERE c.relname = %s
+                    """, (HNSW_INDEX_NAME,))
+                    row = cur.fetchone()
+                    if row is not None and not row[0]:
+                        logger.warning("[MemoryManager] INVALID HNSW 인덱스 재생성")
+                        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {HNSW_INDEX_NAME}")
+                        row = None
+                    if row is None:
+                        logger.info("[MemoryManager] HNSW 인덱스 생성 시작 (CONCURRENTLY)")
+                        cur.execute(f"""
+                            CREATE INDEX CONCURRENTLY IF NOT EXISTS {HNSW_INDEX_NAME}
+                                ON diary_memories USING hnsw (embedding vector_cosine_ops)
+                                WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})
+                        """)
+                cur.execute("ANALYZE diary_memories")
+        finally:
+            conn.autocommit = False
+    logger.info("[MemoryManager] diary_memories 인덱스 확인 완료")
+
+
+def reindex_memory_hnsw():
+    """대량 백필/모델 교체 후 HNSW 그래프 품질 복구 (쓰기를 막지 않는 REINDEX CONCURRENTLY)"""
+    with get_conn() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"REINDEX INDEX CONCURRENTLY {HNSW_INDEX_NAME}")
+                cur.execute("ANALYZE diary_memories")
+        finally:
+            conn.autocommit = False
+
+
 def recall_memories(user_id: int, current_text: str, limit: int = 5, exclude_diary_id: int = None) -> str:
     """
     현재 일기 내용과 일치(유사)하는 과거 기억을 벡터 검색으로 불러옵니다.
@@ -137,33 +308,8 @@ def recall_memories(user_id: int, current_text: str, limit: int = 5, exclude_dia
         # 검색 쿼리를 벡터로 변환
         search_vector = embedder.encode(current_text).tolist()
         
-        conn = get_db_connection()
-        try:
-            cur = conn.cursor()
-            
-            if exclude_diary_id is not None:
-                query = """
-                    SELECT memory_text 
-                    FROM diary_memories 
-                    WHERE user_id = %s AND diary_id != %s
-                    ORDER BY embedding <=> %s::vector 
-                    LIMIT %s
-                """
-                cur.execute(query, (user_id, exclude_diary_id, search_vector, limit))
-            else:
-                query = """
-                    SELECT memory_text 
-                    FROM diary_memories 
-                    WHERE user_id = %s 
-                    ORDER BY embedding <=> %s::vector 
-                    LIMIT %s
-                """
-                cur.execute(query, (user_id, search_vector, limit))
-                
-            rows = cur.fetchall()
-            cur.close()
-        finally:
-            conn.close()
+        with get_db_connection() as conn:
+            rows = search_memory_rows(conn, user_id, search_vector, limit, exclude_diary_id)
         
         if not rows:
             return ""
@@ -171,7 +317,7 @@ def recall_memories(user_id: int, current_text: str, limit: int = 5, exclude_dia
         memories = []
         for row in rows:
             try:
-                dec = crypto.decrypt(row[0])
+                dec = crypto.decrypt(row[1])
                 memories.append(f"  - {dec}")
             except Exception as dec_err:
                 logger.error(f"[MemoryManager] 복호화 에러: {dec_err}")
@@ -190,15 +336,12 @@ def recall_memories(user_id: int, current_text: str, limit: int = 5, exclude_dia
 def get_user_memory_count(user_id: int) -> int:
     """특정 사용자의 저장된 기억 개수를 반환합니다."""
     try:
-        conn = get_db_connection()
-        try:
+        with get_db_connection() as conn:
             cur = conn.cursor()
             cur.execute("SELECT count(*) FROM diary_memories WHERE user_id = %s", (user_id,))
             count = cur.fetchone()[0]
             cur.close()
             return count
-        finally:
-            conn.close()
     except Exception as e:
         logger.error(f"[MemoryManager] 메모리 카운트 실패 (유저 {user_id}): {e}")
         return 0
@@ -209,15 +352,152 @@ def delete_diary_memory(diary_id: int):
     고아 데이터(Zombie Data)로 남는 보안 사고를 방지합니다.
     """
     try:
-        conn = get_db_connection()
-        try:
+        with get_db_connection() as conn:
             cur = conn.cursor()
             cur.execute("DELETE FROM diary_memories WHERE diary_id = %s", (diary_id,))
             conn.commit()
             cur.close()
             logger.info(f"[MemoryManager] 일기 {diary_id} 의 RAG 메모리 파기 완료 (Zero-Trace)")
-        finally:
-            conn.close()
     except Exception as e:
         logger.error(f"[MemoryManager] 일기 {diary_id} 메모리 파기 실패: {e}")
 
+
+
+# ─────────────────────────────────────────────
+# [NativeRAG] 배치 임베딩 / 백필 (임베딩 모델 교체 시 전체 재색인)
+# ─────────────────────────────────────────────
+
+EMBED_BATCH_SIZE = int(os.environ.get('MEMORY_EMBED_BATCH_SIZE', '128'))   # encode() 1회당 문장 수 (64~256 권장)
+BACKFILL_CHUNK_SIZE = int(os.environ.get('MEMORY_BACKFILL_CHUNK_SIZE', '1000'))  # DB에서 한 번에 읽을 일기 수
+
+def store_diary_memories_bulk(items, batch_size: int = None) -> int:
+    """
+    여러 기억을 한 번에 임베딩하고 execute_values로 일괄 UPSERT합니다.
+    items: [(diary_id, user_id, memory_text), ...] — memory_text는 평문
+    Returns: 저장한 건수
+    """
+    if not items:
+        return 0
+    embedder = get_embedder()
+    if not embedder:
+        raise RuntimeError("Embedder 미초기화")
+
+    from psycopg2.extras import execute_values
+
+    texts = [text for _, _, text in items]
+    embeddings = embedder.encode(texts, batch_size=batch_size or EMBED_BATCH_SIZE,
+                                 convert_to_numpy=True, show_progress_bar=False)
+    rows = [
+        (diary_id, user_id, crypto.encrypt(text), embedding.tolist())
+        for (diary_id, user_id, text), embedding in zip(items, embeddings)
+    ]
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            execute_values(cur, """
+                INSERT INTO diary_memories (diary_id, user_id, memory_text, embedding)
+                VALUES %s
+                ON CONFLICT (diary_id) DO UPDATE
+                SET memory_text = EXCLUDED.memory_text,
+                    embedding = EXCLUDED.embedding
+            """, rows, template="(%s, %s, %s, %s::vector)", page_size=500)
+        conn.commit()
+    return len(rows)
+
+def _diary_row_to_memory(row, wrapped_keys=None):
+    """
+    diaries 행 → (diary_id, user_id, memory_text). 기억에 넣으면 안 되는 행은 None.
+    analysis_worker와 같은 기준: AI 분석이 없거나 Fallback(오류) 응답이면 제외 (기억 오염 방지)
+    wrapped_keys: 봉투 형식(sealed) 행의 {user_id: 감싼 데이터 키}
+    """
+    diary_id, user_id, date, event, emotion_desc, emotion_meaning, self_talk, mood_level, ai_comment, ai_emotion, sealed = row
+    if sealed is not None:
+        from diary_envelope import open_columns
+        opened = open_columns(user_id, sealed, {
+            'event': event, 'emotion_desc': emotion_desc, 'emotion_meaning': emotion_meaning,
+            'self_talk': self_talk, 'ai_comment': ai_comment, 'ai_emotion': ai_emotion,
+        }, (wrapped_keys or {}).get(user_id))
+        event, emotion_desc, emotion_meaning, self_talk, ai_comment, ai_emotion = (
+            opened['event'], opened['emotion_desc'], opened['emotion_meaning'],
+            opened['self_talk'], opened['ai_comment'], opened['ai_emotion'])
+    dec = lambda v: (crypto.decrypt(v) or "") if v else ""
+    comment = dec(ai_comment)
+    emotion = dec(ai_emotion)
+    if not comment or "오류가 발생" in comment or "AI 분석 지연" in comment or emotion in ("", "기타", "대기중"):
+        return None
+
+    emotion_desc = dec(emotion_desc)
+    combined_emotion = f"사용자입력감정:{emotion_desc} / AI진단감정:{emotion}" if emotion_desc else emotion
+    integrated_text = " ".join(filter(None, [dec(event), dec(emotion_meaning), dec(self_talk)]))
+    memory_text = build_memory_text(
+        integrated_text,
+        mood_level if mood_level is not None else 3,
+        combined_emotion,
+        comment,
+        date or "",
+    )
+    return diary_id, user_id, memory_text
+
+def backfill_diary_memories(start_after_id: int = 0, chunk_size: int = None, batch_size: int = None,
+                            user_id: int = None, only_missing: bool = False, on_chunk=None) -> dict:
+    """
+    diaries를 id 순으로 chunk_size씩 읽어(keyset) 복호화 → 배치 임베딩 → 일괄 UPSERT 합니다.
+    - 청크마다 커밋되므로 중단 후 마지막 id(on_chunk로 전달)부터 재개할 수 있습니다.
+    - only_missing=True: diary_memories에 아직 없는 일기만 처리 (모델 교체 시에는 False로 전체 재색인)
+    - on_chunk(last_id, stats): 청크 커밋 직후 호출 (체크포인트 기록용)
+    """
+    from diary_envelope import pg_wrapped_keys
+
+    chunk_size = chunk_size or BACKFILL_CHUNK_SIZE
+    stats = {'scanned': 0, 'stored': 0, 'skipped': 0, 'errors': 0, 'last_id': start_after_id}
+
+    where = ["d.id > %s"]
+    if user_id is not None:
+        where.append("d.user_id = %s")
+    if only_missing:
+        where.append("NOT EXISTS (SELECT 1 FROM diary_memories m WHERE m.diary_id = d.id)")
+    query = f"""
+        SELECT d.id, d.user_id, d.date, d.event, d.emotion_desc, d.emotion_meaning, d.self_talk,
+               d.mood_level, d.ai_comment, d.ai_emotion, d.sealed
+          FROM diaries d
+         WHERE {' AND '.join(where)}
+         ORDER BY d.id
+         LIMIT %s
+    """
+
+    last_id = start_after_id
+    while True:
+        params = [last_id] + ([user_id] if user_id is not None else []) + [chunk_size]
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                rows = cur.fetchall()
+                wrapped_keys = pg_wrapped_keys(cur, {row[1] for row in rows if row[-1] is not None})
+            conn.commit()
+        if not rows:
+            break
+
+        items = []
+        for row in rows:
+            try:
+                item = _diary_row_to_memory(row, wrapped_keys)
+            except Exception as e:
+                logger.error(f"[MemoryManager] 백필 복호화 실패 (일기 {row[0]}): {e}")
+                stats['errors'] += 1
+                continue
+            if item is None:
+                stats['skipped'] += 1
+            else:
+                items.append(item)
+
+        stats['stored'] += store_diary_memories_bulk(items, batch_size=batch_size)
+        stats['scanned'] += len(rows)
+        last_id = rows[-1][0]
+        stats['last_id'] = last_id
+        logger.info(f"[MemoryManager] 백필 진행: ~{last_id} (저장 {stats['stored']}, 제외 {stats['skipped']})")
+        if on_chunk:
+            on_chunk(last_id, dict(stats))
+        if len(rows) < chunk_size:
+            break
+
+    return stats
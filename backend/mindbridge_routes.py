@@ -483,11 +483,14 @@ def delete_all_bridge_data():
     user_id = int(get_jwt_identity())  # [Fix#3]
     
     # 1) 열람 로그 삭제 (FK 순서)
-    share_ids = [s.id for s in BridgeShare.query.filter_by(user_id=user_id).all()]
+    shares = BridgeShare.query.filter_by(user_id=user_id).all()
+    share_ids = [s.id for s in shares]
     if share_ids:
         BridgeViewLog.query.filter(BridgeViewLog.share_id.in_(share_ids)).delete(synchronize_session=False)
     
-    # 2) 공유 데이터 삭제
+    # 2) 공유 데이터 삭제 (복호화해 둔 평문 캐시도 즉시 제거)
+    from crypto_utils import purge_plaintext
+    purge_plaintext([s.encrypted_data for s in shares])
     BridgeShare.query.filter_by(user_id=user_id).delete()
     
     # 3) 수신자 삭제
@@ -1,4 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -60,6 +62,8 @@ class Diary(db.Model):
 
     # Direct Mappings (vibe_db has these exact columns)
     date = db.Column(db.String(10), nullable=False) # stored as 'YYYY-MM-DD' string
+    # [DiaryDate] date 문자열의 네이티브 DATE 사본 (ORM 이벤트 + PG 트리거로 동기화, 파싱 불가 값은 NULL)
+    diary_date = db.Column(db.Date, nullable=True)
     
     sleep_condition = db.Column(db.Text, nullable=True) # Text type in DB
     emotion_desc = db.Column(db.Text, nullable=True)
@@ -79,9 +83,20 @@ class Diary(db.Model):
     
     ai_comment = db.Column(db.Text, nullable=True)
     ai_emotion = db.Column(db.Text, nullable=True)
+
+    # [Envelope] 민감 필드 전체를 사용자 데이터 키로 묶어 암호화한 값 (diary_envelope.py, 있으면 위 필드 컬럼은 NULL)
+    sealed = db.Column(db.LargeBinary, nullable=True)
     
     created_at = db.Column(db.DateTime, nullable=True)
-    updated_at = db.Column(db.DateTime, nullable=True)
+    # [ETag] 목록 응답의 변경 감지용 (ORM 쓰기는 onupdate, 워커의 psycopg2 UPDATE는 PG 트리거가 갱신)
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # [Index] 거의 모든 조회가 user_id + date/created_at 범위 (schema_migrations.py 0001과 같은 이름)
+    __table_args__ = (
+        db.Index('ix_diaries_user_date', 'user_id', 'date'),
+        db.Index('ix_diaries_user_created_at', 'user_id', 'created_at'),
+        db.Index('ix_diaries_user_diary_date', 'user_id', 'diary_date'),
+    )
 
     def to_dict(self):
         return {
@@ -103,6 +118,66 @@ class Diary(db.Model):
             'image_url': None # Not in DB
         }
 
+def parse_diary_date(value):
+    """'YYYY-MM-DD' 문자열 → date (파싱 불가 시 None, PG의 diaries_parse_date()와 동일)"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+@event.listens_for(Diary, 'before_insert')
+@event.listens_for(Diary, 'before_update')
+def _sync_diary_date(mapper, connection, target):
+    target.diary_date = parse_diary_date(target.date)
+
+
+# [Envelope] 봉투 형식 행은 로드 시 필드 속성에 평문을 채우고, flush 시 다시 봉인 (diary_envelope.py)
+@event.listens_for(Diary, 'load')
+def _open_sealed_on_load(target, context):
+    if target.__dict__.get('sealed') is not None:
+        from diary_envelope import open_diary
+        open_diary(target, context.session.connection())
+
+
+@event.listens_for(Diary, 'refresh')
+def _open_sealed_on_refresh(target, context, attrs):
+    if target.__dict__.get('sealed') is not None:
+        from diary_envelope import open_diary
+        open_diary(target, context.session.connection(), attrs)
+
+
+@event.listens_for(Diary, 'before_insert')
+def _seal_on_insert(mapper, connection, target):
+    from diary_envelope import seal_diary
+    seal_diary(connection, object_session(target), target, inserting=True)
+
+
+@event.listens_for(Diary, 'before_update')
+def _seal_on_update(mapper, connection, target):
+    from diary_envelope import seal_diary
+    seal_diary(connection, object_session(target), target, inserting=False)
+
+
+@event.listens_for(Diary, 'after_insert')
+@event.listens_for(Diary, 'after_update')
+def _restore_after_seal(mapper, connection, target):
+    from diary_envelope import restore_diary
+    restore_diary(target)
+
+
+@event.listens_for(Session, 'after_commit')
+def _envelope_after_commit(session):
+    from diary_envelope import forget_session_keys
+    forget_session_keys(session, rollback=False)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _envelope_after_rollback(session):
+    from diary_envelope import forget_session_keys
+    forget_session_keys(session, rollback=True)
+
+
 class ChatLog(db.Model):
     __tablename__ = 'chat_logs'
     id = db.Column(db.Integer, primary_key=True)
@@ -280,3 +355,158 @@ class BridgeViewLog(db.Model):
     
     # Relationship
     share = db.relationship('BridgeShare', backref=db.backref('view_logs', lazy=True))
+
+
+class AnalysisJob(db.Model):
+    """
+    [AI 분석 작업 큐]
+    일기 AI 분석(코멘트/감정/점수) 작업을 DB에 영속화한다.
+    - diary_id UNIQUE: 같은 일기의 연속 수정은 하나의 작업으로 병합 (version 증가)
+    - status: pending → running → done / failed
+    - 재배포/재시작 시에도 pending/running 작업이 유실되지 않음
+    """
+    __tablename__ = 'analysis_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    diary_id = db.Column(db.Integer, unique=True, nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=True)
+
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    version = db.Column(db.Integer, nullable=False, default=1)      # 일기 수정 시마다 증가 (Task Versioning)
+    attempts = db.Column(db.Integer, nullable=False, default=0)     # 현재 version 기준 시도 횟수
+    next_run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # 재시도 백오프
+    locked_at = db.Column(db.DateTime, nullable=True)               # 워커 점유 시각 (stale 회수용)
+    locked_by = db.Column(db.String(64), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'diary_id': self.diary_id,
+            'status': self.status,
+            'version': self.version,
+            'attempts': self.attempts,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'last_error': self.last_error,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class DiaryFeature(db.Model):
+    """
+    [킥 분석 일기별 특징 저장소]
+    일기 작성/수정 시 analysis_queue 워커가 Kiwi 기반 특징을 한 번 계산해 저장한다.
+    킥 분석(Phase 2~6)은 요청마다 30일치 일기를 다시 토큰화하지 않고 이 행을 집계한다.
+    - 수치 특징(어휘 다양성, 자기 집중도, 부정어 비율, 수면 점수 등)은 컬럼으로 보관
+    - 인물/감정어 등 일기 내용이 드러나는 Phase별 결과는 payload(암호화 JSON)에 보관
+    - 일기 수정/삭제 시 행을 삭제하고, features_version이 현재와 다르면 무시 (재계산)
+    """
+    __tablename__ = 'diary_features'
+    id = db.Column(db.Integer, primary_key=True)
+    diary_id = db.Column(db.Integer, unique=True, nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    date = db.Column(db.String(10), nullable=True)
+
+    features_version = db.Column(db.Integer, nullable=False, default=1)   # 특징 추출 로직 버전
+    source_version = db.Column(db.Integer, nullable=True)                 # 계산 당시 analysis_jobs.version
+    relational_llm = db.Column(db.Boolean, nullable=False, default=False) # 인물 추출에 LLM NER 포함 여부
+
+    word_count = db.Column(db.Integer, nullable=True)
+    sentence_count = db.Column(db.Integer, nullable=True)
+    char_count = db.Column(db.Integer, nullable=True)
+    ttr = db.Column(db.Float, nullable=True)
+    self_focus = db.Column(db.Float, nullable=True)
+    negation_ratio = db.Column(db.Float, nullable=True)
+    people_count = db.Column(db.Integer, nullable=True)
+    sleep_score = db.Column(db.Integer, nullable=True)
+
+    payload = db.Column(db.Text, nullable=True)  # Encrypted JSON
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class UserConditionSnapshot(db.Model):
+    """
+    [마음 컨디션 스냅샷]
+    generate_condition 결과를 사용자별 1행으로 보관한다. (의료진 대시보드 condition-overview)
+    - 여러 gunicorn 워커/재시작 간에 공유 → 프로세스별 5분 캐시 재계산 제거
+    - diary_fingerprint(일기 수/최대 id/분석 작업 version 합)가 바뀌었거나
+      analysis_date가 오늘이 아닌 사용자만 다시 계산 (증분 갱신)
+    """
+    __tablename__ = 'user_condition_snapshots'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, unique=True, nullable=False, index=True)
+    analysis_date = db.Column(db.String(10), nullable=False)
+    diary_fingerprint = db.Column(db.String(64), nullable=False)
+
+    score = db.Column(db.Integer, nullable=True)
+    grade = db.Column(db.String(20), nullable=True)
+    payload = db.Column(db.Text, nullable=False)  # generate_condition 결과 JSON (점수/신호만, 일기 원문 없음)
+
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DiaryNerCache(db.Model):
+    """
+    [관계 분석 LLM NER 캐시]
+    relational의 LLM 인물 추출 결과를 일기별로 보관한다.
+    - content_hash(LLM 입력 텍스트 해시)가 같으면 재사용 → 일기 1건당 수정 1회마다 최대 1번만 LLM 호출
+    - 일기 수정 시에는 해시가 달라져 자동으로 다시 추출, 삭제 시 행 제거
+    - 인물 이름은 개인정보이므로 names는 암호화 JSON
+    """
+    __tablename__ = 'diary_ner_cache'
+    id = db.Column(db.Integer, primary_key=True)
+    diary_id = db.Column(db.Integer, unique=True, nullable=False, index=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    model = db.Column(db.String(50), nullable=False)
+    names = db.Column(db.Text, nullable=False)  # Encrypted JSON list
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class UserDailyStats(db.Model):
+    """
+    [일별 기분 집계]
+    사용자별 하루 1행. 통계 / 무드 캘린더 / 마음 온도가 일기 전체를 읽고 수면 메모를 복호화하는 대신
+    이 테이블을 (user_id, date) 범위로 한 번 조회한다. (daily_stats.py)
+    - 일기 작성/수정/삭제 시 해당 날짜 행만 다시 계산 (refresh_daily_stats)
+    - 수면은 점수(30/50/80)만 보관, 메모 원문 없음
+    - 마음 온도의 7일 창은 날짜가 아니라 작성 시각(created_at) 기준 → last_created_at으로 행을 고르고 항목별로 거름
+    """
+    __tablename__ = 'user_daily_stats'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.String(10), nullable=False)  # diaries.date와 같은 'YYYY-MM-DD'
+    stats_version = db.Column(db.Integer, nullable=False, default=1)  # 집계 로직 버전
+
+    diary_count = db.Column(db.Integer, nullable=False, default=0)
+    mood_avg = db.Column(db.Float, nullable=True)     # mood_level이 있는 일기 평균
+    sleep_score = db.Column(db.Float, nullable=True)  # 일기별 수면 점수 평균
+    temperature = db.Column(db.Float, nullable=True)  # 일별 마음 온도
+    safety_flag = db.Column(db.Boolean, nullable=False, default=False)
+    # JSON [[mood_level, weather, sleep_score, created_at(ISO), safety], ...] 일기 id 순
+    entries = db.Column(db.Text, nullable=False)
+    last_created_at = db.Column(db.DateTime, nullable=True)  # 그날 일기 중 가장 늦은 created_at
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_user_daily_stats_user_date', 'user_id', 'date', unique=True),
+        db.Index('ix_user_daily_stats_user_created', 'user_id', 'last_created_at'),
+    )
+
+
+class UserDataKey(db.Model):
+    """
+    [봉투 암호화 데이터 키]
+    사용자별 AES-256 데이터 키를 마스터 키(ENCRYPTION_KEY)로 감싼 Fernet 토큰.
+    diaries.sealed는 이 키로 암호화된다. (diary_envelope.py)
+    """
+    __tablename__ = 'user_data_keys'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    wrapped_key = db.Column(db.Text, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,134 @@
+"""
+ONNX Embedder - int8 양자화 MiniLM 임베딩 백엔드
+===============================================
+memory_manager.get_embedder()의 PyTorch SentenceTransformer 대신
+같은 모델(paraphrase-multilingual-MiniLM-L12-v2)을 ONNX로 내보내고 int8 동적 양자화한 버전을
+onnxruntime으로 실행한다. (EMBEDDER_BACKEND=onnx)
+
+- torch 없이 동작 → 콜드 스타트 수 초 → 수백 ms, 워커당 RSS 수백 MB 절감
+- InferenceSession.run은 스레드 안전 → 프로세스당 1개 세션을 모든 스레드가 공유
+- encode()는 SentenceTransformer.encode와 같은 호출 형태/출력(mean pooling, 비정규화)을 따른다
+
+모델 내보내기 (최초 1회, sentence-transformers/torch가 설치된 환경에서):
+  python onnx_embedder.py --output models/minilm-onnx
+  → models/minilm-onnx/{model.onnx, model_int8.onnx, tokenizer.json}
+"""
+
+import os
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+DEFAULT_MODEL_DIR = os.environ.get(
+    'EMBEDDER_ONNX_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'minilm-onnx')
+)
+QUANTIZED_FILE = 'model_int8.onnx'
+MAX_SEQ_LENGTH = 128  # SentenceTransformer 설정과 동일
+INTRA_OP_THREADS = int(os.environ.get('EMBEDDER_ONNX_THREADS', '0'))  # 0 = onnxruntime 기본값
+
+
+class OnnxEmbedder:
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR, model_file=QUANTIZED_FILE):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_path = os.path.join(model_dir, model_file)
+        tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        tokenizer.enable_padding(pad_id=tokenizer.token_to_id('<pad>') or 1, pad_token='<pad>')
+        self._tokenizer = tokenizer
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if INTRA_OP_THREADS > 0:
+            options.intra_op_num_threads = INTRA_OP_THREADS
+        self._session = ort.InferenceSession(self.model_path, sess_options=options,
+                                             providers=['CPUExecutionProvider'])
+        self._input_names = {i.name for i in self._session.get_inputs()}
+
+    def _encode_batch(self, texts):
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self._input_names:
+            feeds['token_type_ids'] = np.zeros_like(input_ids)
+
+        token_embeddings = self._session.run(None, feeds)[0]
+        # Mean Pooling (padding 토큰 제외)
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        return summed / counts
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, show_progress_bar=False,
+               normalize_embeddings=False, **kwargs):
+        """SentenceTransformer.encode 호환: str → (dim,), list → (n, dim) numpy 배열"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        # 길이순 정렬 후 배치 → padding 낭비 최소화 (SentenceTransformer와 같은 방식)
+        order = np.argsort([-len(t) for t in texts])
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            chunks.append((idx, self._encode_batch([texts[i] for i in idx])))
+
+        embeddings = np.zeros((len(texts), chunks[0][1].shape[1]), dtype=np.float32)
+        for idx, vectors in chunks:
+            embeddings[idx] = vectors
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
+
+    @property
+    def dimension(self):
+        return self._session.get_outputs()[0].shape[-1] or 384
+
+
+def export_onnx_model(output_dir=DEFAULT_MODEL_DIR, opset=14):
+    """SentenceTransformer 모델을 ONNX로 내보내고 int8 동적 양자화본을 만든다. (torch 필요)"""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModel.from_pretrained(MODEL_NAME).eval()
+    tokenizer.save_pretrained(output_dir)  # tokenizer.json 포함
+
+    sample = tokenizer(["마음온 임베딩 내보내기"], return_tensors='pt')
+    # XLM-R 토크나이저는 token_type_ids를 만들지 않음 → 있는 입력만 (forward 인자 순서 유지)
+    input_names = [k for k in ('input_ids', 'attention_mask', 'token_type_ids') if k in sample]
+    fp32_path = os.path.join(output_dir, 'model.onnx')
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[k] for k in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes={name: {0: 'batch', 1: 'sequence'}
+                          for name in input_names + ['last_hidden_state']},
+            opset_version=opset,
+        )
+
+    int8_path = os.path.join(output_dir, QUANTIZED_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    logger.info(f"[OnnxEmbedder] 내보내기 완료: {int8_path}")
+    return int8_path
+
+
+if __name__ == "__main__":
+    import argparse
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="MiniLM 임베딩 모델 ONNX int8 내보내기")
+    parser.add_argument('--output', default=DEFAULT_MODEL_DIR)
+    args = parser.parse_args()
+    print(f"✅ {export_onnx_model(args.output)}")
@@ -0,0 +1,268 @@
+"""
+RunPod Client - 비동기 RunPod Serverless 클라이언트
+==================================================
+call_llm_hybrid(analysis_worker) / EmotionAnalysis._call_llm(ai_brain)이
+`/run` 제출 후 `requests.get(status)` + `time.sleep(2)` 루프로 스레드를 최대 5~10분씩 점유하던 방식을 대체한다.
+
+- 프로세스당 1개의 asyncio 이벤트 루프(데몬 스레드)에서 모든 RunPod 작업을 다중화
+- 단일 HTTP/2 세션(httpx, h2 미설치 시 HTTP/1.1 keep-alive)으로 제출/조회
+- 기본 경로: `/runsync?wait=` (서버 측 대기) → 미완료 시 점증 간격 long-poll
+- RUNPOD_WEBHOOK_URL 설정 시: `/run` + webhook 콜백으로 완료 통지 (안전용 저빈도 폴링 병행)
+  RUNPOD_WEBHOOK_SECRET 필수 (URL의 ?token= 값과 비교, 없으면 클라이언트 생성 실패 / webhook 거부)
+- submit()은 concurrent.futures.Future를 반환 → 호출자가 원하는 시점에 result()
+
+사용 예:
+    from runpod_client import get_runpod_client
+    client = get_runpod_client()
+    if client.configured:
+        future = client.submit({"prompt": "...", "max_tokens": 512})
+        output = future.result(timeout=300)
+"""
+
+import os
+import hmac
+import asyncio
+import logging
+import threading
+
+import requests
+from dotenv import load_dotenv
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SYNC_WAIT_MS = int(os.environ.get('RUNPOD_SYNC_WAIT_MS', '60000'))      # /runsync 서버 측 대기 (최대 300000)
+MAX_INFLIGHT = int(os.environ.get('RUNPOD_MAX_INFLIGHT', '256'))         # 동시 진행 작업 상한
+POLL_MIN_SECONDS = 1.0
+POLL_MAX_SECONDS = 10.0
+WEBHOOK_POLL_SECONDS = 30.0  # webhook 유실 대비 안전용 폴링 간격
+
+_FINAL_FAILURE = ('FAILED', 'CANCELLED', 'TIMED_OUT')
+
+
+class RunPodError(Exception):
+    """RunPod 제출/실행 실패"""
+
+
+class RunPodClient:
+    def __init__(self, api_key=None, endpoint_url=None, webhook_url=None, webhook_secret=None):
+        self.api_key = api_key or os.environ.get('RUNPOD_API_KEY')
+        endpoint_url = endpoint_url or os.environ.get('RUNPOD_LLM_URL') or ''
+        # Normalize Base URL (Remove /runsync or /run)
+        self.base_url = endpoint_url.replace('/runsync', '').replace('/run', '').rstrip('/')
+        self.webhook_url = webhook_url or os.environ.get('RUNPOD_WEBHOOK_URL')
+        self.webhook_secret = webhook_secret or os.environ.get('RUNPOD_WEBHOOK_SECRET')
+        if self.webhook_url and not self.webhook_secret:
+            # 시크릿 없는 webhook은 누구나 대기 중인 작업을 임의 출력으로 완료시킬 수 있음
+            raise ValueError("RUNPOD_WEBHOOK_URL requires RUNPOD_WEBHOOK_SECRET")
+
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._session = None
+        self._sem = None
+        self._waiters = {}     # job_id → asyncio.Future (webhook 결과 대기)
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'inflight': 0,
+                       'webhook_hits': 0, 'status_polls': 0}
+
+    @property
+    def configured(self):
+        return bool(self.api_key and self.base_url and "YOUR_POD_ID" not in self.base_url)
+
+    # ─────────────────────────────────────────
+    # 이벤트 루프 / 세션
+    # ─────────────────────────────────────────
+
+    def _ensure_loop(self):
+        if self._loop is not None and self._thread.is_alive():
+            return self._loop
+        with self._start_lock:
+            if self._loop is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _run():
+                    asyncio.set_event_loop(loop)
+                    self._sem = asyncio.Semaphore(MAX_INFLIGHT)
+                    ready.set()
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=_run, name="runpod-client", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+                self._session = None
+                logger.info("[RunPodClient] 이벤트 루프 시작")
+        return self._loop
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+
+    def _get_session(self):
+        if self._session is None and HTTPX_AVAILABLE:
+            limits = httpx.Limits(max_connections=20, max_keepalive_connections=20)
+            try:
+                self._session = httpx.AsyncClient(http2=True, headers=self._headers(), limits=limits)
+            except ImportError:
+                # h2 패키지 미설치 → HTTP/1.1 keep-alive
+                self._session = httpx.AsyncClient(headers=self._headers(), limits=limits)
+        return self._session
+
+    async def _request(self, method, url, json_body=None, timeout=30.0):
+        session = self._get_session()
+        if session is not None:
+            res = await session.request(method, url, json=json_body, timeout=timeout)
+            status_code, text = res.status_code, res.text
+            data = res.json() if status_code == 200 else None
+        else:
+            # httpx 미설치 시: 블로킹 requests를 기본 executor에서 실행 (루프는 막지 않음)
+            loop = asyncio.get_running_loop()
+            res = await loop.run_in_executor(None, lambda: requests.request(
+                method, url, json=json_body, headers=self._headers(), timeout=timeout))
+            status_code, text = res.status_code, res.text
+            data = res.json() if status_code == 200 else None
+        if status_code != 200:
+            raise RunPodError(f"RunPod {method} {url.rsplit('/', 2)[-2:]} 실패 {status_code}: {text[:200]}")
+        return data
+
+    # ─────────────────────────────────────────
+    # 작업 실행
+    # ─────────────────────────────────────────
+
+    async def _run_job(self, job_input, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        job_id = None
+
+        async with self._sem:
+            self._stats['submitted'] += 1
+            self._stats['inflight'] += 1
+            try:
+                body = {"input": job_input}
+                if self.webhook_url:
+                    body["webhook"] = self.webhook_url
+                    data = await self._request('POST', f"{self.base_url}/run", body)
+                else:
+                    wait_ms = max(1000, min(SYNC_WAIT_MS, int(timeout * 1000)))
+                    data = await self._request('POST', f"{self.base_url}/runsync?wait={wait_ms}", body,
+                                               timeout=wait_ms / 1000 + 30)
+
+                job_id = data.get('id')
+                waiter = None
+                if job_id and self.webhook_url:
+                    waiter = loop.create_future()
+                    self._waiters[job_id] = waiter
+
+                delay = WEBHOOK_POLL_SECONDS if waiter else POLL_MIN_SECONDS
+                while True:
+                    status = data.get('status')
+                    if status == 'COMPLETED':
+                        self._stats['completed'] += 1
+                        return data.get('output')
+                    if status in _FINAL_FAILURE:
+                        raise RunPodError(f"RunPod Job {status}: {data.get('error', '')}")
+                    if not job_id:
+                        raise RunPodError(f"RunPod 응답에 job id 없음: {data}")
+
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        await self._cancel(job_id)
+                        raise RunPodError("RunPod Job Timed Out")
+
+                    wait = min(delay, remaining)
+                    if waiter is not None:
+                        try:
+                            data = await asyncio.wait_for(asyncio.shield(waiter), wait)
+                            self._stats['webhook_hits'] += 1
+                            waiter, delay = None, POLL_MIN_SECONDS
+                            continue
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await asyncio.sleep(wait)
+                        delay = min(delay * 1.5, POLL_MAX_SECONDS)
+
+                    self._stats['status_polls'] += 1
+                    data = await self._request('GET', f"{self.base_url}/status/{job_id}")
+            except Exception:
+                self._stats['failed'] += 1
+                raise
+            finally:
+                if job_id:
+                    self._waiters.pop(job_id, None)
+                self._stats['inflight'] -= 1
+
+    async def _cancel(self, job_id):
+        try:
+            await self._request('POST', f"{self.base_url}/cancel/{job_id}")
+        except Exception as e:
+            logger.warning(f"[RunPodClient] 작업 취소 실패 {job_id}: {e}")
+
+    def submit(self, job_input, timeout=300):
+        """
+        RunPod 작업을 제출하고 concurrent.futures.Future를 반환한다.
+        Future 결과는 RunPod의 `output` 그대로이며, 실패/타임아웃 시 RunPodError.
+        """
+        if not self.configured:
+            raise RunPodError("RunPod 설정(RUNPOD_API_KEY / RUNPOD_LLM_URL)이 없습니다.")
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._run_job(job_input, timeout), loop)
+
+    def run(self, job_input, timeout=300):
+        """동기 호출자용: submit() 후 결과를 기다린다."""
+        return self.submit(job_input, timeout).result(timeout + 30)
+
+    # ─────────────────────────────────────────
+    # Webhook
+    # ─────────────────────────────────────────
+
+    def verify_webhook_token(self, token):
+        """시크릿이 설정되어 있고 토큰이 일치할 때만 True (시크릿 미설정 시 webhook 거부)"""
+        if not self.webhook_secret or not token:
+            return False
+        return hmac.compare_digest(token.encode(), self.webhook_secret.encode())
+
+    def resolve_webhook(self, payload):
+        """
+        RunPod webhook 본문({id, status, output, ...})으로 대기 중인 작업을 깨운다.
+        이 프로세스가 기다리는 작업이 아니면 False (다른 워커 프로세스는 폴링으로 회수).
+        """
+        job_id = (payload or {}).get('id')
+        loop = self._loop
+        if not job_id or loop is None:
+            return False
+
+        def _resolve():
+            waiter = self._waiters.get(job_id)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(payload)
+
+        if job_id not in self._waiters:
+            return False
+        loop.call_soon_threadsafe(_resolve)
+        return True
+
+    def stats(self):
+        return dict(self._stats, http2=HTTPX_AVAILABLE, webhook=bool(self.webhook_url),
+                    max_inflight=MAX_INFLIGHT)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_runpod_client():
+    """프로세스 공유 RunPodClient 싱글톤"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = RunPodClient()
+    return _client
@@ -0,0 +1,229 @@
+"""
+Schema Migrations - 기존 PostgreSQL 테이블 변경 관리
+====================================================
+db.create_all()은 새 테이블만 만들고 기존 테이블의 컬럼/인덱스는 건드리지 않는다.
+그동안은 add_ai_column.py 같은 일회성 스크립트를 손으로 돌렸으므로,
+기존 테이블 변경은 여기에 순서대로 등록하고 schema_migrations 테이블에 적용 기록을 남긴다.
+
+- 서버 기동 시 app.py가 run_migrations()를 호출 (AUTO_MIGRATE=0이면 건너뜀)
+- 여러 gunicorn 워커/cron이 동시에 기동해도 advisory lock으로 한 곳만 적용
+- 각 단계는 IF NOT EXISTS 등으로 재실행해도 안전하게 작성 (중간에 실패하면 다음 기동 때 이어서)
+- 인덱스는 CREATE INDEX CONCURRENTLY로 만들어 일기 쓰기를 막지 않음
+
+수동 실행:
+  cd /home/ubuntu/project/backend && source venv/bin/activate
+  python schema_migrations.py            # 미적용 마이그레이션 적용
+  python schema_migrations.py --status   # 적용 현황
+"""
+
+import os
+import logging
+
+from db_pool import get_conn
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_lock 키 (임의의 고정 정수)
+_ADVISORY_LOCK_KEY = 720019
+BACKFILL_BATCH = 5000
+
+
+def _create_index_concurrently(cur, name, table, columns):
+    """이전 CONCURRENTLY 빌드가 중단되어 INVALID로 남은 인덱스는 지우고 다시 만든다"""
+    cur.execute("""
+        SELECT i.indisvalid FROM pg_index i
+          JOIN pg_class c ON c.oid = i.indexrelid
+         WHERE c.relname = %s
+    """, (name,))
+    row = cur.fetchone()
+    if row is not None and not row[0]:
+        logger.warning(f"[Migrations] INVALID 인덱스 재생성: {name}")
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    cur.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def _0001_diaries_user_indexes(cur):
+    """diaries 조회는 거의 모두 user_id + date(또는 created_at) 범위 → 복합 인덱스"""
+    _create_index_concurrently(cur, 'ix_diaries_user_date', 'diaries', 'user_id, date')
+    _create_index_concurrently(cur, 'ix_diaries_user_created_at', 'diaries', 'user_id, created_at')
+    cur.execute("ANALYZE diaries")
+
+
+def _0002_diaries_diary_date(cur):
+    """date(String(10))의 네이티브 DATE 사본 diary_date + 동기화 트리거 + 백필 + 인덱스"""
+    cur.execute("ALTER TABLE diaries ADD COLUMN IF NOT EXISTS diary_date DATE")
+
+    # '2026-02-30' 같은 잘못된 문자열은 예외 대신 NULL (models.parse_diary_date와 동일)
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION diaries_parse_date(value TEXT) RETURNS DATE AS $$
+        BEGIN
+            IF value IS NULL OR value !~ '^\\d{4}-\\d{2}-\\d{2}$' THEN
+                RETURN NULL;
+            END IF;
+            RETURN value::date;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql IMMUTABLE
+    """)
+    # ORM 밖(psycopg2 스크립트, 수동 SQL)에서 date를 바꿔도 diary_date가 따라가도록
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION diaries_sync_diary_date() RETURNS trigger AS $$
+        BEGIN
+            NEW.diary_date := diaries_parse_date(NEW.date);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS trg_diaries_sync_diary_date ON diaries")
+    cur.execute("""
+        CREATE TRIGGER trg_diaries_sync_diary_date
+            BEFORE INSERT OR UPDATE OF date ON diaries
+            FOR EACH ROW EXECUTE FUNCTION diaries_sync_diary_date()
+    """)
+
+    # 백필은 id 구간별로 나눠 커밋 (한 번에 전체를 잠그지 않도록)
+    cur.execute("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM diaries")
+    min_id, max_id = cur.fetchone()
+    for start in range(min_id, max_id + 1, BACKFILL_BATCH):
+        cur.execute("""
+            UPDATE diaries SET diary_date = diaries_parse_date(date)
+             WHERE id >= %s AND id < %s
+               AND diary_date IS DISTINCT FROM diaries_parse_date(date)
+        """, (start, start + BACKFILL_BATCH))
+
+    _create_index_concurrently(cur, 'ix_diaries_user_diary_date', 'diaries', 'user_id, diary_date')
+    cur.execute("ANALYZE diaries")
+
+
+def _0003_diaries_updated_at_trigger(cur):
+    """모든 UPDATE에서 updated_at 갱신 (analysis_worker의 AI 코멘트 저장 등 ORM 밖 쓰기 포함) → 목록 ETag 무효화"""
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION diaries_touch_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at := now() AT TIME ZONE 'utc';
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS trg_diaries_touch_updated_at ON diaries")
+    cur.execute("""
+        CREATE TRIGGER trg_diaries_touch_updated_at
+            BEFORE UPDATE ON diaries
+            FOR EACH ROW EXECUTE FUNCTION diaries_touch_updated_at()
+    """)
+
+
+def _0004_diaries_sealed(cur):
+    """봉투 암호화 컬럼 (diary_envelope.py). user_data_keys는 새 테이블이라 create_all이 만든다"""
+    cur.execute("ALTER TABLE diaries ADD COLUMN IF NOT EXISTS sealed BYTEA")
+
+
+def _0005_user_daily_stats_last_created_at(cur):
+    """마음 온도 7일 창(작성 시각 기준)용 컬럼 + 인덱스. 값은 STATS_VERSION 2 재계산이 채운다"""
+    cur.execute("ALTER TABLE IF EXISTS user_daily_stats ADD COLUMN IF NOT EXISTS last_created_at TIMESTAMP")
+    cur.execute("SELECT to_regclass('user_daily_stats')")
+    if cur.fetchone()[0] is not None:
+        _create_index_concurrently(cur, 'ix_user_daily_stats_user_created', 'user_daily_stats',
+                                   'user_id, last_created_at')
+
+
+# (id, 설명, 적용 함수) — 순서대로 적용, 적용된 id는 다시 실행하지 않음. 기존 항목은 수정하지 말고 새로 추가.
+MIGRATIONS = [
+    ('0001_diaries_user_indexes', 'diaries (user_id, date) / (user_id, created_at) 복합 인덱스',
+     _0001_diaries_user_indexes),
+    ('0002_diaries_diary_date', 'diaries.diary_date DATE 컬럼 + 동기화 트리거 + 인덱스',
+     _0002_diaries_diary_date),
+    ('0003_diaries_updated_at_trigger', 'diaries.updated_at 자동 갱신 트리거 (목록 ETag)',
+     _0003_diaries_updated_at_trigger),
+    ('0004_diaries_sealed', 'diaries.sealed 봉투 암호화 컬럼', _0004_diaries_sealed),
+    ('0005_user_daily_stats_last_created_at', 'user_daily_stats.last_created_at 컬럼 + 인덱스',
+     _0005_user_daily_stats_last_created_at),
+]
+
+
+def _ensure_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            id VARCHAR(100) PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT now()
+        )
+    """)
+
+
+def _applied_ids(cur):
+    cur.execute("SELECT id FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def run_migrations():
+    """
+    미적용 마이그레이션을 순서대로 적용한다. (PostgreSQL 전용)
+
+    Returns:
+        list: 이번에 적용한 migration id 목록
+    """
+    applied_now = []
+    with get_conn() as conn:
+        conn.autocommit = True  # CONCURRENTLY는 트랜잭션 밖에서만 가능, 각 문장은 바로 커밋
+        try:
+            with conn.cursor() as cur:
+                # 다른 워커가 적용 중이면 끝날 때까지 대기 (끝난 뒤에는 적용 기록을 보고 건너뜀)
+                cur.execute("SELECT pg_advisory_lock(%s)", (_ADVISORY_LOCK_KEY,))
+                try:
+                    _ensure_table(cur)
+                    done = _applied_ids(cur)
+                    for migration_id, description, apply in MIGRATIONS:
+                        if migration_id in done:
+                            continue
+                        logger.info(f"[Migrations] 적용 시작: {migration_id} ({description})")
+                        apply(cur)
+                        cur.execute("INSERT INTO schema_migrations (id, description) VALUES (%s, %s)",
+                                    (migration_id, description))
+                        applied_now.append(migration_id)
+                        logger.info(f"[Migrations] 적용 완료: {migration_id}")
+                finally:
+                    cur.execute("SELECT pg_advisory_unlock(%s)", (_ADVISORY_LOCK_KEY,))
+        finally:
+            conn.autocommit = False
+    return applied_now
+
+
+def migration_status():
+    """[(id, 설명, 적용 시각 또는 None), ...]"""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            _ensure_table(cur)
+            cur.execute("SELECT id, applied_at FROM schema_migrations")
+            applied = dict(cur.fetchall())
+        conn.commit()
+    return [(migration_id, description, applied.get(migration_id))
+            for migration_id, description, _ in MIGRATIONS]
+
+
+def should_auto_migrate(database_url=None):
+    """서버 기동 시 자동 적용 여부 (PostgreSQL이고 AUTO_MIGRATE != '0')"""
+    database_url = database_url or os.environ.get('DATABASE_URL', '')
+    return database_url.startswith('postgres') and os.environ.get('AUTO_MIGRATE', '1') != '0'
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [Migrations] %(message)s')
+    parser = argparse.ArgumentParser(description="기존 테이블 스키마 마이그레이션")
+    parser.add_argument('--status', action='store_true', help="적용 현황만 출력")
+    args = parser.parse_args()
+
+    from db_pool import close_pool
+    try:
+        if args.status:
+            for migration_id, description, applied_at in migration_status():
+                mark = f"✅ {applied_at:%Y-%m-%d %H:%M:%S}" if applied_at else "⏳ 미적용"
+                print(f"{mark}  {migration_id}  {description}")
+        else:
+            applied = run_migrations()
+            print(f"✅ 적용 완료: {', '.join(applied)}" if applied else "ℹ️ 적용할 마이그레이션 없음")
+    finally:
+        close_pool()
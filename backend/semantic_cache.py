@@ -0,0 +1,207 @@
+"""
+Semantic Cache - 임베딩 기반 LLM 응답 캐시
+==========================================
+"오늘 너무 피곤해", "회사 때문에 우울해"처럼 거의 같은 짧은 입력마다
+standalone_ai(채팅 공감 반응) / generate_ai_analysis(일기 코멘트)가 LLM 생성을 새로 하던 것을 줄인다.
+
+- 키: 정제된 입력 텍스트의 임베딩 (memory_manager의 paraphrase-multilingual-MiniLM-L12-v2 재사용)
+- 조회: 정확히 같은 텍스트는 임베딩 없이 즉시, 그 외에는 코사인 유사도 ≥ threshold인 최근접 항목
+- 만료: TTL(초) + 최대 항목 수 초과 시 LRU 제거
+- 우회: 위기 키워드 / 고유명사(사람 이름 등) 포함 / 너무 긴 입력은 조회·저장 모두 하지 않음
+  (다른 회원에게 개인 정보가 담긴 응답이 재사용되지 않도록)
+- get_cache_stats()로 적중률 / 조회 지연 노출
+
+임베더를 불러올 수 없는 환경에서는 정확 일치 캐시로만 동작한다.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.environ.get('SEMANTIC_CACHE_ENABLED', '1') == '1'
+DEFAULT_THRESHOLD = float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', '0.93'))
+DEFAULT_TTL_SECONDS = int(os.environ.get('SEMANTIC_CACHE_TTL_SECONDS', '86400'))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('SEMANTIC_CACHE_MAX_ENTRIES', '2000'))
+EMBEDDER_RETRY_SECONDS = 300
+
+
+def _normalize_text(text):
+    return " ".join(str(text).split())
+
+
+def _is_crisis_text(text):
+    from standalone_ai import CRISIS_MATCHER
+    return CRISIS_MATCHER.contains_any(text)
+
+
+def _has_proper_noun(text):
+    """고유명사(NNP)가 있으면 True. 형태소 분석기를 쓸 수 없으면 보수적으로 True."""
+    try:
+        from kick_analysis.kiwi_service import get_kiwi  # 킥 분석과 같은 Kiwi 인스턴스 공유
+        return any(token.tag == 'NNP' for token in get_kiwi().tokenize(text))
+    except Exception as e:
+        logger.warning(f"[SemanticCache] 형태소 분석 실패 → 캐시 우회: {e}")
+        return True
+
+
+_embedder_unavailable_until = 0.0
+
+
+def _embed(text):
+    """정규화된 임베딩 벡터 (임베더를 쓸 수 없으면 None)"""
+    global _embedder_unavailable_until
+    if time.time() < _embedder_unavailable_until:
+        return None
+    from memory_manager import get_embedder
+    embedder = get_embedder()
+    if embedder is None:
+        # 모델 로딩 실패를 매 요청마다 재시도하지 않도록 잠시 보류
+        _embedder_unavailable_until = time.time() + EMBEDDER_RETRY_SECONDS
+        return None
+    vector = np.asarray(embedder.encode(text), dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+class SemanticCache:
+    def __init__(self, name, threshold=DEFAULT_THRESHOLD, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_entries=DEFAULT_MAX_ENTRIES, max_chars=200):
+        self.name = name
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # 정규화 텍스트 → (임베딩 | None, 값, 저장 시각)
+        self._matrix = None             # 임베딩 행렬 캐시 (항목 변경 시 무효화)
+        self._matrix_keys = []
+        self._stats = {'exact_hits': 0, 'semantic_hits': 0, 'misses': 0, 'bypassed': 0,
+                       'stores': 0, 'evictions': 0, 'expired': 0, 'lookup_seconds': 0.0, 'lookups': 0}
+
+    # ── 내부 ──
+
+    def _bypass(self, text):
+        return (not CACHE_ENABLED or not text or len(text) > self.max_chars
+                or _is_crisis_text(text) or _has_proper_noun(text))
+
+    def _purge_expired(self, now):
+        expired = [k for k, (_, _, ts) in self._entries.items() if now - ts > self.ttl_seconds]
+        for k in expired:
+            del self._entries[k]
+        if expired:
+            self._matrix = None
+            self._stats['expired'] += len(expired)
+
+    def _build_matrix(self):
+        if self._matrix is None:
+            keys = [k for k, (vec, _, _) in self._entries.items() if vec is not None]
+            self._matrix_keys = keys
+            self._matrix = np.stack([self._entries[k][0] for k in keys]) if keys else None
+        return self._matrix
+
+    # ── 공개 API ──
+
+    def lookup(self, text):
+        """
+        캐시된 응답을 반환한다. 없으면 None.
+        반환값과 함께 저장 시 재사용할 (정규화 텍스트, 임베딩)을 돌려준다.
+        """
+        norm_text = _normalize_text(text or "")
+        if self._bypass(norm_text):
+            with self._lock:
+                self._stats['bypassed'] += 1
+            return None, None
+
+        started = time.monotonic()
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._entries.get(norm_text)
+            if entry is not None:
+                self._entries.move_to_end(norm_text)
+                self._stats['exact_hits'] += 1
+                self._record_lookup(started)
+                return entry[1], None
+
+        try:
+            vector = _embed(norm_text)
+        except Exception as e:
+            logger.warning(f"[SemanticCache:{self.name}] 임베딩 실패: {e}")
+            vector = None
+
+        with self._lock:
+            matrix = self._build_matrix() if vector is not None else None
+            if matrix is not None:
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key = self._matrix_keys[best]
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                        self._stats['semantic_hits'] += 1
+                        self._record_lookup(started)
+                        return self._entries[key][1], None
+            self._stats['misses'] += 1
+            self._record_lookup(started)
+        return None, (norm_text, vector)
+
+    def store(self, token, value):
+        """lookup()이 돌려준 토큰으로 새 응답을 저장한다. (우회/적중 시 토큰은 None → 무시)"""
+        if token is None or not value:
+            return
+        norm_text, vector = token
+        with self._lock:
+            self._entries[norm_text] = (vector, value, time.time())
+            self._entries.move_to_end(norm_text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+            self._matrix = None
+            self._stats['stores'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def _record_lookup(self, started):
+        self._stats['lookups'] += 1
+        self._stats['lookup_seconds'] += time.monotonic() - started
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        hits = stats['exact_hits'] + stats['semantic_hits']
+        total = hits + stats['misses']
+        stats.update({
+            'hit_rate': round(hits / total, 3) if total else 0.0,
+            'avg_lookup_ms': round(stats['lookup_seconds'] / stats['lookups'] * 1000, 2) if stats['lookups'] else 0.0,
+            'threshold': self.threshold,
+            'ttl_seconds': self.ttl_seconds,
+            'max_entries': self.max_entries,
+        })
+        stats['lookup_seconds'] = round(stats['lookup_seconds'], 3)
+        return stats
+
+
+# 용도별 캐시 (채팅 공감 반응 / 일기 AI 코멘트)
+chat_reaction_cache = SemanticCache('chat_reaction', max_chars=200)
+diary_comment_cache = SemanticCache('diary_comment', max_chars=400)
+
+
+def get_cache_stats():
+    return {
+        'enabled': CACHE_ENABLED,
+        'caches': {c.name: c.stats() for c in (chat_reaction_cache, diary_comment_cache)},
+    }
@@ -1,11 +1,31 @@
-import requests
+from llm_gateway import generate, generate_stream
+from semantic_cache import chat_reaction_cache
+from keyword_matcher import KeywordMatcher
 import re
 import random
 
-def generate_analysis_reaction_standalone(user_text, mode='reaction', history=None):
-    print(f"DEBUG: generate_analysis_reaction_standalone called. Mode={mode}, HistoryLen={len(history) if history else 0}")
-    if not user_text: return None
-    
+# [Phase 4] 응답 금지어 (공허한 격려)
+BLOCKED_PHRASES = ["힘내세요", "긍정적으로 생각하세요", "긍정적으로 생각해 보세요", "잘 될 거예요", "웃으세요", "힘내요"]
+
+# [Phase 4] 위기 키워드 — RunPod 핸들러(runpod_serverless_exaone)와 동일 기준
+CRISIS_KEYWORDS = ["죽고", "자살", "뛰어내", "목을", "손목", "유서", "마지막", "끝내고",
+                   "사라지고", "없어지고", "살기 싫", "의미 없", "수면제", "자해", "목숨"]
+# Level 3 — 감지 시 AI 자유 생성 차단, 사전 정의 안전 메시지만 반환
+CRISIS_LEVEL3 = ["죽고", "자살", "뛰어내", "목을", "손목", "유서", "끝내고", "자해", "목숨"]
+# 위기 키워드 오토마톤 (범주: level3 / crisis) — 발화 1회 스캔으로 두 단계 모두 판정
+CRISIS_MATCHER = KeywordMatcher(
+    [(kw, 'level3') for kw in CRISIS_LEVEL3] + [(kw, 'crisis') for kw in CRISIS_KEYWORDS]
+)
+CRISIS_SAFE_RESPONSES = [
+    "지금 많이 힘드시죠.. 저는 당신 편이에요.\n\n혼자 감당하지 않으셔도 돼요. 지금 바로 전문 상담사와 이야기해 보세요.\n📞 자살예방상담전화: 1393 (24시간)",
+    "그런 생각이 들 정도로 괴로우셨군요..\n당신이 소중하다는 건 꼭 알아주세요.\n\n지금 바로 전문가의 도움을 받을 수 있어요.\n📞 1393 (24시간 무료)",
+    "혼자서 이 마음을 감당하기 너무 힘드셨죠..\n\n전문 상담사가 24시간 기다리고 있어요.\n📞 자살예방상담전화: 1393\n📞 정신건강위기상담: 1577-0199"
+]
+CRISIS_HOTLINE_NOTE = "\n\n혼자 견디기 힘들 땐 언제든 📞 1393(자살예방상담전화, 24시간)에 이야기해 주세요."
+
+
+def _build_reaction_prompt(user_text, history=None):
+    """공감 반응용 Few-Shot 프롬프트와 토큰 상한을 만든다."""
     # 1. Sanitize
     text = re.sub(r'[\w\.-]+@[\w\.-]+', '[EMAIL]', user_text)
     sanitized = text[:300]
@@ -48,36 +68,93 @@ def generate_analysis_reaction_standalone(user_text, mode='reaction', history=No
         dynamic_tokens = 150  # 긴 고민엔 약간 여유 허용 (여전히 3문장 이내 수준)
         
     print(f"📏 [Auto-Scale] Input: {input_len} chars -> Allocating {dynamic_tokens} tokens")
+    return prompt_text, dynamic_tokens
 
+
+def _cache_lookup(user_text, history):
+    """
+    [SemanticCache] 대화 기록이 없는 단발성 입력만 캐시한다. (기록이 있으면 맥락마다 응답이 달라야 함)
+    Returns: (캐시된 응답 | None, 저장용 토큰 | None)
+    """
+    if history:
+        return None, None
+    sanitized = re.sub(r'[\w\.-]+@[\w\.-]+', '[EMAIL]', user_text)[:300]
     try:
-        payload = {
-            "model": "gemma4:2b",
-            "prompt": prompt_text,
-            "stream": False,
-            "options": {
-                "temperature": 0.7, 
+        return chat_reaction_cache.lookup(sanitized)
+    except Exception as e:
+        print(f"⚠️ [SemanticCache] 조회 실패 (무시): {e}")
+        return None, None
+
+
+def _crisis_gate(user_text):
+    """
+    채팅 반응 공통 위기 판정 (/api/chat/reaction, /api/chat/reaction/stream 동일 기준)
+    Returns: (Level 3 안전 응답 | None, 응답 뒤에 상담전화 안내를 덧붙일지)
+    """
+    crisis_levels = CRISIS_MATCHER.categories(user_text)
+    if 'level3' in crisis_levels:
+        print("🛡️ [Crisis L3] 안전 폴백 응답 반환 (AI 생성 차단)")
+        return random.choice(CRISIS_SAFE_RESPONSES), True
+    is_crisis = 'crisis' in crisis_levels
+    if is_crisis:
+        print(f"🚨 [Crisis] 위기 키워드 감지: {user_text[:50]}")
+    return None, is_crisis
+
+
+def generate_analysis_reaction_standalone(user_text, mode='reaction', history=None):
+    """
+    채팅 공감 반응 생성.
+    - Level 3 위기 발화: 생성 없이 안전 메시지 반환
+    - 그 외 위기 키워드: 응답(캐시/생성/fallback) 뒤에 상담전화 안내를 덧붙이고 캐시에 저장하지 않음
+    """
+    print(f"DEBUG: generate_analysis_reaction_standalone called. Mode={mode}, HistoryLen={len(history) if history else 0}")
+    if not user_text: return None
+
+    safe_response, is_crisis = _crisis_gate(user_text)
+    if safe_response:
+        return safe_response
+    note = CRISIS_HOTLINE_NOTE if is_crisis else ""
+
+    cached, cache_token = _cache_lookup(user_text, history)
+    if cached:
+        print("⚡ [SemanticCache] 채팅 반응 캐시 적중")
+        return cached + note
+    
+    prompt_text, dynamic_tokens = _build_reaction_prompt(user_text, history)
+
+    try:
+        result = generate(
+            prompt_text,
+            model="gemma4:2b",
+            options={
+                "temperature": 0.7,
                 "num_predict": dynamic_tokens
-            }
-        }
-        res = requests.post("http://localhost:11434/api/generate", json=payload, timeout=120)
+            },
+            timeout=120
+        ).strip()
         
-        if res.status_code == 200:
-            result = res.json().get('response', '').strip()
+        if result:
             if result.startswith('"') and result.endswith('"'):
                 result = result[1:-1]
             
             # [Phase 4] 응답 금지어 필터링
-            BLOCKED_PHRASES = ["힘내세요", "긍정적으로 생각하세요", "긍정적으로 생각해 보세요", "잘 될 거예요", "웃으세요", "힘내요"]
             for phrase in BLOCKED_PHRASES:
                 if phrase in result:
                     print(f"🚫 [Filter] Blocked phrase removed: {phrase}")
                     result = result.replace(phrase, "").strip()
             
-            if result: return result
+            if result:
+                if not is_crisis:
+                    chat_reaction_cache.store(cache_token, result)
+                return result + note
             
     except Exception as e:
         print(f"❌ Standalone AI Error: {e}")
         
+    return _fallback_reaction(mode) + note
+
+
+def _fallback_reaction(mode):
     # 3. Fallback (Mode Specific)
     fallbacks = []
     if mode == 'question':
@@ -97,6 +174,113 @@ def generate_analysis_reaction_standalone(user_text, mode='reaction', history=No
         
     return random.choice(fallbacks)
 
+
+class _BlockedPhraseFilter:
+    """
+    스트리밍용 금지어 필터. 금지어가 토큰 경계에 걸쳐 나뉘어 들어와도 걸러지도록
+    (가장 긴 금지어 길이 - 1)자만큼은 다음 조각이 올 때까지 내보내지 않고 보류한다.
+    """
+
+    def __init__(self, phrases=BLOCKED_PHRASES):
+        self.phrases = sorted(phrases, key=len, reverse=True)
+        self.holdback = max(len(p) for p in self.phrases) - 1
+        self.buffer = ""
+        self.started = False
+        self.quoted = False
+
+    def _clean(self):
+        for phrase in self.phrases:
+            if phrase in self.buffer:
+                print(f"🚫 [Filter] Blocked phrase removed: {phrase}")
+                self.buffer = self.buffer.replace(phrase, "")
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        if not self.started:
+            # 응답 앞 공백/따옴표 제거 (비스트리밍 버전의 strip + 따옴표 처리와 동일)
+            self.buffer = self.buffer.lstrip()
+            if self.buffer.startswith('"'):
+                self.quoted = True
+                self.buffer = self.buffer[1:].lstrip()
+            if not self.buffer:
+                return ""
+            self.started = True
+        self._clean()
+        if len(self.buffer) <= self.holdback:
+            return ""
+        cut = len(self.buffer) - self.holdback
+        out, self.buffer = self.buffer[:cut], self.buffer[cut:]
+        return out
+
+    def flush(self):
+        self._clean()
+        out = self.buffer.rstrip()
+        if self.quoted and out.endswith('"'):
+            out = out[:-1].rstrip()
+        self.buffer = ""
+        return out
+
+
+def stream_analysis_reaction_standalone(user_text, mode='reaction', history=None):
+    """
+    generate_analysis_reaction_standalone의 스트리밍 버전. 응답 텍스트 조각을 생성되는 대로 yield한다.
+    - 위기 판정은 비스트리밍 버전과 동일 (_crisis_gate)
+      Level 3: 생성 없이 안전 메시지 1건만 yield / 그 외 위기 키워드: 응답(캐시 포함) 뒤에 상담전화 안내
+    - 금지어는 조각 단위로 걸러냄 (_BlockedPhraseFilter)
+    - 첫 조각 전 실패 시 mode별 fallback 문장 1건을 yield
+    """
+    if not user_text:
+        return
+
+    safe_response, is_crisis = _crisis_gate(user_text)
+    if safe_response:
+        yield safe_response
+        return
+
+    cached, cache_token = _cache_lookup(user_text, history)
+    if cached:
+        print("⚡ [SemanticCache] 채팅 반응 캐시 적중 (stream)")
+        yield cached
+        if is_crisis:
+            yield CRISIS_HOTLINE_NOTE
+        return
+
+    prompt_text, dynamic_tokens = _build_reaction_prompt(user_text, history)
+    phrase_filter = _BlockedPhraseFilter()
+    emitted = False
+    generated = []
+    try:
+        for chunk in generate_stream(
+            prompt_text,
+            model="gemma4:2b",
+            options={
+                "temperature": 0.7,
+                "num_predict": dynamic_tokens
+            },
+            timeout=120
+        ):
+            out = phrase_filter.feed(chunk)
+            if out:
+                emitted = True
+                generated.append(out)
+                yield out
+        completed = True
+    except Exception as e:
+        print(f"❌ Standalone AI Stream Error: {e}")
+        completed = False
+
+    tail = phrase_filter.flush()
+    if tail:
+        emitted = True
+        generated.append(tail)
+        yield tail
+    if not emitted:
+        yield _fallback_reaction(mode)
+    elif completed and not is_crisis:
+        chat_reaction_cache.store(cache_token, "".join(generated))
+    if is_crisis:
+        yield CRISIS_HOTLINE_NOTE
+
 def analyze_chat_sentiment_background(user_text, ai_reaction):
     """
     Background Task: Analyze the chat turn to extract structured psychological data.
@@ -127,19 +311,17 @@ def analyze_chat_sentiment_background(user_text, ai_reaction):
     )
     
     try:
-        payload = {
-            "model": "gemma4:2b",
-            "prompt": prompt_text,
-            "stream": False,
-            "options": {
+        result_str = generate(
+            prompt_text,
+            model="gemma4:2b",
+            options={
                 "temperature": 0.2, # Low temp for consistent JSON
                 "num_predict": 120
-            }
-        }
-        res = requests.post("http://localhost:11434/api/generate", json=payload, timeout=30)
+            },
+            timeout=30
+        ).strip()
         
-        if res.status_code == 200:
-            result_str = res.json().get('response', '').strip()
+        if result_str:
             # Extract JSON block if wrapped in code fences
             if "```json" in result_str:
                 import re
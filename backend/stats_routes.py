@@ -8,17 +8,12 @@ import random
 from datetime import datetime, timedelta
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, User, Diary
+from models import User
+from daily_stats import ensure_daily_stats, load_daily_stats, load_written_since, entries_of
 
 stats_bp = Blueprint('stats', __name__)
 
 
-def _get_safe_decrypt():
-    """app.py의 safe_decrypt 함수를 가져온다."""
-    from app import safe_decrypt
-    return safe_decrypt
-
-
 # ─────────────────────────────────────────────
 # [Feature] 마음 온도 (Mood Temperature)
 # ─────────────────────────────────────────────
@@ -29,17 +24,16 @@ def calculate_mood_temperature(user_id):
     - 기록 빈도 (20%): 최근 7일 중 기록 일수 비율
     - 수면 상태 (20%): sleep_condition 텍스트 기반 긍정/부정 분석
     - 안정성 (20%): safety_flag 및 기분 안정도 (분산 기반)
+    [DailyStats] 일기 대신 최근 7일 안에 작성(created_at)된 일기가 있는 user_daily_stats 행만 조회
+                 (수면은 저장된 점수 사용, 날짜를 과거로 적은 일기도 작성 시각 기준으로 포함)
     """
-    safe_decrypt = _get_safe_decrypt()
-    
+    ensure_daily_stats(user_id)
     recent_cutoff = datetime.utcnow() - timedelta(days=7)
-    recent_diaries = Diary.query.filter(
-        Diary.user_id == user_id,
-        Diary.created_at >= recent_cutoff
-    ).order_by(Diary.date.desc()).all()
+    recent_days = load_written_since(user_id, recent_cutoff)
+    recent_entries = [entry for _, entries in recent_days for entry in entries]
     
     # 데이터가 없으면 기본값 36.5° (건강한 체온 비유)
-    if not recent_diaries:
+    if not recent_entries:
         return {
             "temperature": 36.5,
             "label": "측정 중",
@@ -55,31 +49,16 @@ def calculate_mood_temperature(user_id):
         }
     
     # 1. 기분 레벨 점수 (40%)
-    mood_levels = [d.mood_level or 3 for d in recent_diaries]
+    mood_levels = [entry[0] or 3 for entry in recent_entries]
     avg_mood = sum(mood_levels) / len(mood_levels)
     mood_score = ((avg_mood - 1) / 4) * 100  # 1~5 → 0~100
     
     # 2. 기록 빈도 점수 (20%)
-    unique_dates = set(d.date for d in recent_diaries if d.date)
+    unique_dates = set(day.date for day, _ in recent_days if day.date)
     frequency_score = min((len(unique_dates) / 7) * 100, 100)
     
     # 3. 수면 상태 점수 (20%)
-    sleep_positive = ["잘", "충분", "숙면", "편안", "좋"]
-    sleep_negative = ["못", "불면", "뒤척", "힘들", "나쁘", "잠을 못"]
-    sleep_scores = []
-    for d in recent_diaries:
-        sleep_text = safe_decrypt(d.sleep_condition) if d.sleep_condition else ""
-        if not sleep_text:
-            sleep_scores.append(50)  # 기본값
-            continue
-        pos = sum(1 for kw in sleep_positive if kw in sleep_text)
-        neg = sum(1 for kw in sleep_negative if kw in sleep_text)
-        if pos > neg:
-            sleep_scores.append(80)
-        elif neg > pos:
-            sleep_scores.append(30)
-        else:
-            sleep_scores.append(50)
+    sleep_scores = [entry[2] for entry in recent_entries]
     sleep_score = sum(sleep_scores) / len(sleep_scores) if sleep_scores else 50
     
     # 4. 안정성 점수 (20%) - 기분 분산 + safety_flag
@@ -91,10 +70,7 @@ def calculate_mood_temperature(user_id):
         stability_score = 50
     
     # safety_flag가 있으면 안정성 감점
-    has_safety_flag = any(
-        getattr(d, 'safety_flag', None) in [True, 'need_help', 'danger']
-        for d in recent_diaries
-    )
+    has_safety_flag = any(entry[4] for entry in recent_entries)
     if has_safety_flag:
         stability_score = max(0, stability_score - 30)
     
@@ -137,7 +113,7 @@ def calculate_mood_temperature(user_id):
         "label": label,
         "description": description,
         "color": color,
-        "diary_count": len(recent_diaries),
+        "diary_count": len(recent_entries),
         "factors": {
             "mood_score": round(mood_score, 1),
             "frequency_score": round(frequency_score, 1),
@@ -170,36 +146,32 @@ def get_mood_temperature():
 def get_statistics():
     try:
         current_user_id = int(get_jwt_identity())
-        diaries = Diary.query.filter_by(user_id=current_user_id).order_by(Diary.date.asc()).all()
+        # [DailyStats] 일기 전체 대신 일별 집계 행 (일기별 mood_level/weather는 entries에 id 순으로)
+        ensure_daily_stats(current_user_id)
+        days = load_daily_stats(current_user_id)
         
         # 1. Daily Stats (Calendar uses _id, count)
         daily_stats = []
         # 2. Timeline Stats (Chart uses date, mood_level)
         timeline_stats = []
-        
-        for d in diaries:
-            if d.date and d.mood_level:
-                daily_stats.append({'_id': d.date, 'count': d.mood_level})
-                timeline_stats.append({'date': d.date, 'mood_level': d.mood_level})
-        
         # 3. Mood Distribution
         mood_map = {}
-        for d in diaries:
-            if d.mood_level and 1 <= d.mood_level <= 5:
-                mood_map[d.mood_level] = mood_map.get(d.mood_level, 0) + 1
-        formatted_moods = [{'_id': k, 'count': v} for k, v in mood_map.items()]
-
         # 4. Weather Distribution (Nested Moods)
         weather_map = {}
-        for d in diaries:
-            if d.weather:
-                w = d.weather.strip()
-                if not w:
-                    continue
-                if w not in weather_map:
-                    weather_map[w] = {}
-                if d.mood_level:
-                    weather_map[w][d.mood_level] = weather_map[w].get(d.mood_level, 0) + 1
+        
+        for day in days:
+            for mood_level, weather, *_ in entries_of(day):
+                if day.date and mood_level:
+                    daily_stats.append({'_id': day.date, 'count': mood_level})
+                    timeline_stats.append({'date': day.date, 'mood_level': mood_level})
+                if mood_level and 1 <= mood_level <= 5:
+                    mood_map[mood_level] = mood_map.get(mood_level, 0) + 1
+                if weather:
+                    if weather not in weather_map:
+                        weather_map[weather] = {}
+                    if mood_level:
+                        weather_map[weather][mood_level] = weather_map[weather].get(mood_level, 0) + 1
+        formatted_moods = [{'_id': k, 'count': v} for k, v in mood_map.items()]
         
         formatted_weather = []
         for w, m_counts in weather_map.items():
@@ -298,43 +270,6 @@ def _temperature_to_weather(temp):
         return {'emoji': '🌧️', 'label': '비', 'color': '#7e57c2'}
 
 
-def _calculate_daily_temperature(diaries_for_day, safe_decrypt):
-    """
-    특정 날짜의 일기 목록으로부터 마음 온도를 산출한다.
-    calculate_mood_temperature()의 일별 축소 버전.
-    """
-    if not diaries_for_day:
-        return None
-
-    # 1. 기분 레벨 점수 (60%) — 일별이므로 빈도/안정성 가중치 축소
-    mood_levels = [d.mood_level or 3 for d in diaries_for_day]
-    avg_mood = sum(mood_levels) / len(mood_levels)
-    mood_score = ((avg_mood - 1) / 4) * 100
-
-    # 2. 수면 점수 (40%)
-    sleep_positive = ["잘", "충분", "숙면", "편안", "좋"]
-    sleep_negative = ["못", "불면", "뒤척", "힘들", "나쁘", "잠을 못"]
-    sleep_scores = []
-    for d in diaries_for_day:
-        sleep_text = safe_decrypt(d.sleep_condition) if d.sleep_condition else ""
-        if not sleep_text:
-            sleep_scores.append(50)
-            continue
-        pos = sum(1 for kw in sleep_positive if kw in sleep_text)
-        neg = sum(1 for kw in sleep_negative if kw in sleep_text)
-        if pos > neg:
-            sleep_scores.append(80)
-        elif neg > pos:
-            sleep_scores.append(30)
-        else:
-            sleep_scores.append(50)
-    sleep_score = sum(sleep_scores) / len(sleep_scores) if sleep_scores else 50
-
-    raw_score = mood_score * 0.60 + sleep_score * 0.40
-    temperature = 20 + (raw_score / 100) * 25
-    return round(temperature, 1)
-
-
 @stats_bp.route('/api/mood-calendar', methods=['GET'])
 @jwt_required()
 def get_mood_calendar():
@@ -365,27 +300,15 @@ def get_mood_calendar():
     if not (2020 <= year <= 2100) or not (1 <= month <= 12):
         return jsonify({'error': '유효하지 않은 연/월입니다.'}), 400
 
-    safe_decrypt = _get_safe_decrypt()
-
-    # 해당 월의 일기 전부 조회
+    # 해당 월의 일별 집계 조회 (일기/수면 메모는 읽지 않음)
     month_start = f"{year:04d}-{month:02d}-01"
     if month == 12:
         month_end = f"{year + 1:04d}-01-01"
     else:
         month_end = f"{year:04d}-{month + 1:02d}-01"
 
-    diaries = Diary.query.filter(
-        Diary.user_id == user_id,
-        Diary.date >= month_start,
-        Diary.date < month_end
-    ).order_by(Diary.date.asc()).all()
-
-    # 날짜별 그룹핑
-    from collections import defaultdict
-    daily_map = defaultdict(list)
-    for d in diaries:
-        if d.date:
-            daily_map[d.date].append(d)
+    ensure_daily_stats(user_id)
+    daily_map = {day.date: day for day in load_daily_stats(user_id, month_start, month_end)}
 
     # 해당 월의 전체 일수
     import calendar
@@ -394,28 +317,22 @@ def get_mood_calendar():
     days = {}
     for day_num in range(1, days_in_month + 1):
         date_str = f"{year:04d}-{month:02d}-{day_num:02d}"
-        day_diaries = daily_map.get(date_str, [])
+        day_stats = daily_map.get(date_str)
 
-        if not day_diaries:
+        if not day_stats or day_stats.temperature is None:
             days[date_str] = None  # 미기록
             continue
 
-        temp = _calculate_daily_temperature(day_diaries, safe_decrypt)
-        if temp is None:
-            days[date_str] = None
-            continue
-
+        temp = day_stats.temperature
         weather = _temperature_to_weather(temp)
-        mood_levels = [d.mood_level for d in day_diaries if d.mood_level]
-        avg_mood = round(sum(mood_levels) / len(mood_levels), 1) if mood_levels else None
 
         days[date_str] = {
-            'mood_level': avg_mood,
+            'mood_level': day_stats.mood_avg,
             'temperature': temp,
             'emoji': weather['emoji'],
             'label': weather['label'],
             'color': weather['color'],
-            'diary_count': len(day_diaries),
+            'diary_count': day_stats.diary_count,
         }
 
     return jsonify({
@@ -8,6 +8,8 @@ sys.path.insert(0, base_path)
 
 # 테스트 시 환경변수로 DB를 in-memory SQLite로 강제 설정 (app.py 모듈 초기화 에러 방지)
 os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+# 일기 저장 후처리(diary_events)는 요청 스레드에서 실행 (백그라운드 스레드가 in-memory DB 연결을 공유하지 않도록)
+os.environ['DIARY_EVENTS_INLINE'] = '1'
 
 from app import app as flask_app
 from models import db
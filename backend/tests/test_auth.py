@@ -48,3 +48,19 @@ def test_register_and_login(client, app):
     
     me_data = res_me.get_json()
     assert me_data['username'] == 'testuser1'
+
+
+def test_system_stats_endpoints_require_staff(client, app):
+    """운영 지표 엔드포인트는 일반 사용자 403, 의료진 200"""
+    from tests.test_diary import get_auth_headers
+
+    user_headers = get_auth_headers(app)
+    with app.app_context():
+        db.session.add(User(id=2, username="staff1", password="123", role="staff"))
+        db.session.commit()
+    staff_headers = get_auth_headers(app, user_id=2, username="staff1")
+
+    for path in ('/api/analysis/queue', '/api/system/db-pool', '/api/system/diary-events',
+                 '/api/system/runpod', '/api/system/llm-gateway', '/api/system/semantic-cache'):
+        assert client.get(path, headers=user_headers).status_code == 403, path
+        assert client.get(path, headers=staff_headers).status_code == 200, path
@@ -0,0 +1,73 @@
+import json
+
+import standalone_ai
+from tests.test_diary import get_auth_headers
+
+
+def _parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = "message", None
+        for line in block.split("\n"):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        events.append((event, data))
+    return events
+
+
+def test_chat_reaction_stream_filters_blocked_phrases(client, app, monkeypatch):
+    """토큰 경계에 걸친 금지어도 스트리밍 중에 걸러지고, 마지막 done 이벤트로 전체 응답이 온다"""
+    chunks = ['"오늘 많이 ', '지치셨죠. 힘', '내세', '요! 어떤 일이 있었나요?"']
+    monkeypatch.setattr(standalone_ai, 'generate_stream', lambda *a, **kw: iter(chunks))
+    headers = get_auth_headers(app)
+
+    res = client.post('/api/chat/reaction/stream', json={'text': '오늘 너무 피곤했어'}, headers=headers)
+    assert res.status_code == 200
+    assert res.mimetype == 'text/event-stream'
+
+    events = _parse_sse(res.get_data(as_text=True))
+    deltas = "".join(d['delta'] for e, d in events if e == 'message')
+    done = [d for e, d in events if e == 'done']
+    assert "힘내세요" not in deltas
+    assert deltas == done[0]['reaction']
+    assert deltas.startswith("오늘 많이 지치셨죠.") and deltas.endswith("있었나요?")
+
+
+def test_chat_reaction_stream_crisis_override(client, app, monkeypatch):
+    """Level 3 위기 발화는 LLM을 호출하지 않고 안전 메시지만 스트리밍한다"""
+    def _no_llm(*a, **kw):
+        raise AssertionError("LLM must not be called for crisis level 3")
+    monkeypatch.setattr(standalone_ai, 'generate_stream', _no_llm)
+    headers = get_auth_headers(app)
+
+    res = client.post('/api/chat/reaction/stream', json={'text': '그냥 죽고 싶어'}, headers=headers)
+    events = _parse_sse(res.get_data(as_text=True))
+    done = [d for e, d in events if e == 'done'][0]
+    assert done['reaction'] in standalone_ai.CRISIS_SAFE_RESPONSES
+
+
+def test_chat_reaction_endpoints_share_crisis_handling(client, app, monkeypatch):
+    """일반/스트리밍 엔드포인트가 같은 위기 처리: Level 3는 안전 메시지, 그 외 위기는 응답(캐시 포함) 뒤 상담전화 안내"""
+    def _no_llm(*a, **kw):
+        raise AssertionError("LLM must not be called for crisis level 3")
+    monkeypatch.setattr(standalone_ai, 'generate', _no_llm)
+    headers = get_auth_headers(app)
+
+    res = client.post('/api/chat/reaction', json={'text': '그냥 죽고 싶어'}, headers=headers)
+    assert res.get_json()['reaction'] in standalone_ai.CRISIS_SAFE_RESPONSES
+
+    monkeypatch.setattr(standalone_ai, 'generate', lambda *a, **kw: "많이 지치셨군요.")
+    monkeypatch.setattr(standalone_ai, 'generate_stream', lambda *a, **kw: iter(["많이 ", "지치셨군요."]))
+    plain = client.post('/api/chat/reaction', json={'text': '요즘 살기 싫어'}, headers=headers).get_json()
+    events = _parse_sse(client.post('/api/chat/reaction/stream', json={'text': '요즘 살기 싫어'},
+                                    headers=headers).get_data(as_text=True))
+    streamed = [d for e, d in events if e == 'done'][0]
+    assert plain['reaction'] == streamed['reaction'] == "많이 지치셨군요." + standalone_ai.CRISIS_HOTLINE_NOTE
+
+    # 캐시 적중 경로에도 안내를 붙인다
+    monkeypatch.setattr(standalone_ai, '_cache_lookup', lambda text, history: ("캐시된 응답이에요.", None))
+    assert standalone_ai.generate_analysis_reaction_standalone('요즘 살기 싫어') == \
+        "".join(standalone_ai.stream_analysis_reaction_standalone('요즘 살기 싫어')) == \
+        "캐시된 응답이에요." + standalone_ai.CRISIS_HOTLINE_NOTE
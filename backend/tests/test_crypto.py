@@ -0,0 +1,78 @@
+"""
+EncryptionManager 배치 API / 평문 LRU 테스트
+"""
+import time
+
+from crypto_utils import EncryptionManager, purge_plaintext
+from tests.test_diary import get_auth_headers
+
+KEY = 'ZmDfcTF7_60GrrY167zsiPd67pEvs0aGOv2oasOM1Pg='
+
+
+def test_decrypt_many_matches_decrypt_and_uses_cache():
+    manager = EncryptionManager(KEY, cache_size=3)
+    tokens = manager.encrypt_many(["하나", "둘", "셋", "넷"])
+    assert all(t.startswith('gAAAA') for t in tokens)
+
+    # 중복/빈 값/평문이 섞여도 decrypt()와 같은 결과, 같은 순서
+    mixed = [tokens[0], None, "평문", tokens[0], "", tokens[1]]
+    assert manager.decrypt_many(mixed) == [manager.decrypt(t) for t in mixed] == \
+        ["하나", "", "평문", "하나", "", "둘"]
+
+    # 크기 상한: 가장 오래 안 쓴 항목부터 제거
+    manager.decrypt_many(tokens)
+    assert manager.cache.stats()['size'] == 3
+    hits = manager.cache.hits
+    assert manager.decrypt(tokens[3]) == "넷" and manager.cache.hits == hits + 1
+
+    # TTL 만료
+    manager.cache.ttl = 0.01
+    manager.cache.put(tokens[3], "넷")
+    time.sleep(0.02)
+    assert manager.cache.get(tokens[3]) is None
+
+    # 명시적 제거
+    manager.cache.ttl = 60
+    manager.decrypt(tokens[2])
+    purge_plaintext([tokens[2]])
+    assert manager.cache.get(tokens[2]) is None
+
+
+def test_deleted_diary_plaintext_is_purged(client, app):
+    import app as app_module
+
+    headers = get_auth_headers(app)
+    diary_id = client.post('/api/diaries', json={"date": "2026-03-01", "event": "지워질 일기"},
+                           headers=headers).get_json()['id']
+    assert client.get('/api/diaries', headers=headers).status_code == 200  # 목록 조회로 캐시에 적재
+
+    from models import Diary
+    token = Diary.query.get(int(diary_id)).event
+    cache = app_module.crypto.cache
+    assert cache.get(token) == "지워질 일기"
+
+    assert client.delete(f'/api/diaries/{diary_id}', headers=headers).status_code == 200
+    assert cache.get(token) is None
+
+
+def test_old_key_tokens_are_readable_and_rewrapped():
+    from cryptography.fernet import Fernet
+    from key_rotation import rewrap_rows
+
+    old_key = Fernet.generate_key().decode()
+    old_token = EncryptionManager(old_key, cache_size=0, old_keys=[]).encrypt("이전 키 일기")
+    manager = EncryptionManager(KEY, cache_size=0, old_keys=[old_key])
+
+    # 교체 중: 이전 키 값도 읽히고, 새 값은 primary 키로
+    assert manager.decrypt(old_token) == "이전 키 일기"
+    current = manager.encrypt("새 일기")
+    assert EncryptionManager(KEY, cache_size=0, old_keys=[]).decrypt(current) == "새 일기"
+    assert manager.rotate(current) is None and manager.rotate("평문") is None
+
+    # 바뀐 값이 있는 행만, (pk, 이전, 새) 쌍으로
+    changed, stats = rewrap_rows([(1, old_token, current, None), (2, current, "평문", None)], manager)
+    assert stats == {'rows': 2, 'rotated': 1, 'failed': 0}
+    assert len(changed) == 1
+    pk, old, new, *rest = changed[0]
+    assert pk == 1 and old == old_token and rest == [current, current, None, None]
+    assert manager.primary.decrypt(new.encode()).decode() == "이전 키 일기"
@@ -0,0 +1,82 @@
+"""
+일별 기분 집계 (user_daily_stats) 테스트
+일기 작성/수정/삭제가 해당 날짜 행에 반영되고, 통계 API가 일기 대신 집계 행으로 같은 결과를 내는지 확인한다.
+"""
+from datetime import date, timedelta
+
+from models import db, Diary, UserDailyStats
+from tests.test_diary import get_auth_headers
+
+
+def test_daily_stats_follow_diary_writes(client, app):
+    headers = get_auth_headers(app)
+    today = date.today()
+    first, second = (today - timedelta(days=1)).isoformat(), today.isoformat()
+
+    first_id = client.post('/api/diaries', json={"date": first, "mood_level": 2, "weather": " 비 ",
+                                                 "sleep_condition": "잠을 못 잤다"},
+                           headers=headers).get_json()['id']
+    client.post('/api/diaries', json={"date": second, "mood_level": 5, "weather": "맑음",
+                                      "sleep_condition": "푹 잘 잤다"}, headers=headers)
+
+    row = UserDailyStats.query.filter_by(user_id=1, date=first).one()
+    assert (row.diary_count, row.mood_avg, row.sleep_score, row.temperature) == (1, 2.0, 30, 26.8)
+
+    stats = client.get('/api/statistics', headers=headers).get_json()
+    assert stats['timeline'] == [{'date': first, 'mood_level': 2}, {'date': second, 'mood_level': 5}]
+    assert {w['_id'] for w in stats['weather']} == {"비", "맑음"}
+
+    # 수정 → 같은 날짜 행 재계산
+    client.put(f'/api/diaries/{first_id}', json={"mood_level": 4, "sleep_condition": "충분히 잤다"},
+               headers=headers)
+    calendar = client.get(f'/api/mood-calendar?year={today.year}&month={today.month}',
+                          headers=headers).get_json()['days']
+    assert calendar[second]['temperature'] == 43.0
+    if first in calendar:
+        assert calendar[first]['mood_level'] == 4.0 and calendar[first]['temperature'] == 39.2
+
+    temperature = client.get('/api/mood-temperature', headers=headers).get_json()
+    assert temperature['diary_count'] == 2 and temperature['factors']['sleep_score'] == 80.0
+
+    # 삭제 → 그날 일기가 없으면 행 제거
+    client.delete(f'/api/diaries/{first_id}', headers=headers)
+    assert UserDailyStats.query.filter_by(user_id=1, date=first).count() == 0
+
+
+def test_daily_stats_rebuilt_when_out_of_sync(client, app):
+    headers = get_auth_headers(app)
+    # 집계 도입 전 일기 / ORM 밖 쓰기: 행이 없어도 조회 시 사용자 전체를 다시 계산
+    for day, mood in (("2026-01-05", 3), ("2026-01-05", 1), ("2026-01-06", 4)):
+        db.session.add(Diary(user_id=1, date=day, mood_level=mood))
+    db.session.commit()
+    assert UserDailyStats.query.count() == 0
+
+    stats = client.get('/api/statistics', headers=headers).get_json()
+    assert sorted((m['_id'], m['count']) for m in stats['moods']) == [(1, 1), (3, 1), (4, 1)]
+    rows = UserDailyStats.query.order_by(UserDailyStats.date).all()
+    assert [(r.date, r.diary_count, r.mood_avg) for r in rows] == [("2026-01-05", 2, 2.0), ("2026-01-06", 1, 4.0)]
+
+
+def test_mood_temperature_window_follows_writing_time(client, app):
+    """마음 온도 7일 창은 일기 날짜가 아니라 작성 시각 기준 (과거 날짜로 오늘 쓴 일기 포함, 오래전 작성분 제외)"""
+    from datetime import datetime
+    from daily_stats import STATS_VERSION
+
+    headers = get_auth_headers(app)
+    today = date.today()
+    now = datetime.utcnow()
+    db.session.add_all([
+        # 오늘 작성했지만 한 달 전 날짜
+        Diary(user_id=1, date=(today - timedelta(days=30)).isoformat(), mood_level=5, created_at=now,
+              safety_flag=True),
+        # 최근 날짜지만 10일 전에 작성 (예약/가져오기 등)
+        Diary(user_id=1, date=(today - timedelta(days=1)).isoformat(), mood_level=1,
+              created_at=now - timedelta(days=10)),
+    ])
+    db.session.commit()
+
+    temperature = client.get('/api/mood-temperature', headers=headers).get_json()
+    assert temperature['diary_count'] == 1
+    assert temperature['factors']['mood_score'] == 100.0 and temperature['factors']['frequency_score'] == 14.3
+    assert temperature['factors']['stability_score'] == 20  # safety_flag 감점은 창 안의 일기만
+    assert {r.stats_version for r in UserDailyStats.query.filter_by(user_id=1)} == {STATS_VERSION}
@@ -0,0 +1,133 @@
+import os
+import sys
+import types
+import threading
+
+import psycopg2.extensions
+import pytest
+
+import db_pool
+
+
+class _FakeConn:
+    """풀 연결 흉내 — 트랜잭션 상태와 롤백/커밋 호출만 기록"""
+    vector_registered = False
+
+    def __init__(self):
+        self.closed = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class _FakePool:
+    """ThreadedConnectionPool 대체: 반납된 연결을 재사용하고 생성된 풀/연결 수를 기록"""
+    created = []
+
+    def __init__(self, minconn, maxconn, connection_factory=None, **kwargs):
+        self.maxconn = maxconn
+        self._pool = []
+        self._used = {}
+        self.connections = []
+        _FakePool.created.append(self)
+
+    def getconn(self):
+        conn = self._pool.pop() if self._pool else None
+        if conn is None:
+            conn = _FakeConn()
+            self.connections.append(conn)
+        self._used[id(conn)] = conn
+        return conn
+
+    def putconn(self, conn, close=False):
+        self._used.pop(id(conn), None)
+        if not close:
+            self._pool.append(conn)
+
+    def closeall(self):
+        pass
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    registered = []
+    module = types.ModuleType('pgvector.psycopg2')
+    module.register_vector = registered.append
+    monkeypatch.setitem(sys.modules, 'pgvector', types.ModuleType('pgvector'))
+    monkeypatch.setitem(sys.modules, 'pgvector.psycopg2', module)
+
+    _FakePool.created = []
+    monkeypatch.setattr(db_pool, 'ThreadedConnectionPool', _FakePool)
+    monkeypatch.setattr(db_pool, 'POOL_MAX', 2)
+    monkeypatch.setattr(db_pool, '_pool', None)
+    monkeypatch.setattr(db_pool, '_pool_pid', None)
+    monkeypatch.setattr(db_pool, '_slots', None)
+    monkeypatch.setattr(db_pool, '_stats', {key: 0 for key in db_pool._stats})
+    return registered
+
+
+def test_pool_is_recreated_in_a_new_process(fake_pool, monkeypatch):
+    """같은 pid에서는 풀을 재사용하고, fork 이후(pid가 바뀌면) 자식 프로세스용 풀을 새로 만든다"""
+    with db_pool.get_conn() as conn:
+        assert conn.closed == 0
+    with db_pool.get_conn():
+        pass
+    assert len(_FakePool.created) == 1
+    assert db_pool.get_pool_stats()['initialized'] and db_pool.get_pool_stats()['checkouts'] == 2
+
+    parent_pid = os.getpid()
+    monkeypatch.setattr(db_pool.os, 'getpid', lambda: parent_pid + 1)
+    assert db_pool.get_pool_stats()['initialized'] is False  # 부모의 풀은 자식에서 쓰지 않음
+    with db_pool.get_conn():
+        pass
+    assert len(_FakePool.created) == 2 and db_pool._pool is _FakePool.created[1]
+
+
+def test_checkout_times_out_when_pool_is_exhausted(fake_pool):
+    """POOL_MAX개가 모두 대여 중이면 timeout까지 기다린 뒤 PoolTimeout, 반납되면 다시 빌릴 수 있다"""
+    first = db_pool.get_conn()
+    second = db_pool.get_conn()
+    first.__enter__()
+    second.__enter__()
+
+    with pytest.raises(db_pool.PoolTimeout):
+        with db_pool.get_conn(timeout=0.05):
+            pass
+    stats = db_pool.get_pool_stats()
+    assert stats['timeouts'] == 1 and stats['waits'] == 1 and stats['in_use'] == 2
+
+    # 대기 중에 반납되면 그 연결을 받는다
+    third = db_pool.get_conn(timeout=5)
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(third.__enter__()))
+    waiter.start()
+    first.__exit__(None, None, None)
+    waiter.join(timeout=5)
+    assert got and got[0] is _FakePool.created[0].connections[0]
+    for cm in (second, third):
+        cm.__exit__(None, None, None)
+    assert db_pool.get_pool_stats()['in_use'] == 0
+
+
+def test_pgvector_is_registered_once_per_connection(fake_pool):
+    """vector=True 대여는 연결마다 최초 1회만 register_vector를 호출한다"""
+    with db_pool.get_conn(vector=True) as conn:
+        with db_pool.get_conn(vector=True) as other:
+            pass
+    for _ in range(3):
+        with db_pool.get_conn(vector=True):
+            pass
+    with db_pool.get_conn():
+        pass
+
+    assert fake_pool == [conn, other]
+    assert conn.vector_registered and other.vector_registered
+    assert db_pool.get_pool_stats()['vector_registrations'] == 2
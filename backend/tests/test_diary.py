@@ -47,3 +47,172 @@ def test_create_and_get_diary(client, app):
     assert found_diary is not None
     assert found_diary['event'] == diary_data['event']
     assert found_diary['mood_level'] == diary_data['mood_level']
+
+def test_diary_analysis_jobs_coalesce(client, app):
+    """일기 작성 후 연속 수정 시 분석 작업이 하나로 병합되는지 검증 (analysis_jobs)"""
+    headers = get_auth_headers(app)
+
+    diary_data = {
+        "date": "2026-01-05",
+        "event": "회사 일이 많았다.",
+        "emotion_desc": "피곤함",
+        "mood_level": 2
+    }
+    res_post = client.post('/api/diaries', json=diary_data, headers=headers)
+    assert res_post.status_code == 201
+    diary_id = int(res_post.get_json()['id'])
+
+    for i in range(2):
+        diary_data['event'] = f"회사 일이 많았다. (수정 {i + 1})"
+        res_put = client.put(f'/api/diaries/{diary_id}', json=diary_data, headers=headers)
+        assert res_put.status_code == 200
+
+    res_status = client.get(f'/api/diaries/{diary_id}/analysis', headers=headers)
+    assert res_status.status_code == 200
+    status = res_status.get_json()
+    assert status['status'] == 'pending'
+    assert status['version'] == 3
+
+    with app.app_context():
+        from models import AnalysisJob
+        assert AnalysisJob.query.filter_by(diary_id=diary_id).count() == 1
+
+    # 삭제 시 작업도 함께 제거
+    res_del = client.delete(f'/api/diaries/{diary_id}', headers=headers)
+    assert res_del.status_code == 200
+    with app.app_context():
+        from models import AnalysisJob
+        assert AnalysisJob.query.filter_by(diary_id=diary_id).count() == 0
+
+
+def test_enqueue_keeps_caller_changes_when_job_already_exists(app):
+    """다른 요청이 먼저 만든 작업 행(세션 밖)과 겹쳐도 호출자의 미커밋 변경은 함께 커밋된다"""
+    from sqlalchemy import text
+    from analysis_queue import enqueue_analysis
+
+    get_auth_headers(app)
+    diary = Diary(user_id=1, date="2026-01-06", mood_level=2)
+    db.session.add(diary)
+    db.session.commit()
+    db.session.execute(text("INSERT INTO analysis_jobs (diary_id, user_id, status, version, attempts, next_run_at) "
+                            "VALUES (:id, 1, 'done', 4, 2, CURRENT_TIMESTAMP)"), {'id': diary.id})
+    db.session.commit()
+
+    diary.mood_level = 5
+    assert enqueue_analysis(diary.id, 1) == 5
+    db.session.expire_all()
+    assert db.session.get(Diary, diary.id).mood_level == 5
+    job = db.session.execute(text("SELECT status, attempts FROM analysis_jobs WHERE diary_id = :id"),
+                             {'id': diary.id}).one()
+    assert tuple(job) == ('pending', 0)
+
+def test_diary_list_keyset_pagination_fields_and_etag(client, app, monkeypatch):
+    """limit/cursor 키셋 페이지, fields= 필드 선택(나머지는 복호화 안 함), ETag 304"""
+    import sys
+    headers = get_auth_headers(app)
+    for day in ["2026-01-01", "2026-01-02", "2026-01-03", "2026-01-04"]:
+        res = client.post('/api/diaries', json={"date": day, "event": f"{day} 기록", "mood_level": 3},
+                          headers=headers)
+        assert res.status_code == 201
+    with app.app_context():  # 과거 데이터에 남아 있는 같은 날짜 중복 일기
+        db.session.add(Diary(user_id=1, date="2026-01-02", event="중복", mood_level=3))
+        db.session.commit()
+
+    full = client.get('/api/diaries', headers=headers).get_json()
+    assert [d['date'] for d in full] == ["2026-01-04", "2026-01-03", "2026-01-02", "2026-01-02", "2026-01-01"]
+
+    # 같은 날짜 일기가 페이지 경계에 걸려도 누락/중복 없음
+    paged, cursor = [], None
+    while True:
+        res = client.get('/api/diaries', query_string={'limit': 2, **({'cursor': cursor} if cursor else {})},
+                         headers=headers)
+        assert res.status_code == 200 and len(res.get_json()) <= 2
+        paged += res.get_json()
+        cursor = res.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert [d['id'] for d in paged] == [d['id'] for d in full]
+    assert client.get('/api/diaries?cursor=garbage', headers=headers).status_code == 400
+
+    # fields= → 지정한 필드만, 암호화 필드는 복호화하지 않음
+    decrypted = []
+    app_module = sys.modules['app']
+    original = app_module.safe_decrypt
+    monkeypatch.setattr(app_module, 'safe_decrypt', lambda value: decrypted.append(value) or original(value))
+    res = client.get('/api/diaries?fields=id,date,mood_level', headers=headers)
+    assert [set(d) for d in res.get_json()] == [{'id', 'date', 'mood_level'}] * 5
+    assert decrypted == []
+    assert client.get('/api/diaries?fields=id,password', headers=headers).status_code == 400
+
+    # ETag: 변경이 없으면 304, 수정하면 새 ETag
+    res = client.get('/api/diaries?limit=2', headers=headers)
+    etag = res.headers['ETag']
+    decrypted.clear()
+    res_304 = client.get('/api/diaries?limit=2', headers={**headers, 'If-None-Match': etag})
+    assert res_304.status_code == 304 and res_304.data == b''
+    assert decrypted == []
+
+    res_put = client.put(f"/api/diaries/{full[0]['id']}",
+                         json={"date": "2026-01-04", "event": "수정됨", "mood_level": 4}, headers=headers)
+    assert res_put.status_code == 200
+    res = client.get('/api/diaries?limit=2', headers={**headers, 'If-None-Match': etag})
+    assert res.status_code == 200 and res.headers['ETag'] != etag
+    assert res.get_json()[0]['event'] == "수정됨"
+
+def test_diary_side_effects_run_after_response(client, app, monkeypatch):
+    """B2G/보호자 알림/킥 분석 단계가 느려도 일기 저장 응답은 바로 오고, 킥 분석은 사용자별로 병합되는지 검증"""
+    import threading
+    import diary_events
+
+    headers = get_auth_headers(app)
+    release = threading.Event()
+    seen = []
+
+    def slow_stage(event):
+        release.wait(5)
+        seen.append((event['kind'], event['diary_id']))
+
+    monkeypatch.setattr(diary_events, 'INLINE', False)
+    monkeypatch.setattr(diary_events, 'STAGES', [
+        ('b2g', slow_stage, 1, None),
+        ('kick_flags', lambda event: diary_events._kick_pending.discard(event['user_id']), 1,
+         diary_events._accept_kick_flags),
+    ])
+    monkeypatch.setattr(diary_events, '_stats', {})
+    # 킥 분석 단계가 아직 시작 전인 상태 (같은 사용자가 대기 중)
+    diary_events._kick_pending.add(1)
+
+    res = client.post('/api/diaries', json={"date": "2026-01-07", "event": "산책", "mood_level": 3},
+                      headers=headers)
+    assert res.status_code == 201
+    assert seen == []  # 응답 시점에 b2g 단계는 아직 대기 중
+
+    release.set()
+    assert diary_events.wait_idle(5)
+    assert seen == [('created', res.get_json()['id'])]
+    stats = diary_events.get_event_stats()
+    assert stats['b2g']['completed'] == 1 and stats['b2g']['failed'] == 0
+    assert stats['kick_flags']['coalesced'] == 1 and stats['kick_flags']['submitted'] == 0
+    diary_events._kick_pending.discard(1)
+
+
+def test_kick_flags_pending_released_when_submit_fails(monkeypatch):
+    """executor 종료로 등록에 실패하면 대기 표시를 지워, 이후 같은 사용자의 킥 분석이 병합되어 버려지지 않는다"""
+    import diary_events
+
+    class _ShutDownExecutor:
+        def submit(self, *args, **kwargs):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+    monkeypatch.setattr(diary_events, 'INLINE', False)
+    monkeypatch.setattr(diary_events, 'STAGES', [
+        ('kick_flags', lambda event: None, 1, diary_events._accept_kick_flags),
+    ])
+    monkeypatch.setattr(diary_events, '_stats', {})
+    monkeypatch.setattr(diary_events, '_get_executor', lambda name, workers: _ShutDownExecutor())
+
+    for diary_id in (1, 2):
+        diary_events.publish_diary_event('updated', 7, {'id': diary_id})
+    stats = diary_events.get_event_stats()['kick_flags']
+    assert stats['failed'] == 2 and stats['coalesced'] == 0
+    assert 7 not in diary_events._kick_pending
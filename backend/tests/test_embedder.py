@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+
+def test_onnx_embedder_matches_torch_within_tolerance():
+    """int8 ONNX 임베딩이 기존 PyTorch SentenceTransformer 벡터와 코사인 0.98 이상으로 일치한다"""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("tokenizers")
+    st = pytest.importorskip("sentence_transformers")
+    from onnx_embedder import OnnxEmbedder, DEFAULT_MODEL_DIR, QUANTIZED_FILE, MODEL_NAME
+    if not os.path.exists(os.path.join(DEFAULT_MODEL_DIR, QUANTIZED_FILE)):
+        pytest.skip("ONNX 모델 없음 (python onnx_embedder.py로 생성)")
+
+    texts = [
+        "오늘 너무 피곤해",
+        "회사 때문에 우울해서 아무것도 하기 싫었다",
+        "친구랑 오랜만에 만나서 맛있는 걸 먹고 기분이 좋아졌다",
+        "잠을 제대로 못 자서 하루 종일 머리가 아팠어요. 내일은 일찍 자야겠다.",
+        "ㅋㅋㅋ",
+    ]
+    reference = st.SentenceTransformer(MODEL_NAME).encode(texts, convert_to_numpy=True)
+    onnx = OnnxEmbedder().encode(texts, batch_size=2)
+
+    assert onnx.shape == reference.shape
+    cos = (onnx * reference).sum(axis=1) / (np.linalg.norm(onnx, axis=1) * np.linalg.norm(reference, axis=1))
+    assert cos.min() >= 0.98, cos
+
+    # 단건 호출은 1차원 벡터 (SentenceTransformer.encode와 같은 형태)
+    single = OnnxEmbedder().encode(texts[0])
+    assert single.shape == reference[0].shape
+
+
+class _StubEncoding:
+    def __init__(self, ids, length):
+        self.ids = ids + [0] * (length - len(ids))
+        self.attention_mask = [1] * len(ids) + [0] * (length - len(ids))
+
+
+class _StubTokenizer:
+    """글자 하나 = 토큰 하나, 배치 내 최장 길이로 padding(id 0)"""
+
+    def encode_batch(self, texts):
+        ids = [[1 + ord(ch) % 31 for ch in text] for text in texts]
+        length = max(len(i) for i in ids)
+        return [_StubEncoding(i, length) for i in ids]
+
+
+class _StubSession:
+    """토큰 id → 고정 벡터 조회로 last_hidden_state를 흉내 (padding 토큰은 큰 값 → 평균에 섞이면 드러남)"""
+
+    def __init__(self, table):
+        self.table = table
+        self.feeds = []
+
+    def run(self, output_names, feeds):
+        self.feeds.append(feeds)
+        return [self.table[feeds['input_ids']]]
+
+
+def test_onnx_embedder_pooling_matches_sentence_transformers():
+    """세션 출력에 대한 mean pooling(padding 제외)/정규화/입력 순서 복원이 SentenceTransformer와 같다"""
+    from onnx_embedder import OnnxEmbedder
+
+    rng = np.random.default_rng(0)
+    table = rng.normal(size=(32, 8)).astype(np.float32)
+    table[0] = 1000.0
+    embedder = OnnxEmbedder.__new__(OnnxEmbedder)  # 모델 파일 없이 토크나이저/세션만 대체
+    embedder._tokenizer = _StubTokenizer()
+    embedder._session = _StubSession(table)
+    embedder._input_names = {'input_ids', 'attention_mask', 'token_type_ids'}
+
+    texts = ["오늘 너무 피곤해", "ㅋㅋㅋ", "친구랑 오랜만에 만나서 기분이 좋아졌다", "잠"]
+    # SentenceTransformer Pooling(mean): 텍스트별 실제 토큰 벡터의 평균
+    reference = np.stack([table[[1 + ord(ch) % 31 for ch in text]].mean(axis=0) for text in texts])
+
+    vectors = embedder.encode(texts, batch_size=3)
+    assert vectors.shape == (4, 8)
+    np.testing.assert_allclose(vectors, reference, rtol=1e-5, atol=1e-5)
+    assert all('token_type_ids' in feeds and not feeds['token_type_ids'].any() for feeds in embedder._session.feeds)
+
+    normalized = embedder.encode(texts, normalize_embeddings=True)
+    np.testing.assert_allclose(normalized, reference / np.linalg.norm(reference, axis=1, keepdims=True),
+                               rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(embedder.encode(texts[2]), reference[2], rtol=1e-5, atol=1e-5)
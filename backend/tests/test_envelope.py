@@ -0,0 +1,106 @@
+"""
+일기 봉투 암호화 (diary_envelope) 테스트
+기존 Fernet 필드 형식과 봉투 형식이 섞여 있어도 API 응답이 같고, 수정/일괄 변환으로 봉투 형식으로 옮겨지는지 확인한다.
+"""
+from sqlalchemy import text
+
+import diary_envelope
+from crypto_utils import crypto_manager
+from models import db, Diary, UserDataKey
+from tests.test_diary import get_auth_headers
+
+
+def _raw(diary_id):
+    return db.session.execute(
+        text("SELECT sealed, event, ai_comment FROM diaries WHERE id = :id"), {'id': diary_id}).one()
+
+
+def test_envelope_rows_read_like_legacy_rows(client, app, monkeypatch):
+    headers = get_auth_headers(app)
+
+    # 1. 기존 형식 (필드별 Fernet)
+    monkeypatch.setattr(diary_envelope, 'WRITE_ENABLED', False)
+    legacy_id = int(client.post('/api/diaries', json={"date": "2026-02-01", "event": "기존 형식 일기",
+                                                      "self_talk": "괜찮아"}, headers=headers).get_json()['id'])
+    sealed, event, _ = _raw(legacy_id)
+    assert sealed is None and event.startswith('gAAAA')
+
+    # 2. 봉투 형식: 필드 컬럼은 NULL, 데이터 키는 감싼 형태로 1개
+    monkeypatch.setattr(diary_envelope, 'WRITE_ENABLED', True)
+    res = client.post('/api/diaries', json={"date": "2026-02-02", "event": "봉투 형식 일기",
+                                            "emotion_desc": "설렘"}, headers=headers)
+    assert res.status_code == 201 and res.get_json()['event'] == "봉투 형식 일기"
+    sealed_id = int(res.get_json()['id'])
+    sealed, event, _ = _raw(sealed_id)
+    assert sealed is not None and event is None and "봉투".encode() not in bytes(sealed)
+    assert UserDataKey.query.count() == 1
+
+    db.session.expire_all()
+    by_id = {int(d['id']): d for d in client.get('/api/diaries', headers=headers).get_json()}
+    assert by_id[legacy_id]['event'] == "기존 형식 일기" and by_id[legacy_id]['self_talk'] == "괜찮아"
+    assert by_id[sealed_id]['event'] == "봉투 형식 일기" and by_id[sealed_id]['emotion_desc'] == "설렘"
+    projected = client.get('/api/diaries?fields=id,event', headers=headers).get_json()
+    assert {d['event'] for d in projected} == {"기존 형식 일기", "봉투 형식 일기"}
+
+    # 3. ORM 밖(psycopg2 워커)에서 쓴 컬럼 값은 봉인 값보다 우선
+    db.session.execute(text("UPDATE diaries SET ai_comment = :c WHERE id = :id"),
+                       {'c': crypto_manager.encrypt("워커 코멘트"), 'id': sealed_id})
+    db.session.commit()
+    assert client.get(f'/api/diaries/{sealed_id}', headers=headers).get_json()['ai_comment'] == "워커 코멘트"
+
+    # 4. 지연 변환: 기존 형식 일기를 수정하면 봉투 형식으로
+    res = client.put(f'/api/diaries/{legacy_id}', json={"event": "기존 형식 일기", "self_talk": "괜찮아",
+                                                           "mood_level": 4}, headers=headers)
+    assert res.status_code == 200 and res.get_json()['self_talk'] == "괜찮아"
+    sealed, event, _ = _raw(legacy_id)
+    assert sealed is not None and event is None
+
+    # 5. 일괄 변환 (설정이 꺼져 있어도 실행)
+    monkeypatch.setattr(diary_envelope, 'WRITE_ENABLED', False)
+    db.session.add(Diary(user_id=1, date="2026-02-03", event=crypto_manager.encrypt("남은 일기")))
+    db.session.commit()
+    assert diary_envelope.migrate_legacy_rows() == {'scanned': 1, 'sealed': 1}
+    assert Diary.query.filter(Diary.sealed.is_(None)).count() == 0
+    db.session.expire_all()
+    assert Diary.query.filter_by(date="2026-02-03").one().event == "남은 일기"
+
+
+def test_envelope_key_created_in_rolled_back_transaction_is_forgotten(app, monkeypatch):
+    get_auth_headers(app, user_id=2, username="rollback")
+    monkeypatch.setattr(diary_envelope, 'WRITE_ENABLED', True)
+    diary_envelope.forget_user_key(2)
+
+    db.session.add(Diary(user_id=2, date="2026-02-04", event="롤백될 일기"))
+    db.session.flush()
+    assert diary_envelope._cache_get(2) is not None
+    db.session.rollback()
+    # 키 행이 롤백됐으므로 캐시에 남아 있으면 다음 일기가 DB에 없는 키로 암호화된다
+    assert diary_envelope._cache_get(2) is None
+    assert UserDataKey.query.filter_by(user_id=2).count() == 0
+
+
+def test_unopened_sealed_row_is_not_resealed(app, monkeypatch):
+    import pytest
+
+    get_auth_headers(app)
+    monkeypatch.setattr(diary_envelope, 'WRITE_ENABLED', True)
+    diary = Diary(user_id=1, date="2026-02-05", event=crypto_manager.encrypt("본문"), ai_comment="코멘트")
+    db.session.add(diary)
+    db.session.commit()
+    diary_id = diary.id
+
+    # 봉인 손상 (열기 실패) → 필드는 비어 보이지만 수정 시 빈 값으로 다시 봉인하면 안 됨
+    corrupted = bytearray(_raw(diary_id)[0])
+    corrupted[-1] ^= 0xFF
+    db.session.execute(text("UPDATE diaries SET sealed = :s WHERE id = :id"),
+                       {'s': bytes(corrupted), 'id': diary_id})
+    db.session.commit()
+    db.session.expire_all()
+
+    diary = db.session.get(Diary, diary_id)
+    assert diary.event is None and diary.__dict__.get('_envelope_unopened')
+    diary.self_talk = crypto_manager.encrypt("수정")
+    with pytest.raises(ValueError):
+        db.session.commit()
+    db.session.rollback()
+    assert bytes(_raw(diary_id)[0]) == bytes(corrupted)
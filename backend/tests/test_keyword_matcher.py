@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+import keyword_matcher
+from keyword_matcher import KeywordMatcher
+from kick_analysis import cbt_patterns, self_narrative, sleep_mind
+from kick_analysis.emotion_lexicon import ALL_STEMS, match_emotions_in_text
+from kick_analysis.relational import KINSHIP_DICT, _analyze_sentence_emotions, _extract_people_from_text
+import ai_brain
+import standalone_ai
+
+SAMPLE_SENTENCES = [
+    "오늘은 회사에서 발표를 했는데 너무 떨리고 불안했다.",
+    "팀장님이 칭찬해주셔서 뿌듯했지만 집에 와서는 지치고 피곤했다.",
+    "엄마랑 여동생이랑 저녁을 먹었는데 오랜만에 편안하고 따뜻했다.",
+    "나는 항상 실수만 하는 것 같아. 다 내 잘못이야. 앞으로 더 잘해야 하는데.",
+    "잠을 못 자서 뒤척였고 새벽에 깸. 머리 아프고 수면 부족이다.",
+    "푹 잤더니 개운하고 상쾌하다. 친구 덕분에 감사한 하루였다.",
+    "아무도 나를 이해하지 못해. 혼자인 것 같고 외롭고 허전하다.",
+    "다 끝내고 싶다는 생각이 들었다. 살기 싫다.",
+    "내일은 산책도 하고 일찍 자야겠다. 할 수 있을 것 같다!",
+]
+
+BACKENDS = [False] + ([True] if keyword_matcher.AHOCORASICK_AVAILABLE else [])
+
+
+def _texts():
+    rng = random.Random(7)
+    texts = list(SAMPLE_SENTENCES) + ["", "a", "ㅋㅋㅋ"]
+    for _ in range(80):
+        texts.append(" ".join(rng.sample(SAMPLE_SENTENCES, rng.randint(1, len(SAMPLE_SENTENCES)))))
+    return texts
+
+
+@pytest.mark.parametrize("use_c", BACKENDS)
+def test_matcher_matches_naive_scan(use_c):
+    """found()는 키워드별 `in` 검사와 같은 결과·순서, iter_matches()는 모든 등장 위치를 돌려준다"""
+    entries = list(ALL_STEMS.items()) + [("ab", 1), ("b", 2), ("abc", 3), ("bc", 4), ("ab", 5)]
+    matcher = KeywordMatcher(entries, use_c=use_c)
+    for text in _texts() + ["abcab", "xbcx", "aab"]:
+        assert matcher.found(text) == [(kw, cat) for kw, cat in entries if kw in text]
+        expected = sorted({(i, kw) for kw, _ in entries for i in range(len(text)) if text.startswith(kw, i)})
+        assert sorted({(start, kw) for start, kw, _ in matcher.iter_matches(text)}) == expected
+        assert matcher.contains_any(text) == bool(expected)
+
+
+def test_lexicon_functions_match_previous_implementations():
+    """각 사전 함수가 기존 키워드 루프 구현과 같은 결과를 낸다"""
+    for text in _texts():
+        # emotion_lexicon.match_emotions_in_text
+        legacy = [(stem, cat) for stem, cat in ALL_STEMS.items() if stem in text]
+        result = match_emotions_in_text(text)
+        assert result["found_words"] == legacy
+        assert result["found_categories"] == {cat for _, cat in legacy}
+
+        # relational._analyze_sentence_emotions / 호칭 사전
+        assert _analyze_sentence_emotions(text) == {cat for stem, cat in ALL_STEMS.items() if stem in text}
+        kinships = [p["name"] for p in _extract_people_from_text(text, skip_llm=True) if p["type"] == "호칭"]
+        legacy_kinships, seen = [], set()
+        for kinship in sorted(KINSHIP_DICT, key=len, reverse=True):
+            if kinship in text and not any(kinship in s or s in kinship for s in seen):
+                legacy_kinships.append(kinship)
+                seen.add(kinship)
+        assert kinships == legacy_kinships
+
+        # cbt_patterns._detect_patterns_in_text
+        legacy_cbt = {}
+        if text and len(text.strip()) >= 5:
+            for key, info in cbt_patterns.CBT_PATTERNS.items():
+                count = sum(1 for kw in info['keywords'] if kw in text.lower())
+                if count:
+                    legacy_cbt[key] = count
+        assert cbt_patterns._detect_patterns_in_text(text) == legacy_cbt
+
+        # sleep_mind._score_sleep_text
+        if text.strip() and text.strip() not in sleep_mind.SLEEP_LABEL_SCORES:
+            _, pos_hits, neg_hits = sleep_mind._score_sleep_text(text)
+            assert pos_hits == [kw for kw in sleep_mind.SLEEP_POSITIVE_KEYWORDS if kw in text.strip()]
+            assert neg_hits == [kw for kw in sleep_mind.SLEEP_NEGATIVE_KEYWORDS if kw in text.strip()]
+
+        # self_narrative 패턴 사전
+        narrative = self_narrative._analyze_single_diary_narrative(text)
+        if narrative:
+            assert narrative["attribution"]["internal_count"] == sum(
+                1 for p in self_narrative.INTERNAL_ATTRIBUTION if p in text)
+            assert narrative["obligation"]["hits"] == [
+                p for p in self_narrative.OBLIGATION_PATTERNS if p in text][:3]
+            assert narrative["tense"]["future"] == sum(1 for p in self_narrative.FUTURE_MARKERS if p in text)
+            assert narrative["gratitude"]["count"] == sum(
+                1 for p in self_narrative.GRATITUDE_PATTERNS if p in text)
+
+        # 위기 키워드 (standalone_ai)
+        levels = standalone_ai.CRISIS_MATCHER.categories(text)
+        assert ('level3' in levels) == any(kw in text for kw in standalone_ai.CRISIS_LEVEL3)
+        assert ('crisis' in levels) == any(kw in text for kw in standalone_ai.CRISIS_KEYWORDS)
+
+        # 3단계 위기 키워드 (ai_brain.analyze_diary_with_local_llm)
+        found = ai_brain.CRISIS_LEVEL_MATCHER.found(text)
+        for level, keywords in (('level3', ai_brain.CRISIS_LEVEL_3), ('level2', ai_brain.CRISIS_LEVEL_2),
+                                ('level1', ai_brain.CRISIS_LEVEL_1)):
+            assert [k for k, lv in found if lv == level] == [k for k in keywords if k in text]
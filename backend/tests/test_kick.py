@@ -0,0 +1,383 @@
+from datetime import date, datetime, timedelta
+
+from models import db, User, Diary
+from kick_analysis import analyze_timeseries
+from kick_analysis.corpus import UserDiaryWindow
+from kick_analysis.emotion_flow import analyze_emotion_flow
+from kick_analysis.sleep_mind import analyze_sleep_mind
+from kick_analysis.self_narrative import analyze_self_narrative
+
+
+def test_shared_window_decrypts_once_and_matches_per_phase_results(app):
+    """UserDiaryWindow를 공유해도 Phase별 결과는 같고, 복호화는 필드당 한 번만 일어난다"""
+    today = date(2026, 3, 31)
+    db.session.add(User(id=1, username="kick", password="123", role="user"))
+    for i in range(20):
+        day = today - timedelta(days=i)
+        db.session.add(Diary(
+            user_id=1, date=day.strftime('%Y-%m-%d'), mood_level=(i % 5) + 1,
+            event=f"enc:회사에서 발표를 했다 {i}", emotion_desc="enc:불안하고 피곤했다",
+            self_talk="enc:나는 할 수 있어", sleep_condition="enc:잠을 설쳤다",
+            created_at=datetime.combine(day, datetime.min.time()) + timedelta(hours=2 if i % 2 else 21),
+        ))
+    db.session.commit()
+
+    calls = []
+
+    def decrypt(value):
+        calls.append(value)
+        return value[len("enc:"):]
+
+    expected = {
+        'ts': analyze_timeseries(1, db.session, Diary, today=today),
+        'ef': analyze_emotion_flow(1, db.session, Diary, crypto_decrypt=decrypt, today=today),
+        'sm': analyze_sleep_mind(1, db.session, Diary, crypto_decrypt=decrypt, today=today),
+        'sn': analyze_self_narrative(1, db.session, Diary, crypto_decrypt=decrypt, today=today),
+    }
+    calls.clear()
+
+    window = UserDiaryWindow(1, db.session, Diary, crypto_decrypt=decrypt, today=today)
+    shared = {
+        'ts': analyze_timeseries(1, db.session, Diary, today=today, window=window),
+        'ef': analyze_emotion_flow(1, db.session, Diary, today=today, window=window),
+        'sm': analyze_sleep_mind(1, db.session, Diary, today=today, window=window),
+        'sn': analyze_self_narrative(1, db.session, Diary, today=today, window=window),
+    }
+
+    assert shared == expected
+    # 일기 20개 × (event, emotion_desc, self_talk, sleep_condition) — Phase 수와 무관
+    assert len(calls) == 20 * 4
+
+
+def test_precomputed_diary_features_replace_per_request_analysis(app, monkeypatch):
+    """diary_features에 저장된 일기별 특징이 있으면 Phase들이 토큰화 없이 집계만 한다"""
+    from models import DiaryFeature
+    from kick_analysis import linguistic, emotion_flow, self_narrative, sleep_mind
+    from kick_analysis.features import (compute_diary_features, build_diary_text, _encrypt_payload,
+                                        invalidate_diary_features, FEATURES_VERSION)
+    from kick_analysis.linguistic import analyze_linguistic
+
+    today = date(2026, 3, 31)
+    db.session.add(User(id=1, username="kick", password="123", role="user"))
+    for i in range(12):
+        db.session.add(Diary(
+            user_id=1, date=(today - timedelta(days=i)).strftime('%Y-%m-%d'), mood_level=(i % 5) + 1,
+            event=f"오늘은 회사에서 발표를 했는데 너무 떨렸다 {i}", emotion_desc="불안하고 피곤했지만 뿌듯했다",
+            self_talk="나는 잘하고 있어", sleep_condition="잠을 설쳤다",
+        ))
+    db.session.commit()
+
+    phases = [
+        lambda: analyze_linguistic(1, db.session, Diary, today=today),
+        lambda: emotion_flow.analyze_emotion_flow(1, db.session, Diary, today=today),
+        lambda: self_narrative.analyze_self_narrative(1, db.session, Diary, today=today),
+        lambda: sleep_mind.analyze_sleep_mind(1, db.session, Diary, today=today),
+    ]
+    expected = [phase() for phase in phases]
+
+    for d in Diary.query.all():
+        features = compute_diary_features(
+            build_diary_text(d.event, d.emotion_desc, d.emotion_meaning, d.self_talk), d.sleep_condition,
+            skip_llm_ner=True)
+        db.session.add(DiaryFeature(diary_id=d.id, user_id=1, date=d.date, features_version=FEATURES_VERSION,
+                                    payload=_encrypt_payload(features)))
+    db.session.commit()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("저장된 특징이 있는데 다시 계산함")
+
+    for module, name in [(linguistic, '_analyze_single_text'), (emotion_flow, '_analyze_single_diary_emotion'),
+                         (self_narrative, '_analyze_single_diary_narrative'), (sleep_mind, '_score_sleep_text')]:
+        monkeypatch.setattr(module, name, fail)
+
+    assert [phase() for phase in phases] == expected
+
+    # 수정/삭제 시 무효화 → 없는 일기는 즉석 계산으로 돌아감
+    invalidate_diary_features(Diary.query.first().id)
+    db.session.commit()
+    assert DiaryFeature.query.count() == 11
+
+
+def test_bulk_timeseries_matches_per_user_analysis(app):
+    """analyze_timeseries_bulk(집계 쿼리)는 사용자별 analyze_timeseries와 같은 결과를 낸다"""
+    import random
+    from kick_analysis import analyze_timeseries_bulk, analyze_all_users_timeseries
+
+    rng = random.Random(7)
+    today = date(2026, 3, 31)
+    for user_id in range(1, 41):
+        db.session.add(User(id=user_id, username=f"ts{user_id}", password="123", role="user"))
+        # 0~25건: 미기록, 빈도 감소, 같은 날 여러 건, mood/created_at 누락, 미래 날짜 포함
+        for _ in range(rng.randint(0, 25)):
+            day = today - timedelta(days=rng.randint(-1, 40))
+            created_at = None if rng.random() < 0.2 else (
+                datetime.combine(day, datetime.min.time()) + timedelta(hours=rng.randint(0, 23)))
+            db.session.add(Diary(
+                user_id=user_id, date=day.strftime('%Y-%m-%d'), created_at=created_at,
+                mood_level=None if rng.random() < 0.15 else rng.randint(1, 5),
+            ))
+    db.session.commit()
+
+    bulk = analyze_timeseries_bulk(db.session, Diary, today=today)
+    for user_id in range(1, 41):
+        expected = analyze_timeseries(user_id, db.session, Diary, today=today)
+        if Diary.query.filter_by(user_id=user_id).count() == 0:
+            assert user_id not in bulk and expected['flag_count'] == 0
+        else:
+            assert bulk[user_id] == expected
+
+    flagged = analyze_all_users_timeseries(db.session, User, Diary, today=today)
+    assert flagged['total_users'] == 40
+    assert flagged['flagged_count'] == sum(1 for r in bulk.values() if r['flag_count'] > 0)
+    assert {u['username'] for u in flagged['flagged_users']} == {
+        f"ts{uid}" for uid, r in bulk.items() if r['flag_count'] > 0}
+
+
+def test_parallel_overview_matches_sequential_all_users(app, monkeypatch):
+    """청크 단위 overview 계산은 analyze_all_users_* 6개를 차례로 돌린 결과와 같은 플래그를 낸다"""
+    from kick_analysis import analyze_all_users_timeseries, relational
+    from kick_analysis.linguistic import analyze_all_users_linguistic
+    from kick_analysis.emotion_flow import analyze_all_users_emotion_flow
+    from kick_analysis.sleep_mind import analyze_all_users_sleep_mind
+    from kick_analysis.self_narrative import analyze_all_users_self_narrative
+    from kick_analysis import overview
+
+    monkeypatch.setattr(relational, '_extract_people_llm_batch', lambda texts: [[] for _ in texts])
+    today = date(2026, 3, 31)
+    calm = ("오늘은 친구랑 엄마랑 산책을 하고 맛있는 저녁을 먹었다. 덕분에 감사하고 행복했다. "
+            "내일도 열심히 할 수 있을 것 같다.")
+    low = "다 내 잘못이야. 나는 아무것도 못해. 혼자 있고 외롭고 슬프다. 잠을 못 잤다. 해야 하는데."
+    for user_id in range(1, 8):
+        db.session.add(User(id=user_id, username=f"ov{user_id}", password="123", role="user"))
+        for i in range(0, 30, 1 + user_id % 3):
+            recent = i < 7
+            db.session.add(Diary(
+                user_id=user_id, date=(today - timedelta(days=i + user_id % 2 * 8)).strftime('%Y-%m-%d'),
+                mood_level=(2 if recent else 4) - (i % 2 if recent else 0),
+                event=low if recent and user_id % 2 else calm, emotion_desc="피곤했다",
+                sleep_condition="잠을 설쳤다" if recent else "푹 잤다",
+                created_at=datetime.combine(today - timedelta(days=i), datetime.min.time())
+                           + timedelta(hours=3 if recent else 21),
+            ))
+    db.session.commit()
+
+    decrypt = lambda value: value  # noqa: E731
+    sequential = {
+        'timeseries': analyze_all_users_timeseries(db.session, User, Diary, today=today),
+        'linguistic': analyze_all_users_linguistic(db.session, User, Diary, crypto_decrypt=decrypt, today=today),
+        'relational': relational.analyze_all_users_relational(db.session, User, Diary, crypto_decrypt=decrypt,
+                                                              today=today),
+        'emotion_flow': analyze_all_users_emotion_flow(db.session, User, Diary, crypto_decrypt=decrypt, today=today),
+        'sleep_mind': analyze_all_users_sleep_mind(db.session, User, Diary, crypto_decrypt=decrypt, today=today),
+        'self_narrative': analyze_all_users_self_narrative(db.session, User, Diary, crypto_decrypt=decrypt,
+                                                           today=today),
+    }
+    expected = overview.merge_overview(
+        {phase: result['flagged_users'] for phase, result in sequential.items()}, total_users=7)
+
+    result = overview.get_dashboard_overview(app, User, Diary, crypto_decrypt=decrypt, today=today,
+                                             wait=True, workers=1, chunk_size=3)
+    assert result['status'] == 'done'
+    assert result['progress']['processed_users'] == 7 and result['progress']['errors'] == 0
+    assert expected['total_flags'] > 0 and len([p for p, n in expected['by_phase'].items() if n]) >= 3
+    for key in ('total_users', 'flagged_user_count', 'total_flags', 'by_severity', 'by_phase', 'flags'):
+        assert result[key] == expected[key]
+
+
+def test_pool_overview_submits_chunks_in_bounded_window(app, monkeypatch):
+    """프로세스 풀 경로는 청크를 inflight 한도만큼만 앞서 조회/전송하고, 순차 경로와 같은 결과를 낸다"""
+    from concurrent.futures import ThreadPoolExecutor
+    from kick_analysis import overview, relational
+
+    monkeypatch.setattr(relational, '_extract_people_llm_batch', lambda texts: [[] for _ in texts])
+    today = date(2026, 3, 31)
+    for user_id in range(1, 7):
+        db.session.add(User(id=user_id, username=f"win{user_id}", password="123", role="user"))
+        for i in range(10):
+            db.session.add(Diary(user_id=user_id, date=(today - timedelta(days=i)).strftime('%Y-%m-%d'),
+                                 mood_level=1 + (i + user_id) % 5, event="다 내 잘못이야. 혼자 있고 외롭다.",
+                                 sleep_condition="잠을 못 잤다"))
+    db.session.commit()
+    monkeypatch.setitem(overview._state, 'job', None)  # 앞선 테스트의 같은 날짜 계산 결과 재사용 방지
+    sequential = overview.get_dashboard_overview(app, User, Diary, crypto_decrypt=lambda v: v, today=today,
+                                                 wait=True, workers=1, chunk_size=1)
+
+    inflight_at_load = []
+    load_chunk = overview._load_chunk
+
+    def _recording_load(*args, **kwargs):
+        job = overview._state['job']
+        inflight_at_load.append(len(inflight_at_load) - job.processed_users)
+        return load_chunk(*args, **kwargs)
+
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(overview, '_load_chunk', _recording_load)
+    monkeypatch.setattr(overview, '_get_pool', lambda workers: pool)
+    monkeypatch.setattr(overview, 'OVERVIEW_INFLIGHT_PER_WORKER', 1)
+    monkeypatch.setattr(overview, 'OVERVIEW_CACHE_TTL', 0)  # 순차 결과 캐시 재사용 방지
+    try:
+        pooled = overview.get_dashboard_overview(app, User, Diary, today=today, wait=True, workers=2, chunk_size=1)
+    finally:
+        pool.shutdown()
+
+    assert pooled['status'] == 'done' and pooled['progress']['processed_users'] == 6
+    assert len(inflight_at_load) == 6 and max(inflight_at_load) <= 2
+    assert sequential['total_flags'] > 0 and pooled['flags'] == sequential['flags']
+
+
+def test_condition_snapshots_refresh_only_changed_users(app, client, monkeypatch):
+    """스냅샷 갱신은 일기가 바뀐 사용자만 다시 계산하고, 대시보드는 스냅샷을 as_of와 함께 읽는다"""
+    import time
+    from models import AnalysisJob
+    from kick_analysis import condition_snapshots
+    from kick_analysis.condition_snapshots import refresh_condition_snapshots, load_condition_overview
+
+    today = date(2026, 3, 31)
+    for user_id in range(1, 4):
+        db.session.add(User(id=user_id, username=f"cs{user_id}", password="123", role="user"))
+        for i in range(5):
+            db.session.add(Diary(user_id=user_id, date=(today - timedelta(days=i)).strftime('%Y-%m-%d'),
+                                 mood_level=3, event="오늘은 산책을 하고 책을 읽었다"))
+    db.session.commit()
+
+    def refresh():
+        return refresh_condition_snapshots(db.session, User, Diary, today=today)
+
+    assert refresh() == {'users': 3, 'refreshed': 3, 'skipped': 0, 'errors': 0}
+    assert refresh()['refreshed'] == 0
+
+    # 수정: enqueue_analysis가 analysis_jobs.version을 올림
+    diary = Diary.query.filter_by(user_id=2).first()
+    db.session.add(AnalysisJob(diary_id=diary.id, user_id=2, version=2))
+    db.session.commit()
+    assert refresh() == {'users': 3, 'refreshed': 1, 'skipped': 2, 'errors': 0}
+
+    # 삭제
+    db.session.delete(Diary.query.filter_by(user_id=3).first())
+    db.session.commit()
+    assert refresh()['refreshed'] == 1
+
+    # 날짜가 바뀌면 전원 재계산 (미기록 일수 등이 달라짐)
+    assert refresh_condition_snapshots(db.session, User, Diary, today=today + timedelta(days=1))['refreshed'] == 3
+
+    overview = load_condition_overview(db.session, User)
+    assert overview['snapshot_count'] == 3 and overview['total_users'] == 3
+    assert overview['as_of'] and overview['analysis_date'] == '2026-04-01'
+
+    monkeypatch.setitem(condition_snapshots._last_refresh_started, 'at', time.time())  # 백그라운드 갱신 억제
+    res = client.get('/api/kick/dashboard/condition-overview')
+    assert res.status_code == 200
+    assert res.get_json()['as_of'] == overview['as_of']
+
+
+def test_relational_llm_ner_cached_per_diary_and_batched(app, monkeypatch):
+    """LLM NER은 캐시 미스만 한 번에 묶어 요청하고, 같은 본문은 다시 요청하지 않으며, 수정된 일기만 재추출한다"""
+    from models import DiaryNerCache
+    from kick_analysis import relational
+    from kick_analysis.relational import analyze_relational
+
+    batches = []
+
+    def fake_batch(texts):
+        batches.append(len(texts))
+        return [["가나다"] for _ in texts]
+
+    monkeypatch.setattr(relational, '_extract_people_llm_batch', fake_batch)
+    monkeypatch.setattr(relational, '_extract_people_llm',
+                        lambda text: (_ for _ in ()).throw(AssertionError("단건 LLM 호출")))
+    monkeypatch.setattr(relational, 'NER_BATCH_SIZE', 4)
+
+    today = date(2026, 3, 31)
+    db.session.add(User(id=1, username="ner", password="123", role="user"))
+    for i in range(6):
+        db.session.add(Diary(user_id=1, date=(today - timedelta(days=i)).strftime('%Y-%m-%d'),
+                             mood_level=3, event=f"오늘은 민지랑 점심을 먹고 산책했다 {i}"))
+    db.session.commit()
+
+    first = analyze_relational(1, db.session, Diary, today=today)
+    assert batches == [4, 2]  # 일기 6개 → 배치 2번 (일기마다 2번씩 12번이 아님)
+    assert DiaryNerCache.query.count() == 6
+    assert "가나다" in first['relational']['all_people_ever']
+
+    batches.clear()
+    assert analyze_relational(1, db.session, Diary, today=today) == first
+    assert batches == []
+
+    diary = Diary.query.filter_by(user_id=1).first()
+    diary.event = "오늘은 민지랑 영화를 봤다"
+    db.session.commit()
+    analyze_relational(1, db.session, Diary, today=today)
+    assert batches == [1]
+
+
+def test_kiwi_service_batch_matches_tokenize_and_caches():
+    """analyze_many는 tokenize()/split_into_sents()와 같은 결과를 주고, 같은 텍스트는 캐시에서 재사용한다"""
+    from kick_analysis import kiwi_service
+
+    texts = [
+        "오늘은 회사에서 발표를 했다. 너무 떨렸지만 팀장님이 칭찬해주셨다!",
+        "",
+        "엄마랑 저녁을 먹었다... 그런데 \"괜찮아\"라는 말이 자꾸 생각났다 ㅠㅠ",
+        "오늘은 회사에서 발표를 했다. 너무 떨렸지만 팀장님이 칭찬해주셨다!",
+    ]
+    kiwi_service.clear_cache()
+    results = kiwi_service.analyze_many(texts)
+    kiwi = kiwi_service.get_kiwi()
+
+    assert results[1] is None
+    assert results[0] is results[3]  # 같은 텍스트는 한 번만 분석
+    for text, analysis in zip(texts, results):
+        if not text:
+            continue
+        assert [(t.form, t.tag, t.start) for t in analysis.tokens] == \
+            [(t.form, t.tag, t.start) for t in kiwi.tokenize(text)]
+        assert [s.text for s in analysis.sentences] == [s.text for s in kiwi.split_into_sents(text)]
+        assert kiwi_service.analyze_text(text) is analysis
+
+
+def test_kiwi_cache_expires_and_forgets_diary_text(client, app, monkeypatch):
+    """Kiwi 분석 캐시(일기 평문 토큰)는 TTL 후 만료되고, 일기 삭제 시 즉시 제거된다"""
+    from kick_analysis import kiwi_service
+    from kick_analysis.features import build_diary_text
+    from tests.test_diary import get_auth_headers
+
+    kiwi_service.clear_cache()
+    text = "오늘은 회사에서 발표를 했다."
+    first = kiwi_service.analyze_text(text)
+    monkeypatch.setattr(kiwi_service, 'KIWI_CACHE_TTL', -1)  # 이후 적재분은 즉시 만료
+    assert kiwi_service.analyze_text(text) is first
+    kiwi_service.forget([text])
+    second = kiwi_service.analyze_text(text)
+    assert second is not first and kiwi_service.analyze_text(text) is not second
+    monkeypatch.undo()
+
+    headers = get_auth_headers(app)
+    diary_id = client.post('/api/diaries', json={"date": "2026-03-01", "mood_level": 3,
+                                                 "event": "친구랑 산책했다", "self_talk": "괜찮아"},
+                           headers=headers).get_json()['id']
+    kick_text = build_diary_text("친구랑 산책했다", None, None, "괜찮아")
+    kiwi_service.analyze_many([kick_text])
+    assert kiwi_service._cache_get(kiwi_service._key(kick_text)) is not None
+
+    client.delete(f'/api/diaries/{diary_id}', headers=headers)
+    assert kiwi_service._cache_get(kiwi_service._key(kick_text)) is None
+
+
+def test_timeseries_paths_agree_on_future_dated_diaries(app):
+    """기준일 이후 날짜(UTC보다 앞선 KST 일기)는 윈도우/개별 쿼리/bulk 경로 모두 같은 범위로 집계"""
+    from kick_analysis import analyze_timeseries_bulk
+
+    today = date(2026, 3, 31)
+    db.session.add(User(id=1, username="kst", password="123", role="user"))
+    for offset in (1, 0, -1, -2):  # 내일 날짜 1건 포함, 모두 새벽 기록
+        day = today + timedelta(days=offset)
+        db.session.add(Diary(user_id=1, date=day.isoformat(), mood_level=3,
+                             created_at=datetime.combine(day, datetime.min.time()) + timedelta(hours=2)))
+    db.session.commit()
+
+    window = UserDiaryWindow(1, db.session, Diary, today=today)
+    with_window = analyze_timeseries(1, db.session, Diary, today=today, window=window)
+    without_window = analyze_timeseries(1, db.session, Diary, today=today)
+    bulk = analyze_timeseries_bulk(db.session, Diary, today=today)[1]
+    assert with_window == without_window == bulk
+    assert 'night_recording' in [f['type'] for f in with_window['flags']]
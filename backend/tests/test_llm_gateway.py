@@ -0,0 +1,57 @@
+import threading
+
+import llm_gateway
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+        self.text = ''
+
+    def json(self):
+        return self._payload
+
+
+class _FakeVLLM:
+    """/v1/completions 호출을 기록하고 프롬프트를 그대로 되돌려주는 가짜 세션"""
+
+    def __init__(self):
+        self.calls = []
+
+    def post(self, url, json=None, timeout=None):
+        self.calls.append(json)
+        prompts = json['prompt']
+        return _FakeResponse({
+            'choices': [{'index': i, 'text': f"echo:{p}"} for i, p in enumerate(prompts)],
+            'usage': {'prompt_tokens': 2 * len(prompts), 'completion_tokens': 4 * len(prompts)},
+        })
+
+
+def test_concurrent_prompts_are_batched(monkeypatch):
+    """동시에 들어온 같은 옵션의 프롬프트는 vLLM 한 번의 호출로 묶이고, 결과는 요청별로 돌아간다"""
+    monkeypatch.setattr(llm_gateway, 'BATCH_WINDOW_MS', 200)
+    backend = llm_gateway._VLLMBackend(concurrency=1, max_batch=8)
+    fake = backend._http = _FakeVLLM()
+    monkeypatch.setitem(llm_gateway._backends, 'vllm', backend)
+
+    results = {}
+
+    def _call(i):
+        results[i] = llm_gateway.generate(f"p{i}", options={"num_predict": 8}, backend='vllm', timeout=10)
+
+    threads = [threading.Thread(target=_call, args=(i,)) for i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: f"echo:p{i}" for i in range(5)}
+    assert len(fake.calls) < 5
+    assert sum(len(c['prompt']) for c in fake.calls) == 5
+    assert fake.calls[0]['max_tokens'] == 8
+
+    stats = backend.stats()
+    assert stats['completed'] == 5
+    assert stats['completion_tokens'] == 20
@@ -0,0 +1,99 @@
+"""
+diaries 주요 조회의 EXPLAIN 회귀 테스트
+실제 엔드포인트/함수가 실행한 SQL을 가로채 EXPLAIN QUERY PLAN으로 확인한다.
+user_id + date/created_at 범위 조회가 해당 복합 인덱스 범위 스캔을 쓰지 않으면 실패한다.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event
+
+from models import db, User, Diary, BridgeRecipient
+from tests.test_diary import get_auth_headers
+
+
+def _capture_diary_queries(fn):
+    """fn 실행 중 user_id 조건이 있는 diaries SELECT 문과 파라미터를 모은다"""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if (statement.lstrip().upper().startswith('SELECT') and 'FROM diaries' in statement
+                and 'diaries.user_id = ?' in statement):
+            captured.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return captured
+
+
+def _plan(statement, parameters):
+    rows = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return ' | '.join(row[-1] for row in rows)
+
+
+def test_main_diary_queries_use_user_composite_indexes(app, client):
+    from stats_routes import calculate_mood_temperature
+    from kick_analysis.corpus import UserDiaryWindow
+    from kick_analysis.weekly_letter import generate_weekly_letter_for_user
+
+    headers = get_auth_headers(app)
+    today = date.today()
+    for i in range(10):
+        day = today - timedelta(days=i)
+        db.session.add(Diary(user_id=1, date=day.isoformat(), mood_level=3, event="산책",
+                             created_at=datetime.combine(day, datetime.min.time())))
+    recipient = BridgeRecipient(user_id=1, name="엄마", type="family")
+    db.session.add(recipient)
+    db.session.commit()
+    recipient_id = recipient.id
+
+    next_cursor = client.get('/api/diaries?limit=3', headers=headers).headers['X-Next-Cursor']
+    by_date, by_created = 'ix_diaries_user_date', 'ix_diaries_user_created_at'
+    calls = {
+        'get_diaries(range)': (by_date, lambda: client.get(
+            f'/api/diaries?start_date={(today - timedelta(days=7)).isoformat()}&end_date={today.isoformat()}',
+            headers=headers)),
+        'get_diaries(month)': (by_date, lambda: client.get(
+            f'/api/diaries?year={today.year}&month={today.month}', headers=headers)),
+        'get_diaries(cursor)': (by_date, lambda: client.get(
+            f'/api/diaries?limit=3&cursor={next_cursor}', headers=headers)),
+        'user_me(created_at)': (by_created, lambda: client.get('/api/user/me', headers=headers)),
+        'mood_temperature': (by_created, lambda: calculate_mood_temperature(1)),
+        'mood_calendar': (by_date, lambda: client.get(
+            f'/api/mood-calendar?year={today.year}&month={today.month}', headers=headers)),
+        'prepare_share': (by_date, lambda: client.get(f'/api/bridge/prepare-share/{recipient_id}',
+                                                      headers=headers)),
+        'kick_window': (by_date, lambda: UserDiaryWindow(1, db.session, Diary, today=today)),
+        'weekly_letter': (by_date, lambda: generate_weekly_letter_for_user(
+            1, db.session, User, Diary, target_date=today + timedelta(days=60))),
+    }
+
+    for name, (index_name, call) in calls.items():
+        queries = _capture_diary_queries(call)
+        assert queries, f"{name}: diaries 조회를 가로채지 못함"
+        for statement, parameters in queries:
+            plan = _plan(statement, parameters)
+            assert 'INDEX ix_diaries_user_' in plan, f"{name}: 인덱스 미사용\n{statement}\n{plan}"
+            column = index_name[len('ix_diaries_user_'):]
+            if f'diaries.{column} >' in statement or f'diaries.{column} <' in statement:
+                # user_id뿐 아니라 범위 컬럼까지 인덱스로 탐색해야 함 (예: "(user_id=? AND date>? AND date<?)")
+                assert f"INDEX {index_name} (user_id=? AND {column}" in plan, \
+                    f"{name}: 범위 조건 인덱스 미사용\n{statement}\n{plan}"
+
+
+def test_diary_date_column_follows_date_string(app):
+    db.session.add(User(id=1, username="dd", password="123", role="user"))
+    diary = Diary(user_id=1, date="2026-03-01", mood_level=3)
+    db.session.add(diary)
+    db.session.commit()
+    assert diary.diary_date == date(2026, 3, 1)
+
+    diary.date = "2026-03-15"
+    db.session.commit()
+    assert Diary.query.filter(Diary.user_id == 1, Diary.diary_date == date(2026, 3, 15)).count() == 1
+
+    diary.date = "2026-02-30"  # 잘못된 문자열은 NULL
+    db.session.commit()
+    assert diary.diary_date is None
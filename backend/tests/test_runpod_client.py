@@ -0,0 +1,123 @@
+"""
+RunPodClient 테스트 (httpx.MockTransport로 RunPod API 흉내)
+/runsync?wait= 경로, 미완료 시 점증 간격 long-poll, 타임아웃 시 취소, webhook 완료 통지를 확인한다.
+"""
+import json
+import time
+import asyncio
+
+import httpx
+import pytest
+
+import runpod_client
+from runpod_client import RunPodClient, RunPodError
+
+
+class _FakeRunPod:
+    """요청을 기록하고, 작업 id별로 정해진 상태를 차례로 돌려준다"""
+
+    def __init__(self, submit_response, statuses=()):
+        self.submit_response = submit_response
+        self.statuses = list(statuses)
+        self.requests = []
+
+    def __call__(self, request):
+        body = json.loads(request.content) if request.content else None
+        self.requests.append((request.method, request.url.path, dict(request.url.params), body))
+        path = request.url.path
+        if path.endswith('/runsync') or path.endswith('/run'):
+            return httpx.Response(200, json=self.submit_response)
+        if '/status/' in path:
+            status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+            return httpx.Response(200, json=dict(status, id=path.rsplit('/', 1)[-1]))
+        if '/cancel/' in path:
+            return httpx.Response(200, json={'status': 'CANCELLED'})
+        return httpx.Response(404, text='not found')
+
+    def paths(self, kind):
+        return [r for r in self.requests if f'/{kind}' in r[1]]
+
+
+def _client(fake, **kwargs):
+    client = RunPodClient(api_key='k', endpoint_url='https://api.runpod.ai/v2/ep/runsync', **kwargs)
+    client._ensure_loop()
+    client._session = httpx.AsyncClient(transport=httpx.MockTransport(fake))
+    return client
+
+
+@pytest.fixture
+def fast_polling(monkeypatch):
+    """폴링 간격을 줄이고 실제로 기다린 간격을 기록"""
+    monkeypatch.setattr(runpod_client, 'POLL_MIN_SECONDS', 0.02)
+    monkeypatch.setattr(runpod_client, 'POLL_MAX_SECONDS', 0.05)
+    waits = []
+    real_sleep = asyncio.sleep
+
+    async def _sleep(delay, *args, **kwargs):
+        waits.append(round(delay, 4))
+        return await real_sleep(delay, *args, **kwargs)
+
+    monkeypatch.setattr(runpod_client.asyncio, 'sleep', _sleep)
+    return waits
+
+
+def test_runsync_returns_output_without_polling():
+    fake = _FakeRunPod({'id': 'j1', 'status': 'COMPLETED', 'output': {'text': 'ok'}})
+    client = _client(fake)
+
+    assert client.run({'prompt': 'hi'}, timeout=20) == {'text': 'ok'}
+    method, path, params, body = fake.requests[0]
+    assert (method, path) == ('POST', '/v2/ep/runsync')
+    assert params['wait'] == '20000' and body == {'input': {'prompt': 'hi'}}
+    assert len(fake.requests) == 1 and client.stats()['completed'] == 1
+
+
+def test_incomplete_job_is_long_polled_with_growing_interval(fast_polling):
+    fake = _FakeRunPod({'id': 'j2', 'status': 'IN_QUEUE'},
+                       [{'status': 'IN_PROGRESS'}] * 3 + [{'status': 'COMPLETED', 'output': 'done'}])
+    client = _client(fake)
+
+    assert client.run({'prompt': 'hi'}, timeout=20) == 'done'
+    assert len(fake.paths('status')) == 4
+    assert fast_polling[:4] == [0.02, 0.03, 0.045, 0.05]  # x1.5씩, POLL_MAX_SECONDS에서 멈춤
+    assert client.stats()['status_polls'] == 4
+
+
+def test_timed_out_job_is_cancelled(fast_polling):
+    fake = _FakeRunPod({'id': 'j3', 'status': 'IN_QUEUE'}, [{'status': 'IN_PROGRESS'}])
+    client = _client(fake)
+
+    with pytest.raises(RunPodError, match="Timed Out"):
+        client.run({'prompt': 'hi'}, timeout=0.2)
+    assert [r[1] for r in fake.paths('cancel')] == ['/v2/ep/cancel/j3']
+    assert client.stats()['failed'] == 1 and client.stats()['inflight'] == 0
+
+
+def test_webhook_resolves_waiting_job(monkeypatch):
+    monkeypatch.setattr(runpod_client, 'WEBHOOK_POLL_SECONDS', 30.0)
+    fake = _FakeRunPod({'id': 'j4', 'status': 'IN_QUEUE'})
+    client = _client(fake, webhook_url='https://app/api/runpod/webhook?token=s3cret', webhook_secret='s3cret')
+
+    future = client.submit({'prompt': 'hi'}, timeout=20)
+    deadline = time.time() + 5
+    while 'j4' not in client._waiters and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert not client.verify_webhook_token('wrong') and not client.verify_webhook_token(None)
+    assert client.verify_webhook_token('s3cret')
+    assert client.resolve_webhook({'id': 'unknown', 'status': 'COMPLETED'}) is False
+    assert client.resolve_webhook({'id': 'j4', 'status': 'COMPLETED', 'output': 'hooked'}) is True
+
+    assert future.result(timeout=5) == 'hooked'
+    assert fake.requests[0][1] == '/v2/ep/run' and fake.requests[0][3]['webhook'].endswith('token=s3cret')
+    assert not fake.paths('status') and client.stats()['webhook_hits'] == 1
+
+
+def test_webhook_requires_secret(client, monkeypatch):
+    monkeypatch.delenv('RUNPOD_WEBHOOK_SECRET', raising=False)
+    with pytest.raises(ValueError):
+        RunPodClient(api_key='k', endpoint_url='https://x/run', webhook_url='https://app/hook')
+    assert not RunPodClient(api_key='k', endpoint_url='https://x/run').verify_webhook_token('anything')
+
+    res = client.post('/api/runpod/webhook?token=anything', json={'id': 'j5', 'status': 'COMPLETED'})
+    assert res.status_code == 403
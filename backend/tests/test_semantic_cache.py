@@ -0,0 +1,39 @@
+import numpy as np
+
+import semantic_cache
+
+
+def _fake_embed(text):
+    """'피곤'/'우울' 포함 여부로 만든 2차원 벡터 — 같은 범주면 유사도 1에 가깝다"""
+    vec = np.array([1.0 if '피곤' in text else 0.0, 1.0 if '우울' in text else 0.0, 0.05], dtype=np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def test_semantic_cache_hits_bypass_and_eviction(monkeypatch):
+    monkeypatch.setattr(semantic_cache, '_embed', _fake_embed)
+    monkeypatch.setattr(semantic_cache, '_has_proper_noun', lambda text: False)
+    cache = semantic_cache.SemanticCache('test', threshold=0.9, ttl_seconds=60, max_entries=2)
+
+    # 1. 첫 조회는 miss → 저장
+    value, token = cache.lookup("오늘 너무 피곤해")
+    assert value is None
+    cache.store(token, "푹 쉬세요")
+
+    # 2. 정확 일치 / 의미 유사 입력은 적중, 다른 범주는 miss
+    assert cache.lookup("오늘  너무 피곤해")[0] == "푹 쉬세요"
+    assert cache.lookup("요즘 계속 피곤하다")[0] == "푹 쉬세요"
+    value, token = cache.lookup("회사 때문에 우울해")
+    assert value is None
+    cache.store(token, "속상하셨겠어요")
+
+    # 3. 위기 발화는 조회/저장 모두 우회
+    assert cache.lookup("피곤해서 죽고 싶어") == (None, None)
+
+    # 4. 최대 항목 수 초과 시 가장 오래 안 쓴 항목부터 제거
+    _, token = cache.lookup("배고파")
+    cache.store(token, "맛있는 거 드세요")
+    assert cache.lookup("오늘 너무 피곤해")[0] is None
+
+    stats = cache.stats()
+    assert stats['exact_hits'] == 1 and stats['semantic_hits'] == 1
+    assert stats['bypassed'] == 1 and stats['evictions'] == 1
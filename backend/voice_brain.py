@@ -61,9 +61,9 @@ class VoiceBrain:
         Uses Local LLM (Gemma 4) to split the transcribed text into diary fields.
         Returns a dict with keys: event, emotion, meaning, comfort.
         """
-        import requests
         import json
         import re
+        from llm_gateway import generate
 
         if not text or len(text) < 5:
             return None
@@ -71,7 +71,6 @@ class VoiceBrain:
         print(f"🧠 [VoiceBrain] Structuring text with Gemma 4...")
         
         try:
-            url = "http://localhost:11434/api/generate"
             prompt_text = (
                 f"### Role\n"
                 f"당신은 사용자의 일기 내용을 분석하여 4가지 항목으로 분류해주는 AI 비서입니다.\n\n"
@@ -93,23 +92,16 @@ class VoiceBrain:
                 f"* 반드시 JSON만 출력하세요. 마크다운이나 잡담 금지."
             )
 
-            payload = {
-                "model": "gemma4:2b",
-                "prompt": prompt_text,
-                "stream": False,
-                "format": "json", # Enforce structured mode
-                "options": {
+            json_str = generate(
+                prompt_text,
+                model="gemma4:2b",
+                format="json", # Enforce structured mode
+                options={
                     "temperature": 0.5,
                     "num_predict": 500
-                }
-            }
-            
-            response = requests.post(url, json=payload, timeout=60)
-            if response.status_code != 200:
-                print(f"❌ LLM Error: {response.text}")
-                return None
-                
-            json_str = response.json().get('response', '')
+                },
+                timeout=60
+            )
             print(f"🧠 [VoiceBrain] Raw LLM Response: {json_str[:100]}...")
             
             # Simple Cleaning just in case
@@ -105,18 +105,24 @@ def build_prompt(user_text: str, history: str = "", is_crisis: bool = False) ->
     return "\n".join(parts)
 
 
-def handler(job):
-    """RunPod Serverless 이벤트 핸들러"""
-    job_input = job.get("input", {})
-    
-    # 입력 파싱 (기존 API 호환)
-    user_text = job_input.get("text") or job_input.get("prompt")
-    history = job_input.get("history", "")
-    max_tokens = job_input.get("max_tokens", 512)
-    temperature = job_input.get("temperature", 0.7)
+MAX_BATCH_ITEMS = int(os.environ.get("MAX_BATCH_ITEMS", "256"))  # 배치 job 1건당 최대 항목 수
+FALLBACK_REACTION = "잠시 상담 시스템에 문제가 있어요. 곧 돌아올게요. 🙏"
+
+
+def _prepare_item(item: dict):
+    """
+    입력 1건을 검사해 (즉시 응답, 프롬프트, 샘플링 파라미터)를 반환한다.
+    즉시 응답이 있으면(입력 없음 / Level 3 위기) 생성 대상에서 제외된다.
+    """
+    user_text = item.get("text") or item.get("prompt")
+    history = item.get("history", "")
+    max_tokens = item.get("max_tokens", 512)
+    temperature = item.get("temperature", 0.7)
     
     if not user_text:
-        return {"error": "입력 텍스트가 없습니다. 'text' 필드를 포함해주세요."}
+        return {"error": "입력 텍스트가 없습니다. 'text' 필드를 포함해주세요."}, None, None
+    if not isinstance(user_text, str):
+        return {"error": "'text'는 문자열이어야 합니다."}, None, None
     
     # 프롬프트 구성 (위기 감지 시 프롬프트 강화)
     is_crisis = any(kw in user_text for kw in CRISIS_KEYWORDS)
@@ -129,7 +135,7 @@ def handler(job):
     if is_crisis_level3:
         safe_response = random.choice(CRISIS_SAFE_RESPONSES)
         print(f"🛡️ [Crisis L3] 안전 폴백 응답 반환 (AI 생성 차단)", flush=True)
-        return {"reaction": safe_response}
+        return {"reaction": safe_response, "crisis": True}, None, None
     
     full_prompt = build_prompt(user_text, history, is_crisis=is_crisis)
     
@@ -141,18 +147,87 @@ def handler(job):
         stop=["[|endofturn|]", "[|user|]"],   # EXAONE stop tokens
         repetition_penalty=1.1,
     )
+    return None, full_prompt, sampling_params
+
+
+def _postprocess(generated_text: str) -> str:
+    """[Phase 4] 응답 금지어 필터링 (Post-processing)"""
+    generated_text = generated_text.strip()
+    for phrase in BLOCKED_PHRASES:
+        if phrase in generated_text:
+            print(f"🚫 [Filter] Blocked phrase removed: {phrase}", flush=True)
+            generated_text = generated_text.replace(phrase, "").strip()
+    return generated_text
+
+
+def handle_batch(items: list) -> dict:
+    """
+    여러 입력을 vLLM generate 1회로 처리한다. (주간 편지 / 코멘트 백필 등 배치 작업용)
+    결과는 입력 순서대로 {"id", "reaction"[, "crisis", "error"]} 목록으로 반환.
+    Level 3 위기 항목은 항목별로 안전 응답을 받고 생성에서 제외된다.
+    """
+    if len(items) > MAX_BATCH_ITEMS:
+        return {"error": f"배치 항목은 최대 {MAX_BATCH_ITEMS}개까지 가능합니다. (요청: {len(items)}개)"}
+    
+    results = []
+    prompts, params, targets = [], [], []
+    for idx, item in enumerate(items):
+        item = item if isinstance(item, dict) else {"text": item}
+        result = {"id": item.get("id", idx)}
+        try:
+            immediate, full_prompt, sampling_params = _prepare_item(item)
+        except Exception as e:
+            # 잘못된 항목(파라미터 타입 등)은 그 항목만 오류로 응답 → 나머지 배치는 계속 생성
+            print(f"⚠️ [Batch] 항목 {result['id']} 입력 오류: {e}", flush=True)
+            immediate = {"error": f"잘못된 입력: {e}"}
+        if immediate is not None:
+            result.update(immediate)
+        else:
+            prompts.append(full_prompt)
+            params.append(sampling_params)
+            targets.append(result)
+        results.append(result)
+    
+    if prompts:
+        try:
+            # 항목별 SamplingParams 리스트 → vLLM continuous batching으로 한 번에 생성
+            outputs = llm.generate(prompts, params)
+            for result, output in zip(targets, outputs):
+                result["reaction"] = _postprocess(output.outputs[0].text)
+        except Exception as e:
+            print(f"❌ [Error] 배치 추론 실패: {e}", flush=True)
+            traceback.print_exc()
+            for result in targets:
+                result["reaction"] = FALLBACK_REACTION
+                result["error"] = str(e)
+    
+    print(f"📦 [Batch] {len(items)}건 처리 (생성 {len(prompts)}건, 즉시 응답 {len(items) - len(prompts)}건)", flush=True)
+    return {"results": results}
+
+
+def handler(job):
+    """RunPod Serverless 이벤트 핸들러"""
+    job_input = job.get("input", {})
+    
+    # 배치 입력: {"items": [{"id", "text", "history", "max_tokens", "temperature"}, ...]}
+    items = job_input.get("items")
+    if items is not None:
+        if not isinstance(items, list):
+            return {"error": "'items'는 리스트여야 합니다."}
+        return handle_batch(items)
+    
+    # 단건 입력 (기존 API 호환)
+    immediate, full_prompt, sampling_params = _prepare_item(job_input)
+    if immediate is not None:
+        immediate.pop("crisis", None)
+        return immediate
     
     try:
         outputs = llm.generate(full_prompt, sampling_params)
-        generated_text = outputs[0].outputs[0].text.strip()
-        
-        # [Phase 4] 응답 금지어 필터링 (Post-processing)
-        for phrase in BLOCKED_PHRASES:
-            if phrase in generated_text:
-                print(f"🚫 [Filter] Blocked phrase removed: {phrase}", flush=True)
-                generated_text = generated_text.replace(phrase, "").strip()
+        generated_text = _postprocess(outputs[0].outputs[0].text)
         
         # 로그 (디버깅용)
+        user_text = job_input.get("text") or job_input.get("prompt")
         print(f"💬 [IO] In: {user_text[:30]}... → Out: {generated_text[:30]}...", flush=True)
         
         return {"reaction": generated_text}
@@ -161,7 +236,7 @@ def handler(job):
         print(f"❌ [Error] 추론 실패: {e}", flush=True)
         traceback.print_exc()
         return {
-            "reaction": "잠시 상담 시스템에 문제가 있어요. 곧 돌아올게요. 🙏",
+            "reaction": FALLBACK_REACTION,
             "error": str(e)
         }
 
@@ -0,0 +1,91 @@
+"""
+handle_batch 테스트 — vLLM 엔진과 runpod SDK를 가짜 모듈로 바꿔 GPU 없이 실행
+    python -m pytest runpod_serverless_exaone/tests
+"""
+import os
+import sys
+import types
+import importlib.util
+from types import SimpleNamespace
+
+import pytest
+
+HANDLER_PATH = os.path.join(os.path.dirname(__file__), '..', 'src', 'handler.py')
+
+
+class _FakeSamplingParams:
+    def __init__(self, max_tokens=16, **kwargs):
+        if not isinstance(max_tokens, int) or max_tokens < 1:  # vLLM과 같은 검증
+            raise ValueError(f"max_tokens must be at least 1, got {max_tokens}.")
+        self.max_tokens = max_tokens
+        self.kwargs = kwargs
+
+
+class _FakeLLM:
+    """generate 호출을 기록하고, 프롬프트의 사용자 발화를 되돌려준다"""
+
+    def __init__(self, **kwargs):
+        self.calls = []
+
+    def generate(self, prompts, params):
+        self.calls.append((prompts, params))
+        return [SimpleNamespace(outputs=[SimpleNamespace(text=f" 답변:{p.rsplit('[|user|]', 1)[-1].split()[0]} 힘내세요")])
+                for p in prompts]
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    vllm = types.ModuleType('vllm')
+    vllm.LLM, vllm.SamplingParams = _FakeLLM, _FakeSamplingParams
+    runpod = types.ModuleType('runpod')
+    monkeypatch.setitem(sys.modules, 'vllm', vllm)
+    monkeypatch.setitem(sys.modules, 'runpod', runpod)
+    monkeypatch.setenv('MAX_BATCH_ITEMS', '4')
+
+    spec = importlib.util.spec_from_file_location('exaone_handler', HANDLER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_crisis_item_is_answered_without_generation(handler):
+    """Level 3 위기 항목은 안전 응답을 받고 생성에서 빠지며, 나머지는 vLLM 1회 호출로 입력 순서대로 채워진다"""
+    out = handler.handle_batch([
+        {"id": "a", "text": "오늘 산책했어요"},
+        {"id": "b", "text": "그냥 죽고 싶어요"},
+        "회사가 힘들었어요",
+    ])
+
+    results = out["results"]
+    assert [r["id"] for r in results] == ["a", "b", 2]
+    assert results[0]["reaction"] == "답변:오늘" and "crisis" not in results[0]  # 금지어 제거
+    assert results[1]["crisis"] is True and results[1]["reaction"] in handler.CRISIS_SAFE_RESPONSES
+    assert results[2]["reaction"] == "답변:회사가"
+
+    assert len(handler.llm.calls) == 1
+    prompts, _ = handler.llm.calls[0]
+    assert len(prompts) == 2 and not any("죽고" in p for p in prompts)
+
+
+def test_oversized_batch_is_rejected(handler):
+    out = handler.handle_batch([{"text": f"일기 {i}"} for i in range(handler.MAX_BATCH_ITEMS + 1)])
+    assert "error" in out and "results" not in out
+    assert handler.llm.calls == []
+
+
+def test_malformed_items_fail_individually(handler):
+    """텍스트 없음 / 문자열이 아닌 텍스트 / 잘못된 파라미터는 그 항목만 오류, 나머지는 정상 생성"""
+    out = handler.handle_batch([
+        {"id": 1},
+        {"id": 2, "text": 42},
+        {"id": 3, "text": "잠을 못 잤어요", "max_tokens": "많이"},
+        {"id": 4, "text": "친구를 만났어요"},
+    ])
+
+    results = out["results"]
+    assert [r["id"] for r in results] == [1, 2, 3, 4]
+    assert all("error" in r and "reaction" not in r for r in results[:3])
+    assert results[3] == {"id": 4, "reaction": "답변:친구를"}
+    assert len(handler.llm.calls) == 1 and len(handler.llm.calls[0][0]) == 1
+
+    assert handler.handler({"input": {"items": "not-a-list"}}) == {"error": "'items'는 리스트여야 합니다."}